@@ -1,14 +1,82 @@
 # app/dashboard.py
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, State
 import plotly.express as px
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import os
+import logging
+import shapely
+
+from .name_search import NameSearchIndex
+from .spatial_lookup import ZoneLookupService
+
+logger = logging.getLogger(__name__)
 
 # Cargar datos
 manzanas_gdf = gpd.read_file("data/manzanas_coyoacan.geojson")
 
+# Capas contenedoras para ubicar cada manzana: (ruta, columna id, columna nombre)
+CAPAS_PADRE = {
+    'ageb': ("clean_data/poligonos/ageb/ageb_coyoacan_clean.shp", 'id_ageb', None),
+    'colonia': ("clean_data/poligonos/colonia/colonias_coyoacan_clean.shp", 'id_colonia', 'nombre_col'),
+}
+
+def crear_servicio_zonas(manzanas):
+    """
+    Indexa las capas AGEB y colonia (si existen) y las manzanas, con
+    área, centroide y AGEB/colonia precalculados por manzana.
+
+    Returns:
+        ZoneLookupService: Servicio de búsqueda listo para los callbacks.
+    """
+    servicio = ZoneLookupService()
+    padres = []
+    for nombre, (ruta, columna_id, columna_nombre) in CAPAS_PADRE.items():
+        if not os.path.exists(ruta):
+            logger.warning(f"No se encontró la capa '{nombre}' en {ruta}.")
+            continue
+        servicio.agregar_capa(nombre, gpd.read_file(ruta), columna_id, columna_nombre)
+        padres.append(nombre)
+    servicio.agregar_capa('manzanas', manzanas, columna_nombre='nombre', padres=padres)
+    return servicio
+
+def crear_indice_nombres(manzanas, zonas):
+    """
+    Índice de búsqueda de nombres de manzana, calle y colonia. Todos se
+    refieren a manzanas: cada nombre apunta a sus manzanas y a la caja que
+    las contiene.
+
+    Returns:
+        NameSearchIndex: Índice ya construido.
+    """
+    capa = zonas.capas['manzanas']
+    cajas = shapely.bounds(capa.geometrias)
+    indice = NameSearchIndex()
+    indice.agregar('manzana', capa.atributos['nombre'], cajas)
+    if 'calle' in manzanas.columns:
+        indice.agregar('calle', manzanas['calle'], cajas)
+    # Colonia propia de la capa o, si no la tiene, la que la contiene
+    if 'colonia' in manzanas.columns:
+        indice.agregar('colonia', manzanas['colonia'], cajas)
+    elif 'colonia' in capa.atributos.columns:
+        indice.agregar('colonia', capa.atributos['colonia'], cajas)
+    return indice.construir()
+
+def centro_y_zoom(caja):
+    """
+    Centro y zoom de Mapbox que encuadran la caja (lon_min, lat_min,
+    lon_max, lat_max).
+    """
+    lon_min, lat_min, lon_max, lat_max = caja
+    extension = max(lon_max - lon_min, lat_max - lat_min)
+    zoom = 17 if extension <= 0 else float(np.clip(np.log2(360 / extension) - 1, 10, 17))
+    return {"lat": (lat_min + lat_max) / 2, "lon": (lon_min + lon_max) / 2}, zoom
+
 def init_dashboard(server):
     dash_app = Dash(__name__, server=server, url_base_pathname='/dashboard/')
+    zonas = crear_servicio_zonas(manzanas_gdf)
+    nombres = crear_indice_nombres(manzanas_gdf, zonas)
     
     # Layout del dashboard
     dash_app.layout = html.Div([
@@ -17,11 +85,12 @@ def init_dashboard(server):
             
             # Filtros
             html.Div([
-                html.Label("Selecciona una Zona:", style={'font-weight': 'bold'}),
+                html.Label("Busca una calle, colonia o manzana:", style={'font-weight': 'bold'}),
+                # Las opciones llegan por búsqueda (las mejores N por tecla)
                 dcc.Dropdown(
                     id='zone-dropdown',
-                    options=[{'label': nombre, 'value': nombre} for nombre in manzanas_gdf['nombre'].unique()],
-                    placeholder="Selecciona una zona",
+                    options=[],
+                    placeholder="Escribe para buscar",
                     multi=True,
                     style={'width': '100%', 'margin-bottom': '15px'}
                 ),
@@ -42,15 +111,38 @@ def init_dashboard(server):
         
     ], style={'background-color': '#f9f9f9', 'font-family': 'Arial', 'margin': '0', 'padding': '0'})
 
+    # Callback de búsqueda: opciones del dropdown para el texto escrito
+    @dash_app.callback(
+        Output('zone-dropdown', 'options'),
+        [Input('zone-dropdown', 'search_value')],
+        [State('zone-dropdown', 'value')]
+    )
+    def search_zones(texto, seleccion):
+        # Las opciones elegidas se conservan para que no se borre su etiqueta
+        seleccion = seleccion or []
+        elegidas = nombres.opciones(seleccion)
+        if not texto:
+            return elegidas
+        # 'search' = texto evita que el dropdown vuelva a filtrar las
+        # coincidencias difusas (que no contienen el texto tal cual)
+        encontradas = [k for k in nombres.buscar(texto) if k not in seleccion]
+        return elegidas + [dict(opcion, search=texto) for opcion in nombres.opciones(encontradas)]
+
     # Callback para actualizar el mapa basado en la selección
     @dash_app.callback(
         Output('map-graph', 'figure'),
         [Input('zone-dropdown', 'value')]
     )
-    def update_map(selected_zones):
-        # Filtrar el DataFrame basado en la selección del dropdown
-        filtered_gdf = manzanas_gdf if not selected_zones else manzanas_gdf[manzanas_gdf['nombre'].isin(selected_zones)]
-        
+    def update_map(seleccion):
+        # Manzanas de los nombres elegidos, encuadradas en la unión de sus cajas
+        centro, zoom = {"lat": 19.3437, "lon": -99.1621}, 10
+        filtered_gdf = manzanas_gdf
+        if seleccion:
+            filas = np.unique(np.concatenate([nombres.filas[k] for k in seleccion]))
+            filtered_gdf = manzanas_gdf.iloc[filas]
+            cajas = nombres.cajas[seleccion]
+            centro, zoom = centro_y_zoom((*cajas[:, :2].min(axis=0), *cajas[:, 2:].max(axis=0)))
+
         # Crear el mapa
         fig = px.choropleth_mapbox(
             filtered_gdf,
@@ -58,8 +150,8 @@ def init_dashboard(server):
             locations=filtered_gdf.index,
             color='nombre',
             mapbox_style="carto-positron",
-            zoom=10,
-            center={"lat": 19.3437, "lon": -99.1621},
+            zoom=zoom,
+            center=centro,
             opacity=0.6,
             hover_name="nombre"
         )
@@ -72,15 +164,18 @@ def init_dashboard(server):
         [Input('map-graph', 'clickData')]
     )
     def display_zone_info(clickData):
-        if clickData:
-            zone_name = clickData['points'][0]['hovertext']
-            selected_zone = manzanas_gdf[manzanas_gdf['nombre'] == zone_name].iloc[0]
-            # Información detallada de la zona
+        zona = zonas.resolver_clic('manzanas', clickData)
+        if zona:
+            # Información detallada de la zona (precalculada en el índice espacial)
             info = [
-                html.P(f"Nombre: {selected_zone['nombre']}", style={'font-weight': 'bold'}),
-                html.P(f"Área: {selected_zone.geometry.area:.2f} m²"),
-                html.P(f"Coordenadas: {selected_zone.geometry.centroid.y:.4f}, {selected_zone.geometry.centroid.x:.4f}")
+                html.P(f"Nombre: {zona['nombre']}", style={'font-weight': 'bold'}),
+                html.P(f"Área: {zona['area_m2']:,.2f} m²"),
+                html.P(f"Coordenadas: {zona['centroide_lat']:.4f}, {zona['centroide_lon']:.4f}")
             ]
+            if zona.get('ageb'):
+                info.append(html.P(f"AGEB: {zona['ageb']}"))
+            if zona.get('colonia'):
+                info.append(html.P(f"Colonia: {zona['colonia']}"))
             return info
         return "Haz clic en una zona del mapa para ver detalles."
 
@@ -2,21 +2,27 @@
 
 import geopandas as gpd
 from app import db  # Importar el objeto db de tu aplicación
+from dashboard.analysis.dual_crs import preparar_capa
+from dashboard.analysis.spatial_index import SpatialIndexStore, recortar, unir_espacial
 import logging
 
 # Configuración básica de logging
 logger = logging.getLogger(__name__)
 
+# Índices espaciales persistidos por tabla (los mismos que abre el dashboard)
+indices_espaciales = SpatialIndexStore()
+
 def load_coyoacan_boundary():
     """
-    Carga los límites de Coyoacán desde la base de datos.
+    Carga los límites de Coyoacán desde la base de datos, con geometría
+    en EPSG:4326 y en UTM 14N (ver dashboard/analysis/dual_crs.py).
     
     Returns:
         GeoDataFrame: GeoDataFrame con los límites de Coyoacán.
     """
     try:
         query = "SELECT * FROM public.limites_alcaldias WHERE nomgeo = 'Coyoacán';"
-        gdf = gpd.read_postgis(query, db.engine, geom_col='geom')
+        gdf = preparar_capa(gpd.read_postgis(query, db.engine, geom_col='geom'))
         logger.info("Límites de Coyoacán cargados correctamente.")
         return gdf
     except Exception as e:
@@ -25,14 +31,15 @@ def load_coyoacan_boundary():
 
 def load_land_use():
     """
-    Carga el uso de suelo desde la base de datos.
+    Carga el uso de suelo desde la base de datos, con geometría en
+    EPSG:4326 y en UTM 14N.
     
     Returns:
         GeoDataFrame: GeoDataFrame con el uso de suelo.
     """
     try:
         query = "SELECT * FROM public.uso_suelo_coyoacan;"
-        gdf = gpd.read_postgis(query, db.engine, geom_col='geom')
+        gdf = preparar_capa(gpd.read_postgis(query, db.engine, geom_col='geom'))
         logger.info("Uso de suelo cargado correctamente.")
         return gdf
     except Exception as e:
@@ -41,7 +48,8 @@ def load_land_use():
 
 def load_manzanas():
     """
-    Carga las manzanas desde la base de datos.
+    Carga las manzanas desde la base de datos, con geometría en
+    EPSG:4326 y en UTM 14N y sus medidas precalculadas.
     
     Returns:
         GeoDataFrame: GeoDataFrame con las manzanas.
@@ -52,9 +60,9 @@ def load_manzanas():
         logger.info(f"Manzanas cargadas: {manzanas.shape}")
         logger.debug(manzanas.head())
         
-        # Asignar el CRS correcto
-        manzanas = manzanas.to_crs("EPSG:4326")  # Asegurar CRS correcto
-        logger.info("CRS de manzanas asignado a EPSG:4326")
+        # EPSG:4326 para mostrar y UTM 14N para medir, con un transformador cacheado
+        manzanas = preparar_capa(manzanas)
+        logger.info("Manzanas en EPSG:4326 con geometría métrica precalculada")
         return manzanas
     except Exception as e:
         logger.error(f"Error al cargar las manzanas: {e}")
@@ -67,24 +75,23 @@ def calcular_uso_suelo_predominante():
         uso_suelo = load_land_use()
         manzanas = load_manzanas()
 
-        # Asegurar que los CRS coincidan
-        common_crs = uso_suelo.crs
-        if boundary.crs != common_crs:
-            boundary = boundary.to_crs(common_crs)
-            logger.info("Reproyectado límites de Coyoacán al CRS común.")
-        if manzanas.crs != common_crs:
-            manzanas = manzanas.to_crs(common_crs)
-            logger.info("Reproyectado manzanas al CRS común.")
-
-        # Recortar los datos al área de Coyoacán
-        uso_suelo_coyoacan = gpd.clip(uso_suelo, boundary)
-        manzanas_coyoacan = gpd.clip(manzanas, boundary)
+        # Las tres capas ya llegan en EPSG:4326 con su geometría métrica,
+        # así que no hay que reproyectar nada aquí
+
+        # Recortar las manzanas al área de Coyoacán con su índice persistido.
+        # El uso de suelo no se recorta: una manzana recortada ya está dentro
+        # del límite, así que interseca el uso recortado si y solo si
+        # interseca el original.
+        manzanas_coyoacan = recortar(
+            manzanas, boundary, indices_espaciales.obtener('manzanas_coyoacan', manzanas)
+        )
         logger.info("Datos recortados al área de Coyoacán.")
 
         # Realizar la unión espacial entre manzanas y uso de suelo
-        gdf_union = gpd.sjoin(
+        gdf_union = unir_espacial(
             manzanas_coyoacan,
-            uso_suelo_coyoacan,
+            uso_suelo,
+            indices_espaciales.obtener('uso_suelo_coyoacan', uso_suelo),
             how='left',
             predicate='intersects',
             lsuffix='left',  # Especificar sufijos
@@ -0,0 +1,186 @@
+# app/name_search.py
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Mayor que cualquier carácter de un nombre normalizado (cota del rango de prefijo)
+_FIN_PREFIJO = '\uffff'
+
+
+def normalizar(texto):
+    """
+    Forma de búsqueda de un nombre: sin acentos, en minúsculas y con la
+    puntuación convertida en espacios ("Av. Río Churubusco" -> "av rio churubusco").
+    """
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', texto.lower()).split())
+
+
+def trigramas(clave):
+    """Trigramas de un nombre normalizado (con espacios de borde)."""
+    clave = f' {clave} '
+    return {clave[i:i + 3] for i in range(len(clave) - 2)}
+
+
+class NameSearchIndex:
+    """
+    Índice de nombres (calles, colonias, manzanas) para buscar mientras se
+    escribe. Se construye una sola vez al cargar las capas:
+
+    - Prefijo: arreglo ordenado con el nombre completo y cada sufijo que
+      empieza en una palabra ("rio churubusco" se encuentra con "chur"); un
+      prefijo es un rango contiguo que se ubica con dos búsquedas binarias.
+    - Difuso: si el prefijo no llena el resultado, se completa con los
+      nombres que contienen más trigramas del texto (errores de dedo).
+
+    Los registros con el mismo tipo y nombre se agrupan en una sola entrada,
+    cuya caja es la unión de las cajas de sus registros.
+    """
+
+    def __init__(self, limite=10, similitud_minima=0.5):
+        """
+        Parameters:
+            limite (int): Resultados por consulta.
+            similitud_minima (float): Fracción mínima de los trigramas del texto
+                que debe tener un nombre en el modo difuso.
+        """
+        self.limite = limite
+        self.similitud_minima = similitud_minima
+        self._partes = []
+        self.etiquetas = np.empty(0, dtype=object)
+        self.tipos = np.empty(0, dtype=object)
+        self.claves = np.empty(0, dtype=object)
+        self.cajas = np.empty((0, 4))
+        self.filas = []
+        self._prefijos = np.empty(0, dtype=str)
+        self._entrada_prefijo = np.empty(0, dtype='int64')
+        self._es_inicio = np.empty(0, dtype=bool)
+        self._trigramas = {}
+        self._num_trigramas = np.empty(0, dtype='int64')
+
+    def agregar(self, tipo, nombres, cajas):
+        """
+        Registra los nombres de una capa (se indexan al llamar a `construir`).
+
+        Parameters:
+            tipo (str): "calle", "colonia", "manzana"...
+            nombres (array): Nombre de cada registro (nulos y vacíos se omiten).
+            cajas (ndarray): (n, 4) lon_min, lat_min, lon_max, lat_max por registro.
+        """
+        cajas = np.asarray(cajas, dtype='float64').reshape(-1, 4)
+        nombres = pd.Series(np.asarray(nombres, dtype=object))
+        validos = nombres.notna().to_numpy()
+        tabla = pd.DataFrame({
+            'tipo': tipo,
+            'etiqueta': nombres[validos].astype(str).str.strip().to_numpy(),
+            'fila': np.flatnonzero(validos),
+            'lon_min': cajas[validos, 0], 'lat_min': cajas[validos, 1],
+            'lon_max': cajas[validos, 2], 'lat_max': cajas[validos, 3],
+        })
+        tabla['clave'] = [normalizar(e) for e in tabla['etiqueta']]
+        self._partes.append(tabla[tabla['clave'] != ''])
+        return self
+
+    def construir(self):
+        """Agrupa los nombres registrados y arma los índices de prefijo y trigramas."""
+        if not self._partes:
+            return self
+        tabla = pd.concat(self._partes, ignore_index=True)
+        grupos = tabla.groupby(['tipo', 'clave'], sort=True)
+        entradas = grupos.agg(etiqueta=('etiqueta', 'first'),
+                              lon_min=('lon_min', 'min'), lat_min=('lat_min', 'min'),
+                              lon_max=('lon_max', 'max'), lat_max=('lat_max', 'max')).reset_index()
+        self.etiquetas = entradas['etiqueta'].to_numpy(dtype=object)
+        self.tipos = entradas['tipo'].to_numpy(dtype=object)
+        self.claves = entradas['clave'].to_numpy(dtype=object)
+        self.cajas = entradas[['lon_min', 'lat_min', 'lon_max', 'lat_max']].to_numpy()
+        self.filas = [filas.to_numpy() for _, filas in grupos['fila']]
+
+        # Prefijos: el nombre completo y cada sufijo que empieza en una palabra
+        prefijos, entrada_prefijo, es_inicio = [], [], []
+        trigramas_entrada = defaultdict(list)
+        self._num_trigramas = np.zeros(len(self.claves), dtype='int64')
+        for k, clave in enumerate(self.claves):
+            inicios = [0] + [m.start() + 1 for m in re.finditer(' ', clave)]
+            prefijos.extend(clave[i:] for i in inicios)
+            entrada_prefijo.extend([k] * len(inicios))
+            es_inicio.extend([True] + [False] * (len(inicios) - 1))
+            propios = trigramas(clave)
+            self._num_trigramas[k] = len(propios)
+            for trigrama in propios:
+                trigramas_entrada[trigrama].append(k)
+
+        orden = np.argsort(np.array(prefijos, dtype=str), kind='stable')
+        self._prefijos = np.array(prefijos, dtype=str)[orden]
+        self._entrada_prefijo = np.array(entrada_prefijo, dtype='int64')[orden]
+        self._es_inicio = np.array(es_inicio, dtype=bool)[orden]
+        self._trigramas = {t: np.array(k, dtype='int64') for t, k in trigramas_entrada.items()}
+        self._partes = []
+        logger.info(f"Índice de nombres: {len(self.claves)} entradas, {len(self._prefijos)} prefijos, "
+                    f"{len(self._trigramas)} trigramas.")
+        return self
+
+    def __len__(self):
+        return len(self.claves)
+
+    def buscar(self, texto, limite=None):
+        """
+        Entradas que mejor coinciden con `texto`: primero las que empiezan
+        con él, luego las que tienen una palabra que empieza con él (las
+        más cortas antes) y, si faltan, las más parecidas por trigramas.
+
+        Returns:
+            list[int]: Posiciones de entrada (ver etiquetas, tipos, cajas).
+        """
+        limite = limite or self.limite
+        consulta = normalizar(texto)
+        if not consulta or not len(self.claves):
+            return []
+
+        inicio = np.searchsorted(self._prefijos, consulta, side='left')
+        fin = np.searchsorted(self._prefijos, consulta + _FIN_PREFIJO, side='left')
+        entradas = self._entrada_prefijo[inicio:fin]
+        resultado = []
+        if len(entradas):
+            largos = np.fromiter((len(self.claves[k]) for k in entradas), dtype='int64', count=len(entradas))
+            orden = np.lexsort((entradas, largos, ~self._es_inicio[inicio:fin]))
+            unicas, primeras = np.unique(entradas[orden], return_index=True)
+            resultado = unicas[np.argsort(primeras)][:limite].tolist()
+
+        if len(resultado) < limite:
+            resultado += self._buscar_difuso(consulta, limite - len(resultado), set(resultado))
+        return resultado
+
+    def _buscar_difuso(self, consulta, limite, excluir):
+        """
+        Entradas con más trigramas de `consulta` (a igual cobertura, las de
+        mayor Jaccard, es decir, las más cortas).
+        """
+        buscados = trigramas(consulta)
+        propios = [self._trigramas[t] for t in buscados if t in self._trigramas]
+        if not propios:
+            return []
+        comunes = np.bincount(np.concatenate(propios), minlength=len(self.claves))
+        cobertura = comunes / len(buscados)
+        jaccard = comunes / (len(buscados) + self._num_trigramas - comunes)
+        if excluir:
+            cobertura[list(excluir)] = 0.0
+        candidatas = np.flatnonzero(cobertura >= self.similitud_minima)
+        orden = np.lexsort((candidatas, -jaccard[candidatas], -cobertura[candidatas]))
+        return candidatas[orden][:limite].tolist()
+
+    def opciones(self, entradas):
+        """Opciones de dropdown ({label, value}) para las entradas dadas."""
+        return [{'label': f"{self.etiquetas[k]} ({self.tipos[k]})", 'value': int(k)} for k in entradas]
+
+    def caja(self, entrada):
+        """(lon_min, lat_min, lon_max, lat_max) de la entrada."""
+        return tuple(self.cajas[entrada])
@@ -0,0 +1,147 @@
+# app/spatial_lookup.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from dashboard.analysis.dual_crs import CRS_GEOGRAFICO, preparar_capa
+
+logger = logging.getLogger(__name__)
+
+
+class CapaIndexada:
+    """
+    Capa de polígonos con un STRtree persistente y atributos precalculados
+    (área en m², centroide en lat/lon y, opcionalmente, ids de capas padre).
+
+    El árbol se construye una sola vez; cada consulta por punto cuesta
+    O(log n) en lugar de recorrer todo el GeoDataFrame.
+    """
+
+    def __init__(self, gdf, columna_id=None, columna_nombre=None):
+        """
+        Parameters:
+            gdf (GeoDataFrame): Polígonos de la capa.
+            columna_id (str): Columna con el id de cada polígono (None = índice).
+            columna_nombre (str): Columna con el nombre a mostrar (opcional).
+        """
+        # Capa dual: EPSG:4326 con área y centroide ya calculados en UTM 14N
+        # (una capa sin CRS se asume en lon/lat)
+        gdf = preparar_capa(gdf if gdf.crs is not None else gdf.set_crs(CRS_GEOGRAFICO))
+
+        ids = gdf[columna_id] if columna_id else gdf.index.to_series()
+        self.geometrias = np.asarray(gdf.geometry.values)
+        self.arbol = shapely.STRtree(self.geometrias)
+        self.posiciones = {valor: pos for pos, valor in enumerate(ids)}
+
+        self.atributos = pd.DataFrame({
+            'id': ids.to_numpy(),
+            'nombre': gdf[columna_nombre].to_numpy() if columna_nombre else ids.astype(str).to_numpy(),
+            'area_m2': gdf['area_m2'].to_numpy(),
+            'centroide_lat': gdf['centroide_lat'].to_numpy(),
+            'centroide_lon': gdf['centroide_lon'].to_numpy(),
+        })
+        logger.info(f"Capa indexada: {len(self.geometrias)} polígonos.")
+
+    def __len__(self):
+        return len(self.geometrias)
+
+    def buscar_punto(self, lat, lon):
+        """
+        Posición del polígono que contiene el punto, o None.
+        Si varios lo contienen (bordes compartidos), se elige el de menor área.
+        """
+        candidatos = self.arbol.query(shapely.Point(lon, lat), predicate='intersects')
+        if len(candidatos) == 0:
+            return None
+        areas = self.atributos['area_m2'].to_numpy()[candidatos]
+        return int(candidatos[np.argmin(areas)])
+
+    def buscar_id(self, valor):
+        """Posición del polígono con el id dado, o None."""
+        posicion = self.posiciones.get(valor)
+        if posicion is None and isinstance(valor, str) and valor.lstrip('-').isdigit():
+            # Plotly devuelve las 'locations' numéricas como texto en algunos casos
+            posicion = self.posiciones.get(int(valor))
+        return posicion
+
+    def asignar_padres(self, padre, nombre_columna):
+        """
+        Precalcula, para cada polígono, el id del polígono de `padre` que lo
+        contiene (se usa un punto representativo interior, así que basta
+        una consulta vectorizada al árbol del padre).
+
+        Parameters:
+            padre (CapaIndexada): Capa contenedora (p. ej. AGEB o colonia).
+            nombre_columna (str): Columna de atributos donde guardar el id.
+        """
+        puntos = shapely.point_on_surface(self.geometrias)
+        hijos, padres = padre.arbol.query(puntos, predicate='intersects')
+        # Un punto en un borde compartido puede tocar dos padres: se conserva el primero
+        hijos, primeros = np.unique(hijos, return_index=True)
+        valores = np.full(len(self), None, dtype=object)
+        valores[hijos] = padre.atributos['nombre'].to_numpy()[padres[primeros]]
+        self.atributos[nombre_columna] = valores
+        logger.info(f"Padres '{nombre_columna}' asignados a {len(hijos)} de {len(self)} polígonos.")
+
+    def info(self, posicion):
+        """Atributos precalculados del polígono en `posicion`, como dict."""
+        return self.atributos.iloc[posicion].to_dict()
+
+
+class ZoneLookupService:
+    """
+    Resuelve clics del mapa (lat/lon o id de feature) al polígono de cada
+    capa registrada y devuelve sus atributos precalculados.
+    """
+
+    def __init__(self):
+        self.capas = {}
+
+    def agregar_capa(self, nombre, gdf, columna_id=None, columna_nombre=None, padres=()):
+        """
+        Indexa una capa. Las capas listadas en `padres` deben registrarse antes;
+        su id se precalcula en la columna del mismo nombre.
+
+        Returns:
+            CapaIndexada: La capa indexada.
+        """
+        capa = CapaIndexada(gdf, columna_id, columna_nombre)
+        for nombre_padre in padres:
+            if nombre_padre in self.capas:
+                capa.asignar_padres(self.capas[nombre_padre], nombre_padre)
+            else:
+                logger.warning(f"Capa padre '{nombre_padre}' no registrada; se omite.")
+        self.capas[nombre] = capa
+        return capa
+
+    def buscar_punto(self, capa, lat, lon):
+        """Atributos del polígono de `capa` que contiene (lat, lon), o None."""
+        indexada = self.capas[capa]
+        posicion = indexada.buscar_punto(lat, lon)
+        return None if posicion is None else indexada.info(posicion)
+
+    def buscar_id(self, capa, valor):
+        """Atributos del polígono de `capa` con el id dado, o None."""
+        indexada = self.capas[capa]
+        posicion = indexada.buscar_id(valor)
+        return None if posicion is None else indexada.info(posicion)
+
+    def resolver_clic(self, capa, click_data):
+        """
+        Resuelve el `clickData` de Dash: usa 'location' (id de la feature en
+        mapas coropléticos) y, si no viene, las coordenadas 'lat'/'lon'.
+
+        Returns:
+            dict | None: Atributos del polígono seleccionado.
+        """
+        if not click_data or not click_data.get('points'):
+            return None
+        punto = click_data['points'][0]
+        if punto.get('location') is not None:
+            return self.buscar_id(capa, punto['location'])
+        if punto.get('lat') is not None and punto.get('lon') is not None:
+            return self.buscar_punto(capa, punto['lat'], punto['lon'])
+        return None
@@ -0,0 +1,186 @@
+# analysis/accessibility.py
+
+"""
+Accesibilidad a servicios: distancia a las k instalaciones más cercanas
+(KD-tree en CRS métrico) y puntajes 2SFCA (two-step floating catchment area)
+sobre matrices dispersas de distancias acotadas por el radio de captación.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from .spatial_weights import geometrias_metricas, huella_ids
+
+logger = logging.getLogger(__name__)
+
+# Funciones de decaimiento con la distancia dentro del radio de captación
+PONDERACIONES = ("binaria", "gaussiana")
+
+
+def coordenadas_metricas(gdf: GeoDataFrame) -> np.ndarray:
+    """
+    Coordenadas (n, 2) en metros: el punto mismo o el centroide del polígono.
+    """
+    geometrias = geometrias_metricas(gdf)
+    no_puntos = shapely.get_type_id(geometrias) != 0
+    if no_puntos.any():
+        geometrias = geometrias.copy()
+        geometrias[no_puntos] = shapely.centroid(geometrias[no_puntos])
+    return shapely.get_coordinates(geometrias)
+
+
+def matriz_distancias(arbol_origenes: cKDTree,
+                      destinos: np.ndarray,
+                      radio: float) -> sparse.csr_matrix:
+    """
+    Distancias origen-destino menores o iguales a `radio` como matriz
+    dispersa (n_origenes x n_destinos). Las distancias cero se guardan
+    como valores explícitos, así que la estructura de la matriz es la banda.
+    """
+    arbol_destinos = cKDTree(destinos)
+    pares = arbol_origenes.sparse_distance_matrix(arbol_destinos, radio, output_type="ndarray")
+    matriz = sparse.csr_matrix(
+        (pares["v"], (pares["i"], pares["j"])),
+        shape=(arbol_origenes.n, len(destinos))
+    )
+    return matriz
+
+
+def _restringir_radio(distancias: sparse.csr_matrix, radio: float) -> sparse.csr_matrix:
+    """Submatriz con las distancias <= radio (sin volver a consultar el árbol)."""
+    if distancias.nnz == 0 or distancias.data.max() <= radio:
+        return distancias
+    coo = distancias.tocoo()
+    dentro = coo.data <= radio
+    return sparse.csr_matrix(
+        (coo.data[dentro], (coo.row[dentro], coo.col[dentro])), shape=distancias.shape
+    )
+
+
+def pesos_decaimiento(distancias: sparse.csr_matrix,
+                      radio: float,
+                      ponderacion: str = "gaussiana") -> sparse.csr_matrix:
+    """
+    Aplica la función de decaimiento a los valores de la banda.
+    - binaria: 1 dentro del radio.
+    - gaussiana: (e^(-½(d/r)²) - e^(-½)) / (1 - e^(-½)), 1 en d=0 y 0 en d=r.
+
+    :raises ValueError: Si la ponderación no existe.
+    """
+    if ponderacion not in PONDERACIONES:
+        raise ValueError(f"Ponderación '{ponderacion}' no soportada: {PONDERACIONES}")
+    pesos = distancias.copy()
+    if ponderacion == "binaria":
+        pesos.data = np.ones_like(pesos.data)
+    else:
+        borde = np.exp(-0.5)
+        pesos.data = (np.exp(-0.5 * (pesos.data / radio) ** 2) - borde) / (1.0 - borde)
+    return pesos
+
+
+def dos_pasos_fca(pesos: sparse.csr_matrix,
+                  demanda: np.ndarray,
+                  oferta: np.ndarray) -> np.ndarray:
+    """
+    2SFCA con dos productos matriz dispersa-vector:
+    1. R_j = S_j / Σ_i W_ij·P_i  (oferta por habitante en la captación de j)
+    2. A_i = Σ_j W_ij·R_j
+
+    :param pesos: W (n_origenes x n_destinos), ya con decaimiento.
+    :param demanda: Población P_i por origen.
+    :param oferta: Capacidad S_j por instalación.
+    :return: Accesibilidad A_i por origen (0 si no alcanza ninguna).
+    """
+    demanda = np.nan_to_num(np.asarray(demanda, dtype="float64"))
+    oferta = np.asarray(oferta, dtype="float64")
+    demanda_captada = pesos.T @ demanda
+    razon = np.divide(oferta, demanda_captada,
+                      out=np.zeros_like(oferta), where=demanda_captada > 0)
+    return pesos @ razon
+
+
+class AccessibilityEngine:
+    """
+    SRP: calcular accesibilidad de un conjunto fijo de orígenes (manzanas,
+    AGEB) a capas de instalaciones. El KD-tree de orígenes se construye una
+    vez; la matriz de distancias se cachea por conjunto de instalaciones y se
+    reutiliza para cualquier radio menor o igual al ya consultado.
+    """
+
+    def __init__(self, origenes: GeoDataFrame) -> None:
+        """
+        :param origenes: Polígonos o puntos de demanda (se usan centroides).
+        """
+        self.coordenadas: np.ndarray = coordenadas_metricas(origenes)
+        self.arbol: cKDTree = cKDTree(self.coordenadas)
+        self._distancias: Dict[str, Tuple[float, sparse.csr_matrix]] = {}
+
+    @property
+    def n(self) -> int:
+        return len(self.coordenadas)
+
+    def mas_cercanas(self, instalaciones: GeoDataFrame, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distancias (m) e índices de las k instalaciones más cercanas a cada origen.
+
+        :return: Arreglos (n_origenes, k); distancia inf si hay menos de k.
+        """
+        destinos = coordenadas_metricas(instalaciones)
+        if len(destinos) == 0:
+            return np.full((self.n, k), np.inf), np.full((self.n, k), -1)
+        distancias, indices = cKDTree(destinos).query(self.coordenadas, k=k)
+        return distancias.reshape(self.n, k), indices.reshape(self.n, k)
+
+    def distancias(self, instalaciones: GeoDataFrame, radio: float) -> sparse.csr_matrix:
+        """Matriz dispersa de distancias <= radio, cacheada por instalaciones."""
+        destinos = coordenadas_metricas(instalaciones)
+        huella = huella_ids(np.round(destinos, 2).ravel())
+        radio_cache, matriz = self._distancias.get(huella, (-1.0, None))
+        if matriz is None or radio > radio_cache:
+            matriz = matriz_distancias(self.arbol, destinos, radio)
+            self._distancias[huella] = (radio, matriz)
+            logger.info(f"Matriz de distancias <= {radio:g} m: {matriz.shape}, {matriz.nnz} pares.")
+        return _restringir_radio(matriz, radio)
+
+    def dos_pasos(self,
+                  instalaciones: GeoDataFrame,
+                  demanda: np.ndarray,
+                  radio: float,
+                  columna_oferta: Optional[str] = None,
+                  ponderacion: str = "gaussiana") -> np.ndarray:
+        """
+        Puntaje 2SFCA por origen.
+
+        :param demanda: Población por origen (mismo orden que los orígenes).
+        :param radio: Radio de captación en metros.
+        :param columna_oferta: Capacidad de cada instalación (None = 1 c/u).
+        """
+        oferta = (pd.to_numeric(instalaciones[columna_oferta], errors="coerce").fillna(0).to_numpy()
+                  if columna_oferta else np.ones(len(instalaciones)))
+        pesos = pesos_decaimiento(self.distancias(instalaciones, radio), radio, ponderacion)
+        return dos_pasos_fca(pesos, demanda, oferta)
+
+    def calcular(self,
+                 instalaciones: GeoDataFrame,
+                 demanda: np.ndarray,
+                 radio: float,
+                 k: int = 3,
+                 columna_oferta: Optional[str] = None,
+                 ponderacion: str = "gaussiana") -> pd.DataFrame:
+        """
+        Tabla por origen con dist_1..dist_k (m), num_en_radio y acceso_2sfca.
+        """
+        distancias, _ = self.mas_cercanas(instalaciones, k)
+        tabla = pd.DataFrame(distancias, columns=[f"dist_{i + 1}" for i in range(k)])
+        en_radio = self.distancias(instalaciones, radio)
+        tabla["num_en_radio"] = np.diff(en_radio.indptr)
+        tabla["acceso_2sfca"] = self.dos_pasos(instalaciones, demanda, radio,
+                                               columna_oferta, ponderacion)
+        return tabla
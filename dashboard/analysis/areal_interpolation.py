@@ -0,0 +1,230 @@
+# analysis/areal_interpolation.py
+
+"""
+Interpolación areal entre capas de polígonos que no anidan (secciones
+electorales, AGEB, colonias, manzanas). Para cada par de capas se calcula
+una sola vez el crosswalk A (n_origen x n_destino) con las áreas de
+intersección; transferir una variable es un producto disperso.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame
+from scipy import sparse
+
+from .artifact_cache import ArtifactCache
+from .spatial_index import IndiceEspacial
+from .spatial_weights import geometrias_metricas, huella_geometrias, huella_ids
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Crosswalk:
+    """
+    Áreas de intersección (m²) entre las unidades de dos capas.
+    - areas: Matriz dispersa A[i, j] = área(origen_i ∩ destino_j).
+    - area_origen / area_destino: Área total de cada unidad.
+    """
+    areas: sparse.csr_matrix
+    ids_origen: np.ndarray
+    ids_destino: np.ndarray
+    area_origen: np.ndarray
+    area_destino: np.ndarray
+    _normalizadas: Dict[str, sparse.csr_matrix] = field(default_factory=dict, repr=False)
+
+    def transpuesto(self) -> "Crosswalk":
+        """Crosswalk en sentido inverso (destino -> origen), sin recalcular."""
+        return Crosswalk(self.areas.T.tocsr(), self.ids_destino, self.ids_origen,
+                         self.area_destino, self.area_origen)
+
+    def _pesos_extensivos(self, cobertura: bool) -> sparse.csr_matrix:
+        """(A / área de origen)ᵀ, o / área cubierta por el destino si `cobertura`."""
+        clave = "cobertura" if cobertura else "extensiva"
+        if clave not in self._normalizadas:
+            divisor = np.asarray(self.areas.sum(axis=1)).ravel() if cobertura else self.area_origen
+            inversa = np.divide(1.0, divisor, out=np.zeros_like(divisor, dtype="float64"), where=divisor > 0)
+            # Se guarda ya transpuesta (destino x origen) para el producto
+            self._normalizadas[clave] = (sparse.diags(inversa) @ self.areas).T.tocsr()
+        return self._normalizadas[clave]
+
+    def transferir_extensivas(self, valores: pd.DataFrame, cobertura: bool = True) -> pd.DataFrame:
+        """
+        Reparte sumas (población, votos) proporcionalmente al área:
+        destino_j = Σ_i valor_i · A_ij / área_i.
+
+        :param valores: Una fila por unidad de origen (índice = id de origen).
+        :param cobertura: Normalizar por el área de origen cubierta por la
+                          capa destino (conserva el total aunque las capas no
+                          coincidan en el borde).
+        :return: Una fila por unidad de destino.
+        """
+        alineados = valores.reindex(self.ids_origen).apply(pd.to_numeric, errors="coerce").fillna(0.0)
+        resultado = self._pesos_extensivos(cobertura) @ alineados.to_numpy(dtype="float64")
+        return pd.DataFrame(resultado, index=self.ids_destino, columns=valores.columns)
+
+    def transferir_intensivas(self, valores: pd.DataFrame) -> pd.DataFrame:
+        """
+        Promedia tasas y densidades ponderando por área de intersección:
+        destino_j = Σ_i valor_i · A_ij / Σ_i A_ij (los nulos no cuentan).
+
+        :return: Una fila por unidad de destino (NaN si no hay traslape).
+        """
+        alineados = valores.reindex(self.ids_origen).apply(pd.to_numeric, errors="coerce")
+        datos = alineados.to_numpy(dtype="float64")
+        validos = np.isfinite(datos)
+        if "transpuesta" not in self._normalizadas:
+            self._normalizadas["transpuesta"] = self.areas.T.tocsr()
+        transpuesta = self._normalizadas["transpuesta"]
+        numerador = transpuesta @ np.where(validos, datos, 0.0)
+        denominador = transpuesta @ validos.astype("float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            resultado = np.where(denominador > 0, numerador / denominador, np.nan)
+        return pd.DataFrame(resultado, index=self.ids_destino, columns=valores.columns)
+
+
+def construir_crosswalk(origen: np.ndarray,
+                        destino: np.ndarray,
+                        indice_destino: Optional[IndiceEspacial] = None) -> sparse.csr_matrix:
+    """
+    Matriz de áreas de intersección: pares candidatos con el índice del
+    destino (el persistido si se da; si no, un STRtree) e intersecciones
+    vectorizadas (geometrías en CRS métrico).
+    """
+    if indice_destino is not None:
+        i, j = indice_destino.consultar(origen, destino, "intersects")
+    else:
+        i, j = shapely.STRtree(destino).query(origen, predicate="intersects")
+    areas = shapely.area(shapely.intersection(origen[i], destino[j]))
+    positivas = areas > 0
+    return sparse.csr_matrix(
+        (areas[positivas], (i[positivas], j[positivas])), shape=(len(origen), len(destino))
+    )
+
+
+def _ids(gdf: GeoDataFrame, columna_id: Optional[str]) -> np.ndarray:
+    return np.asarray(gdf[columna_id] if columna_id else gdf.index).astype(str)
+
+
+class ArealInterpolator:
+    """
+    SRP: construir y reutilizar crosswalks entre pares de capas. Cada par se
+    calcula una sola vez (memoria + disco); el par inverso se obtiene
+    transponiendo. Si cambian las unidades o las geometrías, la huella no
+    coincide y el crosswalk se recalcula.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None) -> None:
+        """
+        :param cache: Almacén en disco (None = solo memoria).
+        """
+        self.cache: Optional[ArtifactCache] = cache
+        self._memoria: Dict[Tuple[str, str], Tuple[Tuple[str, str], Crosswalk]] = {}
+
+    def obtener(self,
+                origen: GeoDataFrame,
+                destino: GeoDataFrame,
+                nivel_origen: str,
+                nivel_destino: str,
+                columna_id_origen: Optional[str] = None,
+                columna_id_destino: Optional[str] = None,
+                indice_destino: Optional[IndiceEspacial] = None) -> Crosswalk:
+        """
+        Crosswalk de `origen` (una fila por unidad) a `destino`.
+
+        :param nivel_origen: Nombre de la capa de origen (p. ej. "ageb").
+        :param nivel_destino: Nombre de la capa de destino (p. ej. "colonia").
+        :param indice_destino: Índice persistido de `destino` (ver SpatialIndexStore).
+        """
+        geom_origen = geometrias_metricas(origen)
+        geom_destino = geometrias_metricas(destino)
+        ids_origen = _ids(origen, columna_id_origen)
+        ids_destino = _ids(destino, columna_id_destino)
+        huella_origen = huella_ids([huella_ids(ids_origen), huella_geometrias(geom_origen)])
+        huella_destino = huella_ids([huella_ids(ids_destino), huella_geometrias(geom_destino)])
+
+        huellas = (huella_origen, huella_destino)
+
+        # En memoria: el mismo par o su inverso (que se transpone y se guarda)
+        guardadas, crosswalk = self._memoria.get((nivel_origen, nivel_destino), (None, None))
+        if crosswalk is not None and guardadas == huellas:
+            return crosswalk
+        guardadas, inverso = self._memoria.get((nivel_destino, nivel_origen), (None, None))
+        if inverso is not None and guardadas == huellas[::-1]:
+            crosswalk = inverso.transpuesto()
+            self._memoria[(nivel_origen, nivel_destino)] = (huellas, crosswalk)
+            return crosswalk
+
+        nombre = f"crosswalk_{nivel_origen}_{nivel_destino}"
+        crosswalk = self._cargar(nombre, huellas)
+        if crosswalk is None:
+            areas = construir_crosswalk(geom_origen, geom_destino, indice_destino)
+            crosswalk = Crosswalk(areas, ids_origen, ids_destino,
+                                  shapely.area(geom_origen), shapely.area(geom_destino))
+            logger.info(f"Crosswalk {nivel_origen} -> {nivel_destino}: {areas.shape}, {areas.nnz} piezas.")
+            self._guardar(nombre, huellas, crosswalk)
+
+        self._memoria[(nivel_origen, nivel_destino)] = (huellas, crosswalk)
+        return crosswalk
+
+    def transferir(self,
+                   origen: GeoDataFrame,
+                   destino: GeoDataFrame,
+                   nivel_origen: str,
+                   nivel_destino: str,
+                   extensivas: Iterable[str] = (),
+                   intensivas: Iterable[str] = (),
+                   columna_id_origen: Optional[str] = None,
+                   columna_id_destino: Optional[str] = None,
+                   indice_destino: Optional[IndiceEspacial] = None) -> pd.DataFrame:
+        """
+        Transfiere columnas de `origen` a las unidades de `destino`.
+
+        :return: DataFrame indexado por id de destino con las columnas pedidas.
+        """
+        crosswalk = self.obtener(origen, destino, nivel_origen, nivel_destino,
+                                 columna_id_origen, columna_id_destino, indice_destino)
+        valores = origen.set_index(pd.Index(_ids(origen, columna_id_origen)))
+        partes = []
+        extensivas, intensivas = list(extensivas), list(intensivas)
+        if extensivas:
+            partes.append(crosswalk.transferir_extensivas(valores[extensivas]))
+        if intensivas:
+            partes.append(crosswalk.transferir_intensivas(valores[intensivas]))
+        if not partes:
+            return pd.DataFrame(index=crosswalk.ids_destino)
+        return pd.concat(partes, axis=1)
+
+    def _cargar(self, nombre: str, huellas: Tuple[str, str]) -> Optional[Crosswalk]:
+        if self.cache is None:
+            return None
+        arrays = self.cache.cargar_arrays(nombre)
+        if arrays is None or tuple(arrays["huellas"]) != huellas:
+            return None
+        areas = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(arrays["shape"])
+        )
+        logger.info(f"Crosswalk '{nombre}' cargado desde caché.")
+        return Crosswalk(areas, arrays["ids_origen"], arrays["ids_destino"],
+                         arrays["area_origen"], arrays["area_destino"])
+
+    def _guardar(self, nombre: str, huellas: Tuple[str, str], crosswalk: Crosswalk) -> None:
+        if self.cache is None:
+            return
+        self.cache.guardar_arrays(
+            nombre,
+            data=crosswalk.areas.data,
+            indices=crosswalk.areas.indices,
+            indptr=crosswalk.areas.indptr,
+            shape=np.array(crosswalk.areas.shape),
+            ids_origen=crosswalk.ids_origen,
+            ids_destino=crosswalk.ids_destino,
+            area_origen=crosswalk.area_origen,
+            area_destino=crosswalk.area_destino,
+            huellas=np.array(huellas),
+        )
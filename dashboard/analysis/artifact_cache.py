@@ -0,0 +1,99 @@
+# analysis/artifact_cache.py
+
+"""
+Persistencia en disco de artefactos de análisis costosos de calcular
+(matrices de pesos, crosswalks, rejillas de etiquetas, ...).
+"""
+
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Directorio por defecto: dashboard/cache (sobrescribible con COYOACAN_CACHE_DIR)
+DIRECTORIO_CACHE_DEFAULT = os.getenv(
+    "COYOACAN_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+)
+
+
+class ArtifactCache:
+    """
+    SRP: guardar y recuperar arreglos NumPy por nombre.
+    Las escrituras son atómicas (archivo temporal + os.replace), así que un
+    proceso que lee nunca ve un artefacto a medio escribir.
+    """
+
+    def __init__(self, directorio: Optional[str] = None) -> None:
+        """
+        :param directorio: Carpeta donde se guardan los artefactos.
+        """
+        self.directorio: str = directorio or DIRECTORIO_CACHE_DEFAULT
+
+    def ruta(self, nombre: str, extension: str = "npz") -> str:
+        """Ruta del artefacto `nombre` (no garantiza que exista)."""
+        return os.path.join(self.directorio, f"{nombre}.{extension}")
+
+    def guardar_arrays(self, nombre: str, **arrays: np.ndarray) -> None:
+        """
+        Guarda un conjunto de arreglos bajo `nombre`.
+        Los errores de escritura se registran pero no se propagan: la caché
+        es una optimización, no una fuente de verdad.
+        """
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".npz")
+            with os.fdopen(descriptor, "wb") as archivo:
+                np.savez(archivo, **arrays)
+            os.replace(temporal, self.ruta(nombre))
+            logger.info(f"Artefacto '{nombre}' guardado en {self.directorio}.")
+        except OSError as ex:
+            logger.warning(f"No se pudo guardar el artefacto '{nombre}': {ex}")
+
+    def cargar_arrays(self, nombre: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Carga los arreglos guardados bajo `nombre`, o None si no existen o
+        están corruptos.
+        """
+        ruta = self.ruta(nombre)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta, allow_pickle=False) as contenido:
+                return {clave: contenido[clave] for clave in contenido.files}
+        except (OSError, ValueError) as ex:
+            logger.warning(f"Artefacto '{nombre}' ilegible, se recalculará: {ex}")
+            return None
+
+    def guardar_arreglo(self, nombre: str, arreglo: np.ndarray) -> None:
+        """
+        Guarda un solo arreglo como .npy (sin comprimir), de modo que pueda
+        abrirse después como memoria mapeada.
+        """
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".npy")
+            with os.fdopen(descriptor, "wb") as archivo:
+                np.save(archivo, arreglo)
+            os.replace(temporal, self.ruta(nombre, "npy"))
+            logger.info(f"Arreglo '{nombre}' guardado en {self.directorio}.")
+        except OSError as ex:
+            logger.warning(f"No se pudo guardar el arreglo '{nombre}': {ex}")
+
+    def cargar_arreglo(self, nombre: str, mmap: bool = True) -> Optional[np.ndarray]:
+        """
+        Abre el arreglo .npy guardado bajo `nombre` (memoria mapeada de solo
+        lectura si `mmap`), o None si no existe o está corrupto.
+        """
+        ruta = self.ruta(nombre, "npy")
+        if not os.path.exists(ruta):
+            return None
+        try:
+            return np.load(ruta, mmap_mode="r" if mmap else None, allow_pickle=False)
+        except (OSError, ValueError) as ex:
+            logger.warning(f"Arreglo '{nombre}' ilegible, se recalculará: {ex}")
+            return None
@@ -0,0 +1,233 @@
+# analysis/autocorrelation.py
+
+"""
+Autocorrelación espacial: I de Moran global y LISA (Moran local) con
+inferencia por permutaciones vectorizada. Sobre pesos ya construidos, cada
+métrica nueva cuesta productos matriz dispersa-vector.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame
+
+from .spatial_weights import SpatialWeights
+
+logger = logging.getLogger(__name__)
+
+# Etiquetas de los cuadrantes LISA (1..4) y de las unidades no significativas
+CLUSTERS_LISA = {
+    0: "No significativo",
+    1: "Alto-Alto",
+    2: "Bajo-Alto",
+    3: "Bajo-Bajo",
+    4: "Alto-Bajo",
+}
+
+# Tope de elementos por bloque al simular permutaciones (acota la memoria)
+_ELEMENTOS_POR_BLOQUE = 4_000_000
+
+
+@dataclass
+class MoranGlobal:
+    """
+    Resultado del I de Moran global.
+    - esperado: E[I] = -1 / (n - 1) bajo aleatoriedad.
+    - p_sim: p-valor (una cola, en la dirección observada) por permutaciones.
+    - z_sim: Estandarización de I respecto a la distribución simulada.
+    """
+    I: float
+    esperado: float
+    p_sim: float
+    z_sim: float
+    permutaciones: int
+
+
+def _estandarizar(valores: np.ndarray) -> np.ndarray:
+    valores = np.asarray(valores, dtype="float64")
+    if np.isnan(valores).any():
+        raise ValueError("La métrica contiene valores nulos; imputarlos o filtrarlos antes.")
+    if not len(valores) or np.ptp(valores) == 0:
+        # Sin varianza, I es 0/0 y las permutaciones darían p-valores espurios
+        raise ValueError("La métrica es constante; no hay autocorrelación que medir.")
+    return valores - valores.mean()
+
+
+def moran_global(pesos: SpatialWeights,
+                 valores: np.ndarray,
+                 permutaciones: int = 999,
+                 semilla: Optional[int] = None) -> MoranGlobal:
+    """
+    I de Moran global con inferencia por permutaciones.
+
+    :param pesos: Pesos alineados con `valores`.
+    :param valores: Métrica por unidad (sin nulos).
+    :param permutaciones: Número de permutaciones (0 = sin inferencia).
+    :param semilla: Semilla del generador aleatorio.
+    """
+    z = _estandarizar(valores)
+    n = len(z)
+    factor = n / pesos.s0 / (z @ z)
+    observado = float(factor * (z @ pesos.rezago(z)))
+    esperado = -1.0 / (n - 1)
+
+    if permutaciones <= 0:
+        return MoranGlobal(observado, esperado, np.nan, np.nan, 0)
+
+    rng = np.random.default_rng(semilla)
+    simulados = np.empty(permutaciones)
+    bloque = max(1, _ELEMENTOS_POR_BLOQUE // n)
+    for inicio in range(0, permutaciones, bloque):
+        fin = min(inicio + bloque, permutaciones)
+        # Cada columna es una permutación de z
+        orden = np.argsort(rng.random((n, fin - inicio)), axis=0)
+        zp = z[orden]
+        simulados[inicio:fin] = factor * np.einsum("ij,ij->j", zp, pesos.rezago(zp))
+
+    mayores = int((simulados >= observado).sum())
+    if permutaciones - mayores < mayores:
+        mayores = permutaciones - mayores
+    p_sim = (mayores + 1.0) / (permutaciones + 1.0)
+    z_sim = (observado - simulados.mean()) / simulados.std()
+    return MoranGlobal(observado, esperado, p_sim, float(z_sim), permutaciones)
+
+
+def moran_local(pesos: SpatialWeights,
+                valores: np.ndarray,
+                permutaciones: int = 999,
+                alfa: float = 0.05,
+                semilla: Optional[int] = None) -> pd.DataFrame:
+    """
+    LISA (Moran local) con permutación condicional: para cada unidad i se
+    reasignan al azar valores de las demás unidades a sus k_i vecinos.
+    Las unidades se procesan en bloques del mismo número de vecinos, de modo
+    que toda la simulación se hace con operaciones de arreglos.
+
+    :return: DataFrame (una fila por unidad, en el orden de `pesos.ids`) con
+             lisa_I, lisa_p, lisa_cuadrante (1..4) y lisa_cluster (etiqueta,
+             "No significativo" si p > alfa o sin vecinos).
+    """
+    z = _estandarizar(valores)
+    n = len(z)
+    m2 = (z @ z) / n
+    rezago = pesos.rezago(z)
+    locales = z / m2 * rezago
+
+    cuadrante = np.select(
+        [(z > 0) & (rezago > 0), (z <= 0) & (rezago > 0), (z <= 0) & (rezago <= 0)],
+        [1, 2, 3],
+        default=4,
+    )
+
+    p_sim = np.full(n, np.nan)
+    cardinalidad = pesos.cardinalidad
+    if permutaciones > 0 and n > 1:
+        p_sim = _p_valores_condicionales(pesos, z, m2, locales, cardinalidad,
+                                         permutaciones, np.random.default_rng(semilla))
+
+    significativo = (p_sim <= alfa) & (cardinalidad > 0)
+    codigo = np.where(significativo, cuadrante, 0)
+    return pd.DataFrame({
+        "lisa_I": locales,
+        "lisa_p": p_sim,
+        "lisa_cuadrante": cuadrante,
+        "lisa_cluster": pd.Categorical.from_codes(
+            codigo, categories=[CLUSTERS_LISA[c] for c in sorted(CLUSTERS_LISA)]
+        ),
+    }, index=pesos.ids)
+
+
+def _p_valores_condicionales(pesos: SpatialWeights,
+                             z: np.ndarray,
+                             m2: float,
+                             locales: np.ndarray,
+                             cardinalidad: np.ndarray,
+                             permutaciones: int,
+                             rng: np.random.Generator) -> np.ndarray:
+    n = len(z)
+    k_max = int(min(cardinalidad.max(), n - 1))
+    p_sim = np.full(n, np.nan)
+    if k_max == 0:
+        return p_sim
+
+    # Muestras sin reemplazo de k_max posiciones entre las otras n-1 unidades,
+    # compartidas por todas las unidades (como en la permutación condicional de PySAL)
+    aleatorios = rng.random((permutaciones, n - 1))
+    if k_max < n - 1:
+        aleatorios = aleatorios.argpartition(k_max, axis=1)[:, :k_max]
+    else:
+        aleatorios = aleatorios.argsort(axis=1)
+
+    matriz = pesos.matriz
+    for k in np.unique(cardinalidad[cardinalidad > 0]):
+        unidades = np.flatnonzero(cardinalidad == k)
+        base = aleatorios[:, :k]
+        bloque = max(1, _ELEMENTOS_POR_BLOQUE // (permutaciones * k))
+        for inicio in range(0, len(unidades), bloque):
+            grupo = unidades[inicio:inicio + bloque]
+            # Índices (grupo, permutación, vecino) excluyendo a la propia unidad
+            indices = base[None, :, :] + (base[None, :, :] >= grupo[:, None, None])
+            posiciones = matriz.indptr[grupo][:, None] + np.arange(k)[None, :]
+            w = matriz.data[posiciones]
+            rezago_sim = np.einsum("gpk,gk->gp", z[indices], w)
+            simulados = (z[grupo] / m2)[:, None] * rezago_sim
+
+            mayores = (simulados >= locales[grupo][:, None]).sum(axis=1)
+            mayores = np.minimum(mayores, permutaciones - mayores)
+            p_sim[grupo] = (mayores + 1.0) / (permutaciones + 1.0)
+    return p_sim
+
+
+def valores_alineados(gdf: GeoDataFrame,
+                      pesos: SpatialWeights,
+                      columna: str,
+                      columna_id: Optional[str] = None) -> np.ndarray:
+    """
+    `columna` en el orden de `pesos.ids` (unidades alineadas por id), con
+    NaN en las unidades sin valor o ausentes de `gdf`.
+    """
+    ids = np.asarray(gdf[columna_id] if columna_id else gdf.index).astype(str)
+    serie = pd.Series(pd.to_numeric(gdf[columna], errors="coerce").to_numpy(), index=ids)
+    return serie[~serie.index.duplicated()].reindex(pesos.ids).to_numpy(dtype="float64")
+
+
+def sin_nulos(pesos: SpatialWeights, valores: np.ndarray) -> Tuple[SpatialWeights, np.ndarray]:
+    """
+    Pesos y valores solo de las unidades con valor. Así los pesos se
+    construyen (y cachean) una vez sobre todas las unidades, sin importar
+    qué métrica o filtro deje huecos.
+
+    :raises ValueError: Si quedan menos de dos unidades con valor.
+    """
+    validos = ~np.isnan(valores)
+    if validos.sum() < 2:
+        raise ValueError("Se necesitan al menos dos unidades con valor.")
+    return pesos.subconjunto(validos), valores[validos]
+
+
+def capa_hotspots(gdf: GeoDataFrame,
+                  pesos: SpatialWeights,
+                  columna: str,
+                  columna_id: Optional[str] = None,
+                  permutaciones: int = 999,
+                  alfa: float = 0.05,
+                  semilla: Optional[int] = None) -> GeoDataFrame:
+    """
+    Calcula LISA para `columna` y devuelve `gdf` con las columnas lisa_*,
+    lista para dibujarse con FiguresGenerator.generar_mapa_categorico.
+    Las unidades se alinean con los pesos por id; las que no tienen valor
+    (o no están en `gdf`) se excluyen del cálculo y quedan con lisa_* nulo.
+
+    :raises ValueError: Si hay menos de dos unidades con valor o todas
+                        tienen el mismo.
+    """
+    ids = np.asarray(gdf[columna_id] if columna_id else gdf.index).astype(str)
+    pesos_validos, valores = sin_nulos(pesos, valores_alineados(gdf, pesos, columna, columna_id))
+    resultado = moran_local(pesos_validos, valores, permutaciones, alfa, semilla)
+    salida = gdf.copy()
+    for col in resultado.columns:
+        salida[col] = resultado[col].reindex(ids).to_numpy()
+    return salida
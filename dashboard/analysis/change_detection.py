@@ -0,0 +1,192 @@
+# analysis/change_detection.py
+
+"""
+Detección de cambios entre dos versiones de una capa de polígonos (p. ej.
+uso de suelo).
+
+1. Cada geometría se normaliza (coordenadas métricas redondeadas a una
+   rejilla y orden canónico de anillos y vértices, shapely.normalize) y se
+   resume en un hash de 64 bits. Las geometrías idénticas se emparejan con
+   un hash join, en O(n); solo se compara su clase.
+2. Lo que queda sin pareja se cruza con un STRtree de las restantes de la
+   versión anterior: la intersección de mayor área decide si una parcela
+   se movió o cambió de forma (1 a 1), se dividió (1 anterior, varias
+   nuevas) o se fusionó (varias anteriores, 1 nueva). Sin traslape
+   suficiente, la parcela es agregada o eliminada.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame
+
+from .spatial_weights import geometrias_metricas
+
+logger = logging.getLogger(__name__)
+
+COLUMNA_CAMBIO = "tipo_cambio"
+
+# Tipos de cambio (en orden de leyenda)
+TIPOS_CAMBIO = ("agregado", "eliminado", "reclasificado", "forma", "division", "fusion")
+
+
+def hash_geometrias(geometrias: np.ndarray, rejilla: float = 0.01) -> np.ndarray:
+    """
+    Hash (uint64) de cada geometría normalizada: dos polígonos con los
+    mismos vértices (a `rejilla` unidades del CRS) dan el mismo hash aunque
+    empiecen en otro vértice o tengan otra orientación.
+    """
+    normalizadas = shapely.normalize(shapely.set_precision(geometrias, rejilla))
+    return pd.util.hash_array(np.asarray(shapely.to_wkb(normalizadas), dtype=object))
+
+
+def emparejar_por_hash(hash_a: np.ndarray, hash_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pares (i, j) con hash_a[i] == hash_b[j]. Los hashes repetidos se
+    emparejan uno a uno en orden de aparición (la k-ésima con la k-ésima).
+    """
+    izquierda = pd.DataFrame({"h": hash_a, "k": pd.Series(hash_a).groupby(hash_a).cumcount().to_numpy(),
+                              "i": np.arange(len(hash_a))})
+    derecha = pd.DataFrame({"h": hash_b, "k": pd.Series(hash_b).groupby(hash_b).cumcount().to_numpy(),
+                            "j": np.arange(len(hash_b))})
+    pares = izquierda.merge(derecha, on=["h", "k"], how="inner")
+    return pares["i"].to_numpy(), pares["j"].to_numpy()
+
+
+def _intersecciones(ga: np.ndarray, gb: np.ndarray,
+                    resto_a: np.ndarray, resto_b: np.ndarray) -> pd.DataFrame:
+    """Pares (a, b) de restantes que se traslapan, con su área de intersección."""
+    if not len(resto_a) or not len(resto_b):
+        return pd.DataFrame({"a": [], "b": [], "inter": []}).astype({"a": "int64", "b": "int64"})
+    consulta, arbol = shapely.STRtree(ga[resto_a]).query(gb[resto_b], predicate="intersects")
+    a, b = resto_a[arbol], resto_b[consulta]
+    inter = shapely.area(shapely.intersection(ga[a], gb[b]))
+    positivas = inter > 0
+    return pd.DataFrame({"a": a[positivas], "b": b[positivas], "inter": inter[positivas]})
+
+
+def detectar_cambios(anterior: GeoDataFrame,
+                     nueva: GeoDataFrame,
+                     columna_clase: str,
+                     columna_id: Optional[str] = None,
+                     rejilla: float = 0.01,
+                     cobertura: float = 0.8,
+                     umbral_igual: float = 0.99) -> GeoDataFrame:
+    """
+    Cambios de `anterior` a `nueva`, una fila por parcela nueva que cambió
+    y una por parcela eliminada, lista para generar_mapa_categorico.
+
+    :param columna_clase: Columna de la clase (p. ej. "us_dscr").
+    :param columna_id: Id de las parcelas (None = índice).
+    :param rejilla: Tolerancia del hash en metros.
+    :param cobertura: Fracción de una parcela que debe quedar dentro de
+                      otra para considerarlas la misma (o una parte de ella).
+    :param umbral_igual: IoU a partir del cual la forma se considera igual.
+    :return: GDF con tipo_cambio, clase_anterior, clase_nueva, id_anterior,
+             id_nuevo, iou, cambio_clase, cambio_forma y la geometría (de la
+             versión nueva; de la anterior en las eliminadas).
+    """
+    ga, gb = geometrias_metricas(anterior), geometrias_metricas(nueva)
+    na, nb = len(ga), len(gb)
+    clase_a = anterior[columna_clase].astype(str).to_numpy()
+    clase_b = nueva[columna_clase].astype(str).to_numpy()
+    area_a, area_b = shapely.area(ga), shapely.area(gb)
+
+    # 1. Geometrías idénticas
+    ia, ib = emparejar_por_hash(hash_geometrias(ga, rejilla), hash_geometrias(gb, rejilla))
+    origen = np.full(nb, -1, dtype="int64")
+    origen[ib] = ia
+    iou = np.full(nb, np.nan)
+    iou[ib] = 1.0
+    identica_a = np.zeros(na, dtype=bool)
+    identica_a[ia] = True
+    tipo = np.full(nb, "", dtype=object)
+
+    # 2. Restantes: mayor intersección en cada sentido
+    resto_a, resto_b = np.flatnonzero(~identica_a), np.flatnonzero(origen < 0)
+    pares = _intersecciones(ga, gb, resto_a, resto_b).sort_values("inter", ascending=False, kind="stable")
+    mayor_b = pares.drop_duplicates("b")
+    mayor_a = pares.drop_duplicates("a")
+    padre = np.full(nb, -1, dtype="int64")
+    dentro = mayor_b[mayor_b["inter"].to_numpy() / area_b[mayor_b["b"]] >= cobertura]
+    padre[dentro["b"]] = dentro["a"]
+    hijo = np.full(na, -1, dtype="int64")
+    cubierta = mayor_a[mayor_a["inter"].to_numpy() / area_a[mayor_a["a"]] >= cobertura]
+    hijo[cubierta["a"]] = cubierta["b"]
+    hijos = np.bincount(padre[padre >= 0], minlength=na)
+    padres = np.bincount(hijo[hijo >= 0], minlength=nb)
+    unico_padre = np.full(nb, -1, dtype="int64")
+    unicas = np.flatnonzero((hijo >= 0) & (padres[np.maximum(hijo, 0)] == 1))
+    unico_padre[hijo[unicas]] = unicas
+    mayor = np.full(nb, -1, dtype="int64")
+    mayor[mayor_b["b"]] = mayor_b["a"]
+
+    con_padre = padre[resto_b] >= 0
+    division = con_padre & (hijos[np.maximum(padre[resto_b], 0)] > 1)
+    fusion = ~con_padre & (padres[resto_b] > 1)
+    uno_a_uno = (con_padre & ~division) | (~con_padre & ~fusion & (unico_padre[resto_b] >= 0))
+    origen[resto_b] = np.select([con_padre, fusion, uno_a_uno],
+                                [padre[resto_b], mayor[resto_b], unico_padre[resto_b]], -1)
+    tipo[resto_b[division]] = "division"
+    tipo[resto_b[fusion]] = "fusion"
+    tipo[resto_b[(origen[resto_b] < 0)]] = "agregado"
+
+    intersecciones = pd.Series(pares["inter"].to_numpy(), index=pares["a"].to_numpy() * nb + pares["b"].to_numpy())
+    emparejadas = resto_b[origen[resto_b] >= 0]
+    inter = intersecciones.reindex(origen[emparejadas] * nb + emparejadas).fillna(0.0).to_numpy()
+    iou[emparejadas] = inter / (area_a[origen[emparejadas]] + area_b[emparejadas] - inter)
+
+    # 3. Clase y forma de las parejas 1 a 1 (incluidas las idénticas)
+    pareja = np.flatnonzero((origen >= 0) & (tipo == ""))
+    cambio_clase = np.zeros(nb, dtype=bool)
+    cambio_clase[origen >= 0] = clase_a[origen[origen >= 0]] != clase_b[origen >= 0]
+    cambio_forma = ~(iou >= umbral_igual)
+    tipo[pareja] = np.where(cambio_clase[pareja], "reclasificado",
+                            np.where(cambio_forma[pareja], "forma", ""))
+
+    # 4. Anteriores que no terminaron (ni en parte) en ninguna nueva
+    usadas = np.zeros(na, dtype=bool)
+    usadas[origen[origen >= 0]] = True
+    usadas[padre[padre >= 0]] = True
+    usadas[hijo >= 0] = True
+    eliminadas = np.flatnonzero(~identica_a & ~usadas)
+
+    ids_a = np.asarray(anterior[columna_id] if columna_id else anterior.index)
+    ids_b = np.asarray(nueva[columna_id] if columna_id else nueva.index)
+    cambiadas = np.flatnonzero(tipo != "")
+    con_origen = origen[cambiadas] >= 0
+    origen_c = np.maximum(origen[cambiadas], 0)
+    nuevas = pd.DataFrame({
+        COLUMNA_CAMBIO: tipo[cambiadas],
+        "clase_anterior": np.where(con_origen, clase_a[origen_c], None),
+        "clase_nueva": clase_b[cambiadas],
+        "id_anterior": np.where(con_origen, ids_a[origen_c], None),
+        "id_nuevo": ids_b[cambiadas],
+        "iou": iou[cambiadas],
+        "cambio_clase": cambio_clase[cambiadas],
+        "cambio_forma": cambio_forma[cambiadas],
+    })
+    quitadas = pd.DataFrame({
+        COLUMNA_CAMBIO: "eliminado",
+        "clase_anterior": clase_a[eliminadas],
+        "clase_nueva": None,
+        "id_anterior": ids_a[eliminadas],
+        "id_nuevo": None,
+        "iou": np.nan,
+        "cambio_clase": True,
+        "cambio_forma": True,
+    })
+    geometrias_anteriores = anterior.geometry.to_crs(nueva.crs) \
+        if anterior.crs is not None and nueva.crs is not None else anterior.geometry
+    cambios = GeoDataFrame(
+        pd.concat([nuevas, quitadas], ignore_index=True),
+        geometry=np.concatenate([nueva.geometry.to_numpy()[cambiadas],
+                                 geometrias_anteriores.to_numpy()[eliminadas]]),
+        crs=nueva.crs
+    )
+    logger.info(f"Cambios: {len(ib)} de {nb} parcelas idénticas por hash, {len(pares)} traslapes "
+                f"revisados; {cambios[COLUMNA_CAMBIO].value_counts().to_dict()}")
+    return cambios
@@ -0,0 +1,188 @@
+# analysis/crossfilter.py
+
+"""
+Filtrado cruzado (crossfilter) entre el mapa y los histogramas.
+
+Al construir el motor se precalcula la contribución de cada elemento a
+cada métrica: su valor (0 si falta), si es válido y su cubeta en un
+bosquejo de cuantiles (histograma con bordes en los cuantiles globales,
+así que cada cubeta tiene ~n/num_cubetas elementos). Con eso, una
+selección se resume con sumas y bincount, y al cambiarla solo se suman
+los elementos que entraron y se restan los que salieron.
+
+Los percentiles se leen del histograma de la selección (interpolando
+dentro de la cubeta), con error de rango acotado por 1/num_cubetas.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def bordes_cuantiles(valores: np.ndarray, num_cubetas: int) -> np.ndarray:
+    """Bordes (únicos, crecientes) de las cubetas en los cuantiles de `valores`."""
+    validos = valores[np.isfinite(valores)]
+    if validos.size == 0:
+        return np.array([0.0, 0.0])
+    bordes = np.unique(np.quantile(validos, np.linspace(0, 1, num_cubetas + 1)))
+    return bordes if len(bordes) > 1 else np.repeat(bordes, 2)
+
+
+def cuantil_de_histograma(bordes: np.ndarray, conteos: np.ndarray, q: float) -> float:
+    """
+    Cuantil `q` (0-1) aproximado a partir de un histograma: interpolación
+    lineal dentro de la cubeta donde cae el rango buscado.
+    """
+    total = conteos.sum()
+    if total == 0:
+        return float("nan")
+    acumulado = np.cumsum(conteos)
+    objetivo = q * total
+    cubeta = int(np.clip(np.searchsorted(acumulado, objetivo, side="left"), 0, len(conteos) - 1))
+    previo = acumulado[cubeta - 1] if cubeta > 0 else 0
+    fraccion = (objetivo - previo) / conteos[cubeta] if conteos[cubeta] else 0.0
+    return float(bordes[cubeta] + fraccion * (bordes[cubeta + 1] - bordes[cubeta]))
+
+
+@dataclass
+class EstadoSeleccion:
+    """
+    Agregados de una selección (una fila por métrica):
+    - mascara: Elementos seleccionados.
+    - sumas, conteos: Suma y número de valores válidos.
+    - histogramas: (métricas, cubetas) conteos por cubeta del bosquejo.
+    """
+    mascara: np.ndarray
+    sumas: np.ndarray
+    conteos: np.ndarray
+    histogramas: np.ndarray
+
+    @property
+    def seleccionados(self) -> int:
+        return int(self.mascara.sum())
+
+
+class CrossfilterEngine:
+    """
+    SRP: agregados incrementales de una tabla fija para selecciones
+    arbitrarias de sus filas (por posición). El motor no guarda la selección
+    actual: recibe y devuelve EstadoSeleccion, así varios paneles pueden
+    compartirlo.
+    """
+
+    def __init__(self, tabla: pd.DataFrame, metricas: Sequence[str], num_cubetas: int = 64) -> None:
+        """
+        :param tabla: Una fila por elemento del mapa, en el mismo orden.
+        :param metricas: Columnas numéricas a agregar.
+        :param num_cubetas: Resolución del bosquejo de cuantiles.
+        """
+        self.metricas: List[str] = [m for m in metricas if m in tabla.columns]
+        self.n: int = len(tabla)
+        self.num_cubetas: int = num_cubetas
+        crudos = np.column_stack([
+            pd.to_numeric(tabla[m], errors="coerce").to_numpy(dtype="float64") for m in self.metricas
+        ]) if self.metricas else np.empty((self.n, 0))
+        crudos[~np.isfinite(crudos)] = np.nan
+
+        self.validos: np.ndarray = ~np.isnan(crudos)
+        self.valores: np.ndarray = np.where(self.validos, crudos, 0.0)
+        self.bordes: List[np.ndarray] = [bordes_cuantiles(crudos[:, j], num_cubetas)
+                                         for j in range(len(self.metricas))]
+        # Cubeta de cada (elemento, métrica) desplazada a un índice global
+        # j * num_cubetas + cubeta, para agregar todas las métricas en un bincount
+        self.cubetas: np.ndarray = np.full(crudos.shape, -1, dtype="int64")
+        for j, bordes in enumerate(self.bordes):
+            cubeta = np.clip(np.searchsorted(bordes, crudos[:, j], side="right") - 1, 0, len(bordes) - 2)
+            self.cubetas[:, j] = np.where(self.validos[:, j], cubeta + j * num_cubetas, -1)
+        self._ordenes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        logger.info(f"Crossfilter: {self.n} elementos x {len(self.metricas)} métricas.")
+
+    def _contribucion(self, filas: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(sumas, conteos, histogramas) de las filas indicadas (máscara)."""
+        sumas = self.valores[filas].sum(axis=0)
+        conteos = self.validos[filas].sum(axis=0)
+        cubetas = self.cubetas[filas]
+        histogramas = np.bincount(cubetas[cubetas >= 0],
+                                  minlength=len(self.metricas) * self.num_cubetas)
+        return sumas, conteos, histogramas.reshape(len(self.metricas), self.num_cubetas)
+
+    def _mascara(self, posiciones: Optional[Sequence[int]]) -> np.ndarray:
+        if posiciones is None:
+            return np.ones(self.n, dtype=bool)
+        mascara = np.zeros(self.n, dtype=bool)
+        posiciones = np.asarray(posiciones, dtype="int64")
+        mascara[posiciones[(posiciones >= 0) & (posiciones < self.n)]] = True
+        return mascara
+
+    def estado(self, posiciones: Optional[Sequence[int]] = None) -> EstadoSeleccion:
+        """Agregados calculados desde cero (None = todos los elementos)."""
+        mascara = self._mascara(posiciones)
+        return EstadoSeleccion(mascara, *self._contribucion(mascara))
+
+    def actualizar(self,
+                   anterior: Optional[EstadoSeleccion],
+                   posiciones: Optional[Sequence[int]]) -> EstadoSeleccion:
+        """
+        Agregados de la nueva selección a partir de los de la anterior:
+        solo se procesan las filas que entraron o salieron. Si el cambio es
+        mayor que la selección nueva, sale más barato recalcular.
+        """
+        nueva = self._mascara(posiciones)
+        if anterior is None or len(anterior.mascara) != self.n:
+            return EstadoSeleccion(nueva, *self._contribucion(nueva))
+        entran = nueva & ~anterior.mascara
+        salen = anterior.mascara & ~nueva
+        if entran.sum() + salen.sum() > nueva.sum():
+            return EstadoSeleccion(nueva, *self._contribucion(nueva))
+        sumas_e, conteos_e, hist_e = self._contribucion(entran)
+        sumas_s, conteos_s, hist_s = self._contribucion(salen)
+        return EstadoSeleccion(
+            nueva,
+            anterior.sumas + sumas_e - sumas_s,
+            anterior.conteos + conteos_e - conteos_s,
+            anterior.histogramas + hist_e - hist_s,
+        )
+
+    def histograma(self, estado: EstadoSeleccion, metrica: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(bordes, conteos) del bosquejo de `metrica` para la selección."""
+        j = self.metricas.index(metrica)
+        bordes = self.bordes[j]
+        return bordes, estado.histogramas[j, :len(bordes) - 1]
+
+    def cuantil(self, estado: EstadoSeleccion, metrica: str, q: float) -> float:
+        """Cuantil `q` (0-1) aproximado de `metrica` en la selección."""
+        return cuantil_de_histograma(*self.histograma(estado, metrica), q)
+
+    def resumen(self, estado: EstadoSeleccion, percentiles: Sequence[int] = (10, 50, 90)) -> pd.DataFrame:
+        """Tabla por métrica: elementos válidos, total, media y percentiles."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias = estado.sumas / estado.conteos
+        tabla = pd.DataFrame({"conteo": estado.conteos, "total": estado.sumas, "media": medias},
+                             index=pd.Index(self.metricas, name="metrica"))
+        for p in percentiles:
+            tabla[f"p{p}"] = [self.cuantil(estado, m, p / 100) for m in self.metricas]
+        return tabla
+
+    def filas_en_rango(self,
+                       metrica: str,
+                       minimo: Optional[float] = None,
+                       maximo: Optional[float] = None) -> np.ndarray:
+        """
+        Posiciones de los elementos con minimo <= metrica <= maximo
+        (p. ej. el rango marcado en un histograma), con búsqueda binaria
+        sobre un orden precalculado.
+        """
+        if metrica not in self._ordenes:
+            j = self.metricas.index(metrica)
+            posiciones = np.flatnonzero(self.validos[:, j])
+            orden = posiciones[np.argsort(self.valores[posiciones, j], kind="stable")]
+            self._ordenes[metrica] = (self.valores[orden, j], orden)
+        valores, orden = self._ordenes[metrica]
+        inicio = 0 if minimo is None else np.searchsorted(valores, minimo, side="left")
+        fin = len(valores) if maximo is None else np.searchsorted(valores, maximo, side="right")
+        return np.sort(orden[inicio:fin])
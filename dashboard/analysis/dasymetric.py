@@ -0,0 +1,269 @@
+# analysis/dasymetric.py
+
+"""
+Redistribución dasimétrica de totales censales de AGEB a manzanas,
+ponderada por el área de uso de suelo residencial de cada manzana.
+
+La redistribución se expresa como una matriz dispersa W (manzanas x AGEB)
+cuyas columnas suman 1: para cualquier año o variable extensiva,
+valores_manzana = W @ valores_ageb, y el total de cada variable se conserva.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame, GeoSeries
+from scipy import sparse
+
+from .artifact_cache import ArtifactCache
+from .dual_crs import copiar_geometria_dual
+from .spatial_index import IndiceEspacial
+from .spatial_weights import geometrias_metricas, huella_geometrias, huella_ids
+
+logger = logging.getLogger(__name__)
+
+# Forma de construir W; entra en la huella para invalidar matrices guardadas
+# con una versión anterior (p. ej. las que perdían las AGEB sin manzanas)
+VERSION_MATRIZ = 2
+
+
+@dataclass
+class MatrizDasimetrica:
+    """
+    W (n_manzanas x n_ageb): fracción del total de cada AGEB que recibe
+    cada manzana. Todas las columnas suman 1 (si hay manzanas).
+    - principal: Posición (en ids_ageb) de la AGEB que contiene la mayor
+                 parte de cada manzana (-1 si ninguna).
+    """
+    matriz: sparse.csr_matrix
+    ids_manzana: np.ndarray
+    ids_ageb: np.ndarray
+    principal: np.ndarray
+
+    def ageb_principal(self) -> np.ndarray:
+        """Id de la AGEB que contiene a cada manzana (None si ninguna)."""
+        ids = np.full(len(self.ids_manzana), None, dtype=object)
+        con_ageb = self.principal >= 0
+        ids[con_ageb] = self.ids_ageb[self.principal[con_ageb]]
+        return ids
+
+    def redistribuir(self, valores: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reparte variables extensivas de AGEB a manzana (un producto disperso).
+
+        :param valores: Una fila por AGEB (índice = id de AGEB).
+        :return: Una fila por manzana (índice = id de manzana).
+        """
+        alineados = valores.reindex(self.ids_ageb).apply(pd.to_numeric, errors="coerce").fillna(0.0)
+        resultado = self.matriz @ alineados.to_numpy(dtype="float64")
+        return pd.DataFrame(resultado, index=self.ids_manzana, columns=valores.columns)
+
+
+def es_residencial(usos: pd.Series, prefijos: Sequence[str]) -> np.ndarray:
+    """Máscara de usos de suelo residenciales (por prefijo, sin mayúsculas)."""
+    usos = usos.fillna("").astype(str).str.strip().str.lower()
+    return usos.str.startswith(tuple(p.lower() for p in prefijos)).to_numpy()
+
+
+def _pares_manzana(manzanas: np.ndarray,
+                   otras: np.ndarray,
+                   indice_manzanas: Optional[IndiceEspacial]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pares (manzana, otra) que se intersecan, con el índice persistido de manzanas si existe."""
+    if indice_manzanas is not None:
+        j, i = indice_manzanas.consultar(otras, manzanas, "intersects")
+        return i, j
+    return shapely.STRtree(otras).query(manzanas, predicate="intersects")
+
+
+def area_residencial(manzanas: np.ndarray,
+                     usos_residenciales: np.ndarray,
+                     indice_manzanas: Optional[IndiceEspacial] = None) -> np.ndarray:
+    """
+    Área (m²) de uso residencial dentro de cada manzana: intersección
+    vectorizada de los pares candidatos y suma por manzana.
+    """
+    if len(usos_residenciales) == 0:
+        return np.zeros(len(manzanas))
+    i, j = _pares_manzana(manzanas, usos_residenciales, indice_manzanas)
+    areas = shapely.area(shapely.intersection(manzanas[i], usos_residenciales[j]))
+    return np.bincount(i, weights=areas, minlength=len(manzanas))
+
+
+def construir_matriz(manzanas: np.ndarray,
+                     agebs: np.ndarray,
+                     peso_manzana: np.ndarray,
+                     indice_manzanas: Optional[IndiceEspacial] = None) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Traslapa manzanas con AGEB y normaliza los pesos por AGEB (groupby).
+    Cada pieza manzana∩AGEB pesa peso_manzana · (área pieza / área manzana).
+    Si una AGEB no tiene área residencial, sus piezas se ponderan por área;
+    si no traslapa ninguna manzana, su total pasa a las más cercanas. Así
+    ninguna AGEB pierde su población.
+
+    :return: (W, posición de la AGEB con la pieza más grande de cada manzana)
+    """
+    i, j = _pares_manzana(manzanas, agebs, indice_manzanas)
+    area_pieza = shapely.area(shapely.intersection(manzanas[i], agebs[j]))
+    area_manzana = shapely.area(manzanas)[i]
+    fraccion = np.divide(area_pieza, area_manzana, out=np.zeros_like(area_pieza), where=area_manzana > 0)
+    pesos = peso_manzana[i] * fraccion
+
+    n_ageb = len(agebs)
+    suma = np.bincount(j, weights=pesos, minlength=n_ageb)
+    sin_peso = suma[j] <= 0
+    pesos[sin_peso] = area_pieza[sin_peso]
+    suma = np.bincount(j, weights=pesos, minlength=n_ageb)
+
+    # AGEB sin piezas con área: a la(s) manzana(s) más cercana(s), a partes iguales
+    huerfanas = np.flatnonzero(suma <= 0)
+    if len(huerfanas) and len(manzanas):
+        k, cercanas = shapely.STRtree(manzanas).query_nearest(agebs[huerfanas], all_matches=True)
+        i = np.concatenate([i, cercanas])
+        j = np.concatenate([j, huerfanas[k]])
+        pesos = np.concatenate([pesos, np.ones(len(k))])
+        area_pieza = np.concatenate([area_pieza, np.zeros(len(k))])
+        suma = np.bincount(j, weights=pesos, minlength=n_ageb)
+        logger.info(f"{len(huerfanas)} AGEB sin manzanas traslapadas: se asignan a la más cercana.")
+
+    datos = np.divide(pesos, suma[j], out=np.zeros_like(pesos), where=suma[j] > 0)
+    matriz = sparse.csr_matrix((datos, (i, j)), shape=(len(manzanas), n_ageb))
+    matriz.eliminate_zeros()
+
+    # Pieza más grande por manzana: ordenar por (manzana, área) y tomar la última
+    principal = np.full(len(manzanas), -1)
+    orden = np.lexsort((area_pieza, i))
+    ultimas = np.append(i[orden][1:] != i[orden][:-1], True)
+    principal[i[orden][ultimas]] = j[orden][ultimas]
+    return matriz, principal
+
+
+class DasymetricEngine:
+    """
+    SRP: construir (una vez) y reutilizar la matriz de redistribución
+    AGEB -> manzana. Se guarda en memoria y en disco; se reconstruye si
+    cambian las manzanas, las AGEB o la capa de uso de suelo.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None) -> None:
+        """
+        :param cache: Almacén en disco (None = solo memoria).
+        """
+        self.cache: Optional[ArtifactCache] = cache
+        self._memoria: Dict[str, MatrizDasimetrica] = {}
+
+    def obtener(self,
+                manzanas: GeoDataFrame,
+                agebs: GeoDataFrame,
+                columna_id_ageb: str,
+                columna_id_manzana: Optional[str] = None,
+                uso_suelo: Optional[GeoDataFrame] = None,
+                columna_uso: Optional[str] = None,
+                prefijos_residenciales: Iterable[str] = ("habitacion",),
+                indice_manzanas: Optional[IndiceEspacial] = None) -> MatrizDasimetrica:
+        """
+        Matriz de redistribución entre `agebs` (una fila por AGEB) y `manzanas`.
+
+        El peso de cada manzana es su área residencial: la intersección con
+        los polígonos residenciales de `uso_suelo` si se da; si no, el área
+        de la manzana cuando su uso predominante (`columna_uso` en
+        `manzanas`) es residencial.
+
+        :param indice_manzanas: Índice persistido de `manzanas` (ver SpatialIndexStore).
+        :raises ValueError: Si no hay forma de determinar el uso residencial.
+        """
+        prefijos = tuple(prefijos_residenciales)
+        ids_manzana = np.asarray(manzanas[columna_id_manzana] if columna_id_manzana
+                                 else manzanas.index).astype(str)
+        ids_ageb = np.asarray(agebs[columna_id_ageb]).astype(str)
+        geom_manzanas = geometrias_metricas(manzanas)
+
+        if uso_suelo is not None and columna_uso in uso_suelo.columns:
+            residenciales = geometrias_metricas(uso_suelo)[es_residencial(uso_suelo[columna_uso], prefijos)]
+            origen = huella_geometrias(residenciales)
+        elif columna_uso in manzanas.columns:
+            residenciales = None
+            origen = huella_ids(manzanas[columna_uso].astype(str))
+        else:
+            raise ValueError("Se requiere una capa de uso de suelo o el uso predominante por manzana.")
+
+        huella = huella_ids([huella_ids(ids_manzana), huella_ids(ids_ageb), origen, *prefijos, VERSION_MATRIZ])
+        nombre = "dasimetrico_ageb_manzana"
+        resultado = self._memoria.get(huella)
+        if resultado is not None:
+            return resultado
+
+        resultado = self._cargar(nombre, huella)
+        if resultado is None:
+            if residenciales is not None:
+                peso = area_residencial(geom_manzanas, residenciales, indice_manzanas)
+            else:
+                peso = np.where(es_residencial(manzanas[columna_uso], prefijos),
+                                shapely.area(geom_manzanas), 0.0)
+            matriz, principal = construir_matriz(geom_manzanas, geometrias_metricas(agebs), peso,
+                                                 indice_manzanas)
+            resultado = MatrizDasimetrica(matriz, ids_manzana, ids_ageb, principal)
+            logger.info(f"Matriz dasimétrica construida: {matriz.shape}, {matriz.nnz} piezas, "
+                        f"{int((peso > 0).sum())} manzanas residenciales.")
+            self._guardar(nombre, huella, resultado)
+
+        self._memoria[huella] = resultado
+        return resultado
+
+    def _cargar(self, nombre: str, huella: str) -> Optional[MatrizDasimetrica]:
+        if self.cache is None:
+            return None
+        arrays = self.cache.cargar_arrays(nombre)
+        if arrays is None or str(arrays["huella"]) != huella:
+            return None
+        matriz = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(arrays["shape"])
+        )
+        logger.info(f"Matriz dasimétrica '{nombre}' cargada desde caché.")
+        return MatrizDasimetrica(matriz, arrays["ids_manzana"], arrays["ids_ageb"], arrays["principal"])
+
+    def _guardar(self, nombre: str, huella: str, resultado: MatrizDasimetrica) -> None:
+        if self.cache is None:
+            return
+        self.cache.guardar_arrays(
+            nombre,
+            data=resultado.matriz.data,
+            indices=resultado.matriz.indices,
+            indptr=resultado.matriz.indptr,
+            shape=np.array(resultado.matriz.shape),
+            ids_manzana=resultado.ids_manzana,
+            ids_ageb=resultado.ids_ageb,
+            principal=resultado.principal,
+            huella=np.array(huella),
+        )
+
+
+def capa_manzanas(manzanas: GeoDataFrame,
+                  matriz: MatrizDasimetrica,
+                  valores_ageb: pd.DataFrame,
+                  atributos_ageb: Optional[pd.DataFrame] = None) -> GeoDataFrame:
+    """
+    GeoDataFrame de manzanas con las variables redistribuidas, el id de la
+    AGEB principal ("ageb"), los atributos de esa AGEB y area_km2 propia.
+
+    :param valores_ageb: Variables extensivas por AGEB (índice = id AGEB).
+    :param atributos_ageb: Columnas descriptivas por AGEB a copiar tal cual.
+    """
+    redistribuidos = matriz.redistribuir(valores_ageb)
+    capa = GeoDataFrame(
+        {"manzana": matriz.ids_manzana, "ageb": matriz.ageb_principal()},
+        geometry=manzanas.geometry.to_numpy(), crs=manzanas.crs
+    )
+    for columna in redistribuidos.columns:
+        capa[columna] = redistribuidos[columna].to_numpy()
+    if atributos_ageb is not None:
+        for columna in atributos_ageb.columns:
+            capa[columna] = capa["ageb"].map(atributos_ageb[columna])
+    capa = copiar_geometria_dual(manzanas, capa)
+    areas = capa["area_m2"].to_numpy() if "area_m2" in capa.columns \
+        else GeoSeries(geometrias_metricas(manzanas)).area.to_numpy()
+    capa["area_km2"] = areas / 1e6
+    return capa
@@ -0,0 +1,123 @@
+# analysis/dual_crs.py
+
+"""
+Capas con doble geometría: la geometría activa en EPSG:4326 (para mostrar)
+y una columna `geom_metrica` en UTM 14N (para medir), construidas una sola
+vez al cargar la capa. Al mismo tiempo se precalculan área, perímetro,
+centroide y caja envolvente, así que ninguna consulta posterior necesita
+reproyectar ni medir geometrías.
+
+Los transformadores de pyproj se crean una vez por par de CRS y se
+reutilizan (crearlos es lo más caro de una reproyección pequeña).
+"""
+
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import shapely
+from geopandas import GeoDataFrame, GeoSeries
+from pyproj import CRS, Transformer
+
+logger = logging.getLogger(__name__)
+
+# CRS métrico para Coyoacán (UTM zona 14N) y CRS de visualización
+CRS_METRICO = "EPSG:32614"
+CRS_GEOGRAFICO = "EPSG:4326"
+
+COLUMNA_METRICA = "geom_metrica"
+# Atributos precalculados: medidas en CRS_METRICO, posiciones en lon/lat
+COLUMNAS_GEOMETRICAS = (
+    "area_m2", "perimetro_m", "centroide_lon", "centroide_lat",
+    "bbox_lon_min", "bbox_lat_min", "bbox_lon_max", "bbox_lat_max",
+)
+
+
+@lru_cache(maxsize=None)
+def transformador(origen: str, destino: str) -> Transformer:
+    """Transformer (x, y en orden lon/lat) de `origen` a `destino`, cacheado."""
+    return Transformer.from_crs(origen, destino, always_xy=True)
+
+
+def reproyectar(geometrias: np.ndarray, origen, destino) -> np.ndarray:
+    """
+    Reproyecta un arreglo de geometrías de shapely con el transformador
+    cacheado: todas las coordenadas se transforman en una sola llamada.
+    """
+    origen, destino = CRS.from_user_input(origen), CRS.from_user_input(destino)
+    if origen.equals(destino):
+        return np.asarray(geometrias)
+    transformer = transformador(origen.to_string(), destino.to_string())
+    return shapely.transform(
+        np.asarray(geometrias), lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1]))
+    )
+
+
+def es_dual(gdf: GeoDataFrame) -> bool:
+    """Indica si la capa ya tiene geometría métrica y atributos precalculados."""
+    return COLUMNA_METRICA in gdf.columns
+
+
+def preparar_capa(gdf: GeoDataFrame, filas: Optional[np.ndarray] = None) -> GeoDataFrame:
+    """
+    Capa con geometría activa en CRS_GEOGRAFICO, `geom_metrica` en
+    CRS_METRICO y COLUMNAS_GEOMETRICAS. Si la capa ya es dual, se devuelve
+    tal cual (o solo se recalculan `filas`, p. ej. tras un recorte). Una
+    capa sin CRS se devuelve sin cambios.
+
+    :param filas: Máscara booleana de filas cuya geometría activa cambió.
+    :return: Nueva capa (la original no se modifica).
+    """
+    if gdf.empty or gdf.crs is None:
+        return gdf
+    if es_dual(gdf) and filas is None:
+        return gdf
+
+    capa = gdf.copy()
+    if not capa.crs.equals(CRS_GEOGRAFICO):
+        geograficas = reproyectar(capa.geometry.values, capa.crs, CRS_GEOGRAFICO)
+        capa[capa.geometry.name] = GeoSeries(geograficas, index=capa.index, crs=CRS_GEOGRAFICO)
+    geograficas = np.asarray(capa.geometry.values)
+
+    nueva = not (es_dual(capa) and filas is not None)
+    filas = np.ones(len(capa), dtype=bool) if nueva else np.asarray(filas, dtype=bool)
+    metricas = np.empty(len(capa), dtype=object) if nueva \
+        else np.asarray(capa[COLUMNA_METRICA].values).copy()
+    metricas[filas] = reproyectar(geograficas[filas], CRS_GEOGRAFICO, CRS_METRICO)
+    capa[COLUMNA_METRICA] = GeoSeries(metricas, index=capa.index, crs=CRS_METRICO)
+
+    centroides = reproyectar(shapely.centroid(metricas[filas]), CRS_METRICO, CRS_GEOGRAFICO)
+    cajas = shapely.bounds(geograficas[filas])
+    nuevos = {
+        "area_m2": shapely.area(metricas[filas]),
+        "perimetro_m": shapely.length(metricas[filas]),
+        "centroide_lon": shapely.get_x(centroides),
+        "centroide_lat": shapely.get_y(centroides),
+        "bbox_lon_min": cajas[:, 0], "bbox_lat_min": cajas[:, 1],
+        "bbox_lon_max": cajas[:, 2], "bbox_lat_max": cajas[:, 3],
+    }
+    for columna, valores in nuevos.items():
+        completa = np.full(len(capa), np.nan) if nueva else capa[columna].to_numpy(dtype="float64").copy()
+        completa[filas] = valores
+        capa[columna] = completa
+    logger.debug(f"Capa dual preparada: {len(capa)} geometrías.")
+    return capa
+
+
+def sin_geometria_metrica(gdf: GeoDataFrame) -> GeoDataFrame:
+    """Capa sin la columna métrica (p. ej. para escribir un shapefile)."""
+    return gdf.drop(columns=[COLUMNA_METRICA]) if es_dual(gdf) else gdf
+
+
+def copiar_geometria_dual(origen: GeoDataFrame, destino: GeoDataFrame) -> GeoDataFrame:
+    """
+    Copia `geom_metrica` y COLUMNAS_GEOMETRICAS de `origen` a `destino`
+    (mismas filas en el mismo orden, p. ej. una capa derivada de otra).
+    """
+    if not es_dual(origen):
+        return destino
+    destino[COLUMNA_METRICA] = GeoSeries(origen[COLUMNA_METRICA].values, index=destino.index, crs=CRS_METRICO)
+    for columna in COLUMNAS_GEOMETRICAS:
+        destino[columna] = origen[columna].to_numpy()
+    return destino
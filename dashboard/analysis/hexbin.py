@@ -0,0 +1,198 @@
+# analysis/hexbin.py
+
+"""
+Agregación de puntos (localidades, servicios, unidades económicas) en una
+rejilla hexagonal jerárquica sobre CRS_METRICO.
+
+La resolución r tiene hexágonos (punta arriba) de radio TAMANO_BASE_M / 2^r
+con origen común, así que el id de una celda es estable entre consultas y
+procesos. La celda padre de una celda es la celda de la resolución más
+gruesa que contiene su centro (misma convención aproximada que H3).
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame, GeoSeries
+
+from .accessibility import coordenadas_metricas
+from .spatial_weights import CRS_METRICO
+
+logger = logging.getLogger(__name__)
+
+# Radio (centro a vértice) de los hexágonos de resolución 0
+TAMANO_BASE_M = 8000.0
+
+_RAIZ3 = np.sqrt(3.0)
+# Empaquetado del id: resolución (8 bits) | q (28 bits) | r (28 bits)
+_BITS = 28
+_DESPLAZAMIENTO = 1 << (_BITS - 1)
+_MASCARA = (1 << _BITS) - 1
+# Vértices de un hexágono punta arriba de radio 1
+_ANGULOS = np.deg2rad(30 + 60 * np.arange(6))
+_VERTICES = np.column_stack([np.cos(_ANGULOS), np.sin(_ANGULOS)])
+
+
+def tamano_celda(resolucion: int) -> float:
+    """Radio (m) de los hexágonos de `resolucion`."""
+    return TAMANO_BASE_M / 2 ** resolucion
+
+
+def codificar(resolucion: int, q: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """Ids int64 a partir de coordenadas axiales (q, r)."""
+    q = np.asarray(q, dtype="int64") + _DESPLAZAMIENTO
+    r = np.asarray(r, dtype="int64") + _DESPLAZAMIENTO
+    return (np.int64(resolucion) << (2 * _BITS)) | (q << _BITS) | r
+
+
+def decodificar(ids: np.ndarray):
+    """(resolucion, q, r) de cada id."""
+    ids = np.asarray(ids, dtype="int64")
+    resolucion = ids >> (2 * _BITS)
+    q = ((ids >> _BITS) & _MASCARA) - _DESPLAZAMIENTO
+    r = (ids & _MASCARA) - _DESPLAZAMIENTO
+    return resolucion, q, r
+
+
+def celdas_de_puntos(x: np.ndarray, y: np.ndarray, resolucion: int) -> np.ndarray:
+    """
+    Celda de cada punto (x, y en CRS_METRICO): coordenadas axiales
+    fraccionarias y redondeo cúbico, todo vectorizado.
+    """
+    tamano = tamano_celda(resolucion)
+    qf = (_RAIZ3 / 3 * x - y / 3) / tamano
+    rf = (2 / 3 * y) / tamano
+    sf = -qf - rf
+    q, r, s = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    corregir_q = (dq > dr) & (dq > ds)
+    corregir_r = ~corregir_q & (dr > ds)
+    q = np.where(corregir_q, -r - s, q)
+    r = np.where(corregir_r, -q - s, r)
+    return codificar(resolucion, q, r)
+
+
+def centros(ids: np.ndarray) -> np.ndarray:
+    """Centros (n, 2) en CRS_METRICO de las celdas."""
+    resolucion, q, r = decodificar(ids)
+    tamano = TAMANO_BASE_M / 2.0 ** resolucion
+    return np.column_stack([tamano * _RAIZ3 * (q + r / 2), tamano * 1.5 * r])
+
+
+def padres(ids: np.ndarray, resolucion_padre: int) -> np.ndarray:
+    """Celda de `resolucion_padre` que contiene el centro de cada celda."""
+    xy = centros(ids)
+    return celdas_de_puntos(xy[:, 0], xy[:, 1], resolucion_padre)
+
+
+def poligonos(ids: np.ndarray) -> np.ndarray:
+    """Hexágonos (CRS_METRICO) de las celdas, construidos en un solo paso."""
+    ids = np.asarray(ids, dtype="int64")
+    resolucion, _, _ = decodificar(ids)
+    tamano = TAMANO_BASE_M / 2.0 ** resolucion
+    vertices = centros(ids)[:, None, :] + tamano[:, None, None] * _VERTICES[None, :, :]
+    return shapely.polygons(vertices)
+
+
+def agregar_celdas(celdas: np.ndarray,
+                   valores: Optional[pd.DataFrame] = None,
+                   pesos: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Conteo y sumas por celda con np.unique + bincount.
+
+    :param celdas: Id de celda por registro.
+    :param valores: Columnas a sumar (una fila por registro).
+    :param pesos: Conteo que aporta cada registro (None = 1).
+    :return: DataFrame indexado por id de celda con `conteo` y las sumas.
+    """
+    unicas, inversa = np.unique(celdas, return_inverse=True)
+    tabla = pd.DataFrame(index=pd.Index(unicas, name="celda"))
+    tabla["conteo"] = np.bincount(inversa, weights=pesos, minlength=len(unicas))
+    if pesos is None:
+        tabla["conteo"] = tabla["conteo"].astype("int64")
+    if valores is not None:
+        for columna in valores.columns:
+            datos = pd.to_numeric(valores[columna], errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+            tabla[columna] = np.bincount(inversa, weights=datos, minlength=len(unicas))
+    return tabla
+
+
+class HexGridEngine:
+    """
+    SRP: asignar puntos a la rejilla hexagonal y agregarlos por celda en
+    varias resoluciones. Los polígonos de cada celda se construyen una sola
+    vez por resolución (ya en EPSG:4326) y se reutilizan en cada capa.
+    """
+
+    def __init__(self, crs_salida: str = "EPSG:4326") -> None:
+        """
+        :param crs_salida: CRS de las geometrías de las capas resultantes.
+        """
+        self.crs_salida: str = crs_salida
+        self._geometrias: Dict[int, pd.Series] = {}
+
+    def geometrias(self, ids: np.ndarray, resolucion: int) -> np.ndarray:
+        """Polígonos de las celdas `ids` (construye solo las que no estén en caché)."""
+        ids = np.asarray(ids, dtype="int64")
+        cache = self._geometrias.get(resolucion, pd.Series(dtype=object))
+        faltantes = ids[~np.isin(ids, cache.index.to_numpy())]
+        if faltantes.size:
+            nuevas = GeoSeries(poligonos(faltantes), crs=CRS_METRICO).to_crs(self.crs_salida)
+            cache = pd.concat([cache, pd.Series(np.asarray(nuevas.values), index=faltantes)])
+            self._geometrias[resolucion] = cache
+        return cache.loc[ids].to_numpy()
+
+    def agregar(self,
+                puntos: GeoDataFrame,
+                resoluciones: Sequence[int],
+                sumas: Iterable[str] = (),
+                columna_categoria: Optional[str] = None) -> Dict[int, GeoDataFrame]:
+        """
+        Capas hexagonales de `puntos` en cada resolución. Los puntos se
+        asignan una sola vez a la resolución más fina; las más gruesas se
+        obtienen sumando las celdas hijas en su celda padre.
+
+        :param sumas: Columnas numéricas a sumar por celda.
+        :param columna_categoria: Si se da, agrega `conteo_<categoria>` por valor.
+        :return: {resolucion: GDF con celda, conteo, sumas y area_km2}.
+        """
+        resoluciones = sorted(set(resoluciones), reverse=True)
+        if puntos.empty or not resoluciones:
+            return {}
+        xy = coordenadas_metricas(puntos)
+        valores = pd.DataFrame(index=range(len(puntos)))
+        for columna in sumas:
+            valores[columna] = pd.to_numeric(puntos[columna], errors="coerce").to_numpy()
+        if columna_categoria is not None:
+            categorias = puntos[columna_categoria].astype(str).to_numpy()
+            for categoria in sorted(set(categorias)):
+                valores[f"conteo_{categoria}"] = (categorias == categoria).astype("float64")
+
+        celdas = celdas_de_puntos(xy[:, 0], xy[:, 1], resoluciones[0])
+        tabla = agregar_celdas(celdas, valores)
+        capas = {}
+        for resolucion in resoluciones:
+            if resolucion != resoluciones[0]:
+                hijas = tabla.index.to_numpy()
+                tabla = agregar_celdas(padres(hijas, resolucion),
+                                       tabla.drop(columns="conteo"),
+                                       pesos=tabla["conteo"].to_numpy(dtype="float64"))
+                tabla["conteo"] = tabla["conteo"].round().astype("int64")
+            capas[resolucion] = self._capa(tabla, resolucion)
+        logger.info(f"{len(puntos)} puntos agregados en hexágonos: "
+                    f"{ {r: len(c) for r, c in capas.items()} } celdas por resolución.")
+        return capas
+
+    def _capa(self, tabla: pd.DataFrame, resolucion: int) -> GeoDataFrame:
+        ids = tabla.index.to_numpy()
+        capa = GeoDataFrame(
+            {"celda": ids.astype(str)},
+            geometry=self.geometrias(ids, resolucion), crs=self.crs_salida
+        )
+        for columna in tabla.columns:
+            capa[columna] = tabla[columna].to_numpy()
+        capa["area_km2"] = 1.5 * _RAIZ3 * tamano_celda(resolucion) ** 2 / 1e6
+        return capa
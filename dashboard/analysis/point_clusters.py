@@ -0,0 +1,196 @@
+# analysis/point_clusters.py
+
+"""
+Agrupamiento jerárquico de puntos por nivel de zoom (al estilo de
+supercluster): se construye una vez por capa de puntos, de max_zoom hacia
+abajo, agrupando en cada nivel los elementos del nivel siguiente que caen
+dentro de `radio` píxeles. Consultar (bbox, zoom) es una búsqueda binaria
+sobre un arreglo ordenado por x más un filtro por y.
+
+Coordenadas internas: Web Mercator normalizado a [0, 1] (como los tiles).
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+
+def a_mercator(lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Lon/lat (grados) a Web Mercator en [0, 1]."""
+    seno = np.sin(np.deg2rad(np.clip(lat, -85.0511, 85.0511)))
+    x = np.asarray(lon, dtype="float64") / 360.0 + 0.5
+    y = 0.5 - 0.25 * np.log((1 + seno) / (1 - seno)) / np.pi
+    return x, y
+
+
+def a_lonlat(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator en [0, 1] a lon/lat (grados)."""
+    lon = (np.asarray(x) - 0.5) * 360.0
+    lat = np.rad2deg(2 * np.arctan(np.exp((180 - np.asarray(y) * 360) * np.pi / 180)) - np.pi / 2)
+    return lon, lat
+
+
+@dataclass
+class NivelZoom:
+    """
+    Elementos (puntos o clusters) visibles en un zoom, ordenados por x.
+    - ids: Posición del punto original (< n) o id de cluster (>= n).
+    - conteo: Puntos que representa cada elemento.
+    """
+    x: np.ndarray
+    y: np.ndarray
+    conteo: np.ndarray
+    ids: np.ndarray
+
+
+@dataclass
+class ResultadoClusters:
+    """Elementos de un (bbox, zoom); `es_cluster` distingue clusters de puntos."""
+    lon: np.ndarray
+    lat: np.ndarray
+    conteo: np.ndarray
+    ids: np.ndarray
+    es_cluster: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Tabla para Plotly (scatter_mapbox)."""
+        return pd.DataFrame({"lon": self.lon, "lat": self.lat, "conteo": self.conteo,
+                             "id": self.ids, "es_cluster": self.es_cluster})
+
+
+def _ordenar(x: np.ndarray, y: np.ndarray, conteo: np.ndarray, ids: np.ndarray) -> NivelZoom:
+    orden = np.argsort(x, kind="stable")
+    return NivelZoom(x[orden], y[orden], conteo[orden], ids[orden])
+
+
+class PointClusterIndex:
+    """
+    SRP: índice de clusters por zoom de una capa de puntos (inmutable una
+    vez construido). Los ids de cluster empiezan en n (número de puntos).
+    """
+
+    def __init__(self,
+                 lon: np.ndarray,
+                 lat: np.ndarray,
+                 radio: float = 40.0,
+                 extension: int = 512,
+                 min_zoom: int = 0,
+                 max_zoom: int = 16,
+                 min_puntos: int = 2) -> None:
+        """
+        :param radio: Radio de agrupamiento en píxeles.
+        :param extension: Tamaño del tile en píxeles.
+        :param max_zoom: Último zoom con clusters; a partir de max_zoom + 1
+                         se ven todos los puntos.
+        :param min_puntos: Puntos mínimos para formar un cluster.
+        """
+        self.n: int = len(lon)
+        self.min_zoom: int = min_zoom
+        self.max_zoom: int = max_zoom
+        self.niveles: Dict[int, NivelZoom] = {}
+        self._padre: List[int] = []
+        self._zoom_cluster: List[int] = []
+
+        x, y = a_mercator(np.asarray(lon, dtype="float64"), np.asarray(lat, dtype="float64"))
+        validos = np.isfinite(x) & np.isfinite(y)
+        ids = np.flatnonzero(validos)
+        x, y = x[validos], y[validos]
+        conteo = np.ones(len(ids), dtype="int64")
+        self._padre_punto = np.full(self.n, -1, dtype="int64")
+        self.niveles[max_zoom + 1] = _ordenar(x, y, conteo, ids)
+
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            x, y, conteo, ids = self._agrupar(x, y, conteo, ids, zoom,
+                                              radio / (extension * 2 ** zoom), min_puntos)
+            self.niveles[zoom] = _ordenar(x, y, conteo, ids)
+        self._padre_cluster = np.asarray(self._padre, dtype="int64")
+        logger.info(f"Índice de clusters: {self.n} puntos, "
+                    f"{len(self.niveles[min_zoom].ids)} elementos en zoom {min_zoom}.")
+
+    def _agrupar(self, x, y, conteo, ids, zoom: int, radio: float, min_puntos: int):
+        """Un nivel: cada elemento no asignado absorbe a sus vecinos libres."""
+        vecinos = cKDTree(np.column_stack([x, y])).query_ball_point(np.column_stack([x, y]), radio)
+        asignado = np.zeros(len(x), dtype=bool)
+        nx, ny, nconteo, nids = [], [], [], []
+        for i in range(len(x)):
+            if asignado[i]:
+                continue
+            asignado[i] = True
+            libres = [j for j in vecinos[i] if not asignado[j]]
+            total = conteo[i] + (conteo[libres].sum() if libres else 0)
+            if not libres or total < min_puntos:
+                nx.append(x[i]); ny.append(y[i]); nconteo.append(conteo[i]); nids.append(ids[i])
+                continue
+            asignado[libres] = True
+            grupo = [i] + libres
+            peso = conteo[grupo]
+            cluster = self.n + len(self._padre)
+            self._padre.append(-1)
+            self._zoom_cluster.append(zoom)
+            for miembro in ids[grupo]:
+                self._asignar_padre(miembro, cluster)
+            nx.append(np.dot(x[grupo], peso) / total)
+            ny.append(np.dot(y[grupo], peso) / total)
+            nconteo.append(total)
+            nids.append(cluster)
+        return (np.asarray(nx), np.asarray(ny),
+                np.asarray(nconteo, dtype="int64"), np.asarray(nids, dtype="int64"))
+
+    def _asignar_padre(self, miembro: int, cluster: int) -> None:
+        if miembro < self.n:
+            self._padre_punto[miembro] = cluster
+        else:
+            self._padre[miembro - self.n] = cluster
+
+    def clusters(self, bbox: Sequence[float], zoom: float) -> ResultadoClusters:
+        """
+        Elementos visibles en `bbox` (lon_min, lat_min, lon_max, lat_max) al
+        zoom dado (se redondea hacia abajo y se acota a [min_zoom, max_zoom+1]).
+        """
+        nivel = self.niveles[int(np.clip(np.floor(zoom), self.min_zoom, self.max_zoom + 1))]
+        x0, y1 = a_mercator(np.array([bbox[0]]), np.array([bbox[1]]))
+        x1, y0 = a_mercator(np.array([bbox[2]]), np.array([bbox[3]]))
+        inicio = np.searchsorted(nivel.x, x0[0], side="left")
+        fin = np.searchsorted(nivel.x, x1[0], side="right")
+        y = nivel.y[inicio:fin]
+        dentro = (y >= y0[0]) & (y <= y1[0])
+        x = nivel.x[inicio:fin][dentro]
+        lon, lat = a_lonlat(x, y[dentro])
+        ids = nivel.ids[inicio:fin][dentro]
+        return ResultadoClusters(lon, lat, nivel.conteo[inicio:fin][dentro], ids, ids >= self.n)
+
+    def zoom_expansion(self, cluster: int) -> int:
+        """Zoom al que el cluster se separa en sus hijos."""
+        return self._zoom_cluster[cluster - self.n] + 1
+
+    def hojas(self, cluster: int) -> np.ndarray:
+        """Posiciones de los puntos originales contenidos en el cluster."""
+        # Subir desde cada punto por sus clusters más finos que el buscado
+        zoom = self._zoom_cluster[cluster - self.n]
+        zoom_cluster = np.asarray(self._zoom_cluster)
+        actual = self._padre_punto.copy()
+        while True:
+            posicion = np.where(actual >= self.n, actual - self.n, 0)
+            subir = (actual >= self.n) & (zoom_cluster[posicion] > zoom) & (self._padre_cluster[posicion] >= 0)
+            if not subir.any():
+                break
+            actual[subir] = self._padre_cluster[posicion[subir]]
+        return np.flatnonzero(actual == cluster)
+
+
+def indice_de_capa(puntos: GeoDataFrame, **parametros) -> PointClusterIndex:
+    """Índice de clusters de una capa de puntos (se reproyecta a EPSG:4326)."""
+    if puntos.crs is not None and not puntos.crs.equals("EPSG:4326"):
+        puntos = puntos.to_crs("EPSG:4326")
+    geometrias = puntos.geometry
+    return PointClusterIndex(geometrias.x.to_numpy(), geometrias.y.to_numpy(), **parametros)
@@ -0,0 +1,444 @@
+# analysis/regionalization.py
+
+"""
+Regionalización con restricción espacial: agrupa unidades contiguas
+(manzanas, AGEB) en regiones homogéneas en varios indicadores.
+
+- SKATER: árbol de expansión mínima del grafo de contigüidad (aristas
+  pesadas por disimilitud) y cortes sucesivos de la arista que más reduce
+  la suma de cuadrados intra-región. Las sumas por subárbol se acumulan
+  nivel por nivel del árbol, así que evaluar todos los cortes posibles son
+  unas cuantas operaciones vectorizadas por nivel.
+- max-p: crecimiento aleatorio de regiones hasta alcanzar un umbral (p. ej.
+  población mínima); gana el reinicio con más regiones y, a igualdad, con
+  menor suma de cuadrados. Los reinicios son independientes y se reparten
+  entre procesos.
+
+El grafo sale de SpatialWeights (ver spatial_weights.py), que ya se
+construye una vez por nivel y se guarda en disco. La asignación resultante
+también se guarda (RegionalizationEngine) con la huella de su contenido,
+así que al arrancar la app solo se recalcula si cambiaron los datos.
+"""
+
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from .artifact_cache import ArtifactCache
+from .spatial_weights import SpatialWeights, huella_ids
+
+logger = logging.getLogger(__name__)
+
+METODOS_REGIONALIZACION = ("skater", "maxp")
+
+# Se suma a cada disimilitud: minimum_spanning_tree descarta aristas de peso 0
+_EPSILON = 1e-9
+
+
+@dataclass
+class ResultadoRegionalizacion:
+    """
+    Asignación de unidades a regiones.
+    - etiquetas: Región (0..p-1) de cada unidad, en el orden de los pesos.
+    - suma_cuadrados: Suma de cuadrados intra-región (atributos estandarizados).
+    - semilla: Semilla del reinicio ganador (solo max-p).
+    """
+    etiquetas: np.ndarray
+    metodo: str
+    suma_cuadrados: float
+    semilla: Optional[int] = None
+
+    @property
+    def n_regiones(self) -> int:
+        return int(len(np.unique(self.etiquetas)))
+
+
+def estandarizar(valores: np.ndarray) -> np.ndarray:
+    """Z-score por columna; los faltantes quedan en la media (0)."""
+    valores = np.asarray(valores, dtype="float64")
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    medias = np.nanmean(valores, axis=0)
+    desviaciones = np.nanstd(valores, axis=0)
+    desviaciones[~(desviaciones > 0)] = 1.0
+    z = (valores - medias) / desviaciones
+    return np.nan_to_num(z, nan=0.0)
+
+
+def grafo_contiguidad(pesos: SpatialWeights) -> sparse.csr_matrix:
+    """Grafo binario y simétrico de vecindad a partir de los pesos."""
+    patron = (pesos.matriz != 0).astype("float64")
+    return ((patron + patron.T) > 0).astype("float64").tocsr()
+
+
+def disimilitud_aristas(grafo: sparse.csr_matrix, atributos: np.ndarray) -> sparse.csr_matrix:
+    """Grafo con peso = distancia euclidiana entre atributos de los extremos."""
+    aristas = sparse.triu(grafo, k=1).tocoo()
+    distancias = np.linalg.norm(atributos[aristas.row] - atributos[aristas.col], axis=1)
+    return sparse.csr_matrix((distancias + _EPSILON, (aristas.row, aristas.col)), shape=grafo.shape)
+
+
+def suma_cuadrados(atributos: np.ndarray, etiquetas: np.ndarray) -> float:
+    """Suma de cuadrados intra-región: sum(x^2) - sum_k |S_k|^2 / n_k."""
+    _, codigos = np.unique(etiquetas, return_inverse=True)
+    conteos = np.bincount(codigos)
+    sumas = np.column_stack([np.bincount(codigos, weights=atributos[:, j]) for j in range(atributos.shape[1])])
+    return float((atributos ** 2).sum() - ((sumas ** 2).sum(axis=1) / conteos).sum())
+
+
+# -- SKATER -----------------------------------------------------------------
+
+def _bosque(arbol: sparse.csr_matrix) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Padre de cada nodo (-1 en las raíces) y nodos agrupados por
+    profundidad, del nivel más profundo al más somero. Un nodo virtual
+    unido a una raíz por componente permite un solo recorrido BFS.
+    """
+    n = arbol.shape[0]
+    _, componentes = csgraph.connected_components(arbol, directed=False)
+    raices = np.unique(componentes, return_index=True)[1]
+    virtual = sparse.csr_matrix((np.ones(len(raices)), (np.full(len(raices), n), raices)), shape=(n + 1, n + 1))
+    extendido = sparse.bmat([[arbol, None], [None, sparse.csr_matrix((1, 1))]]).tocsr() + virtual
+    orden, predecesores = csgraph.breadth_first_order(extendido, n, directed=False)
+
+    padre = predecesores[:n].astype("int64")
+    padre[padre == n] = -1
+    profundidad = np.zeros(n + 1, dtype="int64")
+    for nodo in orden[1:]:  # orden BFS: el padre ya tiene profundidad
+        profundidad[nodo] = profundidad[predecesores[nodo]] + 1
+    profundidad = profundidad[:n]
+
+    por_nivel = np.argsort(-profundidad, kind="stable")
+    cortes = np.flatnonzero(np.diff(profundidad[por_nivel])) + 1
+    return padre, np.split(por_nivel, cortes)
+
+
+def _acumular(valores: np.ndarray, padre: np.ndarray, niveles: List[np.ndarray]) -> np.ndarray:
+    """Suma de `valores` sobre el subárbol de cada nodo (de las hojas a la raíz)."""
+    acumulado = valores.copy()
+    for nodos in niveles:
+        hijos = nodos[padre[nodos] >= 0]
+        np.add.at(acumulado, padre[hijos], acumulado[hijos])
+    return acumulado
+
+
+def _raices(padre: np.ndarray, niveles: List[np.ndarray]) -> np.ndarray:
+    """Raíz (región) de cada nodo, propagada de la raíz a las hojas."""
+    raiz = np.arange(len(padre))
+    for nodos in reversed(niveles):
+        hijos = nodos[padre[nodos] >= 0]
+        raiz[hijos] = raiz[padre[hijos]]
+    return raiz
+
+
+def _ssd(estadisticas: np.ndarray) -> np.ndarray:
+    """Suma de cuadrados a partir de filas [n, piso, sum x^2, sum x...]."""
+    n = np.maximum(estadisticas[:, 0], 1.0)
+    return estadisticas[:, 2] - (estadisticas[:, 3:] ** 2).sum(axis=1) / n
+
+
+def skater(grafo: sparse.csr_matrix,
+           atributos: np.ndarray,
+           n_regiones: int,
+           piso: Optional[np.ndarray] = None,
+           umbral: float = 0.0,
+           tamanio_minimo: int = 1) -> ResultadoRegionalizacion:
+    """
+    :param grafo: Vecindad binaria simétrica (ver grafo_contiguidad).
+    :param atributos: (n, d) atributos estandarizados.
+    :param n_regiones: Regiones buscadas (las islas del grafo ya cuentan
+                       como regiones; puede quedar en menos si ningún corte
+                       respeta las restricciones).
+    :param piso: Variable que cada región debe sumar al menos `umbral`.
+    :param tamanio_minimo: Unidades mínimas por región.
+    """
+    n = len(atributos)
+    arbol = csgraph.minimum_spanning_tree(disimilitud_aristas(grafo, atributos))
+    padre, niveles = _bosque(arbol)
+    piso = np.ones(n) if piso is None else np.nan_to_num(np.asarray(piso, dtype="float64"))
+    estadisticas = np.column_stack([np.ones(n), piso, (atributos ** 2).sum(axis=1), atributos])
+
+    while (padre < 0).sum() < n_regiones:
+        raiz = _raices(padre, niveles)
+        acumulado = _acumular(estadisticas, padre, niveles)
+        candidatos = np.flatnonzero(padre >= 0)
+        subarbol = acumulado[candidatos]
+        total = acumulado[raiz[candidatos]]
+        resto = total - subarbol
+        factibles = (subarbol[:, 0] >= tamanio_minimo) & (resto[:, 0] >= tamanio_minimo) \
+            & (subarbol[:, 1] >= umbral) & (resto[:, 1] >= umbral)
+        if not factibles.any():
+            logger.warning(f"SKATER: sin cortes factibles con {(padre < 0).sum()} regiones.")
+            break
+        ganancia = np.where(factibles, _ssd(total) - _ssd(subarbol) - _ssd(resto), -np.inf)
+        padre[candidatos[np.argmax(ganancia)]] = -1
+
+    etiquetas = np.unique(_raices(padre, niveles), return_inverse=True)[1]
+    return ResultadoRegionalizacion(etiquetas, "skater", suma_cuadrados(atributos, etiquetas))
+
+
+# -- max-p ------------------------------------------------------------------
+
+def _crecer_regiones(indptr: np.ndarray,
+                     indices: np.ndarray,
+                     atributos: np.ndarray,
+                     piso: np.ndarray,
+                     umbral: float,
+                     semilla: int) -> np.ndarray:
+    """
+    Fase de construcción de max-p: desde semillas en orden aleatorio, cada
+    región agrega al vecino más parecido a su centroide hasta sumar
+    `umbral`. Las que no lo alcanzan se deshacen (enclaves) y al final cada
+    enclave se une a la región vecina más parecida.
+    """
+    rng = np.random.default_rng(semilla)
+    n = len(atributos)
+    etiquetas = np.full(n, -1, dtype="int64")
+
+    def vecinos(u: int) -> np.ndarray:
+        return indices[indptr[u]:indptr[u + 1]]
+
+    region = 0
+    for inicio in rng.permutation(n):
+        if etiquetas[inicio] != -1:
+            continue
+        miembros = [inicio]
+        etiquetas[inicio] = region
+        total, suma = piso[inicio], atributos[inicio].copy()
+        frontera = {v for v in vecinos(inicio) if etiquetas[v] == -1}
+        while total < umbral and frontera:
+            candidatos = np.fromiter(frontera, dtype="int64")
+            distancias = ((atributos[candidatos] - suma / len(miembros)) ** 2).sum(axis=1)
+            elegido = candidatos[np.argmin(distancias)]
+            frontera.discard(elegido)
+            miembros.append(elegido)
+            etiquetas[elegido] = region
+            total, suma = total + piso[elegido], suma + atributos[elegido]
+            frontera.update(v for v in vecinos(elegido) if etiquetas[v] == -1)
+        if total >= umbral:
+            region += 1
+        else:
+            etiquetas[miembros] = -2
+
+    # Enclaves: a la región vecina con el centroide más cercano, por rondas
+    enclaves = np.flatnonzero(etiquetas < 0)
+    while len(enclaves) and region > 0:
+        asignadas = etiquetas >= 0
+        conteos = np.bincount(etiquetas[asignadas], minlength=region)
+        centroides = np.column_stack([
+            np.bincount(etiquetas[asignadas], weights=atributos[asignadas, j], minlength=region)
+            for j in range(atributos.shape[1])
+        ]) / np.maximum(conteos, 1)[:, None]
+        for u in enclaves:
+            regiones = np.unique(etiquetas[vecinos(u)])
+            regiones = regiones[regiones >= 0]
+            if len(regiones):
+                etiquetas[u] = regiones[np.argmin(((centroides[regiones] - atributos[u]) ** 2).sum(axis=1))]
+        restantes = np.flatnonzero(etiquetas < 0)
+        if len(restantes) == len(enclaves):
+            break
+        enclaves = restantes
+
+    # Lo que no toca ninguna región (islas, o umbral inalcanzable): una región por componente
+    if len(enclaves):
+        grafo = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n, n))
+        _, componentes = csgraph.connected_components(grafo[enclaves][:, enclaves], directed=False)
+        etiquetas[enclaves] = region + componentes
+    return etiquetas
+
+
+def _reinicio_maxp(argumentos: Tuple) -> Tuple[np.ndarray, int, float, int]:
+    """Un reinicio de max-p (función de módulo para poder ejecutarse en otro proceso)."""
+    indptr, indices, atributos, piso, umbral, semilla = argumentos
+    etiquetas = _crecer_regiones(indptr, indices, atributos, piso, umbral, semilla)
+    return etiquetas, int(len(np.unique(etiquetas))), suma_cuadrados(atributos, etiquetas), semilla
+
+
+def maxp(grafo: sparse.csr_matrix,
+         atributos: np.ndarray,
+         piso: np.ndarray,
+         umbral: float,
+         reinicios: int = 8,
+         semilla: int = 0,
+         procesos: Optional[int] = None) -> ResultadoRegionalizacion:
+    """
+    :param grafo: Vecindad binaria simétrica (ver grafo_contiguidad).
+    :param piso: Variable que cada región debe sumar al menos `umbral`.
+    :param reinicios: Construcciones aleatorias independientes.
+    :param procesos: Procesos en paralelo (None = núcleos disponibles, 1 = sin paralelismo).
+    """
+    piso = np.nan_to_num(np.asarray(piso, dtype="float64"))
+    argumentos = [(grafo.indptr, grafo.indices, atributos, piso, umbral, semilla + k)
+                  for k in range(reinicios)]
+    if procesos == 1 or reinicios == 1:
+        resultados = [_reinicio_maxp(a) for a in argumentos]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_reinicio_maxp, argumentos))
+    etiquetas, p, ssd, ganadora = max(resultados, key=lambda r: (r[1], -r[2]))
+    logger.info(f"max-p: {p} regiones (mejor de {reinicios} reinicios, semilla {ganadora}).")
+    return ResultadoRegionalizacion(etiquetas, "maxp", ssd, ganadora)
+
+
+# -- capa de regiones ---------------------------------------------------------
+
+def regionalizar(gdf: GeoDataFrame,
+                 pesos: SpatialWeights,
+                 variables: Sequence[str],
+                 metodo: str = "skater",
+                 n_regiones: int = 20,
+                 columna_piso: Optional[str] = None,
+                 umbral: float = 0.0,
+                 columna_id: Optional[str] = None,
+                 reinicios: int = 8,
+                 procesos: Optional[int] = None) -> ResultadoRegionalizacion:
+    """
+    Regionaliza las unidades de `gdf` alineadas con los pesos por id.
+
+    :param variables: Indicadores sobre los que se mide la homogeneidad.
+    :param metodo: "skater" (n_regiones fijo) o "maxp" (umbral sobre columna_piso).
+    :raises ValueError: Si el método no es válido, faltan unidades o max-p no tiene piso.
+    """
+    if metodo not in METODOS_REGIONALIZACION:
+        raise ValueError(f"Método de regionalización '{metodo}' no soportado: {METODOS_REGIONALIZACION}")
+    if metodo == "maxp" and columna_piso is None:
+        raise ValueError("max-p necesita una columna de piso (p. ej. población).")
+
+    ids = np.asarray(gdf[columna_id] if columna_id else gdf.index).astype(str)
+    columnas = list(dict.fromkeys(list(variables) + ([columna_piso] if columna_piso else [])))
+    tabla = pd.DataFrame(gdf[columnas])
+    tabla = tabla.apply(pd.to_numeric, errors="coerce").set_axis(ids)
+    faltantes = ~np.isin(pesos.ids, ids)
+    if faltantes.any():
+        raise ValueError(f"Hay {int(faltantes.sum())} unidades de los pesos ausentes en la capa.")
+    tabla = tabla[~tabla.index.duplicated()].reindex(pesos.ids)
+
+    atributos = estandarizar(tabla[list(variables)].to_numpy())
+    piso = tabla[columna_piso].to_numpy() if columna_piso else None
+    grafo = grafo_contiguidad(pesos)
+    if metodo == "skater":
+        resultado = skater(grafo, atributos, n_regiones, piso, umbral)
+    else:
+        resultado = maxp(grafo, atributos, piso, umbral, reinicios, procesos=procesos)
+    logger.info(f"Regionalización '{metodo}': {pesos.n} unidades en {resultado.n_regiones} regiones.")
+    return resultado
+
+
+def huella_regionalizacion(gdf: GeoDataFrame,
+                           pesos: SpatialWeights,
+                           columnas: Sequence[str],
+                           columna_id: Optional[str],
+                           parametros: Sequence) -> str:
+    """Huella del grafo, los ids, los valores de `columnas` y los parámetros."""
+    ids = np.asarray(gdf[columna_id] if columna_id else gdf.index).astype(str)
+    valores = gdf[list(columnas)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+    matriz = pesos.matriz.copy()
+    matriz.sort_indices()  # scipy puede reordenar los índices de la matriz original
+    grafo = hashlib.sha1(matriz.indptr.tobytes() + matriz.indices.tobytes()).hexdigest()
+    contenido = hashlib.sha1(np.ascontiguousarray(valores).tobytes()).hexdigest()
+    return huella_ids([huella_ids(pesos.ids), grafo, huella_ids(ids), contenido, *parametros])
+
+
+class RegionalizationEngine:
+    """
+    SRP: regionalizar una sola vez por contenido. La asignación se guarda en
+    memoria y en disco; se recalcula solo si cambian las unidades, sus
+    valores, el grafo o los parámetros.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None) -> None:
+        """
+        :param cache: Almacén en disco (None = solo memoria).
+        """
+        self.cache: Optional[ArtifactCache] = cache
+        self._memoria: Dict[str, ResultadoRegionalizacion] = {}
+
+    def obtener(self,
+                gdf: GeoDataFrame,
+                pesos: SpatialWeights,
+                variables: Sequence[str],
+                metodo: str = "skater",
+                n_regiones: int = 20,
+                columna_piso: Optional[str] = None,
+                umbral: float = 0.0,
+                columna_id: Optional[str] = None,
+                reinicios: int = 8,
+                procesos: Optional[int] = None,
+                nombre: str = "regiones") -> ResultadoRegionalizacion:
+        """
+        Como `regionalizar`, pero devuelve la asignación guardada si la
+        huella coincide.
+
+        :param nombre: Nombre del artefacto en disco (uno por capa regionalizada).
+        """
+        columnas = list(dict.fromkeys(list(variables) + ([columna_piso] if columna_piso else [])))
+        huella = huella_regionalizacion(gdf, pesos, columnas, columna_id,
+                                        [metodo, n_regiones, columna_piso, umbral, reinicios, *variables])
+        resultado = self._memoria.get(huella)
+        if resultado is None:
+            resultado = self._cargar(nombre, huella)
+        if resultado is None:
+            resultado = regionalizar(gdf, pesos, variables,
+                                     metodo = metodo,
+                                     n_regiones = n_regiones,
+                                     columna_piso = columna_piso,
+                                     umbral = umbral,
+                                     columna_id = columna_id,
+                                     reinicios = reinicios,
+                                     procesos = procesos)
+            self._guardar(nombre, huella, resultado)
+        self._memoria[huella] = resultado
+        return resultado
+
+    def _cargar(self, nombre: str, huella: str) -> Optional[ResultadoRegionalizacion]:
+        if self.cache is None:
+            return None
+        arrays = self.cache.cargar_arrays(nombre)
+        if arrays is None or str(arrays["huella"]) != huella:
+            return None
+        semilla = int(arrays["semilla"])
+        logger.info(f"Regionalización '{nombre}' cargada desde caché.")
+        return ResultadoRegionalizacion(arrays["etiquetas"], str(arrays["metodo"]),
+                                        float(arrays["suma_cuadrados"]), semilla if semilla >= 0 else None)
+
+    def _guardar(self, nombre: str, huella: str, resultado: ResultadoRegionalizacion) -> None:
+        if self.cache is None:
+            return
+        self.cache.guardar_arrays(
+            nombre,
+            etiquetas=resultado.etiquetas,
+            metodo=np.array(resultado.metodo),
+            suma_cuadrados=np.array(resultado.suma_cuadrados),
+            semilla=np.array(-1 if resultado.semilla is None else resultado.semilla),
+            huella=np.array(huella),
+        )
+
+
+def capa_regiones(gdf: GeoDataFrame,
+                  pesos: SpatialWeights,
+                  resultado: ResultadoRegionalizacion,
+                  columna_region: str = "region",
+                  columna_id: Optional[str] = None,
+                  sumar: Sequence[str] = ()) -> GeoDataFrame:
+    """
+    Disuelve las unidades en una capa con un polígono por región, su número
+    de unidades y la suma de las columnas `sumar` (conteos).
+    """
+    ids = np.asarray(gdf[columna_id] if columna_id else gdf.index).astype(str)
+    region = pd.Series(resultado.etiquetas + 1, index=pesos.ids)
+    unidades = gdf[[gdf.geometry.name] + [c for c in sumar if c in gdf.columns]].copy()
+    unidades[columna_region] = region.reindex(ids).to_numpy()
+    unidades["n_unidades"] = 1
+    unidades = unidades[unidades[columna_region].notna()]
+    agregados = {c: "sum" for c in unidades.columns if c not in (gdf.geometry.name, columna_region)}
+    capa = unidades.dissolve(by=columna_region, aggfunc=agregados).reset_index()
+    capa[columna_region] = capa[columna_region].astype("int64")
+    return capa
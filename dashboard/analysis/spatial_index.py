@@ -0,0 +1,241 @@
+# analysis/spatial_index.py
+
+"""
+Índices espaciales R-tree persistentes por tabla. Se construyen al ingerir
+(o al primer uso, si no existen) y se guardan en disco junto a los demás
+artefactos; cada proceso (Flask o Dash) los abre al arrancar en lugar de
+construir un índice en memoria en su primer sjoin/clip.
+
+El índice solo resuelve cajas envolventes (CRS_METRICO); el predicado
+exacto se evalúa después con shapely sobre los pares candidatos.
+"""
+
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame
+from rtree import index as rtree_index
+
+from .artifact_cache import ArtifactCache
+from .dual_crs import COLUMNA_METRICA, COLUMNAS_GEOMETRICAS, es_dual, preparar_capa
+from .spatial_weights import geometrias_metricas, huella_geometrias, huella_ids
+
+logger = logging.getLogger(__name__)
+
+
+def huella_capa(geometrias: np.ndarray) -> str:
+    """Huella de una capa (geometrías en CRS_METRICO) para validar su índice."""
+    return huella_ids([len(geometrias), huella_geometrias(geometrias)])
+
+
+def _flujo(geometrias: np.ndarray):
+    """Entradas (id, caja, None) para la carga masiva del R-tree."""
+    cajas = shapely.bounds(geometrias)
+    validas = np.flatnonzero(np.isfinite(cajas).all(axis=1))
+    for posicion in validas:
+        yield int(posicion), tuple(cajas[posicion]), None
+
+
+@dataclass
+class IndiceEspacial:
+    """
+    R-tree en disco de una capa: el id de cada entrada es la posición de la
+    geometría en la capa (en el orden con el que se construyó).
+    """
+    arbol: rtree_index.Index
+    huella: str
+    n: int
+
+    def candidatos(self, geometrias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pares (i, j) cuyas cajas se intersecan: i en `geometrias` (CRS_METRICO),
+        j en la capa indexada. Una sola consulta vectorizada.
+        """
+        cajas = shapely.bounds(np.asarray(geometrias))
+        validas = np.flatnonzero(np.isfinite(cajas).all(axis=1))
+        if validas.size == 0 or self.n == 0:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="int64")
+        ids, conteos = self.arbol.intersection_v(
+            np.ascontiguousarray(cajas[validas, :2]), np.ascontiguousarray(cajas[validas, 2:])
+        )
+        return np.repeat(validas, np.asarray(conteos, dtype="int64")), np.asarray(ids, dtype="int64")
+
+    def consultar(self,
+                  geometrias: np.ndarray,
+                  indexadas: np.ndarray,
+                  predicado: Optional[str] = "intersects") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Equivalente a STRtree(indexadas).query(geometrias, predicate) con el
+        índice persistido.
+
+        :param geometrias: Geometrías de consulta en CRS_METRICO.
+        :param indexadas: Geometrías de la capa indexada, en el mismo CRS que
+                          `geometrias` (no necesariamente métrico).
+        :param predicado: Predicado binario de shapely (None = solo cajas).
+        """
+        i, j = self.candidatos(geometrias)
+        if predicado is None or i.size == 0:
+            return i, j
+        cumple = getattr(shapely, predicado)(np.asarray(geometrias)[i], np.asarray(indexadas)[j])
+        return i[cumple], j[cumple]
+
+
+def construir_indice(geometrias: np.ndarray, base: str) -> IndiceEspacial:
+    """
+    Construye el R-tree de `geometrias` (CRS_METRICO) en disco bajo `base`
+    (.dat/.idx). Se escribe a un nombre temporal y se mueve al final, así que
+    un proceso que ya tenía abierto el índice anterior no lo ve a medias.
+    """
+    directorio = os.path.dirname(base)
+    os.makedirs(directorio, exist_ok=True)
+    temporal = os.path.join(directorio, f".tmp_{uuid.uuid4().hex}")
+    propiedades = rtree_index.Property()
+    propiedades.overwrite = True
+    arbol = rtree_index.Index(temporal, _flujo(geometrias), properties=propiedades)
+    arbol.close()
+    for extension in ("dat", "idx"):
+        os.replace(f"{temporal}.{extension}", f"{base}.{extension}")
+    return abrir_indice(base, huella_capa(geometrias), len(geometrias))
+
+
+def abrir_indice(base: str, huella: str, n: int) -> IndiceEspacial:
+    """Abre un R-tree existente; las páginas se leen de disco bajo demanda."""
+    return IndiceEspacial(rtree_index.Index(base), huella, n)
+
+
+class SpatialIndexStore:
+    """
+    SRP: construir, persistir y reutilizar el índice espacial de cada tabla.
+    Un índice se reutiliza mientras la huella de su capa coincida; si la
+    capa cambió (o nunca se indexó), se reconstruye y se persiste.
+    Los procesos que comparten directorio de caché comparten índices.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None) -> None:
+        """
+        :param cache: Almacén en disco (donde viven los .dat/.idx y su huella).
+        """
+        self.cache: ArtifactCache = cache or ArtifactCache()
+        self._memoria: Dict[str, IndiceEspacial] = {}
+
+    def _base(self, tabla: str) -> str:
+        return os.path.join(self.cache.directorio, f"rtree_{tabla}")
+
+    def construir(self, tabla: str, gdf: GeoDataFrame) -> IndiceEspacial:
+        """
+        Construye (siempre) el índice de `tabla` y lo deja en disco.
+        Pensado para los scripts de ingesta.
+        """
+        geometrias = geometrias_metricas(gdf)
+        indice = construir_indice(geometrias, self._base(tabla))
+        self.cache.guardar_arrays(f"rtree_{tabla}_meta", huella=np.array(indice.huella), n=np.array(indice.n))
+        self._memoria[tabla] = indice
+        logger.info(f"Índice espacial de '{tabla}' construido: {indice.n} geometrías.")
+        return indice
+
+    def obtener(self, tabla: str, gdf: GeoDataFrame) -> IndiceEspacial:
+        """
+        Índice de `tabla` para las geometrías de `gdf`: el de memoria, el de
+        disco si su huella coincide o, si no, uno nuevo.
+        """
+        huella = huella_capa(geometrias_metricas(gdf))
+        indice = self._memoria.get(tabla)
+        if indice is not None and indice.huella == huella:
+            return indice
+
+        meta = self.cache.cargar_arrays(f"rtree_{tabla}_meta")
+        base = self._base(tabla)
+        if meta is not None and str(meta["huella"]) == huella and os.path.exists(f"{base}.dat"):
+            try:
+                indice = abrir_indice(base, huella, int(meta["n"]))
+                logger.info(f"Índice espacial de '{tabla}' abierto desde disco.")
+            except Exception as ex:
+                logger.warning(f"Índice espacial de '{tabla}' ilegible, se reconstruirá: {ex}")
+                indice = None
+        else:
+            indice = None
+        if indice is None:
+            indice = self.construir(tabla, gdf)
+        self._memoria[tabla] = indice
+        return indice
+
+    def precargar(self, capas: Dict[str, GeoDataFrame]) -> None:
+        """Abre (o construye) el índice de cada capa no vacía, p. ej. al arrancar."""
+        for tabla, gdf in capas.items():
+            if gdf is None or gdf.empty or "geometry" not in gdf:
+                continue
+            try:
+                self.obtener(tabla, gdf)
+            except Exception as ex:
+                logger.warning(f"No se pudo preparar el índice espacial de '{tabla}': {ex}")
+
+
+def unir_espacial(izquierda: GeoDataFrame,
+                  derecha: GeoDataFrame,
+                  indice_derecha: IndiceEspacial,
+                  how: str = "inner",
+                  predicate: str = "intersects",
+                  lsuffix: str = "left",
+                  rsuffix: str = "right") -> GeoDataFrame:
+    """
+    gpd.sjoin(izquierda, derecha) usando el índice persistido de `derecha`
+    (construido sobre `derecha` en este mismo orden). Misma forma de salida:
+    geometría e índice de la izquierda, columna index_<rsuffix> y sufijos en
+    columnas repetidas. Como sjoin descarta la geometría de la derecha,
+    también se descartan su geometría métrica y sus atributos geométricos.
+
+    :param how: "inner" o "left".
+    """
+    geom_izq = geometrias_metricas(izquierda)
+    i, j = indice_derecha.consultar(geom_izq, geometrias_metricas(derecha), predicate)
+    if how == "left":
+        sin_pareja = np.setdiff1d(np.arange(len(izquierda)), i)
+        i = np.concatenate([i, sin_pareja])
+        j = np.concatenate([j, np.full(len(sin_pareja), -1)])
+    orden = np.lexsort((j, i))
+    i, j = i[orden], j[orden]
+
+    omitidas = {derecha.geometry.name, COLUMNA_METRICA, *COLUMNAS_GEOMETRICAS}
+    columnas_der = [c for c in derecha.columns if c not in omitidas]
+    repetidas = set(columnas_der) & set(izquierda.columns)
+    resultado = izquierda.iloc[i].rename(columns={c: f"{c}_{lsuffix}" for c in repetidas})
+    tiene = pd.Series(j >= 0)
+    posiciones = np.where(tiene, j, 0)
+    resultado[f"index_{rsuffix}"] = pd.Series(np.asarray(derecha.index)[posiciones]).where(tiene).to_numpy()
+    for columna in columnas_der:
+        nombre = f"{columna}_{rsuffix}" if columna in repetidas else columna
+        resultado[nombre] = derecha[columna].iloc[posiciones].reset_index(drop=True).where(tiene).to_numpy()
+    return resultado
+
+
+def recortar(gdf: GeoDataFrame, mascara: GeoDataFrame, indice: IndiceEspacial) -> GeoDataFrame:
+    """
+    gpd.clip(gdf, mascara) usando el índice persistido de `gdf`: las
+    geometrías dentro de la máscara se conservan tal cual y solo las que
+    cruzan el borde se intersecan.
+    """
+    geometrias_mascara = mascara.geometry
+    if mascara.crs is not None and gdf.crs is not None and not mascara.crs.equals(gdf.crs):
+        geometrias_mascara = geometrias_mascara.to_crs(gdf.crs)
+    union = shapely.union_all(np.asarray(geometrias_mascara.values))
+    union_metrica = shapely.union_all(geometrias_metricas(mascara))
+    _, j = indice.candidatos(np.array([union_metrica]))
+    j = np.sort(j)
+    geometrias = np.asarray(gdf.geometry.values)[j]
+    shapely.prepare(union)
+    dentro = shapely.within(geometrias, union)
+    recortadas = geometrias.copy()
+    recortadas[~dentro] = shapely.intersection(geometrias[~dentro], union)
+    conservar = ~shapely.is_empty(recortadas)
+    resultado = gdf.iloc[j[conservar]].copy()
+    resultado[gdf.geometry.name] = recortadas[conservar]
+    if es_dual(resultado):
+        # Solo las geometrías que cruzaron el borde cambian su versión métrica
+        resultado = preparar_capa(resultado, filas=~dentro[conservar])
+    return resultado
@@ -0,0 +1,249 @@
+# analysis/spatial_weights.py
+
+"""
+Construcción y caché de matrices de pesos espaciales (contigüidad queen/rook
+o k vecinos más cercanos) como matrices dispersas estandarizadas por fila.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from geopandas import GeoDataFrame
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from .artifact_cache import ArtifactCache
+from .dual_crs import COLUMNA_METRICA, CRS_METRICO, reproyectar
+
+logger = logging.getLogger(__name__)
+
+METODOS_PESOS = ("queen", "rook", "knn")
+
+
+@dataclass
+class SpatialWeights:
+    """
+    Pesos espaciales W (n x n) estandarizados por fila.
+    - ids: Identificador de la unidad de cada fila/columna.
+    - cardinalidad: Número de vecinos por unidad (0 = isla).
+    """
+    matriz: sparse.csr_matrix
+    ids: np.ndarray
+    metodo: str
+
+    @property
+    def n(self) -> int:
+        return self.matriz.shape[0]
+
+    @property
+    def cardinalidad(self) -> np.ndarray:
+        return np.diff(self.matriz.indptr)
+
+    @property
+    def s0(self) -> float:
+        return float(self.matriz.sum())
+
+    def rezago(self, valores: np.ndarray) -> np.ndarray:
+        """Rezago espacial W·x (un producto matriz dispersa-vector)."""
+        return self.matriz @ valores
+
+    def subconjunto(self, mascara: np.ndarray) -> "SpatialWeights":
+        """
+        Pesos restringidos a las unidades de `mascara` (p. ej. las que
+        tienen valor de la métrica), estandarizados por fila de nuevo. Los
+        pesos completos (y su caché) no cambian.
+        """
+        mascara = np.asarray(mascara, dtype=bool)
+        if mascara.all():
+            return self
+        matriz = self.matriz[mascara][:, mascara].tocoo()
+        return SpatialWeights(matriz=_estandarizar_filas(matriz.row, matriz.col, int(mascara.sum())).tocsr(),
+                              ids=self.ids[mascara], metodo=self.metodo)
+
+
+def huella_ids(ids: Sequence) -> str:
+    """Huella estable de la lista ordenada de ids, para validar la caché."""
+    return hashlib.sha1("\x1f".join(map(str, ids)).encode("utf-8")).hexdigest()
+
+
+def huella_geometrias(geometrias: np.ndarray) -> str:
+    """Huella barata de una capa: áreas y extensiones redondeadas."""
+    resumen = np.column_stack([shapely.area(geometrias), shapely.bounds(geometrias)])
+    return hashlib.sha1(np.round(resumen, 2).tobytes()).hexdigest()
+
+
+def geometrias_metricas(gdf: GeoDataFrame) -> np.ndarray:
+    """
+    Geometrías como arreglo de shapely en CRS_METRICO: la columna
+    precalculada de una capa dual (ver dual_crs) o, si no la tiene, las
+    geometrías reproyectadas si son geográficas.
+    """
+    if COLUMNA_METRICA in gdf.columns:
+        return np.asarray(gdf[COLUMNA_METRICA].values)
+    geometrias = np.asarray(gdf.geometry.values)
+    if gdf.crs is not None and gdf.crs.is_geographic:
+        geometrias = reproyectar(geometrias, gdf.crs, CRS_METRICO)
+    return geometrias
+
+
+def _ids_unidades(gdf: GeoDataFrame, columna_id: Optional[str]) -> np.ndarray:
+    valores = gdf[columna_id] if columna_id else gdf.index
+    return np.asarray(valores).astype(str)
+
+
+def _estandarizar_filas(filas: np.ndarray, columnas: np.ndarray, n: int) -> sparse.csr_matrix:
+    binaria = sparse.csr_matrix(
+        (np.ones(len(filas), dtype="float64"), (filas, columnas)), shape=(n, n)
+    )
+    binaria.sum_duplicates()
+    binaria.data[:] = 1.0
+    grados = np.asarray(binaria.sum(axis=1)).ravel()
+    inversa = np.divide(1.0, grados, out=np.zeros_like(grados), where=grados > 0)
+    return sparse.diags(inversa) @ binaria
+
+
+def pares_contiguos(geometrias: np.ndarray, metodo: str = "queen",
+                    tolerancia: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pares (i, j), i != j, de polígonos contiguos usando un STRtree.
+
+    :param geometrias: Polígonos en un CRS métrico si tolerancia > 0.
+    :param metodo: "queen" (comparten al menos un punto) o
+                   "rook" (comparten un segmento de frontera).
+    :param tolerancia: Distancia (unidades del CRS) bajo la cual dos
+                       polígonos se consideran vecinos (solo queen). Útil
+                       en manzanas, que suelen estar separadas por calles.
+    """
+    consulta = shapely.buffer(geometrias, tolerancia) if tolerancia > 0 else geometrias
+    arbol = shapely.STRtree(geometrias)
+    i, j = arbol.query(consulta, predicate="intersects")
+    distintos = i != j
+    i, j = i[distintos], j[distintos]
+
+    if metodo == "rook":
+        interseccion = shapely.intersection(geometrias[i], geometrias[j])
+        frontera = shapely.get_dimensions(interseccion) >= 1
+        i, j = i[frontera], j[frontera]
+    return i, j
+
+
+def pares_knn(geometrias: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pares (i, j) con j entre los k centroides más cercanos a i (KD-tree)."""
+    centroides = shapely.get_coordinates(shapely.centroid(geometrias))
+    k = min(k, len(centroides) - 1)
+    if k < 1:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    _, vecinos = cKDTree(centroides).query(centroides, k=k + 1)
+    filas = np.repeat(np.arange(len(centroides)), k + 1)
+    columnas = vecinos.ravel()
+    distintos = filas != columnas
+    return filas[distintos], columnas[distintos]
+
+
+class SpatialWeightsBuilder:
+    """
+    SRP: construir pesos espaciales una vez por nivel de granularidad y
+    reutilizarlos (memoria + disco). Si la lista de unidades cambia, la
+    huella no coincide y los pesos se reconstruyen.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None) -> None:
+        """
+        :param cache: Almacén en disco (None = solo memoria).
+        """
+        self.cache: Optional[ArtifactCache] = cache
+        self._memoria: Dict[str, SpatialWeights] = {}
+
+    def obtener(self,
+                gdf: GeoDataFrame,
+                nivel: str,
+                metodo: str = "queen",
+                k: int = 8,
+                tolerancia: float = 0.0,
+                columna_id: Optional[str] = None) -> SpatialWeights:
+        """
+        Devuelve los pesos del nivel `nivel` (p. ej. "manzana", "ageb"),
+        construyéndolos solo si no existen o si cambiaron las unidades.
+
+        :param gdf: Polígonos del nivel, una fila por unidad.
+        :param metodo: "queen", "rook" o "knn".
+        :param k: Vecinos para "knn".
+        :param tolerancia: Metros de tolerancia para "queen".
+        :param columna_id: Columna con el id de la unidad (None = índice).
+        :raises ValueError: Si el método no es válido.
+        """
+        if metodo not in METODOS_PESOS:
+            raise ValueError(f"Método de pesos '{metodo}' no soportado: {METODOS_PESOS}")
+
+        ids = _ids_unidades(gdf, columna_id)
+        huella = huella_ids(ids)
+        sufijo = f"{k}" if metodo == "knn" else (f"_{tolerancia:g}m" if tolerancia > 0 else "")
+        nombre = f"pesos_{nivel}_{metodo}{sufijo}"
+
+        pesos = self._memoria.get(nombre)
+        if pesos is not None and huella_ids(pesos.ids) == huella:
+            return pesos
+
+        pesos = self._cargar(nombre, huella, metodo)
+        if pesos is None:
+            pesos = self.construir(gdf, metodo, k, tolerancia, ids)
+            self._guardar(nombre, huella, pesos)
+
+        self._memoria[nombre] = pesos
+        return pesos
+
+    @staticmethod
+    def construir(gdf: GeoDataFrame,
+                  metodo: str,
+                  k: int = 8,
+                  tolerancia: float = 0.0,
+                  ids: Optional[np.ndarray] = None) -> SpatialWeights:
+        """Construye los pesos sin caché."""
+        if metodo == "knn" or tolerancia > 0:
+            geometrias = geometrias_metricas(gdf)
+        else:
+            geometrias = np.asarray(gdf.geometry.values)
+
+        if metodo == "knn":
+            filas, columnas = pares_knn(geometrias, k)
+        else:
+            filas, columnas = pares_contiguos(geometrias, metodo, tolerancia)
+
+        n = len(geometrias)
+        matriz = _estandarizar_filas(filas, columnas, n)
+        ids = ids if ids is not None else np.arange(n).astype(str)
+        pesos = SpatialWeights(matriz=matriz.tocsr(), ids=ids, metodo=metodo)
+        islas = int((pesos.cardinalidad == 0).sum())
+        logger.info(f"Pesos '{metodo}' construidos: {n} unidades, "
+                    f"{pesos.matriz.nnz} enlaces, {islas} islas.")
+        return pesos
+
+    def _cargar(self, nombre: str, huella: str, metodo: str) -> Optional[SpatialWeights]:
+        if self.cache is None:
+            return None
+        arrays = self.cache.cargar_arrays(nombre)
+        if arrays is None or str(arrays["huella"]) != huella:
+            return None
+        matriz = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=tuple(arrays["shape"])
+        )
+        logger.info(f"Pesos '{nombre}' cargados desde caché.")
+        return SpatialWeights(matriz=matriz, ids=arrays["ids"], metodo=metodo)
+
+    def _guardar(self, nombre: str, huella: str, pesos: SpatialWeights) -> None:
+        if self.cache is None:
+            return
+        self.cache.guardar_arrays(
+            nombre,
+            data=pesos.matriz.data,
+            indices=pesos.matriz.indices,
+            indptr=pesos.matriz.indptr,
+            shape=np.array(pesos.matriz.shape),
+            ids=pesos.ids,
+            huella=np.array(huella),
+        )
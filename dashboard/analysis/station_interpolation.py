@@ -0,0 +1,166 @@
+# analysis/station_interpolation.py
+
+"""
+Interpolación de lecturas de estaciones (calidad del aire) a polígonos
+(manzanas, colonias) por IDW o vecino más cercano. Los k vecinos de cada
+centroide y sus pesos se calculan una sola vez con un KD-tree; interpolar
+una ventana de tiempo es un promedio ponderado sobre una matriz (n, k).
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame
+from scipy.spatial import cKDTree
+
+from .accessibility import coordenadas_metricas
+from .artifact_cache import ArtifactCache
+from .spatial_weights import geometrias_metricas, huella_geometrias, huella_ids
+
+logger = logging.getLogger(__name__)
+
+METODOS_INTERPOLACION = ("idw", "cercano")
+
+
+@dataclass
+class PesosVecinos:
+    """
+    Vecinos y pesos de cada destino:
+    - indices: (n_destinos, k) posición de la estación en ids_estaciones.
+    - pesos: (n_destinos, k) peso de cada vecino (suman 1 por fila).
+    """
+    indices: np.ndarray
+    pesos: np.ndarray
+    ids_estaciones: np.ndarray
+    ids_destino: np.ndarray
+
+    def interpolar(self, valores: pd.Series) -> np.ndarray:
+        """
+        Promedio ponderado de los valores de las estaciones vecinas. Las
+        estaciones sin dato en la ventana no cuentan y los pesos del resto se
+        renormalizan, así que los pesos no se recalculan aunque falten
+        estaciones.
+
+        :param valores: Valor por estación (índice = id de estación).
+        :return: Valor por destino (NaN si ningún vecino tiene dato).
+        """
+        por_estacion = pd.to_numeric(valores, errors="coerce")\
+            .reindex(self.ids_estaciones).to_numpy(dtype="float64")
+        vecinos = por_estacion[self.indices]
+        validos = np.isfinite(vecinos)
+        pesos = np.where(validos, self.pesos, 0.0)
+        suma = pesos.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(suma > 0, (pesos * np.where(validos, vecinos, 0.0)).sum(axis=1) / suma, np.nan)
+
+
+def calcular_pesos(arbol: cKDTree,
+                   destinos: np.ndarray,
+                   k: int = 4,
+                   potencia: float = 2.0,
+                   metodo: str = "idw") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vecinos y pesos normalizados de cada punto de `destinos`.
+    - idw: 1 / d^potencia entre los k vecinos (peso total si d = 0).
+    - cercano: la estación más cercana con peso 1.
+
+    :raises ValueError: Si el método no existe.
+    """
+    if metodo not in METODOS_INTERPOLACION:
+        raise ValueError(f"Método '{metodo}' no soportado: {METODOS_INTERPOLACION}")
+    k = 1 if metodo == "cercano" else min(k, arbol.n)
+    distancias, indices = arbol.query(destinos, k=k)
+    distancias = distancias.reshape(len(destinos), k)
+    indices = indices.reshape(len(destinos), k)
+    if metodo == "cercano":
+        return indices, np.ones_like(distancias)
+
+    coincide = distancias <= 1e-9
+    with np.errstate(divide="ignore"):
+        pesos = np.where(coincide, 0.0, 1.0 / distancias ** potencia)
+    en_estacion = coincide.any(axis=1)
+    pesos[en_estacion] = coincide[en_estacion].astype("float64")
+    return indices, pesos / pesos.sum(axis=1, keepdims=True)
+
+
+class StationInterpolator:
+    """
+    SRP: construir y reutilizar los pesos estación -> destino. El KD-tree
+    se construye una vez por conjunto de estaciones y los pesos por
+    (estaciones, capa destino, método); ambos se invalidan por huella.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None) -> None:
+        """
+        :param cache: Almacén en disco (None = solo memoria).
+        """
+        self.cache: Optional[ArtifactCache] = cache
+        self._arboles: Dict[str, cKDTree] = {}
+        self._memoria: Dict[str, PesosVecinos] = {}
+
+    def pesos(self,
+              estaciones: GeoDataFrame,
+              destinos: GeoDataFrame,
+              nivel: str,
+              columna_id_estacion: str = "estacion",
+              columna_id_destino: Optional[str] = None,
+              k: int = 4,
+              potencia: float = 2.0,
+              metodo: str = "idw") -> PesosVecinos:
+        """
+        Pesos de interpolación de `estaciones` a los centroides de `destinos`.
+
+        :param nivel: Nombre de la capa destino (p. ej. "manzana").
+        """
+        coord_estaciones = coordenadas_metricas(estaciones)
+        ids_estaciones = np.asarray(estaciones[columna_id_estacion]).astype(str)
+        ids_destino = np.asarray(destinos[columna_id_destino] if columna_id_destino
+                                 else destinos.index).astype(str)
+        huella_estaciones = huella_ids([huella_ids(ids_estaciones),
+                                        huella_ids(np.round(coord_estaciones, 2).ravel())])
+        huella = huella_ids([huella_estaciones, huella_ids(ids_destino),
+                             huella_geometrias(geometrias_metricas(destinos)), metodo, k, potencia])
+
+        if huella in self._memoria:
+            return self._memoria[huella]
+
+        nombre = f"vecinos_estaciones_{nivel}_{metodo}"
+        resultado = self._cargar(nombre, huella)
+        if resultado is None:
+            arbol = self._arboles.get(huella_estaciones)
+            if arbol is None:
+                arbol = cKDTree(coord_estaciones)
+                self._arboles[huella_estaciones] = arbol
+            indices, pesos = calcular_pesos(arbol, coordenadas_metricas(destinos), k, potencia, metodo)
+            resultado = PesosVecinos(indices, pesos, ids_estaciones, ids_destino)
+            logger.info(f"Pesos {metodo} de {len(ids_estaciones)} estaciones a "
+                        f"{len(ids_destino)} unidades de '{nivel}' (k={indices.shape[1]}).")
+            self._guardar(nombre, huella, resultado)
+
+        self._memoria[huella] = resultado
+        return resultado
+
+    def _cargar(self, nombre: str, huella: str) -> Optional[PesosVecinos]:
+        if self.cache is None:
+            return None
+        arrays = self.cache.cargar_arrays(nombre)
+        if arrays is None or str(arrays["huella"]) != huella:
+            return None
+        logger.info(f"Pesos '{nombre}' cargados desde caché.")
+        return PesosVecinos(arrays["indices"], arrays["pesos"],
+                            arrays["ids_estaciones"], arrays["ids_destino"])
+
+    def _guardar(self, nombre: str, huella: str, resultado: PesosVecinos) -> None:
+        if self.cache is None:
+            return
+        self.cache.guardar_arrays(
+            nombre,
+            indices=resultado.indices,
+            pesos=resultado.pesos,
+            ids_estaciones=resultado.ids_estaciones,
+            ids_destino=resultado.ids_destino,
+            huella=np.array(huella),
+        )
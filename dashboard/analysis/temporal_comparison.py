@@ -0,0 +1,125 @@
+# analysis/temporal_comparison.py
+
+"""
+Comparación entre años de una métrica por unidad espacial.
+
+Las capas de cada año se alinean por unidad (columna id o, si no la hay,
+la geometría idéntica, como en data_access/unit_store.py) en una matriz
+unidades x años. Con ella, las diferencias y tasas de crecimiento entre
+dos años son operaciones sobre columnas, sin merges por año, y la
+animación puede enviar la geometría una sola vez y un vector de valores
+por año.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la capa de comparación (ver comparar)
+COLUMNAS_COMPARACION = ("valor_base", "valor_final", "delta", "crecimiento_pct", "crecimiento_anual_pct")
+
+
+@dataclass(frozen=True)
+class SerieAnual:
+    """
+    Valores de una métrica por unidad y año.
+
+    - unidades: Una fila por unidad (geometría e id); la posición es la
+      fila de `valores`.
+    - anios: Años ordenados; la posición es la columna de `valores`.
+    - valores: Matriz (unidades x años), NaN donde la unidad no tiene dato.
+    """
+    metrica: str
+    unidades: GeoDataFrame
+    anios: np.ndarray
+    valores: np.ndarray
+
+    def columna(self, anio: int) -> np.ndarray:
+        """Valores de todas las unidades en `anio`."""
+        posicion = np.searchsorted(self.anios, anio)
+        if posicion >= len(self.anios) or self.anios[posicion] != anio:
+            raise ValueError(f"El año {anio} no está en la serie: {self.anios.tolist()}")
+        return self.valores[:, posicion]
+
+
+def claves_unidad(capa: GeoDataFrame, columna_id: Optional[str] = None) -> np.ndarray:
+    """Clave de unidad de cada fila: el id, o el WKB de la geometría."""
+    if columna_id and columna_id in capa.columns:
+        return capa[columna_id].astype(str).to_numpy()
+    return shapely.to_wkb(np.asarray(capa.geometry.values))
+
+
+def serie_anual(capas: Dict[int, GeoDataFrame],
+                metrica: str,
+                columna_id: Optional[str] = None) -> SerieAnual:
+    """
+    Alinea las capas por unidad en una matriz unidades x años.
+
+    :param capas: {año: capa del año con `metrica`}.
+    :param columna_id: Id de unidad común a los años (None = geometría).
+    :return: SerieAnual; si una unidad aparece dos veces en un año, queda
+             el último valor.
+    """
+    anios = np.array(sorted(capas))
+    capas = [capas[anio] for anio in anios]
+    if not capas or all(capa.empty for capa in capas):
+        return SerieAnual(metrica, GeoDataFrame(), anios, np.empty((0, len(anios))))
+
+    if columna_id and not all(columna_id in capa.columns for capa in capas):
+        columna_id = None
+    claves = np.concatenate([claves_unidad(capa, columna_id) for capa in capas])
+    codigos, unicas = pd.factorize(pd.Series(claves), sort=False)
+    columnas = np.repeat(np.arange(len(anios)), [len(capa) for capa in capas])
+    valores = np.full((len(unicas), len(anios)), np.nan)
+    valores[codigos, columnas] = np.concatenate([
+        pd.to_numeric(capa[metrica], errors="coerce").to_numpy(dtype="float64")
+        if metrica in capa.columns else np.full(len(capa), np.nan)
+        for capa in capas
+    ])
+
+    # Geometría (y id) de la primera aparición de cada unidad
+    conservar = [columna_id] if columna_id else []
+    todas = pd.concat([capa[conservar + [capa.geometry.name]] for capa in capas], ignore_index=True)
+    primeras = np.unique(codigos, return_index=True)[1]
+    unidades = GeoDataFrame(todas.iloc[primeras].reset_index(drop=True),
+                            geometry=capas[0].geometry.name, crs=capas[0].crs)
+    logger.info(f"Serie de '{metrica}': {len(unidades)} unidades x {len(anios)} años.")
+    return SerieAnual(metrica, unidades, anios, valores)
+
+
+def deltas(valores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cambio absoluto y crecimiento (%) entre años consecutivos, columna a
+    columna: (unidades x años-1). El crecimiento es NaN si el año previo
+    vale 0 o falta.
+    """
+    previos = valores[:, :-1]
+    delta = valores[:, 1:] - previos
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crecimiento = np.where(previos != 0, delta / np.abs(previos) * 100.0, np.nan)
+    return delta, crecimiento
+
+
+def comparar(serie: SerieAnual, anio_base: int, anio_final: int) -> GeoDataFrame:
+    """
+    Capa de unidades con la métrica en `anio_base` y `anio_final`, su
+    diferencia, el crecimiento total (%) y el crecimiento anual compuesto
+    (%, solo con ambos valores positivos).
+
+    :raises ValueError: Si alguno de los años no está en la serie.
+    """
+    base, final = serie.columna(anio_base), serie.columna(anio_final)
+    delta, crecimiento = deltas(np.column_stack([base, final]))
+    periodo = abs(anio_final - anio_base)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anual = np.where((base > 0) & (final > 0) & (periodo > 0),
+                         (np.power(final / base, 1.0 / max(periodo, 1)) - 1.0) * 100.0, np.nan)
+    return serie.unidades.assign(**dict(zip(COLUMNAS_COMPARACION,
+                                            (base, final, delta[:, 0], crecimiento[:, 0], anual))))
@@ -0,0 +1,253 @@
+# analysis/zonal_stats.py
+
+"""
+Estadísticas zonales de rásters ambientales (calidad del aire, vegetación,
+temperatura) sobre capas de polígonos. La capa se rasteriza una sola vez a
+una rejilla de etiquetas por especificación de rejilla; después cada ráster
+se lee por ventanas y se reduce por zona con bincount.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import rasterio
+from affine import Affine
+from geopandas import GeoDataFrame
+from rasterio import features
+from rasterio.windows import Window
+
+from .artifact_cache import ArtifactCache
+from .dual_crs import COLUMNA_METRICA, CRS_METRICO, reproyectar
+from .spatial_weights import huella_geometrias, huella_ids
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES_DEFAULT = (10, 50, 90)
+
+
+@dataclass(frozen=True)
+class EspecificacionRejilla:
+    """
+    Rejilla de un ráster: CRS, transformación afín (6 coeficientes) y tamaño.
+    Dos rásters con la misma especificación comparten rejilla de etiquetas.
+    """
+    crs: str
+    transform: Tuple[float, ...]
+    ancho: int
+    alto: int
+
+    @classmethod
+    def desde_raster(cls, src: "rasterio.DatasetReader") -> "EspecificacionRejilla":
+        return cls(src.crs.to_string(), tuple(src.transform)[:6], src.width, src.height)
+
+    def huella(self) -> str:
+        return hashlib.sha1(repr(self).encode("utf-8")).hexdigest()[:16]
+
+
+def rasterizar_zonas(geometrias: Sequence, espec: EspecificacionRejilla,
+                     todos_tocados: bool = False) -> np.ndarray:
+    """
+    Rejilla (alto x ancho) con la etiqueta 1..n de la zona que cubre cada
+    píxel (0 = fuera de toda zona). Si dos zonas se traslapan, gana la última.
+
+    :param geometrias: Polígonos en el CRS del ráster.
+    :param todos_tocados: Incluir cualquier píxel que toque la zona (útil
+                          para zonas más chicas que un píxel).
+    """
+    formas = ((geometria, etiqueta) for etiqueta, geometria in enumerate(geometrias, start=1)
+              if geometria is not None and not geometria.is_empty)
+    return features.rasterize(
+        formas, out_shape=(espec.alto, espec.ancho), transform=Affine(*espec.transform),
+        fill=0, dtype="int32", all_touched=todos_tocados
+    )
+
+
+class AcumuladorZonal:
+    """
+    Reduce bloques (etiquetas, valores) a estadísticas por zona sin recorrer
+    zonas: conteo y suma con bincount, mínimo y máximo con ufunc.at y
+    percentiles con un único ordenamiento por (zona, valor) al final.
+    """
+
+    def __init__(self, n_zonas: int, percentiles: Sequence[float] = PERCENTILES_DEFAULT) -> None:
+        self.n_zonas = n_zonas
+        self.percentiles = tuple(percentiles)
+        self.conteo = np.zeros(n_zonas + 1, dtype="int64")
+        self.suma = np.zeros(n_zonas + 1)
+        self.minimo = np.full(n_zonas + 1, np.inf)
+        self.maximo = np.full(n_zonas + 1, -np.inf)
+        self._etiquetas: List[np.ndarray] = []
+        self._valores: List[np.ndarray] = []
+
+    def agregar(self, etiquetas: np.ndarray, valores: np.ndarray,
+                validos: Optional[np.ndarray] = None) -> None:
+        """Acumula un bloque; `validos` marca los píxeles con dato."""
+        mascara = etiquetas > 0
+        if validos is not None:
+            mascara &= validos
+        zonas = etiquetas[mascara]
+        datos = valores[mascara].astype("float64")
+        if zonas.size == 0:
+            return
+        self.conteo += np.bincount(zonas, minlength=self.n_zonas + 1)
+        self.suma += np.bincount(zonas, weights=datos, minlength=self.n_zonas + 1)
+        np.minimum.at(self.minimo, zonas, datos)
+        np.maximum.at(self.maximo, zonas, datos)
+        if self.percentiles:
+            self._etiquetas.append(zonas.astype("int32"))
+            self._valores.append(datos.astype("float32"))
+
+    def resultado(self) -> pd.DataFrame:
+        """
+        Una fila por zona (en orden 1..n) con pixeles, media, minimo, maximo
+        y pNN; NaN en zonas sin píxeles válidos.
+        """
+        conteo = self.conteo[1:]
+        vacias = conteo == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            tabla = pd.DataFrame({
+                "pixeles": conteo,
+                "media": np.where(vacias, np.nan, self.suma[1:] / conteo),
+                "minimo": np.where(vacias, np.nan, self.minimo[1:]),
+                "maximo": np.where(vacias, np.nan, self.maximo[1:]),
+            })
+        if self.percentiles:
+            for percentil, valores in self._percentiles(conteo).items():
+                tabla[f"p{percentil:g}"] = valores
+        return tabla
+
+    def _percentiles(self, conteo: np.ndarray) -> Dict[float, np.ndarray]:
+        zonas = np.concatenate(self._etiquetas) if self._etiquetas else np.empty(0, dtype="int32")
+        valores = np.concatenate(self._valores).astype("float64") if self._valores else np.empty(0)
+        ordenados = valores
+        if valores.size:
+            # Un solo sort sobre la clave zona·ancho + (valor - mínimo): agrupa por
+            # zona y ordena dentro de cada zona (más rápido que lexsort/argsort)
+            minimo = valores.min()
+            ancho = valores.max() - minimo + 1.0
+            claves = zonas * ancho + (valores - minimo)
+            claves.sort()
+            ordenados = claves - np.repeat(np.arange(1, self.n_zonas + 1), conteo) * ancho + minimo
+        inicios = np.concatenate([[0], np.cumsum(conteo)[:-1]])
+        salida = {}
+        for percentil in self.percentiles:
+            # Interpolación lineal entre rangos, como np.percentile
+            posicion = inicios + percentil / 100.0 * np.maximum(conteo - 1, 0)
+            bajo = np.floor(posicion).astype("int64")
+            alto = np.ceil(posicion).astype("int64")
+            fraccion = posicion - bajo
+            resultado = np.full(len(conteo), np.nan)
+            hay = conteo > 0
+            resultado[hay] = ordenados[bajo[hay]] * (1 - fraccion[hay]) + ordenados[alto[hay]] * fraccion[hay]
+            salida[percentil] = resultado
+        return salida
+
+
+def _extension(etiquetas: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """(fila0, fila1, col0, col1) del rectángulo que contiene todas las zonas."""
+    filas = np.flatnonzero(np.asarray(etiquetas).any(axis=1))
+    if filas.size == 0:
+        return None
+    columnas = np.flatnonzero(np.asarray(etiquetas[filas[0]:filas[-1] + 1]).any(axis=0))
+    return int(filas[0]), int(filas[-1]) + 1, int(columnas[0]), int(columnas[-1]) + 1
+
+
+class ZonalStatsEngine:
+    """
+    SRP: estadísticas zonales de rásters sobre capas de polígonos.
+    La rejilla de etiquetas de cada (capa, rejilla) se calcula una sola vez y
+    se guarda en disco como .npy, que se abre como memoria mapeada.
+    """
+
+    def __init__(self, cache: Optional[ArtifactCache] = None, filas_por_bloque: int = 512) -> None:
+        """
+        :param cache: Almacén en disco (None = solo memoria).
+        :param filas_por_bloque: Alto de cada ventana de lectura del ráster.
+        """
+        self.cache: Optional[ArtifactCache] = cache
+        self.filas_por_bloque: int = filas_por_bloque
+        self._memoria: Dict[str, Tuple[str, np.ndarray, Optional[Tuple[int, int, int, int]]]] = {}
+
+    def etiquetas(self,
+                  zonas: GeoDataFrame,
+                  nivel: str,
+                  espec: EspecificacionRejilla,
+                  columna_id: Optional[str] = None) -> Tuple[np.ndarray, Optional[Tuple[int, int, int, int]]]:
+        """
+        Rejilla de etiquetas de `zonas` sobre `espec` (la etiqueta k es la
+        fila k-1 de `zonas`) y su rectángulo ocupado.
+        """
+        # Una capa dual ya trae la geometría en CRS_METRICO: si el ráster
+        # está en ese CRS no hay que reproyectar nada
+        if COLUMNA_METRICA in zonas.columns:
+            geometrias = reproyectar(zonas[COLUMNA_METRICA].values, CRS_METRICO, espec.crs)
+        elif zonas.crs is not None:
+            geometrias = reproyectar(zonas.geometry.values, zonas.crs, espec.crs)
+        else:
+            geometrias = np.asarray(zonas.geometry.values)
+        ids = np.asarray(zonas[columna_id] if columna_id else zonas.index).astype(str)
+        huella = huella_ids([huella_ids(ids), huella_geometrias(geometrias)])
+        nombre = f"etiquetas_{nivel}_{espec.huella()}"
+
+        guardada = self._memoria.get(nombre)
+        if guardada is not None and guardada[0] == huella:
+            return guardada[1], guardada[2]
+
+        rejilla = None
+        if self.cache is not None:
+            meta = self.cache.cargar_arrays(f"{nombre}_meta")
+            if meta is not None and str(meta["huella"]) == huella:
+                rejilla = self.cache.cargar_arreglo(nombre, mmap=True)
+        if rejilla is None:
+            rejilla = rasterizar_zonas(geometrias, espec)
+            logger.info(f"Rejilla de etiquetas '{nombre}': {espec.alto}x{espec.ancho}, "
+                        f"{int((rejilla > 0).sum())} píxeles en {len(ids)} zonas.")
+            if self.cache is not None:
+                self.cache.guardar_arreglo(nombre, rejilla)
+                self.cache.guardar_arrays(f"{nombre}_meta", huella=np.array(huella))
+
+        extension = _extension(rejilla)
+        self._memoria[nombre] = (huella, rejilla, extension)
+        return rejilla, extension
+
+    def estadisticas(self,
+                     ruta_raster: str,
+                     zonas: GeoDataFrame,
+                     nivel: str,
+                     columna_id: Optional[str] = None,
+                     banda: int = 1,
+                     percentiles: Sequence[float] = PERCENTILES_DEFAULT) -> pd.DataFrame:
+        """
+        Estadísticas de la banda `banda` del ráster por zona. Solo se lee el
+        rectángulo ocupado por las zonas, en ventanas de `filas_por_bloque`.
+
+        :return: DataFrame indexado por id de zona (mismo orden que `zonas`).
+        """
+        ids = np.asarray(zonas[columna_id] if columna_id else zonas.index).astype(str)
+        acumulador = AcumuladorZonal(len(ids), percentiles)
+        with rasterio.open(ruta_raster) as src:
+            espec = EspecificacionRejilla.desde_raster(src)
+            rejilla, extension = self.etiquetas(zonas, nivel, espec, columna_id)
+            nodata = src.nodata
+            if extension is not None:
+                fila0, fila1, col0, col1 = extension
+                for fila in range(fila0, fila1, self.filas_por_bloque):
+                    alto = min(self.filas_por_bloque, fila1 - fila)
+                    etiquetas = np.asarray(rejilla[fila:fila + alto, col0:col1])
+                    if not etiquetas.any():
+                        continue
+                    valores = src.read(banda, window=Window(col0, fila, col1 - col0, alto))
+                    validos = np.isfinite(valores) if valores.dtype.kind == "f" else np.ones(valores.shape, bool)
+                    if nodata is not None and not np.isnan(nodata):
+                        validos &= valores != nodata
+                    acumulador.agregar(etiquetas, valores, validos)
+
+        tabla = acumulador.resultado()
+        tabla.index = ids
+        logger.info(f"Estadísticas zonales de {ruta_raster} por '{nivel}': "
+                    f"{int((tabla['pixeles'] > 0).sum())} de {len(ids)} zonas con datos.")
+        return tabla
@@ -1,8 +1,20 @@
 # app.py
 
 import logging
+import os
+
+import geopandas as gpd
 from data_access.data_connection import DatabaseCredentials, DatabaseConnectionManager
 from data_access.data_loader import PostgresGeoDataLoader
+from data_access.electoral_store import ElectoralResultsStore
+from data_access.raster_catalog import RasterCatalog
+from data_access.station_store import StationReadingStore
+from domain.domain_models import (
+    DIRECTORIO_ELECTORALES,
+    DIRECTORIO_ESTACIONES,
+    DIRECTORIO_RASTERS,
+    RUTA_CAMBIOS_USO_SUELO
+)
 from services.data_service import DataService
 from presentation.controller import DashAppController
 from presentation.callback_register import CallbackRegister
@@ -32,6 +44,19 @@ def main() -> None:
 
     # 3. Cargar datasets
     data_service.initialize_datasets()
+    data_service.cargar_ambientales(RasterCatalog(DIRECTORIO_RASTERS).descubrir())
+    if not data_service.tiene_dataset("regiones"):
+        # Regiones del año más reciente; con los mismos datos se cargan de la caché
+        anios = data_service.obtener_anios_disponibles("demograficos")
+        data_service.regionalizar("demograficos", anio = anios[-1] if anios else None)
+    estaciones = StationReadingStore(DIRECTORIO_ESTACIONES)
+    if estaciones.existe():
+        data_service.conectar_estaciones(estaciones)
+    electorales = ElectoralResultsStore(DIRECTORIO_ELECTORALES)
+    if electorales.existe():
+        data_service.cargar_electorales(electorales)
+    if os.path.exists(RUTA_CAMBIOS_USO_SUELO):
+        data_service.registrar_dataset("cambios_uso_suelo", gpd.read_parquet(RUTA_CAMBIOS_USO_SUELO))
     
     # 4. Generar el Frontend iniciarl
     layout_builder = LayoutBuilder()
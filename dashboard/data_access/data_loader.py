@@ -7,12 +7,36 @@ usando la conexión proveída por DatabaseConnectionManager.
 
 import logging
 import geopandas as gpd
-from typing import Dict
+from typing import Dict, Sequence, Tuple
+from sqlalchemy import text
 from .data_connection import DatabaseConnectionManager
+from .filter_planner import compilar_sql
 from geopandas import GeoDataFrame
 
 logger = logging.getLogger(__name__)
 
+# Tablas opcionales {clave: (consulta, columna de geometría)}:
+# si no existen, se omiten con un aviso
+TABLAS_OPCIONALES: Dict[str, Tuple[str, str]] = {
+    "servicios": ("SELECT * FROM servicios_publicos", "geometry"),
+    "manzanas": ("SELECT * FROM manzanas_coyoacan", "geom"),
+    "colonias": ("SELECT * FROM colonias_coyoacan", "geom"),
+    "secciones": ("SELECT * FROM secciones_electorales", "geom"),
+    "regiones": ("SELECT * FROM regiones_analisis", "geom"),
+}
+
+# Tabla de origen de cada dataset: nombra su índice espacial persistido,
+# compartido con la app Flask (ver analysis/spatial_index.py)
+TABLAS_DATASET: Dict[str, str] = {
+    "demograficos": "datos_demograficos",
+    "edafologicos": "uso_suelo",
+    "servicios": "servicios_publicos",
+    "manzanas": "manzanas_coyoacan",
+    "colonias": "colonias_coyoacan",
+    "secciones": "secciones_electorales",
+    "regiones": "regiones_analisis",
+}
+
 class PostgresGeoDataLoader:
     """
     SRP: Encargado de cargar datos de PostgreSQL usando GeoPandas.
@@ -53,7 +77,13 @@ class PostgresGeoDataLoader:
                 con=engine,
                 geom_col="geometry"
             )
-        
+
+            for clave, (consulta, geom_col) in TABLAS_OPCIONALES.items():
+                try:
+                    gdf = gpd.read_postgis(consulta, con=engine, geom_col=geom_col)
+                    datasets[clave] = gdf.rename_geometry("geometry") if geom_col != "geometry" else gdf
+                except Exception as ex:
+                    logger.warning(f"Dataset opcional '{clave}' no disponible: {ex}")
 
             logger.info("Datasets cargados exitosamente.")
             return datasets
@@ -61,3 +91,29 @@ class PostgresGeoDataLoader:
         except Exception as ex:
             logger.error(f"Error al cargar los datasets: {ex}")
             raise RuntimeError("No se pudieron cargar los GeoDataFrames desde la DB.") from ex
+
+    def load_dataset_filtrado(self,
+                              dataset_key: str,
+                              predicados: Sequence,
+                              combinacion: str = "and") -> GeoDataFrame:
+        """
+        Carga un dataset aplicando los predicados en la base de datos
+        (WHERE con parámetros ligados), así solo viajan las filas que pasan.
+
+        :param dataset_key: Clave de TABLAS_DATASET.
+        :param predicados: PredicadoFiltro a compilar (ver filter_planner.py).
+        :raises KeyError: Si el dataset no tiene tabla conocida.
+        :raises RuntimeError: Si falla la consulta.
+        """
+        tabla = TABLAS_DATASET[dataset_key]
+        geom_col = TABLAS_OPCIONALES.get(dataset_key, ("", "geometry"))[1]
+        where, parametros = compilar_sql(predicados, combinacion)
+        consulta = f"SELECT * FROM {tabla}" + (f" WHERE {where}" if where else "")
+        try:
+            engine = self.connection_manager.get_engine()
+            gdf = gpd.read_postgis(text(consulta), con=engine, geom_col=geom_col, params=parametros)
+        except Exception as ex:
+            logger.error(f"Error al cargar '{dataset_key}' filtrado: {ex}")
+            raise RuntimeError(f"No se pudo cargar '{dataset_key}' filtrado desde la DB.") from ex
+        logger.info(f"'{dataset_key}' filtrado en SQL: {len(gdf)} filas.")
+        return gdf.rename_geometry("geometry") if geom_col != "geometry" else gdf
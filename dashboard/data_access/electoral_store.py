@@ -0,0 +1,95 @@
+# data_access/electoral_store.py
+
+"""
+Resultados electorales ya agregados (ver scripts/electoral_ingest.py),
+particionados por año, un GeoParquet por nivel:
+
+    <directorio>/anio=AAAA/seccion.parquet
+    <directorio>/anio=AAAA/colonia.parquet   (transferencia precalculada)
+    <directorio>/anio=AAAA/ageb.parquet
+
+Cargar un nivel solo lee sus archivos; nada se recalcula al arrancar.
+"""
+
+import logging
+import os
+import tempfile
+from typing import List, Optional, Sequence
+
+import geopandas as gpd
+import pandas as pd
+from geopandas import GeoDataFrame
+
+logger = logging.getLogger(__name__)
+
+NIVEL_BASE = "seccion"
+
+_PREFIJO_PARTICION = "anio="
+
+
+class ElectoralResultsStore:
+    """
+    SRP: escribir y leer las capas de resultados electorales por año y nivel.
+    Cada archivo se escribe completo y se publica con os.replace, así que un
+    lector nunca ve una capa a medio escribir.
+    """
+
+    def __init__(self, directorio: str) -> None:
+        """
+        :param directorio: Carpeta raíz del almacén.
+        """
+        self.directorio: str = directorio
+
+    def _ruta(self, anio: int, nivel: str) -> str:
+        return os.path.join(self.directorio, f"{_PREFIJO_PARTICION}{anio}", f"{nivel}.parquet")
+
+    def existe(self) -> bool:
+        """Indica si hay al menos un año con resultados por sección."""
+        return any(os.path.exists(self._ruta(anio, NIVEL_BASE)) for anio in self.anios())
+
+    def anios(self) -> List[int]:
+        """Años con partición, ordenados (solo se lista el directorio)."""
+        if not os.path.isdir(self.directorio):
+            return []
+        return sorted(int(nombre[len(_PREFIJO_PARTICION):]) for nombre in os.listdir(self.directorio)
+                      if nombre.startswith(_PREFIJO_PARTICION) and nombre[len(_PREFIJO_PARTICION):].isdigit())
+
+    def niveles(self) -> List[str]:
+        """Niveles presentes en algún año (la sección primero)."""
+        niveles = set()
+        for anio in self.anios():
+            carpeta = os.path.dirname(self._ruta(anio, NIVEL_BASE))
+            niveles.update(a[:-len(".parquet")] for a in os.listdir(carpeta) if a.endswith(".parquet"))
+        return sorted(niveles, key=lambda n: (n != NIVEL_BASE, n))
+
+    def escribir(self, capa: GeoDataFrame, anio: int, nivel: str = NIVEL_BASE) -> str:
+        """
+        Guarda (reemplaza) la capa de `nivel` para `anio`.
+
+        :return: Ruta del archivo escrito.
+        """
+        ruta = self._ruta(anio, nivel)
+        carpeta = os.path.dirname(ruta)
+        os.makedirs(carpeta, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+        os.close(descriptor)
+        try:
+            capa.assign(anio=anio).to_parquet(temporal, index=False)
+            os.replace(temporal, ruta)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        logger.info(f"Resultados {anio} ({nivel}): {len(capa)} unidades en {ruta}.")
+        return ruta
+
+    def leer(self, nivel: str = NIVEL_BASE, anios: Optional[Sequence[int]] = None) -> GeoDataFrame:
+        """
+        Capa de `nivel` con todos los años pedidos (None = todos) y su
+        columna `anio`; vacía si no hay archivos.
+        """
+        rutas = [self._ruta(anio, nivel) for anio in (anios if anios is not None else self.anios())]
+        partes = [gpd.read_parquet(ruta) for ruta in rutas if os.path.exists(ruta)]
+        if not partes:
+            return gpd.GeoDataFrame()
+        return gpd.GeoDataFrame(pd.concat(partes, ignore_index=True), crs=partes[0].crs)
@@ -0,0 +1,221 @@
+# data_access/filter_planner.py
+
+"""
+Planificador de filtros por atributo (ver PredicadoFiltro en
+domain/domain_models.py). Una misma lista de predicados se puede:
+
+- compilar a una cláusula WHERE con parámetros ligados, para que
+  PostgreSQL filtre antes de transferir filas, o
+- evaluar en memoria con índices de mapas de bits: un bitmap empaquetado
+  (np.packbits) por valor de cada columna categórica, y un orden
+  precalculado (argsort) por columna numérica para los rangos. Combinar
+  predicados es un AND/OR bit a bit, sin volver a recorrer la tabla.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Estrategias de evaluación de un predicado
+BITMAP = "bitmap"
+RANGO_ORDENADO = "rango_ordenado"
+ESCANEO = "escaneo"
+
+
+def _identificador(columna: str) -> str:
+    """Nombre de columna entre comillas dobles (admite espacios, p. ej. "us dscr")."""
+    return '"' + str(columna).replace('"', '""') + '"'
+
+
+def _valor_sql(valor: Any) -> Any:
+    """Escalares de numpy a tipos de Python (los drivers no siempre los aceptan)."""
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def compilar_sql(predicados: Sequence, combinacion: str = "and") -> Tuple[str, Dict[str, Any]]:
+    """
+    Cláusula WHERE (sin la palabra WHERE) y sus parámetros (:f0, :f1, ...).
+    Los valores nunca se interpolan en el texto de la consulta.
+
+    :param predicados: Objetos con columna, operador, valores, minimo y maximo.
+    :param combinacion: "and" u "or".
+    :return: ("" , {}) si no hay predicados.
+    """
+    partes: List[str] = []
+    parametros: Dict[str, Any] = {}
+
+    def ligar(valor: Any) -> str:
+        nombre = f"f{len(parametros)}"
+        parametros[nombre] = _valor_sql(valor)
+        return f":{nombre}"
+
+    for predicado in predicados:
+        columna = _identificador(predicado.columna)
+        if predicado.operador == "eq":
+            partes.append(f"{columna} = {ligar(predicado.valores[0])}")
+        elif predicado.operador == "in":
+            if not predicado.valores:
+                partes.append("FALSE")
+                continue
+            marcas = ", ".join(ligar(v) for v in predicado.valores)
+            partes.append(f"{columna} IN ({marcas})")
+        else:
+            cotas = []
+            if predicado.minimo is not None:
+                cotas.append(f"{columna} >= {ligar(predicado.minimo)}")
+            if predicado.maximo is not None:
+                cotas.append(f"{columna} <= {ligar(predicado.maximo)}")
+            partes.append("(" + " AND ".join(cotas) + ")" if cotas else "TRUE")
+
+    if not partes:
+        return "", {}
+    union = " OR " if combinacion == "or" else " AND "
+    return union.join(partes), parametros
+
+
+@dataclass
+class PlanFiltro:
+    """Predicados con la estrategia elegida para cada uno."""
+    predicados: List[Any]
+    estrategias: List[str]
+    combinacion: str = "and"
+
+    def describir(self) -> List[str]:
+        return [f"{p.columna} {p.operador} -> {e}" for p, e in zip(self.predicados, self.estrategias)]
+
+
+class IndiceBitmap:
+    """
+    SRP: índices en memoria de una tabla (inmutable) para evaluar predicados.
+    Los bitmaps de una columna categórica y el orden de una columna numérica
+    se construyen la primera vez que se consultan y se reutilizan.
+    """
+
+    def __init__(self, tabla: pd.DataFrame, columnas_categoricas: Iterable[str] = ()) -> None:
+        """
+        :param tabla: Tabla (o GeoDataFrame) a indexar; no se copia.
+        :param columnas_categoricas: Columnas con un bitmap por valor.
+        """
+        self.tabla: pd.DataFrame = tabla
+        self.n: int = len(tabla)
+        self.columnas_categoricas: Tuple[str, ...] = tuple(
+            c for c in columnas_categoricas if c in tabla.columns
+        )
+        self._bitmaps: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._ordenes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._vacio = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+        self._lleno = np.packbits(np.ones(self.n, dtype=bool))
+
+    # -- construcción perezosa ------------------------------------------------
+
+    def bitmaps(self, columna: str) -> Dict[Any, np.ndarray]:
+        """{valor: bitmap empaquetado} de una columna categórica."""
+        if columna not in self._bitmaps:
+            codigos, valores = pd.factorize(self.tabla[columna], sort=False)
+            orden = np.argsort(codigos, kind="stable")
+            limites = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+            bitmaps = {}
+            for k, valor in enumerate(valores):
+                mascara = np.zeros(self.n, dtype=bool)
+                mascara[orden[limites[k]:limites[k + 1]]] = True
+                bitmaps[valor] = np.packbits(mascara)
+            self._bitmaps[columna] = bitmaps
+            logger.debug(f"Bitmaps de '{columna}': {len(bitmaps)} valores.")
+        return self._bitmaps[columna]
+
+    def _orden(self, columna: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(valores ordenados sin NaN, posiciones) de una columna numérica."""
+        if columna not in self._ordenes:
+            valores = pd.to_numeric(self.tabla[columna], errors="coerce").to_numpy(dtype="float64")
+            posiciones = np.flatnonzero(~np.isnan(valores))
+            orden = posiciones[np.argsort(valores[posiciones], kind="stable")]
+            self._ordenes[columna] = (valores[orden], orden)
+        return self._ordenes[columna]
+
+    # -- planificación y evaluación ------------------------------------------
+
+    def planificar(self, predicados: Sequence, combinacion: str = "and") -> PlanFiltro:
+        """
+        Estrategia por predicado: bitmap para eq/in sobre columnas
+        categóricas, búsqueda binaria sobre el orden para rangos numéricos
+        y escaneo para el resto. En un AND, los predicados con bitmap van
+        primero (son los más baratos y pueden vaciar el resultado).
+        """
+        if combinacion not in ("and", "or"):
+            raise ValueError(f"Combinación '{combinacion}' no soportada.")
+        for predicado in predicados:
+            if predicado.columna not in self.tabla.columns:
+                raise KeyError(f"Columna '{predicado.columna}' no existe en la tabla.")
+
+        estrategias = []
+        for predicado in predicados:
+            if predicado.operador in ("eq", "in") and predicado.columna in self.columnas_categoricas:
+                estrategias.append(BITMAP)
+            elif predicado.operador == "rango" and pd.api.types.is_numeric_dtype(self.tabla[predicado.columna]):
+                estrategias.append(RANGO_ORDENADO)
+            else:
+                estrategias.append(ESCANEO)
+        prioridad = {BITMAP: 0, RANGO_ORDENADO: 1, ESCANEO: 2}
+        orden = sorted(range(len(estrategias)), key=lambda i: prioridad[estrategias[i]])
+        return PlanFiltro([predicados[i] for i in orden], [estrategias[i] for i in orden], combinacion)
+
+    def _evaluar_predicado(self, predicado, estrategia: str) -> np.ndarray:
+        """Bitmap empaquetado de las filas que cumplen un predicado."""
+        if estrategia == BITMAP:
+            bitmaps = self.bitmaps(predicado.columna)
+            resultado = self._vacio
+            for valor in predicado.valores:
+                if valor in bitmaps:
+                    resultado = np.bitwise_or(resultado, bitmaps[valor])
+            return resultado
+        if estrategia == RANGO_ORDENADO:
+            valores, orden = self._orden(predicado.columna)
+            inicio = 0 if predicado.minimo is None else np.searchsorted(valores, predicado.minimo, side="left")
+            fin = len(valores) if predicado.maximo is None else np.searchsorted(valores, predicado.maximo, side="right")
+            mascara = np.zeros(self.n, dtype=bool)
+            mascara[orden[inicio:fin]] = True
+            return np.packbits(mascara)
+        return np.packbits(self._escanear(predicado))
+
+    def _escanear(self, predicado) -> np.ndarray:
+        """Máscara booleana recorriendo la columna (sin índice)."""
+        columna = self.tabla[predicado.columna]
+        if predicado.operador in ("eq", "in"):
+            return columna.isin(list(predicado.valores)).to_numpy()
+        mascara = columna.notna().to_numpy()
+        if predicado.minimo is not None:
+            mascara &= (columna >= predicado.minimo).fillna(False).to_numpy(dtype=bool)
+        if predicado.maximo is not None:
+            mascara &= (columna <= predicado.maximo).fillna(False).to_numpy(dtype=bool)
+        return mascara
+
+    def evaluar(self, predicados: Sequence, combinacion: str = "and") -> np.ndarray:
+        """
+        Máscara booleana (longitud n) de las filas que cumplen los
+        predicados. Sin predicados, todas las filas.
+        """
+        if not predicados:
+            return np.ones(self.n, dtype=bool)
+        plan = self.planificar(predicados, combinacion)
+        combinar = np.bitwise_or if plan.combinacion == "or" else np.bitwise_and
+        resultado: Optional[np.ndarray] = None
+        for predicado, estrategia in zip(plan.predicados, plan.estrategias):
+            bits = self._evaluar_predicado(predicado, estrategia)
+            resultado = bits if resultado is None else combinar(resultado, bits)
+            # Corto circuito: un AND vacío o un OR completo ya no cambian
+            if plan.combinacion == "and" and not resultado.any():
+                break
+            if plan.combinacion == "or" and np.array_equal(resultado, self._lleno):
+                break
+        return np.unpackbits(resultado, count=self.n).astype(bool)
+
+    def filtrar(self, predicados: Sequence, combinacion: str = "and") -> pd.DataFrame:
+        """Filas de la tabla que cumplen los predicados."""
+        if not predicados:
+            return self.tabla
+        return self.tabla[self.evaluar(predicados, combinacion)]
@@ -0,0 +1,201 @@
+# data_access/ragged_geometry.py
+
+"""
+Geometrías poligonales en formato columnar (al estilo de GeoArrow): un
+buffer plano de coordenadas y tres niveles de offsets,
+
+    anillos[k]    -> primer vértice del anillo k
+    poligonos[p]  -> primer anillo del polígono p
+    partes[i]     -> primer polígono del elemento i
+
+en lugar de un objeto de shapely por elemento. Opcionalmente las
+coordenadas se guardan en float32 relativas a un origen local (la mitad de
+memoria; en Coyoacán el error es de milímetros).
+
+Cajas, áreas, perímetros y subconjuntos son operaciones sobre arreglos;
+los objetos de shapely solo se construyen al pedirlos (a_shapely).
+"""
+
+import logging
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+logger = logging.getLogger(__name__)
+
+_POLIGONALES = (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)
+
+
+def _rangos(inicios: np.ndarray, fines: np.ndarray) -> np.ndarray:
+    """Concatenación vectorizada de arange(inicio, fin) para cada par."""
+    largos = fines - inicios
+    total = int(largos.sum())
+    if total == 0:
+        return np.empty(0, dtype="int64")
+    saltos = np.repeat(inicios - np.concatenate([[0], np.cumsum(largos)[:-1]]), largos)
+    return saltos + np.arange(total)
+
+
+def _sumar_segmentos(valores: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Suma de valores[offsets[i]:offsets[i+1]] para cada i."""
+    acumulado = np.concatenate([[0.0], np.cumsum(valores)])
+    return acumulado[offsets[1:]] - acumulado[offsets[:-1]]
+
+
+def _offsets(largos: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(largos)]).astype("int64")
+
+
+class RaggedGeometryArray:
+    """
+    SRP: guardar un arreglo de (Multi)Polígonos como buffers planos y
+    calcular sobre ellos sin pasar por shapely. Inmutable.
+    """
+
+    def __init__(self,
+                 coords: np.ndarray,
+                 anillos: np.ndarray,
+                 poligonos: np.ndarray,
+                 partes: np.ndarray,
+                 simples: np.ndarray,
+                 origen: Optional[np.ndarray] = None,
+                 crs=None) -> None:
+        """
+        :param coords: (n, 2) coordenadas (relativas a `origen` si se da).
+        :param simples: Elementos que eran Polygon (y no MultiPolygon).
+        :param origen: Desplazamiento (x, y) en float64, o None.
+        """
+        self.coords: np.ndarray = coords
+        self.anillos: np.ndarray = anillos
+        self.poligonos: np.ndarray = poligonos
+        self.partes: np.ndarray = partes
+        self.simples: np.ndarray = simples
+        self.origen: Optional[np.ndarray] = origen
+        self.crs = crs
+
+    @classmethod
+    def desde_shapely(cls,
+                      geometrias: Sequence,
+                      crs=None,
+                      float32: bool = False) -> "RaggedGeometryArray":
+        """
+        :param geometrias: Polygon/MultiPolygon de shapely (vacías o None se
+                           conservan como elementos sin partes, y vuelven
+                           como MULTIPOLYGON EMPTY).
+        :param float32: Guarda coordenadas float32 relativas al mínimo de la capa.
+        :raises ValueError: Si hay geometrías no poligonales.
+        """
+        geometrias = np.asarray(geometrias, dtype=object)
+        tipos = shapely.get_type_id(geometrias)
+        if not np.isin(tipos[tipos >= 0], [int(t) for t in _POLIGONALES]).all():
+            raise ValueError("RaggedGeometryArray solo admite Polygon y MultiPolygon.")
+        # Todo como MultiPolygon (un solo esquema de offsets); las vacías
+        # quedan como elementos sin partes
+        validos = (tipos >= 0) & ~shapely.is_empty(geometrias)
+        simples = validos & (tipos == int(shapely.GeometryType.POLYGON))
+        multi = geometrias.copy()
+        multi[simples] = shapely.multipolygons(geometrias[simples].reshape(-1, 1))
+        multi[~validos] = shapely.from_wkt("MULTIPOLYGON EMPTY")
+        if len(multi):
+            _, coords, (anillos, poligonos, partes) = shapely.to_ragged_array(multi)
+        else:
+            coords = np.empty((0, 2))
+            anillos = poligonos = partes = np.zeros(1, dtype="int64")
+
+        origen = None
+        if float32:
+            origen = coords.min(axis=0) if len(coords) else np.zeros(2)
+            coords = (coords - origen).astype("float32")
+        return cls(coords, anillos.astype("int64"), poligonos.astype("int64"), partes.astype("int64"),
+                   simples, origen, crs)
+
+    def __len__(self) -> int:
+        return len(self.partes) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.coords, self.anillos, self.poligonos, self.partes, self.simples))
+
+    @property
+    def vacias(self) -> np.ndarray:
+        return self.partes[1:] == self.partes[:-1]
+
+    def coordenadas(self) -> np.ndarray:
+        """Coordenadas absolutas en float64."""
+        coords = self.coords.astype("float64", copy=False)
+        return coords + self.origen if self.origen is not None else coords
+
+    def a_ragged(self) -> Tuple[shapely.GeometryType, np.ndarray, Tuple[np.ndarray, ...]]:
+        """Mismo formato que shapely.to_ragged_array (para los serializadores)."""
+        return shapely.GeometryType.MULTIPOLYGON, self.coordenadas(), (self.anillos, self.poligonos, self.partes)
+
+    def a_shapely(self) -> np.ndarray:
+        """Geometrías de shapely (Polygon donde el original lo era)."""
+        if len(self) == 0:
+            return np.empty(0, dtype=object)
+        geometrias = shapely.from_ragged_array(*self.a_ragged())
+        geometrias[self.simples] = shapely.get_geometry(geometrias[self.simples], 0)
+        return geometrias
+
+    def tomar(self, indices: np.ndarray) -> "RaggedGeometryArray":
+        """Subconjunto (o reordenamiento, con repeticiones) de elementos."""
+        indices = np.asarray(indices, dtype="int64")
+        pol = _rangos(self.partes[indices], self.partes[indices + 1])
+        anillos = _rangos(self.poligonos[pol], self.poligonos[pol + 1])
+        vertices = _rangos(self.anillos[anillos], self.anillos[anillos + 1])
+        return RaggedGeometryArray(
+            self.coords[vertices],
+            _offsets(self.anillos[anillos + 1] - self.anillos[anillos]),
+            _offsets(self.poligonos[pol + 1] - self.poligonos[pol]),
+            _offsets(self.partes[indices + 1] - self.partes[indices]),
+            self.simples[indices], self.origen, self.crs
+        )
+
+    # -- núcleos vectorizados -------------------------------------------------
+
+    def _vertices_elemento(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(primer vértice, fin) de cada elemento."""
+        primeros = self.anillos[self.poligonos[self.partes]]
+        return primeros[:-1], primeros[1:]
+
+    def cajas(self) -> np.ndarray:
+        """(n, 4) minx, miny, maxx, maxy por elemento (NaN si está vacío)."""
+        cajas = np.full((len(self), 4), np.nan)
+        inicios, fines = self._vertices_elemento()
+        con_datos = fines > inicios
+        if con_datos.any():
+            coords = self.coordenadas()
+            cajas[con_datos, :2] = np.minimum.reduceat(coords, inicios[con_datos], axis=0)
+            cajas[con_datos, 2:] = np.maximum.reduceat(coords, inicios[con_datos], axis=0)
+        return cajas
+
+    def _por_anillo(self, valores_arista: np.ndarray) -> np.ndarray:
+        """Suma por anillo de un valor por arista (vértice i -> i + 1)."""
+        acumulado = np.concatenate([[0.0], np.cumsum(valores_arista)])
+        inicios, fines = self.anillos[:-1], self.anillos[1:]
+        fin_arista = np.maximum(fines - 1, inicios)
+        return acumulado[fin_arista] - acumulado[inicios]
+
+    def areas(self) -> np.ndarray:
+        """Área por elemento (unidades del CRS al cuadrado): exterior menos huecos."""
+        if len(self.coords) < 2:
+            return np.zeros(len(self))
+        # Coordenadas relativas para no perder precisión en el producto cruzado
+        coords = self.coords.astype("float64")
+        coords = coords - coords[0]
+        x, y = coords[:, 0], coords[:, 1]
+        cruz = x[:-1] * y[1:] - x[1:] * y[:-1]
+        anillos = np.abs(self._por_anillo(cruz)) / 2
+        exteriores = np.zeros(len(anillos), dtype=bool)
+        primeros = self.poligonos[:-1]
+        exteriores[primeros[primeros < len(anillos)]] = True
+        con_signo = np.where(exteriores, anillos, -anillos)
+        return _sumar_segmentos(_sumar_segmentos(con_signo, self.poligonos), self.partes)
+
+    def perimetros(self) -> np.ndarray:
+        """Longitud de todos los anillos (exteriores y huecos) por elemento."""
+        if len(self.coords) < 2:
+            return np.zeros(len(self))
+        tramos = np.hypot(*np.diff(self.coords.astype("float64"), axis=0).T)
+        return _sumar_segmentos(_sumar_segmentos(self._por_anillo(tramos), self.poligonos), self.partes)
@@ -0,0 +1,53 @@
+# data_access/raster_catalog.py
+
+"""
+Descubre los rásters ambientales disponibles en un directorio.
+"""
+
+import logging
+import os
+import re
+from typing import List
+
+from domain.domain_models import RasterAmbiental
+
+logger = logging.getLogger(__name__)
+
+# "<variable>_<anio>.tif" o "<variable>.tif"
+_PATRON_RASTER = re.compile(r"^(?P<variable>[a-z0-9]+(?:_[a-z0-9]+)*?)(?:_(?P<anio>\d{4}))?\.tiff?$",
+                            re.IGNORECASE)
+
+
+class RasterCatalog:
+    """
+    SRP: listar los GeoTIFF de un directorio como RasterAmbiental,
+    infiriendo variable y año del nombre del archivo.
+    """
+
+    def __init__(self, directorio: str) -> None:
+        """
+        :param directorio: Carpeta con los rásters.
+        """
+        self.directorio: str = directorio
+
+    def descubrir(self) -> List[RasterAmbiental]:
+        """
+        :return: Rásters encontrados (vacío si el directorio no existe).
+        """
+        if not os.path.isdir(self.directorio):
+            logger.warning(f"Directorio de rásters '{self.directorio}' inexistente.")
+            return []
+
+        rasters = []
+        for archivo in sorted(os.listdir(self.directorio)):
+            coincidencia = _PATRON_RASTER.match(archivo)
+            if not coincidencia:
+                continue
+            anio = coincidencia.group("anio")
+            rasters.append(RasterAmbiental(
+                variable = coincidencia.group("variable").lower(),
+                ruta = os.path.join(self.directorio, archivo),
+                anio = int(anio) if anio else None
+            ))
+        logger.info(f"Rásters ambientales encontrados: {[r.ruta for r in rasters]}")
+        return rasters
@@ -0,0 +1,206 @@
+# data_access/station_store.py
+
+"""
+Almacén columnar (Parquet) de lecturas de estaciones de monitoreo de la
+calidad del aire, de solo anexado y particionado por día:
+
+    <directorio>/estaciones.parquet
+    <directorio>/lecturas/fecha=AAAA-MM-DD/part-<marca>.parquet
+
+Una consulta por rango de fechas solo abre las particiones del rango.
+"""
+
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Union
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from geopandas import GeoDataFrame
+
+logger = logging.getLogger(__name__)
+
+# Esquema de las lecturas (formato largo: una fila por estación, hora y contaminante)
+ESQUEMA_LECTURAS = pa.schema([
+    ("estacion", pa.string()),
+    ("fecha", pa.timestamp("s")),
+    ("contaminante", pa.string()),
+    ("valor", pa.float64()),
+])
+
+_PREFIJO_PARTICION = "fecha="
+
+Fecha = Union[str, date, datetime, pd.Timestamp]
+
+
+class StationReadingStore:
+    """
+    SRP: guardar y leer lecturas horarias de estaciones.
+    Las escrituras solo agregan archivos nuevos (temporal + os.replace), así
+    que un lector concurrente nunca ve una partición a medio escribir.
+    """
+
+    def __init__(self, directorio: str) -> None:
+        """
+        :param directorio: Carpeta raíz del almacén.
+        """
+        self.directorio: str = directorio
+
+    @property
+    def directorio_lecturas(self) -> str:
+        return os.path.join(self.directorio, "lecturas")
+
+    @property
+    def ruta_estaciones(self) -> str:
+        return os.path.join(self.directorio, "estaciones.parquet")
+
+    def existe(self) -> bool:
+        """Indica si hay catálogo de estaciones y al menos una partición."""
+        return os.path.exists(self.ruta_estaciones) and bool(self.particiones())
+
+    def registrar_estaciones(self, estaciones: GeoDataFrame, columna_id: str = "estacion") -> None:
+        """
+        Guarda (reemplaza) el catálogo de estaciones: id, lon y lat (EPSG:4326).
+
+        :param estaciones: Puntos de las estaciones.
+        :param columna_id: Columna con la clave de cada estación.
+        """
+        puntos = estaciones.to_crs("EPSG:4326") if estaciones.crs is not None else estaciones
+        catalogo = pd.DataFrame({
+            "estacion": puntos[columna_id].astype(str).to_numpy(),
+            "lon": puntos.geometry.x.to_numpy(),
+            "lat": puntos.geometry.y.to_numpy(),
+        })
+        for columna in puntos.columns:
+            if columna not in (columna_id, puntos.geometry.name) and columna not in catalogo.columns:
+                catalogo[columna] = puntos[columna].to_numpy()
+        self._escribir(pa.Table.from_pandas(catalogo, preserve_index=False), self.ruta_estaciones)
+        logger.info(f"Catálogo de {len(catalogo)} estaciones guardado en {self.directorio}.")
+
+    def estaciones(self) -> GeoDataFrame:
+        """Catálogo de estaciones como puntos (vacío si no existe)."""
+        if not os.path.exists(self.ruta_estaciones):
+            return gpd.GeoDataFrame()
+        catalogo = pq.read_table(self.ruta_estaciones).to_pandas()
+        return gpd.GeoDataFrame(
+            catalogo, geometry=gpd.points_from_xy(catalogo["lon"], catalogo["lat"]), crs="EPSG:4326"
+        )
+
+    def agregar(self, lecturas: pd.DataFrame) -> int:
+        """
+        Anexa lecturas (columnas estacion, fecha, contaminante, valor): un
+        archivo nuevo por día presente en el lote, ordenado por fecha.
+
+        :return: Número de particiones tocadas.
+        """
+        lecturas = pd.DataFrame({
+            "estacion": lecturas["estacion"].astype(str),
+            "fecha": pd.to_datetime(lecturas["fecha"]).astype("datetime64[s]"),
+            "contaminante": lecturas["contaminante"].astype(str).str.lower(),
+            "valor": pd.to_numeric(lecturas["valor"], errors="coerce"),
+        }).dropna(subset=["fecha"])
+        marca = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        dias = lecturas["fecha"].dt.strftime("%Y-%m-%d")
+        for dia, lote in lecturas.groupby(dias, sort=True):
+            carpeta = os.path.join(self.directorio_lecturas, f"{_PREFIJO_PARTICION}{dia}")
+            tabla = pa.Table.from_pandas(lote.sort_values("fecha"), schema=ESQUEMA_LECTURAS,
+                                         preserve_index=False)
+            self._escribir(tabla, os.path.join(carpeta, f"part-{marca}.parquet"))
+        logger.info(f"{len(lecturas)} lecturas anexadas en {dias.nunique()} particiones.")
+        return int(dias.nunique())
+
+    def particiones(self, inicio: Optional[Fecha] = None, fin: Optional[Fecha] = None) -> List[str]:
+        """
+        Días (AAAA-MM-DD) con lecturas dentro de [inicio, fin], ordenados.
+        Solo se lista el directorio; no se abre ningún archivo.
+        """
+        if not os.path.isdir(self.directorio_lecturas):
+            return []
+        dias = sorted(nombre[len(_PREFIJO_PARTICION):] for nombre in os.listdir(self.directorio_lecturas)
+                      if nombre.startswith(_PREFIJO_PARTICION))
+        desde = pd.Timestamp(inicio).strftime("%Y-%m-%d") if inicio is not None else None
+        hasta = pd.Timestamp(fin).strftime("%Y-%m-%d") if fin is not None else None
+        return [d for d in dias if (desde is None or d >= desde) and (hasta is None or d <= hasta)]
+
+    def meses(self) -> List[str]:
+        """Meses (AAAA-MM) con al menos un día de lecturas, ordenados."""
+        return sorted({dia[:7] for dia in self.particiones()})
+
+    def leer(self,
+             inicio: Optional[Fecha] = None,
+             fin: Optional[Fecha] = None,
+             contaminantes: Optional[Sequence[str]] = None,
+             estaciones: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Lecturas con inicio <= fecha < fin (cualquiera de los dos puede
+        omitirse). Solo se abren las particiones del rango y el filtro por
+        contaminante/estación se empuja al lector de Parquet.
+        """
+        archivos = []
+        for dia in self.particiones(inicio, self._ultimo_dia(fin)):
+            carpeta = os.path.join(self.directorio_lecturas, f"{_PREFIJO_PARTICION}{dia}")
+            archivos.extend(os.path.join(carpeta, a) for a in sorted(os.listdir(carpeta))
+                            if a.endswith(".parquet"))
+        if not archivos:
+            return ESQUEMA_LECTURAS.empty_table().to_pandas()
+
+        filtro = None
+        condiciones = []
+        if inicio is not None:
+            condiciones.append(ds.field("fecha") >= pa.scalar(pd.Timestamp(inicio), pa.timestamp("s")))
+        if fin is not None:
+            condiciones.append(ds.field("fecha") < pa.scalar(pd.Timestamp(fin), pa.timestamp("s")))
+        if contaminantes is not None:
+            condiciones.append(ds.field("contaminante").isin([c.lower() for c in contaminantes]))
+        if estaciones is not None:
+            condiciones.append(ds.field("estacion").isin([str(e) for e in estaciones]))
+        for condicion in condiciones:
+            filtro = condicion if filtro is None else filtro & condicion
+
+        tabla = ds.dataset(archivos, schema=ESQUEMA_LECTURAS, format="parquet").to_table(filter=filtro)
+        logger.debug(f"Lectura de {len(archivos)} archivos: {tabla.num_rows} lecturas.")
+        return tabla.to_pandas()
+
+    def promedios(self,
+                  inicio: Optional[Fecha],
+                  fin: Optional[Fecha],
+                  contaminante: str) -> pd.Series:
+        """Promedio de `contaminante` por estación en [inicio, fin)."""
+        lecturas = self.leer(inicio, fin, contaminantes=[contaminante])
+        return lecturas.groupby("estacion")["valor"].mean()
+
+    def contaminantes(self) -> List[str]:
+        """Contaminantes presentes en la partición más reciente."""
+        dias = self.particiones()
+        if not dias:
+            return []
+        lecturas = self.leer(dias[-1])
+        return sorted(lecturas["contaminante"].unique())
+
+    @staticmethod
+    def _ultimo_dia(fin: Optional[Fecha]) -> Optional[pd.Timestamp]:
+        """Último día que puede tener lecturas anteriores a `fin` (exclusivo)."""
+        if fin is None:
+            return None
+        return pd.Timestamp(fin) - pd.Timedelta(seconds=1)
+
+    @staticmethod
+    def _escribir(tabla: pa.Table, ruta: str) -> None:
+        carpeta = os.path.dirname(ruta)
+        os.makedirs(carpeta, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+        os.close(descriptor)
+        try:
+            pq.write_table(tabla, temporal)
+            os.replace(temporal, ruta)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
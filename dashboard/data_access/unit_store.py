@@ -0,0 +1,184 @@
+# data_access/unit_store.py
+
+"""
+Almacén en memoria de datasets con varios años: cada unidad espacial
+(AGEB, colonia, zona...) guarda su geometría una sola vez y los atributos
+de todos los años van en una tabla sin geometrías, con el código de su
+unidad. La capa de un año se arma (atributos + geometría de su unidad)
+solo cuando se va a dibujar o analizar.
+
+Así la memoria crece con unidades + unidades x años x métricas (números),
+no con unidades x años geometrías. Las columnas de polígonos se guardan
+además en formato columnar (RaggedGeometryArray), sin objetos de shapely.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame, GeoSeries
+
+from .ragged_geometry import RaggedGeometryArray
+
+logger = logging.getLogger(__name__)
+
+COLUMNA_UNIDAD = "_unidad"
+
+Geometrias = Union[RaggedGeometryArray, GeoSeries]
+
+
+def es_multianual(gdf: GeoDataFrame, columna_anio: str = "anio") -> bool:
+    """Indica si la capa tiene más de un año (y por tanto geometrías repetidas)."""
+    return columna_anio in gdf.columns and gdf[columna_anio].nunique(dropna=False) > 1
+
+
+class UnitGeometryStore:
+    """
+    SRP: guardar una geometría por unidad espacial y los atributos por año,
+    y reconstruir la capa de un año bajo demanda. Inmutable una vez creado.
+    """
+
+    def __init__(self,
+                 unidades: pd.DataFrame,
+                 geometrias: Dict[str, Geometrias],
+                 atributos: pd.DataFrame,
+                 columnas: List[str],
+                 nombre_geometria: str = "geometry",
+                 columna_anio: str = "anio") -> None:
+        """
+        :param unidades: Una fila por unidad (posición = código de unidad)
+                         con las columnas que solo dependen de la geometría.
+        :param geometrias: {columna: geometrías por unidad}, en formato
+                           columnar si son polígonos o GeoSeries si no.
+        :param atributos: Una fila por registro con COLUMNA_UNIDAD y el resto
+                          de columnas (sin geometrías), en el orden original.
+        :param columnas: Orden de columnas de la capa original.
+        :param nombre_geometria: Columna de la geometría activa.
+        """
+        self.unidades: pd.DataFrame = unidades
+        self._geometrias: Dict[str, Geometrias] = geometrias
+        self.atributos: pd.DataFrame = atributos
+        self.columnas: List[str] = columnas
+        self.nombre_geometria: str = nombre_geometria
+        self.columna_anio: str = columna_anio
+        self._filas: Dict[object, np.ndarray] = {}
+        if columna_anio in atributos.columns:
+            codigos, anios = pd.factorize(atributos[columna_anio], sort=True)
+            self._filas = {anio: np.flatnonzero(codigos == k) for k, anio in enumerate(anios)}
+
+    @classmethod
+    def desde_capa(cls,
+                   gdf: GeoDataFrame,
+                   columnas_geometricas: Iterable[str] = (),
+                   columna_anio: str = "anio",
+                   float32: bool = False) -> "UnitGeometryStore":
+        """
+        Separa una capa en geometrías únicas y atributos. Dos registros son
+        la misma unidad si su geometría es idéntica (mismo WKB), así que no
+        hace falta una columna id única entre granularidades.
+
+        :param columnas_geometricas: Columnas que dependen solo de la geometría
+                                     (geometría métrica, área, centroide...).
+        :param float32: Coordenadas de polígonos en float32 relativas a un
+                        origen local (ver RaggedGeometryArray).
+        """
+        nombre = gdf.geometry.name
+        por_unidad = [nombre] + [c for c in columnas_geometricas if c in gdf.columns and c != nombre]
+        codigos, _ = pd.factorize(pd.Series(shapely.to_wkb(np.asarray(gdf.geometry.values))), sort=False)
+        primeras = np.unique(codigos, return_index=True)[1]
+        unidades = gdf.iloc[primeras][por_unidad].reset_index(drop=True)
+
+        geometrias: Dict[str, Geometrias] = {}
+        for columna in por_unidad:
+            if not isinstance(unidades[columna], GeoSeries):
+                continue
+            serie = unidades[columna]
+            try:
+                geometrias[columna] = RaggedGeometryArray.desde_shapely(serie.values, serie.crs, float32)
+            except ValueError:
+                geometrias[columna] = serie
+        unidades = pd.DataFrame(unidades.drop(columns=list(geometrias)))
+
+        atributos = pd.DataFrame(gdf.drop(columns=por_unidad))
+        atributos[COLUMNA_UNIDAD] = codigos.astype("int32")
+        logger.info(f"Capa separada: {len(gdf)} registros, {len(unidades)} geometrías únicas.")
+        return cls(unidades, geometrias, atributos, list(gdf.columns), nombre, columna_anio)
+
+    def __len__(self) -> int:
+        return len(self.atributos)
+
+    @property
+    def crs(self):
+        return self._geometrias[self.nombre_geometria].crs
+
+    @property
+    def anios(self) -> List:
+        return list(self._filas)
+
+    @property
+    def empty(self) -> bool:
+        return self.atributos.empty
+
+    @property
+    def es_poligonal(self) -> bool:
+        return isinstance(self._geometrias[self.nombre_geometria], RaggedGeometryArray)
+
+    def _serie(self, columna: str, unidades: np.ndarray, indice: pd.Index) -> GeoSeries:
+        """Geometrías de shapely de `columna` para los códigos de unidad dados."""
+        geometrias = self._geometrias[columna]
+        if isinstance(geometrias, RaggedGeometryArray):
+            return GeoSeries(geometrias.tomar(unidades).a_shapely(), index=indice, crs=geometrias.crs)
+        return GeoSeries(geometrias.values[unidades], index=indice, crs=geometrias.crs)
+
+    @property
+    def geometrias(self) -> GeoDataFrame:
+        """
+        Una fila por unidad con sus geometrías (se construyen al pedirlas),
+        p. ej. para un índice espacial.
+        """
+        codigos = np.arange(len(self.unidades))
+        capa = GeoDataFrame(self.unidades.copy(),
+                            geometry=self._serie(self.nombre_geometria, codigos, self.unidades.index))
+        capa = capa.rename_geometry(self.nombre_geometria) if self.nombre_geometria != "geometry" else capa
+        for columna in self._geometrias:
+            if columna != self.nombre_geometria:
+                capa[columna] = self._serie(columna, codigos, self.unidades.index)
+        return capa
+
+    def _atributos(self, anio: Optional[int]) -> pd.DataFrame:
+        if anio is None or self.columna_anio not in self.atributos.columns:
+            return self.atributos
+        return self.atributos.iloc[self._filas.get(anio, np.empty(0, dtype="int64"))]
+
+    def unidades_de(self, indice: pd.Index) -> np.ndarray:
+        """Código de unidad de los registros con etiquetas `indice`."""
+        return self.atributos.loc[indice, COLUMNA_UNIDAD].to_numpy()
+
+    def geometrias_columnares(self, indice: pd.Index) -> Optional[RaggedGeometryArray]:
+        """
+        Geometría activa de los registros `indice` en formato columnar (para
+        serializar sin shapely), o None si la capa no es de polígonos.
+        """
+        if not self.es_poligonal:
+            return None
+        return self._geometrias[self.nombre_geometria].tomar(self.unidades_de(indice))
+
+    def capa(self, anio: Optional[int] = None) -> GeoDataFrame:
+        """
+        Capa con geometrías de los registros de `anio` (None = todos), con el
+        mismo índice y columnas que la capa original. Un año inexistente
+        devuelve una capa vacía (como GeoDataProcessor.filtrar_por_anio).
+        """
+        atributos = self._atributos(anio)
+        unidades = atributos[COLUMNA_UNIDAD].to_numpy()
+        capa = GeoDataFrame(atributos.drop(columns=COLUMNA_UNIDAD),
+                            geometry=self._serie(self.nombre_geometria, unidades, atributos.index))
+        capa = capa.rename_geometry(self.nombre_geometria) if self.nombre_geometria != "geometry" else capa
+        for columna in self._geometrias:
+            if columna != self.nombre_geometria:
+                capa[columna] = self._serie(columna, unidades, atributos.index)
+        for columna in self.unidades.columns:
+            capa[columna] = self.unidades[columna].to_numpy()[unidades]
+        return capa[self.columnas]
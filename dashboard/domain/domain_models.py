@@ -3,7 +3,8 @@
 Define entidades (dataclasses) que representan el dominio de la aplicación.
 """
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Any, Optional, List, Tuple
+import os
 import random
 
 # Lista de esquemas de colores disponibles
@@ -30,6 +31,94 @@ AVAILABLE_COLOR_SCHEMES = [
     "Teal"
 ]
 
+# Colores para mapas de clusters LISA (hot spots / cold spots)
+COLORES_LISA = {
+    "Alto-Alto": "#d7191c",
+    "Bajo-Alto": "#abd9e9",
+    "Bajo-Bajo": "#2c7bb6",
+    "Alto-Bajo": "#fdae61",
+    "No significativo": "#eeeeee",
+}
+
+# Colores de los tipos de cambio de uso de suelo entre versiones
+# (ver analysis/change_detection.py); el orden es el de la leyenda
+COLORES_CAMBIO = {
+    "agregado": "#1a9641",
+    "eliminado": "#d7191c",
+    "reclasificado": "#fdae61",
+    "forma": "#abd9e9",
+    "division": "#2c7bb6",
+    "fusion": "#7b3294",
+}
+
+# Columna que identifica la unidad espacial de cada dataset
+# (si no existe, se usa el índice del GeoDataFrame)
+COLUMNAS_ID_UNIDAD = {
+    "demograficos": "ageb",
+    "edafologicos": "identifica",
+    "ambientales": "zona",
+    "electorales": "seccion",
+}
+
+# Redistribución dasimétrica AGEB -> manzana (granularidad "manzana" de demograficos)
+# - Columnas candidatas a id de manzana y a uso de suelo (la primera que exista).
+# - Usos residenciales: los que empiezan con estos prefijos ("Habitacional ...").
+# - Variables extensivas (conteos) que se reparten: las que empiezan con estos prefijos.
+COLUMNAS_ID_MANZANA = ("cvegeo", "identifica", "id_manzana")
+COLUMNAS_USO_SUELO = ("us dscr", "us_dscr")
+PREFIJOS_USO_RESIDENCIAL = ("habitacion",)
+PREFIJOS_EXTENSIVOS = ("pob", "p_", "viv", "tviv", "hog", "tothog", "votos_", "lista_nominal", "casillas")
+
+# Capas de polígonos a las que se puede llevar un dataset por interpolación
+# areal: {granularidad: (dataset con los polígonos, columna id)}
+CAPAS_GRANULARIDAD = {
+    "colonia": ("colonias", "id_colonia"),
+    "seccion": ("secciones", "seccion"),
+    "region": ("regiones", "region"),
+}
+
+# Granularidad en la que se publica cada dataset (solo estos se redistribuyen)
+GRANULARIDAD_NATIVA = {
+    "demograficos": "ageb",
+    "electorales": "seccion",
+}
+
+# Granularidades hexagonales para datasets de puntos: {valor: (resolución, etiqueta)}
+# (radio de 1 km, 500 m y 250 m; ver analysis/hexbin.py)
+GRANULARIDADES_HEX = {
+    "hex_1000": (3, "Hexágonos de 1 km"),
+    "hex_500": (4, "Hexágonos de 500 m"),
+    "hex_250": (5, "Hexágonos de 250 m"),
+}
+
+# Rásters ambientales (GeoTIFF "<variable>_<anio>.tif") a resumir por zona,
+# y percentiles que se calculan además de media, mínimo y máximo
+DIRECTORIO_RASTERS = os.getenv("COYOACAN_RASTER_DIR", "data/rasters")
+PERCENTILES_ZONALES = (10, 50, 90)
+
+# Almacén de lecturas de estaciones de calidad del aire (ver StationReadingStore)
+DIRECTORIO_ESTACIONES = os.getenv("COYOACAN_ESTACIONES_DIR", "data/estaciones")
+
+# Resultados electorales por año (ver ElectoralResultsStore y scripts/electoral_ingest.py)
+DIRECTORIO_ELECTORALES = os.getenv("COYOACAN_ELECTORALES_DIR", "data/electorales")
+
+# Capa de cambios de uso de suelo generada con scripts/land_use_changes.py
+RUTA_CAMBIOS_USO_SUELO = os.getenv("COYOACAN_CAMBIOS_USO_SUELO", "data/cambios_uso_suelo.parquet")
+
+# Filtros por atributo (ver data_access/filter_planner.py):
+# - Columnas categóricas con índice de mapas de bits (uno por valor).
+# - Operadores de PredicadoFiltro y formas de combinar varios predicados.
+COLUMNAS_BITMAP = ("us dscr", "us_dscr", "colonia", "alc")
+OPERADORES_FILTRO = ("eq", "in", "rango")
+COMBINACIONES_FILTRO = ("and", "or")
+
+# Tipos de instalación de la capa "servicios" (columna 'tipo') y su etiqueta
+TIPOS_SERVICIO = {
+    "salud": "Salud",
+    "educacion": "Educación",
+    "transporte": "Transporte",
+}
+
 
 @dataclass
 class MapVisualizationConfig:
@@ -43,8 +132,167 @@ class MapVisualizationConfig:
     latitud_centro: float = 19.332608
     longitud_centro: float = -99.143209
     mapbox_style: str = "open-street-map"  # Estilo por defecto
+    precision_coordenadas: int = 5  # Decimales del GeoJSON enviado (~1.1 m)
+    cortes: Optional[List[float]] = None  # Bordes de clase; None = escala continua
+    rango_color: Optional[Tuple[float, float]] = None  # Rango fijo de la escala continua
             
 
+@dataclass
+class MetricaDerivada:
+    """
+    Métrica calculada a partir de columnas del dataset mediante una expresión
+    aritmética, p. ej. "pob_total / area_km2".
+    - nombre: Nombre de la columna resultante (valor del dropdown 'metrica').
+    - expresion: Expresión sobre columnas numéricas (ver DerivedMetricsEngine).
+    - etiqueta: Texto a mostrar en el dropdown (None = derivado del nombre).
+    - datasets: Datasets donde aplica (None = cualquiera que tenga las columnas).
+    """
+    nombre: str
+    expresion: str
+    etiqueta: Optional[str] = None
+    datasets: Optional[List[str]] = None
+
+
+# Métricas derivadas registradas por defecto. Solo aparecen en el dropdown
+# si el dataset contiene todas las columnas que usa la expresión.
+METRICAS_DERIVADAS = [
+    MetricaDerivada("densidad_pob", "pob_total / area_km2",
+                    "Densidad de población (hab/km²)", ["demograficos"]),
+    MetricaDerivada("densidad_hombres", "pob_hombres / area_km2",
+                    "Densidad de hombres (hab/km²)", ["demograficos"]),
+    MetricaDerivada("densidad_mujeres", "pob_mujeres / area_km2",
+                    "Densidad de mujeres (hab/km²)", ["demograficos"]),
+    MetricaDerivada("indice_masculinidad", "pob_hombres / pob_mujeres * 100",
+                    "Índice de masculinidad (H por cada 100 M)", ["demograficos"]),
+]
+
+
+@dataclass(frozen = True)
+class AccesibilidadConfig:
+    """
+    Parámetros del cálculo de accesibilidad a servicios (página /servicios):
+    - dataset_demanda: Dataset cuyas unidades son los orígenes (demanda).
+    - columna_demanda: Población de cada unidad de demanda.
+    - columna_tipo: Columna de la capa de servicios con el tipo de instalación.
+    - columna_oferta: Capacidad de cada instalación (None = 1 por instalación).
+    - radio_m: Radio de captación 2SFCA en metros.
+    - k: Número de instalaciones más cercanas a medir.
+    - ponderacion: Decaimiento con la distancia ("binaria" o "gaussiana").
+    """
+    dataset_demanda: str = "demograficos"
+    columna_demanda: str = "pob_total"
+    columna_tipo: str = "tipo"
+    columna_oferta: Optional[str] = None
+    radio_m: float = 1000.0
+    k: int = 3
+    ponderacion: str = "gaussiana"
+
+
+@dataclass(frozen = True)
+class HotspotsConfig:
+    """
+    Parámetros de los hot spots (I de Moran global y LISA; ver
+    analysis/autocorrelation.py):
+    - metodo_pesos, tolerancia_m: Contigüidad y tolerancia de ajuste en metros.
+    - metodo_manzana: Método en la granularidad "manzana". Las manzanas
+      están separadas por calles, así que la contigüidad estricta deja casi
+      todas como islas; por eso se usan los k vecinos más cercanos.
+    - k: Vecinos para "knn".
+    - permutaciones, alfa: Inferencia por permutaciones y significancia.
+    """
+    metodo_pesos: str = "queen"
+    tolerancia_m: float = 15.0
+    metodo_manzana: str = "knn"
+    k: int = 8
+    permutaciones: int = 999
+    alfa: float = 0.05
+
+
+@dataclass(frozen = True)
+class RegionalizacionConfig:
+    """
+    Parámetros de la regionalización en zonas de análisis (granularidad
+    "region"; ver analysis/regionalization.py):
+    - metodo: "skater" (número fijo de regiones) o "maxp" (umbral por región).
+    - variables: Indicadores a homogeneizar (vacío = columnas numéricas).
+    - n_regiones: Regiones buscadas (solo skater).
+    - columna_piso, umbral: Cada región suma al menos `umbral` de esa columna.
+    - metodo_pesos, tolerancia_m: Grafo de contigüidad (las manzanas están
+      separadas por calles, de ahí la tolerancia).
+    - reinicios, procesos: Construcciones de max-p y procesos en paralelo.
+    """
+    metodo: str = "skater"
+    variables: Tuple[str, ...] = ()
+    n_regiones: int = 20
+    columna_piso: Optional[str] = "pob_total"
+    umbral: float = 0.0
+    metodo_pesos: str = "queen"
+    tolerancia_m: float = 15.0
+    reinicios: int = 8
+    procesos: Optional[int] = None
+
+
+@dataclass(frozen = True)
+class InterpolacionEstacionesConfig:
+    """
+    Parámetros de la interpolación de estaciones a polígonos:
+    - metodo: "idw" (distancia inversa) o "cercano" (estación más cercana).
+    - k: Número de estaciones vecinas (solo idw).
+    - potencia: Exponente de la distancia en idw.
+    """
+    metodo: str = "idw"
+    k: int = 4
+    potencia: float = 2.0
+
+
+@dataclass
+class RasterAmbiental:
+    """
+    Ráster ambiental a resumir por zona (página /ambientales):
+    - variable: Nombre corto, prefijo de las columnas (p. ej. "ndvi").
+    - ruta: Archivo GeoTIFF.
+    - anio: Año del ráster (None = sin año).
+    - banda: Banda a leer.
+    """
+    variable: str
+    ruta: str
+    anio: Optional[int] = None
+    banda: int = 1
+
+
+@dataclass(frozen = True)
+class PredicadoFiltro:
+    """
+    Condición sobre una columna del dataset:
+    - eq: columna == valores[0]
+    - in: columna en valores
+    - rango: minimo <= columna <= maximo (None = sin cota)
+    """
+    columna: str
+    operador: str = "eq"
+    valores: Tuple[Any, ...] = ()
+    minimo: Optional[float] = None
+    maximo: Optional[float] = None
+
+    def __post_init__(self):
+        if self.operador not in OPERADORES_FILTRO:
+            raise ValueError(f"Operador '{self.operador}' no soportado: {OPERADORES_FILTRO}")
+
+    @classmethod
+    def igual(cls, columna: str, valor: Any) -> "PredicadoFiltro":
+        return cls(columna, "eq", (valor,))
+
+    @classmethod
+    def en(cls, columna: str, valores: List[Any]) -> "PredicadoFiltro":
+        return cls(columna, "in", tuple(valores))
+
+    @classmethod
+    def rango(cls, columna: str,
+              minimo: Optional[float] = None,
+              maximo: Optional[float] = None) -> "PredicadoFiltro":
+        return cls(columna, "rango", (), minimo, maximo)
+
+
 @dataclass
 class DashboardFilters:
     """
@@ -52,12 +300,20 @@ class DashboardFilters:
     - anio: Año específico
     - granularidad: "colonia", "ageb", etc.
     - metrica: Nombre de la columna a graficar
+    - predicados: Filtros por atributo (igualdad, lista o rango)
+    - combinacion: Cómo se combinan los predicados ("and" u "or")
     """
     type_data: str
     anio: Optional[int] = None
     granularidad: str = "colonia"
     metrica: Optional[str] = None
     tooltip_cols: List = field(init = False)
+    predicados: List[PredicadoFiltro] = field(default_factory = list)
+    combinacion: str = "and"
+
+    def firma_predicados(self) -> Tuple:
+        """Clave hashable de los predicados (para cachés por filtro)."""
+        return (self.combinacion, tuple(self.predicados)) if self.predicados else ()
 
     def __post_init__(self):
         if self.type_data == "demograficos":
@@ -73,4 +329,17 @@ class DashboardFilters:
                 "colonia",
                 "us dscr",
                 "calle"
-            ]
\ No newline at end of file
+            ]
+        elif self.type_data == "servicios":
+            self.tooltip_cols = ["ageb"]
+        elif self.type_data == "electorales":
+            self.tooltip_cols = [
+                "seccion",
+                "colonia",
+                "casillas",
+                "participacion"
+            ]
+        else:
+            self.tooltip_cols = []
+        if self.combinacion not in COMBINACIONES_FILTRO:
+            raise ValueError(f"Combinación '{self.combinacion}' no soportada: {COMBINACIONES_FILTRO}")
@@ -0,0 +1,180 @@
+# figures/classification.py
+
+"""
+Clasificación de valores para mapas coropléticos: cuantiles, intervalos
+iguales y cortes naturales de Jenks. Los cortes se cachean para que todos
+los renderizadores (Plotly, Leaflet) usen exactamente las mismas clases.
+"""
+
+import logging
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METODOS_CLASIFICACION = {
+    "cuantiles": "Cuantiles",
+    "intervalos_iguales": "Intervalos iguales",
+    "jenks": "Cortes naturales (Jenks)",
+}
+
+# Máximo de valores representativos sobre los que corre la programación
+# dinámica de Jenks (O(k·m²) con m <= este valor).
+MUESTRA_JENKS = 1000
+
+
+def _valores_validos(valores: Sequence[float]) -> np.ndarray:
+    valores = np.asarray(valores, dtype="float64")
+    return valores[np.isfinite(valores)]
+
+
+def cortes_cuantiles(valores: Sequence[float], k: int) -> np.ndarray:
+    """Bordes de k clases con (aprox.) el mismo número de unidades."""
+    valores = _valores_validos(valores)
+    return np.unique(np.quantile(valores, np.linspace(0, 1, k + 1)))
+
+
+def cortes_intervalos_iguales(valores: Sequence[float], k: int) -> np.ndarray:
+    """Bordes de k clases de igual amplitud entre el mínimo y el máximo."""
+    valores = _valores_validos(valores)
+    return np.unique(np.linspace(valores.min(), valores.max(), k + 1))
+
+
+def cortes_jenks(valores: Sequence[float], k: int, muestra: int = MUESTRA_JENKS) -> np.ndarray:
+    """
+    Cortes naturales de Jenks (Fisher-Jenks exacto sobre valores ponderados).
+
+    Los valores se ordenan (O(n log n)) y se agrupan en valores únicos con
+    su frecuencia. Si quedan más de `muestra` valores únicos, se resumen en
+    `muestra` grupos consecutivos de igual tamaño (media y peso de cada
+    grupo), de modo que la programación dinámica opera sobre m <= muestra
+    representantes. El mínimo y el máximo reales siempre son bordes.
+    """
+    valores = np.sort(_valores_validos(valores))
+    unicos, pesos = np.unique(valores, return_counts=True)
+    if len(unicos) <= k:
+        return unicos if len(unicos) > 1 else np.repeat(unicos, 2)
+
+    if len(unicos) > muestra:
+        grupos = np.array_split(np.arange(len(valores)), muestra)
+        inicios = np.array([g[0] for g in grupos])
+        pesos = np.diff(np.append(inicios, len(valores))).astype("float64")
+        unicos = np.add.reduceat(valores, inicios) / pesos
+        ultimos = valores[np.append(inicios[1:], len(valores)) - 1]
+    else:
+        pesos = pesos.astype("float64")
+        ultimos = unicos
+
+    fin_clases = _fisher_jenks(unicos, pesos, k)
+    cortes = np.concatenate([[valores[0]], ultimos[fin_clases[:-1]], [valores[-1]]])
+    return np.unique(cortes)
+
+
+def _fisher_jenks(x: np.ndarray, w: np.ndarray, k: int) -> np.ndarray:
+    """
+    Programación dinámica de Fisher: minimiza la suma de desviaciones
+    cuadradas ponderadas dentro de cada clase. Devuelve, para cada clase, el
+    índice (en x) de su último elemento.
+    """
+    m = len(x)
+    s0 = np.concatenate([[0.0], np.cumsum(w)])
+    s1 = np.concatenate([[0.0], np.cumsum(w * x)])
+    s2 = np.concatenate([[0.0], np.cumsum(w * x * x)])
+
+    # ssd[i, j] = dispersión de la clase x[i..j] (inf si i > j)
+    i = np.arange(m)[:, None]
+    j = np.arange(m)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peso = s0[j + 1] - s0[i]
+        ssd = (s2[j + 1] - s2[i]) - (s1[j + 1] - s1[i]) ** 2 / peso
+    ssd = np.where(i <= j, np.maximum(ssd, 0.0), np.inf)
+
+    costo = ssd[0].copy()
+    origen = np.zeros((k, m), dtype=int)
+    for c in range(1, k):
+        # Última clase = x[i..j] con i >= c; las c clases previas cubren x[..i-1]
+        candidatos = costo[c - 1:m - 1][:, None] + ssd[c:, :]
+        mejor = np.argmin(candidatos, axis=0)
+        costo = candidatos[mejor, np.arange(m)]
+        origen[c] = mejor + c
+
+    fines = [m - 1]
+    for c in range(k - 1, 0, -1):
+        fines.append(origen[c, fines[-1]] - 1)
+    return np.array(fines[::-1])
+
+
+def calcular_cortes(valores: Sequence[float], metodo: str, k: int) -> np.ndarray:
+    """
+    Bordes [mínimo, b1, ..., máximo] de hasta k clases (pueden ser menos si
+    hay muchos empates).
+
+    :raises ValueError: Si el método no existe o no hay valores válidos.
+    """
+    if metodo not in METODOS_CLASIFICACION:
+        raise ValueError(f"Método de clasificación '{metodo}' no soportado.")
+    if _valores_validos(valores).size == 0:
+        raise ValueError("No hay valores válidos para clasificar.")
+    if metodo == "cuantiles":
+        return cortes_cuantiles(valores, k)
+    if metodo == "intervalos_iguales":
+        return cortes_intervalos_iguales(valores, k)
+    return cortes_jenks(valores, k)
+
+
+def asignar_clases(valores: Sequence[float], cortes: Sequence[float]) -> np.ndarray:
+    """
+    Índice de clase (0..len(cortes)-2) de cada valor; -1 para nulos.
+    La clase c contiene (cortes[c], cortes[c+1]]; la primera incluye el mínimo.
+    """
+    valores = np.asarray(valores, dtype="float64")
+    cortes = np.asarray(cortes, dtype="float64")
+    clases = np.digitize(valores, cortes[1:-1], right=True)
+    return np.where(np.isfinite(valores), clases, -1)
+
+
+def etiquetas_clases(cortes: Sequence[float]) -> List[str]:
+    """Etiquetas legibles "a – b" de cada clase."""
+    def formato(v: float) -> str:
+        return f"{v:,.0f}" if abs(v) >= 1000 else f"{v:,.2f}"
+    return [f"{formato(a)} – {formato(b)}" for a, b in zip(cortes[:-1], cortes[1:])]
+
+
+class BreaksCache:
+    """
+    SRP: memorizar cortes por (dataset, anio, granularidad, metrica, metodo, k).
+    Se invalida cuando el dataset se recarga.
+    """
+
+    def __init__(self) -> None:
+        self._cortes: Dict[Tuple[Hashable, ...], np.ndarray] = {}
+
+    def obtener(self,
+                clave: Tuple[Hashable, ...],
+                valores: Union[Sequence[float], Callable[[], Sequence[float]]],
+                metodo: str,
+                k: int) -> np.ndarray:
+        """
+        Devuelve los cortes cacheados para `clave`, calculándolos si faltan.
+
+        :param clave: (dataset, anio, granularidad, metrica)
+        :param valores: Valores a clasificar, o una función que los produce;
+                        la función solo se llama si los cortes no están en
+                        caché (así un acierto no arma la capa filtrada).
+        """
+        clave_completa = tuple(clave) + (metodo, k)
+        cortes = self._cortes.get(clave_completa)
+        if cortes is None:
+            cortes = calcular_cortes(valores() if callable(valores) else valores, metodo, k)
+            self._cortes[clave_completa] = cortes
+            logger.info(f"Cortes '{metodo}' calculados para {clave}: {np.round(cortes, 4).tolist()}")
+        return cortes
+
+    def invalidar(self, dataset_key: Optional[str] = None) -> None:
+        """Descarta los cortes de un dataset (o todos)."""
+        if dataset_key is None:
+            self._cortes.clear()
+        else:
+            for clave in [c for c in self._cortes if c[0] == dataset_key]:
+                del self._cortes[clave]
@@ -6,11 +6,15 @@ Genera visualizaciones (e.g. mapas coropléticos) con Plotly.
 
 import geopandas as gpd
 from geopandas import GeoDataFrame
+import numpy as np
+import pandas as pd
 import plotly.express as px
-from typing import Any, Optional, List
+import plotly.graph_objects as go
+from typing import Any, Dict, Optional, List
 from domain.domain_models import MapVisualizationConfig
+from figures.classification import asignar_clases, etiquetas_clases
+from figures.geojson_serializer import GeoJSONSerializer
 import dash_leaflet as dl
-import json
 
 
 class FiguresGenerator:
@@ -19,12 +23,16 @@ class FiguresGenerator:
     """
     
     @staticmethod
-    def generar_mapa_coropletico(data: GeoDataFrame, config: MapVisualizationConfig) -> Optional[Any]:
+    def generar_mapa_coropletico(data: GeoDataFrame,
+                                 config: MapVisualizationConfig,
+                                 geometrias: Optional[Any] = None) -> Optional[Any]:
         """
         Genera un mapa coroplético con Plotly Express, o None si data está vacío.
         
         :param data: GeoDataFrame con geometry y la columna métrica
         :param config: Parámetros de configuración de la visualización
+        :param geometrias: Geometrías de `data` en formato columnar
+                           (RaggedGeometryArray); se serializan sin shapely.
         :return: Un objeto Figure de Plotly, o None si data está vacío.
         """
         if data.empty:
@@ -35,23 +43,47 @@ class FiguresGenerator:
         #   if col not in data.columns:
         #       raise ValueError(f"La columna de hover '{col}' no existe en los datos.")
 
+        # GeoJSON compacto: sin propiedades (Plotly las toma del data_frame)
+        # y con anillos cerrados, que Mapbox necesita.
+        serializer = GeoJSONSerializer(precision = config.precision_coordenadas,
+                                       omitir_cierre = False)
+
+        color = config.columna_metrica
+        escala = config.esquema_color
+        rango_color = config.rango_color
+        hover_data = {col: True \
+                      for col in config.hover_columns}  # Mostrar columnas adicionales en el hover
+
+        # Si hay cortes de clase, se colorea por índice de clase con una
+        # escala escalonada; el hover sigue mostrando el valor de la métrica.
+        # Con un solo borde (métrica constante) no hay clases: escala continua.
+        con_clases = config.cortes is not None and len(config.cortes) >= 2
+        if con_clases:
+            clases = asignar_clases(data[config.columna_metrica], config.cortes)
+            num_clases = len(config.cortes) - 1
+            data = data.assign(_clase = np.where(clases >= 0, clases, np.nan))
+            color = "_clase"
+            escala = FiguresGenerator._escala_discreta(config.esquema_color, num_clases)
+            rango_color = (-0.5, num_clases - 0.5)
+            hover_data.update({config.columna_metrica: True, "_clase": False})
+
         # Crear el mapa coroplético
         fig = px.choropleth_mapbox(
             data_frame = data,
-            geojson = data.__geo_interface__,
+            geojson = serializer.serializar_dict(data, geometrias = geometrias),
             locations = data.index,
-            color = config.columna_metrica,
+            color = color,
             mapbox_style = config.mapbox_style,  # Usar el estilo configurado
             zoom = config.zoom,
             center = {"lat": config.latitud_centro, 
                       "lon": config.longitud_centro},
-            color_continuous_scale = config.esquema_color,
+            color_continuous_scale = escala,
+            range_color = rango_color,
             opacity = 0.7,  # Ajustar la opacidad para mejor visibilidad
             hover_name = config.nombre_hover \
                             if config.nombre_hover \
                                 else config.columna_metrica,
-            hover_data = {col: True \
-                          for col in config.hover_columns}  # Mostrar columnas adicionales en el hover
+            hover_data = hover_data
         )
 
         # Actualizar el layout para mejorar el aspecto
@@ -76,9 +108,255 @@ class FiguresGenerator:
             )
         )
 
+        if con_clases:
+            fig.update_layout(coloraxis_colorbar = dict(
+                tickvals = list(range(len(config.cortes) - 1)),
+                ticktext = etiquetas_clases(config.cortes)
+            ))
+
+
+        return fig
+
+    @staticmethod
+    def generar_mapa_categorico(data: GeoDataFrame,
+                                config: MapVisualizationConfig,
+                                colores: Dict[str, str]) -> Optional[Any]:
+        """
+        Genera un mapa de categorías (p. ej. clusters LISA o usos de suelo),
+        o None si data está vacío.
+
+        :param data: GeoDataFrame con geometry y la columna de categoría
+                     (config.columna_metrica).
+        :param config: Parámetros de configuración de la visualización
+        :param colores: Color por categoría; define también el orden de la leyenda.
+        :return: Un objeto Figure de Plotly, o None si data está vacío.
+        """
+        if data.empty:
+            return None
+
+        serializer = GeoJSONSerializer(precision = config.precision_coordenadas,
+                                       omitir_cierre = False)
+        categorias = data[config.columna_metrica].astype(str)
+
+        fig = px.choropleth_mapbox(
+            data_frame = data.assign(**{config.columna_metrica: categorias}),
+            geojson = serializer.serializar_dict(data),
+            locations = data.index,
+            color = config.columna_metrica,
+            color_discrete_map = colores,
+            category_orders = {config.columna_metrica: list(colores)},
+            mapbox_style = config.mapbox_style,
+            zoom = config.zoom,
+            center = {"lat": config.latitud_centro,
+                      "lon": config.longitud_centro},
+            opacity = 0.7,
+            hover_name = config.nombre_hover \
+                            if config.nombre_hover \
+                                else config.columna_metrica,
+            hover_data = {col: True \
+                          for col in config.hover_columns \
+                            if col in data.columns}
+        )
+
+        fig.update_layout(
+            title={
+                'text': config.titulo,
+                'y':0.95,
+                'x':0.5,
+                'xanchor': 'center',
+                'yanchor': 'top'
+            },
+            margin={"r":0, "t":50, "l":0, "b":0},
+            legend_title_text = config.titulo_colorbar
+        )
 
         return fig
 
+    @staticmethod
+    def generar_mapa_animado(unidades: GeoDataFrame,
+                             valores: np.ndarray,
+                             anios: List[int],
+                             config: MapVisualizationConfig) -> Optional[Any]:
+        """
+        Genera un mapa coroplético con un cuadro por año y un slider que los
+        recorre en el navegador, o None si no hay unidades.
+
+        El GeoJSON va una sola vez en la traza base; cada cuadro solo trae
+        el vector `z` del año (columna de `valores`), así que mover el
+        slider no vuelve a pedir ni a enviar geometrías.
+
+        :param unidades: Una fila por unidad (EPSG:4326).
+        :param valores: Matriz (unidades x años) de la métrica.
+        :param anios: Año de cada columna de `valores`.
+        :param config: Parámetros de configuración de la visualización
+        """
+        if unidades.empty or not len(anios):
+            return None
+
+        serializer = GeoJSONSerializer(precision = config.precision_coordenadas,
+                                       omitir_cierre = False)
+        valores = valores.astype("float32")
+        finitos = valores[np.isfinite(valores)]
+        rango = config.rango_color or ((float(finitos.min()), float(finitos.max()))
+                                       if finitos.size else (0.0, 1.0))
+        etiquetas = unidades[config.nombre_hover].astype(str).to_numpy() \
+            if config.nombre_hover in unidades.columns else unidades.index.astype(str).to_numpy()
+        hovertemplate = "%{text}<br>" + config.columna_metrica + ": %{z:,.2f}<extra></extra>"
+        nombres = [str(anio) for anio in anios]
+
+        fig = go.Figure(
+            data = [go.Choroplethmapbox(
+                geojson = serializer.serializar_dict(unidades),
+                locations = unidades.index.astype(str),
+                z = valores[:, 0],
+                text = etiquetas,
+                hovertemplate = hovertemplate,
+                colorscale = config.esquema_color,
+                zmin = rango[0],
+                zmax = rango[1],
+                marker_opacity = 0.7,
+                marker_line_width = 0.5,
+                colorbar = dict(title = config.titulo_colorbar)
+            )],
+            frames = [go.Frame(name = nombre, data = [go.Choroplethmapbox(z = valores[:, k])], traces = [0])
+                      for k, nombre in enumerate(nombres)]
+        )
+
+        animar = dict(frame = dict(duration = 700, redraw = True),
+                      transition = dict(duration = 0), mode = "immediate")
+        fig.update_layout(
+            title = {'text': config.titulo, 'y': 0.95, 'x': 0.5,
+                     'xanchor': 'center', 'yanchor': 'top'},
+            margin = {"r": 0, "t": 50, "l": 0, "b": 0},
+            mapbox = dict(style = config.mapbox_style, zoom = config.zoom,
+                          center = {"lat": config.latitud_centro,
+                                    "lon": config.longitud_centro}),
+            updatemenus = [dict(
+                type = "buttons", showactive = False, x = 0.05, y = 0.05,
+                buttons = [dict(label = "▶", method = "animate", args = [None, dict(animar, fromcurrent = True)]),
+                           dict(label = "❚❚", method = "animate",
+                                args = [[None], dict(animar, frame = dict(duration = 0, redraw = False))])]
+            )],
+            sliders = [dict(
+                active = 0, x = 0.15, y = 0.05, len = 0.8,
+                currentvalue = dict(prefix = "Año: "),
+                steps = [dict(label = nombre, method = "animate",
+                              args = [[nombre], dict(animar, frame = dict(duration = 0, redraw = True))])
+                         for nombre in nombres]
+            )]
+        )
+        return fig
+
+    @staticmethod
+    def generar_mapa_clusters(clusters: pd.DataFrame, config: MapVisualizationConfig) -> Optional[Any]:
+        """
+        Genera un mapa de puntos agrupados (salida de
+        ResultadoClusters.a_dataframe()): cada cluster es un círculo de
+        tamaño proporcional a su conteo, o None si no hay elementos.
+
+        :param clusters: Columnas lon, lat, conteo y es_cluster.
+        :param config: Parámetros de configuración de la visualización
+        :return: Un objeto Figure de Plotly, o None si clusters está vacío.
+        """
+        if clusters.empty:
+            return None
+
+        fig = px.scatter_mapbox(
+            data_frame = clusters,
+            lat = "lat",
+            lon = "lon",
+            size = np.sqrt(clusters["conteo"].to_numpy(dtype = "float64")),
+            size_max = 30,
+            color = "conteo",
+            color_continuous_scale = config.esquema_color,
+            mapbox_style = config.mapbox_style,
+            zoom = config.zoom,
+            center = {"lat": config.latitud_centro,
+                      "lon": config.longitud_centro},
+            opacity = 0.8,
+            hover_data = {"conteo": True, "lat": False, "lon": False}
+        )
+
+        fig.update_layout(
+            title={
+                'text': config.titulo,
+                'y':0.95,
+                'x':0.5,
+                'xanchor': 'center',
+                'yanchor': 'top'
+            },
+            margin={"r":0, "t":50, "l":0, "b":0},
+            coloraxis_colorbar = dict(title = config.titulo_colorbar \
+                                              if config.titulo_colorbar \
+                                              else "conteo")
+        )
+
+        return fig
+
+    @staticmethod
+    def generar_histograma(bordes: np.ndarray,
+                           conteos: np.ndarray,
+                           titulo: str,
+                           etiqueta_x: str,
+                           rango: Optional[List[float]] = None) -> Optional[Any]:
+        """
+        Genera el histograma de una selección (bosquejo de cuantiles del
+        crossfilter): una barra por cubeta, con su ancho real. La figura
+        queda en modo de selección por rango para filtrar el mapa.
+
+        :param bordes: Bordes de las cubetas (len(conteos) + 1).
+        :param conteos: Elementos por cubeta.
+        :param rango: [min, max] marcado previamente (se sombrea).
+        :return: Un objeto Figure de Plotly, o None si no hay cubetas.
+        """
+        if len(conteos) == 0:
+            return None
+
+        bordes = np.asarray(bordes, dtype = "float64")
+        anchos = np.diff(bordes)
+        fig = px.bar(
+            x = bordes[:-1] + anchos / 2,
+            y = conteos,
+            labels = {"x": etiqueta_x, "y": "Elementos"}
+        )
+        fig.update_traces(width = np.where(anchos > 0, anchos, 1e-9),
+                          marker_line_width = 0)
+
+        fig.update_layout(
+            title={
+                'text': titulo,
+                'y':0.95,
+                'x':0.5,
+                'xanchor': 'center',
+                'yanchor': 'top'
+            },
+            margin={"r":0, "t":50, "l":0, "b":0},
+            dragmode = "select",
+            selectdirection = "h",
+            bargap = 0
+        )
+        if rango is not None:
+            fig.add_vrect(x0 = rango[0], x1 = rango[1], fillcolor = "orange",
+                          opacity = 0.2, line_width = 0)
+
+        return fig
+
+    @staticmethod
+    def _escala_discreta(esquema: str, num_clases: int) -> List[List[Any]]:
+        """
+        Convierte una escala continua de Plotly en una escalonada de
+        `num_clases` colores, para usarla con índices de clase 0..n-1.
+        """
+        colores = px.colors.sample_colorscale(
+            px.colors.get_colorscale(esquema),
+            [i / max(num_clases - 1, 1) for i in range(num_clases)]
+        )
+        escala = []
+        for i, color in enumerate(colores):
+            escala.append([i / num_clases, color])
+            escala.append([(i + 1) / num_clases, color])
+        return escala
+
     @staticmethod
     def _crear_hovertemplate(hover_columns: List[str], nombre_hover: Optional[str]) -> str:
         """
@@ -122,15 +400,21 @@ class LeafletMapGenerator:
         if data.empty or config.columna_metrica not in data.columns:
             return None
 
-        # Convertir el GeoDataFrame a GeoJSON
-        # dash-leaflet trabaja directamente con geojson para pintar polígonos.
-        geojson_data = json.loads(data.to_json())
+        # Convertir el GeoDataFrame a GeoJSON compacto
+        # dash-leaflet trabaja directamente con geojson para pintar polígonos;
+        # solo se envían las propiedades que usa el estilo y el tooltip.
+        propiedades = [config.columna_metrica] + [
+            c for c in config.hover_columns if c != config.columna_metrica
+        ]
+        serializer = GeoJSONSerializer(precision = config.precision_coordenadas)
+        geojson_data = serializer.serializar_dict(data, propiedades)
 
         # O podemos aplicar una escala de colores en Python, según la métrica.
-        # Por ejemplo, asignar una escala con base en min-max.
+        # Con cortes de clase se usa la clase; si no, una escala min-max.
         valores = data[config.columna_metrica]
         vmin, vmax = valores.min(), valores.max()
         rango = vmax - vmin if vmax != vmin else 1
+        num_clases = len(config.cortes) - 1 if config.cortes is not None else 0
 
         # En Leaflet, se puede usar "style" a nivel de Feature. 
         # Creamos un diccionario con la propiedad "style" que devuelva color según la métrica.
@@ -139,7 +423,11 @@ class LeafletMapGenerator:
             # Obtenemos la métrica del feature
             prop_val = feature["properties"].get(config.columna_metrica, 0)
             # Normalizamos y asignamos un color
-            intensidad = (prop_val - vmin) / rango
+            if num_clases > 1:
+                clase = asignar_clases([prop_val], config.cortes)[0]
+                intensidad = max(clase, 0) / (num_clases - 1)
+            else:
+                intensidad = (prop_val - vmin) / rango
             # Por ejemplo, un degrade de azul a rojo
             r = int(intensidad * 255)
             g = 0
@@ -176,4 +464,3 @@ class LeafletMapGenerator:
         )
 
         return leaflet_map
-
@@ -0,0 +1,205 @@
+# figures/geojson_serializer.py
+
+"""
+Serializa GeoDataFrames a un GeoJSON compacto para enviarlo al navegador.
+
+A diferencia de `__geo_interface__` o `to_json()`, aquí:
+- Las coordenadas se redondean a una precisión configurable.
+- Se eliminan vértices consecutivos que colapsan tras el redondeo y,
+  opcionalmente, el punto que cierra cada anillo.
+- Solo se incluyen las propiedades que la vista necesita.
+- El texto se arma directamente desde los buffers de coordenadas
+  (shapely.to_ragged_array), sin construir un dict por vértice (solo
+  `serializar`; `serializar_dict` sí lo arma, ver su docstring). Si las
+  geometrías ya están en formato columnar (RaggedGeometryArray), se usan
+  sus buffers sin pasar por shapely.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from geopandas import GeoDataFrame
+
+logger = logging.getLogger(__name__)
+
+_SEPARADORES = (",", ":")
+
+
+class GeoJSONSerializer:
+    """
+    SRP: convertir geometrías + propiedades seleccionadas en bytes GeoJSON.
+    Las geometrías deben venir en EPSG:4326 (no se reproyecta aquí).
+    """
+
+    def __init__(self, precision: int = 5, omitir_cierre: bool = True) -> None:
+        """
+        :param precision: Decimales a conservar (5 ≈ 1.1 m, 6 ≈ 0.11 m).
+        :param omitir_cierre: Si es True, no se escribe el último punto de
+                              cada anillo (igual al primero). Leaflet cierra
+                              los anillos por sí mismo; Mapbox/Plotly no.
+        """
+        self.precision: int = precision
+        self.omitir_cierre: bool = omitir_cierre
+
+    def serializar(self,
+                   data: GeoDataFrame,
+                   propiedades: Optional[Sequence[str]] = None,
+                   geometrias: Optional[Any] = None) -> bytes:
+        """
+        Serializa `data` como FeatureCollection.
+
+        :param data: GeoDataFrame en EPSG:4326.
+        :param propiedades: Columnas a incluir en "properties" (None = ninguna).
+        :param geometrias: Geometrías de las filas de `data` en formato
+                           columnar (None = las de data.geometry).
+        :return: GeoJSON codificado en UTF-8.
+        :raises ValueError: Si el tipo de geometría no está soportado.
+        """
+        geometrias = self.serializar_geometrias(data.geometry.values if geometrias is None else geometrias)
+        props = self._serializar_propiedades(data, propiedades or [])
+        ids = [json.dumps(str(i)) for i in data.index]
+
+        features = [
+            f'{{"type":"Feature","id":{fid},"properties":{prop},"geometry":{geom}}}'
+            for fid, prop, geom in zip(ids, props, geometrias)
+        ]
+        texto = '{"type":"FeatureCollection","features":[' + ",".join(features) + "]}"
+        return texto.encode("utf-8")
+
+    def serializar_dict(self,
+                        data: GeoDataFrame,
+                        propiedades: Optional[Sequence[str]] = None,
+                        geometrias: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Igual que `serializar`, pero devuelve un dict. Los renderizadores lo
+        necesitan: Plotly toma un `geojson` de texto como URL y dash-leaflet
+        solo acepta `data` como objeto. Este camino sí arma el dict completo
+        (json.loads sobre el texto compacto), así que no es más barato en
+        CPU que `__geo_interface__`; lo que se gana es el tamaño del
+        GeoJSON enviado (precisión, vértices colapsados, propiedades).
+        """
+        return json.loads(self.serializar(data, propiedades, geometrias))
+
+    def serializar_geometrias(self, geometrias: Any) -> List[str]:
+        """
+        Devuelve el fragmento JSON de cada geometría (o "null" si está vacía).
+
+        :param geometrias: Arreglo de geometrías shapely, o un arreglo
+                           columnar con `a_ragged()` y `vacias`
+                           (data_access/ragged_geometry.py).
+        :return: Lista de strings, uno por geometría.
+        """
+        if hasattr(geometrias, "a_ragged"):
+            tipo, coords, offsets = geometrias.a_ragged()
+            return self.serializar_ragged(tipo, coords, offsets, geometrias.vacias)
+        tipo, coords, offsets = shapely.to_ragged_array(geometrias)
+        vacias = shapely.is_empty(geometrias) | shapely.is_missing(geometrias)
+        return self.serializar_ragged(tipo, coords, offsets, vacias)
+
+    def serializar_ragged(self,
+                          tipo: shapely.GeometryType,
+                          coords: np.ndarray,
+                          offsets: Sequence[np.ndarray],
+                          vacias: np.ndarray) -> List[str]:
+        """
+        Núcleo de serialización sobre buffers planos de coordenadas con sus
+        offsets (formato de `shapely.to_ragged_array`).
+        """
+        if tipo == shapely.GeometryType.POINT:
+            pares = self._formatear_pares(np.round(coords, self.precision))
+            return ["null" if v else f'{{"type":"Point","coordinates":[{p}]}}'
+                    for p, v in zip(pares, vacias)]
+
+        if tipo == shapely.GeometryType.POLYGON:
+            anillo_offsets, poligono_offsets = offsets
+            multi_offsets = np.arange(len(poligono_offsets))
+        elif tipo == shapely.GeometryType.MULTIPOLYGON:
+            anillo_offsets, poligono_offsets, multi_offsets = offsets
+        else:
+            raise ValueError(f"Tipo de geometría no soportado para GeoJSON compacto: {tipo!r}")
+
+        coords, anillo_offsets = self._compactar_anillos(coords, anillo_offsets)
+        pares = self._formatear_pares(coords)
+        anillos = [
+            "[[" + "],[".join(pares[inicio:fin]) + "]]"
+            for inicio, fin in zip(anillo_offsets[:-1], anillo_offsets[1:])
+        ]
+        poligonos = [
+            "[" + ",".join(anillos[inicio:fin]) + "]"
+            for inicio, fin in zip(poligono_offsets[:-1], poligono_offsets[1:])
+        ]
+
+        resultado: List[str] = []
+        for inicio, fin, vacia in zip(multi_offsets[:-1], multi_offsets[1:], vacias):
+            if vacia or fin == inicio:
+                resultado.append("null")
+            elif fin - inicio == 1:
+                resultado.append(f'{{"type":"Polygon","coordinates":{poligonos[inicio]}}}')
+            else:
+                partes = ",".join(poligonos[inicio:fin])
+                resultado.append(f'{{"type":"MultiPolygon","coordinates":[{partes}]}}')
+        return resultado
+
+    def _compactar_anillos(self,
+                           coords: np.ndarray,
+                           anillo_offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Redondea las coordenadas y elimina, por anillo, los vértices repetidos
+        consecutivos y (opcionalmente) el punto de cierre.
+        """
+        coords = np.round(coords, self.precision)
+        if len(coords) == 0:
+            return coords, anillo_offsets
+
+        inicios = anillo_offsets[:-1]
+        conservar = np.ones(len(coords), dtype=bool)
+        conservar[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        conservar[inicios[inicios < len(coords)]] = True
+        coords, anillo_offsets = self._filtrar(coords, anillo_offsets, conservar)
+
+        if self.omitir_cierre:
+            inicios, fines = anillo_offsets[:-1], anillo_offsets[1:]
+            con_cierre = (fines - inicios > 1)
+            con_cierre[con_cierre] = np.all(
+                coords[fines[con_cierre] - 1] == coords[inicios[con_cierre]], axis=1
+            )
+            conservar = np.ones(len(coords), dtype=bool)
+            conservar[fines[con_cierre] - 1] = False
+            coords, anillo_offsets = self._filtrar(coords, anillo_offsets, conservar)
+
+        return coords, anillo_offsets
+
+    @staticmethod
+    def _filtrar(coords: np.ndarray,
+                 anillo_offsets: np.ndarray,
+                 conservar: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        acumulado = np.concatenate([[0], np.cumsum(conservar)])
+        return coords[conservar], acumulado[anillo_offsets]
+
+    @staticmethod
+    def _formatear_pares(coords: np.ndarray) -> List[str]:
+        """
+        Convierte un arreglo (n, 2) en strings "x,y". Se delega el formateo
+        de flotantes a json.dumps (en C) y se parte el texto resultante.
+        """
+        if len(coords) == 0:
+            return []
+        texto = json.dumps(coords[:, :2].tolist(), separators=_SEPARADORES)
+        return texto[2:-2].split("],[")
+
+    @staticmethod
+    def _serializar_propiedades(data: GeoDataFrame, propiedades: Sequence[str]) -> List[str]:
+        columnas = [c for c in propiedades if c in data.columns and c != data.geometry.name]
+        if not columnas or data.empty:
+            return ["{}"] * len(data)
+
+        registros = pd.DataFrame(data[columnas]).to_json(
+            orient="records", lines=True, force_ascii=False
+        )
+        # JSON-lines escapa los saltos de línea dentro de los textos, pero
+        # splitlines() también cortaría en U+2028, U+2029 o \x85 de un valor
+        return registros.rstrip("\n").split("\n")
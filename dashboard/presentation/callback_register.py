@@ -2,13 +2,18 @@ import logging
 import random
 from typing import Optional
 
-from dash import Dash, html, dcc, Input, Output
+from dash import Dash, html, dcc, ctx, no_update, Input, Output, Patch, State
+import numpy as np
+import pandas as pd
 from services.data_service import DataService
 
 from domain.domain_models import (
     DashboardFilters,
     MapVisualizationConfig,
-    AVAILABLE_COLOR_SCHEMES
+    PredicadoFiltro,
+    AVAILABLE_COLOR_SCHEMES,
+    COLORES_CAMBIO,
+    COLORES_LISA
 )
 
 from figures.figures_utils import FiguresGenerator
@@ -22,7 +27,14 @@ class CallbackRegister:
     Clase encargada de registrar todos los callbacks de la aplicación.
     - Navegación entre páginas
     - Actualización de dropdown de métricas
+    - Filtro por atributo (columna categórica y valores)
+    - Filtrado cruzado entre el mapa y el histograma
     - Generación de mapas
+    - Hot spots (I de Moran global y clusters LISA)
+    - Comparación entre años (diferencias y animación)
+    - Calidad del aire interpolada de las estaciones (/ambientales)
+    - Puntos agrupados por zoom según la vista del mapa
+    - Mapa de cambios de uso de suelo
     """
 
     def __init__(self, data_service: DataService, page_builder: LayoutBuilder) -> None:
@@ -39,7 +51,14 @@ class CallbackRegister:
         """
         self._register_page_callback(app)
         self._register_metrica_callback(app)
+        self._register_filtro_callbacks(app)
         self._register_map_callback(app)
+        self._register_crossfilter_callbacks(app)
+        self._register_hotspots_callback(app)
+        self._register_comparacion_callback(app)
+        self._register_estaciones_callback(app)
+        self._register_clusters_callback(app)
+        self._register_cambios_callback(app)
 
     def _register_page_callback(self, app: Dash) -> None:
         """
@@ -77,7 +96,16 @@ class CallbackRegister:
             elif pathname == "/ambientales":
                 anios = self.data_service\
                     .obtener_anios_disponibles("ambientales")
-                return self.page_builder.create_ambientales_page(anios)
+                return self.page_builder.create_ambientales_page(
+                    anios,
+                    self.data_service.contaminantes_estaciones(),
+                    self.data_service.meses_estaciones()
+                )
+
+            elif pathname == "/cambios-uso-suelo":
+                cambios = self.data_service.obtener_cambios_uso_suelo()
+                resumen = cambios["tipo_cambio"].value_counts().to_dict() if not cambios.empty else {}
+                return self.page_builder.create_cambios_uso_suelo_page(resumen)
             
             else:
                 return html.Div([
@@ -100,22 +128,31 @@ class CallbackRegister:
         )
         def actualizar_opciones_metrica(anio: Optional[int], gran: str, pathname: str):
             dataset_key = self._parse_dataset_key(pathname)
-            gdf = self.data_service.datasets.get(dataset_key)
-            if gdf is None or gdf.empty:
-                logger.warning(f"Dataset '{dataset_key}' vacío o inexistente.")
-                return []
-
-            if anio and "anio" in gdf.columns:
-                gdf = gdf[gdf["anio"] == anio]
-
-            # Filtrar columnas numéricas
-            numeric_cols = [
-                c for c in gdf.columns
-                if c not in ("geometry", "anio") and \
-                    gdf[c].dtype.kind in ["i", "f"]
-            ]
-            return [{"label": c.replace("_", " ").capitalize(), "value": c}\
-                     for c in numeric_cols]
+            # Columnas numéricas nativas + métricas derivadas registradas
+            return self.data_service.obtener_metricas_disponibles(dataset_key, anio, gran)
+
+    def _register_filtro_callbacks(self, app: Dash) -> None:
+        """
+        Callbacks para llenar los dropdowns del filtro por atributo según el
+        dataset (pathname) y la columna elegida.
+        """
+
+        @app.callback(
+            Output("filtro-columna", "options"),
+            [Input("url", "pathname")]
+        )
+        def actualizar_columnas_filtro(pathname: str):
+            dataset_key = self._parse_dataset_key(pathname)
+            return self.data_service.obtener_opciones_filtro(dataset_key)
+
+        @app.callback(
+            Output("filtro-valores", "options"),
+            [Input("filtro-columna", "value"),
+             Input("url", "pathname")]
+        )
+        def actualizar_valores_filtro(columna: Optional[str], pathname: str):
+            dataset_key = self._parse_dataset_key(pathname)
+            return self.data_service.obtener_valores_filtro(dataset_key, columna)
 
     def _register_map_callback(self, app: Dash) -> None:
         """
@@ -128,21 +165,23 @@ class CallbackRegister:
             [Input("anio", "value"), 
              Input("granularidad", "value"), 
              Input("metrica", "value"), 
-             Input("url", "pathname")]
+             Input("url", "pathname"),
+             Input("clasificacion", "value"),
+             Input("filtro-columna", "value"),
+             Input("filtro-valores", "value")]
         )
-        def actualizar_mapa(anio: Optional[int], gran: str, metrica: Optional[str], pathname: str):
+        def actualizar_mapa(anio: Optional[int], gran: str, metrica: Optional[str], pathname: str,
+                            clasificacion: Optional[str] = "cuantiles",
+                            filtro_columna: Optional[str] = None,
+                            filtro_valores: Optional[list] = None):
             if not metrica:
                 return html.Div("Seleccione una métrica para visualizar el mapa.")
 
             dataset_key = self._parse_dataset_key(pathname)
 
             # Llenamos un objeto DashboardFilters
-            filters = DashboardFilters(
-                type_data = dataset_key,
-                anio = anio,
-                granularidad = gran,
-                metrica = metrica
-            )
+            filters = self._crear_filtros(dataset_key, anio, gran, metrica,
+                                          filtro_columna, filtro_valores)
 
             gdf_filtrado = self.data_service.obtener_datos_filtrados(dataset_key, filters)
 
@@ -153,33 +192,371 @@ class CallbackRegister:
             titulo = f"Distribución de {metrica} del {anio} por {gran} en Coyoacán"
 
             # Determinamos columnas para hover
-            hover_cols = [
-                c for c in gdf_filtrado.columns
-                if c not in ("geometry", "anio") and gdf_filtrado[c].dtype.kind in ["i", "f"]
-            ]
+            hover_cols = self.data_service.columnas_numericas(gdf_filtrado)
             # Agregamos cualquier columna adicional definida en el dataclass
-            hover_cols += filters.tooltip_cols
+            hover_cols += [c for c in filters.tooltip_cols if c in gdf_filtrado.columns]
 
             # Seleccionamos aleatoriamente un esquema de color
             esquema_color_seleccionado = random.choice(AVAILABLE_COLOR_SCHEMES)
 
+            # Cortes de clase compartidos (cacheados en el DataService)
+            cortes = None
+            if clasificacion and clasificacion != "continua":
+                cortes = self.data_service.obtener_cortes(dataset_key, filters, clasificacion)
+
             # Creamos la configuración para el mapa
             map_config = MapVisualizationConfig(
                 titulo = titulo,
                 columna_metrica = metrica,
                 titulo_colorbar = dataset_key,
                 hover_columns = hover_cols,
-                esquema_color = esquema_color_seleccionado
+                esquema_color = esquema_color_seleccionado,
+                cortes = cortes
             )
 
-            figura = FiguresGenerator.generar_mapa_coropletico(gdf_filtrado, map_config)
+            # Polígonos de datasets con varios años: buffers columnares, sin shapely
+            geometrias = self.data_service.geometrias_columnares(dataset_key, filters, gdf_filtrado)
+            figura = FiguresGenerator.generar_mapa_coropletico(gdf_filtrado, map_config, geometrias)
             if figura is None:
                 return html.Div("Mapa no disponible (datos vacíos).")
 
-            return dcc.Graph(figure = figura, 
+            return dcc.Graph(id = "grafica-mapa",
+                             figure = figura, 
                              style = {'width': '100%', 
                                       'height': '800px'})
 
+    def _register_hotspots_callback(self, app: Dash) -> None:
+        """
+        Callback para el panel de hot spots: I de Moran global y mapa de
+        clusters LISA de la métrica con los mismos filtros que el mapa.
+        """
+
+        @app.callback(
+            Output("mapa-hotspots", "children"),
+            [Input("mostrar-hotspots", "value"),
+             Input("anio", "value"),
+             Input("granularidad", "value"),
+             Input("metrica", "value"),
+             Input("url", "pathname"),
+             Input("filtro-columna", "value"),
+             Input("filtro-valores", "value")]
+        )
+        def actualizar_hotspots(mostrar: Optional[list], anio: Optional[int], gran: str,
+                                metrica: Optional[str], pathname: str,
+                                filtro_columna: Optional[str] = None,
+                                filtro_valores: Optional[list] = None):
+            if not mostrar or not metrica:
+                return html.Div()
+
+            dataset_key = self._parse_dataset_key(pathname)
+            filters = self._crear_filtros(dataset_key, anio, gran, metrica,
+                                          filtro_columna, filtro_valores)
+            capa, global_ = self.data_service.calcular_hotspots(dataset_key, filters)
+            if capa.empty or global_ is None:
+                return html.Div("Se necesitan al menos dos unidades con valores distintos para calcular hot spots.")
+
+            # Las unidades sin valor quedan fuera del cálculo
+            capa = capa.assign(lisa_cluster = capa["lisa_cluster"].astype(object).fillna("Sin dato"))
+            map_config = MapVisualizationConfig(
+                titulo = f"Clusters LISA de {metrica} ({anio}, {gran})",
+                columna_metrica = "lisa_cluster",
+                titulo_colorbar = "Cluster",
+                hover_columns = [metrica, "lisa_I", "lisa_p"],
+                esquema_color = "Viridis"
+            )
+            figura = FiguresGenerator.generar_mapa_categorico(capa, map_config,
+                                                              {**COLORES_LISA, "Sin dato": "#ffffff"})
+            return html.Div([
+                html.P(f"I de Moran global: {global_.I:.3f} (esperado {global_.esperado:.3f}, "
+                       f"p = {global_.p_sim:.3f}, {global_.permutaciones} permutaciones)"),
+                dcc.Graph(figure = figura,
+                          style = {'width': '100%',
+                                   'height': '800px'})
+            ])
+
+    def _register_comparacion_callback(self, app: Dash) -> None:
+        """
+        Callback para el mapa de comparación entre años: diferencia o
+        crecimiento entre el año base y el seleccionado (escala divergente
+        centrada en cero), o la animación con un cuadro por año.
+        """
+
+        @app.callback(
+            Output("mapa-comparacion", "children"),
+            [Input("modo-comparacion", "value"),
+             Input("anio-base", "value"),
+             Input("anio", "value"),
+             Input("granularidad", "value"),
+             Input("metrica", "value"),
+             Input("url", "pathname"),
+             Input("filtro-columna", "value"),
+             Input("filtro-valores", "value")]
+        )
+        def actualizar_comparacion(modo: Optional[str], anio_base: Optional[int], anio: Optional[int],
+                                   gran: str, metrica: Optional[str], pathname: str,
+                                   filtro_columna: Optional[str] = None,
+                                   filtro_valores: Optional[list] = None):
+            if not modo or not metrica:
+                return html.Div()
+
+            dataset_key = self._parse_dataset_key(pathname)
+            filters = self._crear_filtros(dataset_key, anio, gran, metrica,
+                                          filtro_columna, filtro_valores)
+
+            if modo == "animacion":
+                serie = self.data_service.obtener_serie_anual(dataset_key, filters)
+                if serie is None or serie.unidades.empty:
+                    return html.Div("No hay datos de varios años para animar.")
+                map_config = MapVisualizationConfig(
+                    titulo = f"{metrica} por año en Coyoacán",
+                    columna_metrica = metrica,
+                    titulo_colorbar = metrica,
+                    hover_columns = [],
+                    esquema_color = "Viridis",
+                    nombre_hover = next((c for c in serie.unidades.columns
+                                         if c != serie.unidades.geometry.name), None)
+                )
+                figura = FiguresGenerator.generar_mapa_animado(serie.unidades, serie.valores,
+                                                               serie.anios.tolist(), map_config)
+            else:
+                if anio_base is None or anio is None or anio_base == anio:
+                    return html.Div("Seleccione un año base distinto del año del mapa.")
+                comparacion = self.data_service.comparar_anios(dataset_key, filters, anio_base)
+                if comparacion.empty:
+                    return html.Div("No se encontraron datos para ambos años.")
+                extremo = float(np.nanmax(np.abs(comparacion[modo].to_numpy(dtype = "float64")), initial = 0.0))
+                map_config = MapVisualizationConfig(
+                    titulo = f"Cambio de {metrica} de {anio_base} a {anio} por {gran}",
+                    columna_metrica = modo,
+                    titulo_colorbar = modo,
+                    hover_columns = [c for c in ("valor_base", "valor_final", "delta", "crecimiento_pct")
+                                     if c != modo],
+                    esquema_color = "RdBu",
+                    rango_color = (-extremo, extremo) if extremo > 0 else None
+                )
+                figura = FiguresGenerator.generar_mapa_coropletico(comparacion, map_config)
+
+            if figura is None:
+                return html.Div("Mapa no disponible (datos vacíos).")
+            return dcc.Graph(figure = figura,
+                             style = {'width': '100%',
+                                      'height': '800px'})
+
+    def _register_estaciones_callback(self, app: Dash) -> None:
+        """
+        Callback para el mapa de calidad del aire: promedio mensual del
+        contaminante en las estaciones, interpolado a las manzanas.
+        """
+
+        @app.callback(
+            Output("mapa-estaciones", "children"),
+            [Input("contaminante-estaciones", "value"),
+             Input("mes-estaciones", "value")]
+        )
+        def actualizar_mapa_estaciones(contaminante: Optional[str], mes: Optional[str]):
+            if not contaminante or not mes:
+                return html.Div()
+
+            inicio = pd.Timestamp(f"{mes}-01")
+            fin = inicio + pd.offsets.MonthBegin(1)
+            capa = self.data_service.interpolar_estaciones(contaminante, inicio, fin)
+            columna = contaminante.lower()
+            if capa.empty or capa[columna].isna().all():
+                return html.Div(f"No hay lecturas de {contaminante.upper()} en {mes}.")
+
+            map_config = MapVisualizationConfig(
+                titulo = f"{contaminante.upper()} promedio de {mes} (interpolado de estaciones)",
+                columna_metrica = columna,
+                titulo_colorbar = contaminante.upper(),
+                hover_columns = ["zona"],
+                esquema_color = "YlOrRd"
+            )
+            figura = FiguresGenerator.generar_mapa_coropletico(capa, map_config)
+            if figura is None:
+                return html.Div("Mapa no disponible (datos vacíos).")
+            return dcc.Graph(figure = figura,
+                             style = {'width': '100%',
+                                      'height': '800px'})
+
+    def _register_clusters_callback(self, app: Dash) -> None:
+        """
+        Callback para el mapa de puntos agrupados: cada vez que se mueve o
+        acerca el mapa (relayoutData) se piden los clusters de la vista.
+        """
+
+        @app.callback(
+            Output("mapa-clusters", "figure"),
+            [Input("mapa-clusters", "relayoutData"),
+             Input("anio", "value"),
+             Input("url", "pathname")]
+        )
+        def actualizar_clusters(vista: Optional[dict], anio: Optional[int], pathname: str):
+            vista = vista or {}
+            # Eventos sin cambio de vista (p. ej. autosize): se conserva el mapa
+            if ctx.triggered_id == "mapa-clusters" and "mapbox.zoom" not in vista:
+                return no_update
+
+            dataset_key = self._parse_dataset_key(pathname)
+            map_config = MapVisualizationConfig(
+                titulo = f"Instalaciones de {dataset_key}",
+                columna_metrica = "conteo",
+                titulo_colorbar = "Puntos",
+                hover_columns = [],
+                esquema_color = "Viridis"
+            )
+            bbox = self._bbox_vista(vista)
+            if "mapbox.zoom" in vista:
+                map_config.zoom = vista["mapbox.zoom"]
+                map_config.longitud_centro = vista["mapbox.center"]["lon"]
+                map_config.latitud_centro = vista["mapbox.center"]["lat"]
+
+            clusters = self.data_service.obtener_clusters(dataset_key, bbox, map_config.zoom, anio)
+            figura = FiguresGenerator.generar_mapa_clusters(clusters.a_dataframe(), map_config)
+            return figura if figura is not None else {}
+
+    @staticmethod
+    def _bbox_vista(vista: dict) -> tuple:
+        """
+        (lon_min, lat_min, lon_max, lat_max) visible según el relayoutData de
+        un mapa de Mapbox (esquinas en "mapbox._derived"); todo el mundo si
+        aún no se ha movido.
+        """
+        esquinas = vista.get("mapbox._derived", {}).get("coordinates")
+        if not esquinas:
+            return (-180.0, -90.0, 180.0, 90.0)
+        lons, lats = zip(*esquinas)
+        return (min(lons), min(lats), max(lons), max(lats))
+
+    def _register_cambios_callback(self, app: Dash) -> None:
+        """
+        Callback para dibujar la capa de cambios de uso de suelo (una
+        categoría por tipo de cambio).
+        """
+
+        @app.callback(
+            Output("mapa-cambios", "children"),
+            Input("url", "pathname")
+        )
+        def actualizar_mapa_cambios(pathname: str):
+            cambios = self.data_service.obtener_cambios_uso_suelo()
+            if pathname != "/cambios-uso-suelo" or cambios.empty:
+                return html.Div()
+
+            map_config = MapVisualizationConfig(
+                titulo = "Cambios de uso de suelo",
+                columna_metrica = "tipo_cambio",
+                hover_columns = ["clase_anterior", "clase_nueva", "id_anterior", "id_nuevo", "iou"],
+                esquema_color = "Viridis"
+            )
+            figura = FiguresGenerator.generar_mapa_categorico(cambios, map_config, COLORES_CAMBIO)
+            return dcc.Graph(figure = figura,
+                             style = {'width': '100%',
+                                      'height': '800px'})
+
+    def _register_crossfilter_callbacks(self, app: Dash) -> None:
+        """
+        Callbacks del filtrado cruzado:
+        - Selección (lazo o caja) en el mapa -> histograma y totales.
+        - Rango marcado en el histograma -> polígonos resaltados en el mapa.
+        """
+        entradas_filtros = [Input("anio", "value"),
+                            Input("granularidad", "value"),
+                            Input("metrica", "value"),
+                            Input("url", "pathname"),
+                            Input("filtro-columna", "value"),
+                            Input("filtro-valores", "value")]
+
+        @app.callback(
+            [Output("histograma-crossfilter", "figure"),
+             Output("totales-crossfilter", "children")],
+            [Input("grafica-mapa", "selectedData")] + entradas_filtros
+        )
+        def actualizar_seleccion(seleccion: Optional[dict], anio: Optional[int], gran: str,
+                                 metrica: Optional[str], pathname: str,
+                                 filtro_columna: Optional[str] = None,
+                                 filtro_valores: Optional[list] = None):
+            if not metrica:
+                return {}, None
+
+            dataset_key = self._parse_dataset_key(pathname)
+            filters = self._crear_filtros(dataset_key, anio, gran, metrica,
+                                          filtro_columna, filtro_valores)
+
+            # Sin selección (o selección borrada) se resume toda la capa
+            posiciones = None
+            if seleccion and seleccion.get("points") is not None:
+                posiciones = [p["pointIndex"] for p in seleccion["points"] if "pointIndex" in p]
+
+            resumen = self.data_service.actualizar_seleccion(dataset_key, filters, posiciones)
+            if resumen is None:
+                return {}, html.Div("No hay datos para la selección.")
+
+            histograma = self.data_service.histograma_seleccion(dataset_key, filters)
+            figura = None
+            if histograma is not None:
+                seleccionados = "toda la capa" if posiciones is None else f"{len(posiciones)} seleccionados"
+                figura = FiguresGenerator.generar_histograma(
+                    *histograma,
+                    titulo = f"{metrica} ({seleccionados})",
+                    etiqueta_x = metrica
+                )
+            return figura if figura is not None else {}, self._tabla_resumen(resumen)
+
+        @app.callback(
+            Output("grafica-mapa", "figure"),
+            [Input("histograma-crossfilter", "selectedData")],
+            [State(entrada.component_id, entrada.component_property) for entrada in entradas_filtros]
+        )
+        def resaltar_rango(rango: Optional[dict], anio: Optional[int], gran: str,
+                           metrica: Optional[str], pathname: str,
+                           filtro_columna: Optional[str] = None,
+                           filtro_valores: Optional[list] = None):
+            parche = Patch()
+            if not metrica or not rango or "range" not in rango:
+                parche["data"][0]["selectedpoints"] = None
+                return parche
+
+            dataset_key = self._parse_dataset_key(pathname)
+            filters = self._crear_filtros(dataset_key, anio, gran, metrica,
+                                          filtro_columna, filtro_valores)
+            minimo, maximo = rango["range"]["x"]
+            parche["data"][0]["selectedpoints"] = self.data_service.posiciones_en_rango(
+                dataset_key, filters, minimo, maximo
+            )
+            return parche
+
+    @staticmethod
+    def _tabla_resumen(resumen: pd.DataFrame) -> html.Table:
+        """Tabla HTML con el resumen por métrica de la selección."""
+        columnas = ["metrica"] + list(resumen.columns)
+        filas = [
+            html.Tr([html.Td(metrica)] + [html.Td(f"{valor:,.2f}") for valor in fila])
+            for metrica, fila in zip(resumen.index, resumen.to_numpy())
+        ]
+        return html.Table([html.Thead(html.Tr([html.Th(c) for c in columnas])),
+                           html.Tbody(filas)],
+                          className = "table table-sm")
+
+    @staticmethod
+    def _crear_filtros(dataset_key: str,
+                       anio: Optional[int],
+                       gran: str,
+                       metrica: Optional[str],
+                       filtro_columna: Optional[str] = None,
+                       filtro_valores: Optional[list] = None) -> DashboardFilters:
+        """
+        DashboardFilters a partir de los dropdowns (el filtro por atributo
+        solo aplica si hay columna y al menos un valor).
+        """
+        return DashboardFilters(
+            type_data = dataset_key,
+            anio = anio,
+            granularidad = gran,
+            metrica = metrica,
+            predicados = [PredicadoFiltro.en(filtro_columna, filtro_valores)]
+                         if filtro_columna and filtro_valores else []
+        )
+
     def _parse_dataset_key(self, pathname: str) -> str:
         """
         Determina la clave del dataset según el pathname.
@@ -1,7 +1,10 @@
 from dash import html, dcc
-from typing import List
+from typing import Dict, List, Optional
 import dash_bootstrap_components as dbc
 
+from domain.domain_models import GRANULARIDADES_HEX
+from figures.classification import METODOS_CLASIFICACION
+
 class LayoutBuilder:
     """
     Clase encargada de construir el layout principal de la aplicación:
@@ -41,7 +44,8 @@ class LayoutBuilder:
                     dbc.NavLink("Edafológicos", href="/edafologia", active="exact"),
                     dbc.NavLink("Electorales", href="/electorales", active="exact"),
                     dbc.NavLink("Servicios", href="/servicios", active="exact"),
-                    dbc.NavLink("Ambientales", href="/ambientales", active="exact")
+                    dbc.NavLink("Ambientales", href="/ambientales", active="exact"),
+                    dbc.NavLink("Cambios de uso de suelo", href="/cambios-uso-suelo", active="exact")
                 ],
                 vertical=True,
                 pills=True,
@@ -60,42 +64,178 @@ class LayoutBuilder:
         return html.Div([
             html.H3("Rubro: Tablero de Demográfico"),
             self.create_filter_row(anios),
-            html.Div(id="mapa-demograficos")
+            html.Div(id="mapa-demograficos"),
+            self.create_crossfilter_panel(),
+            self.create_hotspots_panel(),
+            self.create_comparison_panel(anios)
         ])
 
     def create_edafologicos_page(self, anios: List[int]) -> html.Div:
         return html.Div([
             html.H3("Rubro: Tablero de Edafológico"),
             self.create_filter_row(anios),
-            html.Div(id="mapa-demograficos")
+            html.Div(id="mapa-demograficos"),
+            self.create_crossfilter_panel(),
+            self.create_hotspots_panel(),
+            self.create_comparison_panel(anios)
         ])
 
     def create_electorales_page(self, anios: List[int]) -> html.Div:
         return html.Div([
             html.H3("Rubro: Tablero Electoral"),
             self.create_filter_row(anios),
-            html.Div(id="mapa-demograficos")
+            html.Div(id="mapa-demograficos"),
+            self.create_crossfilter_panel(),
+            self.create_hotspots_panel(),
+            self.create_comparison_panel(anios)
         ])
 
     def create_servicios_page(self, anios: List[int]) -> html.Div:
         return html.Div([
             html.H3("Rubro: Tablero de Servicios"),
             self.create_filter_row(anios),
-            html.Div(id="mapa-demograficos")
+            html.Div(id="mapa-demograficos"),
+            self.create_crossfilter_panel(),
+            self.create_hotspots_panel(),
+            self.create_comparison_panel(anios),
+            self.create_clusters_panel()
         ])
 
-    def create_ambientales_page(self, anios: List[int]) -> html.Div:
+    def create_cambios_uso_suelo_page(self, resumen: Dict[str, int]) -> html.Div:
+        """
+        Página de cambios entre versiones de uso de suelo: conteo por tipo
+        de cambio y el mapa (lo llena el callback de "mapa-cambios").
+        """
+        return html.Div([
+            html.H3("Cambios de uso de suelo entre versiones"),
+            html.Ul([html.Li(f"{tipo}: {conteo}") for tipo, conteo in resumen.items()])
+            if resumen else html.P("No hay una comparación de versiones cargada."),
+            html.Div(id="mapa-cambios")
+        ])
+
+    def create_ambientales_page(self,
+                                anios: List[int],
+                                contaminantes: Optional[List[str]] = None,
+                                meses: Optional[List[str]] = None) -> html.Div:
         return html.Div([
             html.H3("Rubro: Tablero Ambiental"),
             self.create_filter_row(anios),
-            html.Div(id="mapa-demograficos")
+            html.Div(id="mapa-demograficos"),
+            self.create_crossfilter_panel(),
+            self.create_hotspots_panel(),
+            self.create_comparison_panel(anios),
+            self.create_estaciones_panel(contaminantes or [], meses or [])
         ])
 
-    def create_filter_row(self, anios: List[int]) -> html.Div:
+    def create_estaciones_panel(self, contaminantes: List[str], meses: List[str]) -> html.Div:
+        """
+        Crea el panel de calidad del aire: contaminante y mes a promediar en
+        las estaciones de monitoreo e interpolar a las manzanas.
+        """
+        return html.Div([
+            html.Div([
+                html.Div([
+                    html.Label("Contaminante (estaciones):"),
+                    dcc.Dropdown(
+                        id="contaminante-estaciones",
+                        options=[{"label": c.upper(), "value": c} for c in contaminantes],
+                        value=None,
+                        placeholder="Sin estaciones" if not contaminantes else "Seleccione"
+                    )
+                ], style={"width": "20%", "display": "inline-block", "marginRight": "10px"}),
+
+                html.Div([
+                    html.Label("Mes:"),
+                    dcc.Dropdown(
+                        id="mes-estaciones",
+                        options=[{"label": m, "value": m} for m in meses],
+                        value=meses[-1] if meses else None
+                    )
+                ], style={"width": "20%", "display": "inline-block"})
+            ], style={"display": "flex", "flexDirection": "row"}),
+            html.Div(id="mapa-estaciones")
+        ], style={"marginTop": "10px"})
+
+    def create_crossfilter_panel(self) -> html.Div:
+        """
+        Crea el panel de filtrado cruzado: histograma de la métrica para la
+        selección (lazo) del mapa y tabla de totales. Marcar un rango en el
+        histograma resalta los polígonos correspondientes.
+        """
+        return html.Div([
+            html.Div([
+                dcc.Graph(id="histograma-crossfilter", style={"height": "350px"})
+            ], style={"width": "55%", "display": "inline-block", "marginRight": "10px"}),
+
+            html.Div(id="totales-crossfilter",
+                     style={"width": "45%", "display": "inline-block", "overflowX": "auto"})
+        ], style={"display": "flex", "flexDirection": "row", "marginTop": "10px"})
+
+    def create_hotspots_panel(self) -> html.Div:
+        """
+        Crea el panel de autocorrelación espacial: al activarlo se muestran
+        el I de Moran global y el mapa de clusters LISA de la métrica.
+        """
+        return html.Div([
+            dcc.Checklist(
+                id="mostrar-hotspots",
+                options=[{"label": " Hot spots (I de Moran / LISA)", "value": "lisa"}],
+                value=[]
+            ),
+            html.Div(id="mapa-hotspots")
+        ], style={"marginTop": "10px"})
+
+    def create_clusters_panel(self) -> html.Div:
+        """
+        Crea el mapa de puntos agrupados: al mover o acercar el mapa, los
+        clusters se recalculan para la vista.
+        """
+        return html.Div([
+            html.Label("Instalaciones (agrupadas según el zoom):"),
+            dcc.Graph(id="mapa-clusters", style={"width": "100%", "height": "600px"})
+        ], style={"marginTop": "10px"})
+
+    def create_comparison_panel(self, anios: List[int]) -> html.Div:
         """
-        Crea los dropdowns de Año, Granularidad y Métrica en una sola fila.
+        Crea el panel de comparación entre años: diferencia o crecimiento
+        de la métrica entre el año base y el año seleccionado arriba, o la
+        animación de todos los años (el slider corre en el navegador).
         """
         return html.Div([
+            html.Div([
+                html.Div([
+                    html.Label("Comparar años:"),
+                    dcc.Dropdown(
+                        id="modo-comparacion",
+                        options=[
+                            {"label": "Diferencia", "value": "delta"},
+                            {"label": "Crecimiento (%)", "value": "crecimiento_pct"},
+                            {"label": "Crecimiento anual (%)", "value": "crecimiento_anual_pct"},
+                            {"label": "Animación por año", "value": "animacion"}
+                        ],
+                        value=None,
+                        placeholder="Sin comparación"
+                    )
+                ], style={"width": "20%", "display": "inline-block", "marginRight": "10px"}),
+
+                html.Div([
+                    html.Label("Año base:"),
+                    dcc.Dropdown(
+                        id="anio-base",
+                        options=[{"label": str(a), "value": a} for a in anios],
+                        value=anios[0] if anios else None
+                    )
+                ], style={"width": "20%", "display": "inline-block"})
+            ], style={"display": "flex", "flexDirection": "row"}),
+            html.Div(id="mapa-comparacion")
+        ], style={"marginTop": "10px"})
+
+    def create_filter_row(self, anios: List[int]) -> html.Div:
+        """
+        Crea los dropdowns de Año, Granularidad, Métrica y Clasificación
+        en una sola fila, y debajo la fila de filtros por atributo.
+        """
+        return html.Div([html.Div([
             html.Div([
                 html.Label("Año:"),
                 dcc.Dropdown(
@@ -111,7 +251,13 @@ class LayoutBuilder:
                     id="granularidad",
                     options=[
                         {"label": "Colonia", "value": "colonia"},
-                        {"label": "AGEB", "value": "ageb"}
+                        {"label": "AGEB", "value": "ageb"},
+                        {"label": "Manzana (dasimétrico)", "value": "manzana"},
+                        {"label": "Sección electoral", "value": "seccion"},
+                        {"label": "Zona de análisis", "value": "region"}
+                    ] + [
+                        {"label": etiqueta, "value": valor}
+                        for valor, (_, etiqueta) in GRANULARIDADES_HEX.items()
                     ],
                     value="colonia"
                 )
@@ -123,5 +269,44 @@ class LayoutBuilder:
                     id="metrica",
                     value=None
                 )
+            ], style={"width": "20%", "display": "inline-block", "marginRight": "10px"}),
+
+            html.Div([
+                html.Label("Clasificación:"),
+                dcc.Dropdown(
+                    id="clasificacion",
+                    options=[{"label": "Escala continua", "value": "continua"}] + [
+                        {"label": etiqueta, "value": metodo}
+                        for metodo, etiqueta in METODOS_CLASIFICACION.items()
+                    ],
+                    value="cuantiles",
+                    clearable=False
+                )
             ], style={"width": "20%", "display": "inline-block"})
-        ], style={"display": "flex", "flexDirection": "row"})
+        ], style={"display": "flex", "flexDirection": "row"}),
+            self.create_attribute_filter_row()
+        ])
+
+    def create_attribute_filter_row(self) -> html.Div:
+        """
+        Crea los dropdowns del filtro por atributo: columna categórica
+        (uso de suelo, colonia, alcaldía...) y los valores a conservar.
+        """
+        return html.Div([
+            html.Div([
+                html.Label("Filtrar por:"),
+                dcc.Dropdown(
+                    id="filtro-columna",
+                    value=None
+                )
+            ], style={"width": "20%", "display": "inline-block", "marginRight": "10px"}),
+
+            html.Div([
+                html.Label("Valores:"),
+                dcc.Dropdown(
+                    id="filtro-valores",
+                    multi=True,
+                    value=[]
+                )
+            ], style={"width": "40%", "display": "inline-block"})
+        ], style={"display": "flex", "flexDirection": "row", "marginTop": "10px"})
@@ -7,13 +7,58 @@ a la capa de presentación.
 """
 
 import logging
+from dataclasses import replace
+import numpy as np
+import pandas as pd
 import geopandas as gpd
 from geopandas import GeoDataFrame
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-from data_access.data_loader import PostgresGeoDataLoader
+from analysis.accessibility import AccessibilityEngine
+from analysis.areal_interpolation import ArealInterpolator
+from analysis.artifact_cache import ArtifactCache
+from analysis.crossfilter import CrossfilterEngine, EstadoSeleccion
+from analysis.dasymetric import DasymetricEngine, capa_manzanas
+from analysis.dual_crs import COLUMNA_METRICA, COLUMNAS_GEOMETRICAS, copiar_geometria_dual, preparar_capa
+from analysis.hexbin import HexGridEngine
+from analysis.autocorrelation import MoranGlobal, capa_hotspots, moran_global, sin_nulos, valores_alineados
+from analysis.change_detection import COLUMNA_CAMBIO
+from analysis.point_clusters import PointClusterIndex, ResultadoClusters, indice_de_capa
+from analysis.regionalization import RegionalizationEngine, capa_regiones
+from analysis.spatial_index import IndiceEspacial, SpatialIndexStore
+from analysis.spatial_weights import SpatialWeightsBuilder, geometrias_metricas
+from analysis.station_interpolation import PesosVecinos, StationInterpolator
+from analysis.temporal_comparison import SerieAnual, comparar, serie_anual
+from analysis.zonal_stats import ZonalStatsEngine
+from data_access.data_loader import PostgresGeoDataLoader, TABLAS_DATASET
 from data_access.data_processor import GeoDataProcessor
-from domain.domain_models import DashboardFilters
+from data_access.electoral_store import NIVEL_BASE, ElectoralResultsStore
+from data_access.filter_planner import IndiceBitmap
+from data_access.station_store import StationReadingStore
+from data_access.ragged_geometry import RaggedGeometryArray
+from data_access.unit_store import UnitGeometryStore, es_multianual
+from domain.domain_models import (
+    AccesibilidadConfig,
+    CAPAS_GRANULARIDAD,
+    COLUMNAS_BITMAP,
+    COLUMNAS_ID_MANZANA,
+    COLUMNAS_ID_UNIDAD,
+    COLUMNAS_USO_SUELO,
+    DashboardFilters,
+    GRANULARIDAD_NATIVA,
+    GRANULARIDADES_HEX,
+    HotspotsConfig,
+    InterpolacionEstacionesConfig,
+    METRICAS_DERIVADAS,
+    PREFIJOS_EXTENSIVOS,
+    PERCENTILES_ZONALES,
+    PREFIJOS_USO_RESIDENCIAL,
+    RasterAmbiental,
+    RegionalizacionConfig,
+    TIPOS_SERVICIO
+)
+from figures.classification import BreaksCache
+from services.derived_metrics import DerivedMetricsEngine
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +69,56 @@ class DataService:
     Expuesto a la capa de presentación (Dash).
     """
 
-    def __init__(self, loader: PostgresGeoDataLoader) -> None:
+    def __init__(self,
+                 loader: PostgresGeoDataLoader,
+                 metricas_derivadas: Optional[DerivedMetricsEngine] = None) -> None:
         """
         :param loader: Cargador de datos desde PostgreSQL
+        :param metricas_derivadas: Motor de métricas derivadas
+                                   (por defecto, las de METRICAS_DERIVADAS)
         """
         self.loader: PostgresGeoDataLoader = loader
         self.datasets: Dict[str, GeoDataFrame] = {}
+        # Datasets con varios años: geometría por unidad + atributos por año
+        self.almacenes: Dict[str, UnitGeometryStore] = {}
+        self.metricas_derivadas: DerivedMetricsEngine = metricas_derivadas \
+            if metricas_derivadas is not None \
+            else DerivedMetricsEngine(METRICAS_DERIVADAS)
+        self.pesos_espaciales: SpatialWeightsBuilder = SpatialWeightsBuilder(ArtifactCache())
+        self.cortes: BreaksCache = BreaksCache()
+        self.accesibilidad_config: AccesibilidadConfig = AccesibilidadConfig()
+        self.regionalizacion_config: RegionalizacionConfig = RegionalizacionConfig()
+        self.regionalizador: RegionalizationEngine = RegionalizationEngine(ArtifactCache())
+        self.hotspots_config: HotspotsConfig = HotspotsConfig()
+        self._motores_accesibilidad: Dict[Tuple, AccessibilityEngine] = {}
+        self._capas_accesibilidad: Dict[Tuple, GeoDataFrame] = {}
+        self.dasimetrico: DasymetricEngine = DasymetricEngine(ArtifactCache())
+        self._demograficos_manzana: Dict[Optional[int], GeoDataFrame] = {}
+        self.interpolador: ArealInterpolator = ArealInterpolator(ArtifactCache())
+        self._capas_transferidas: Dict[Tuple, GeoDataFrame] = {}
+        # Capas en otra granularidad ya calculadas fuera del tablero (todos los
+        # años): {(dataset, granularidad): GDF}
+        self._capas_precalculadas: Dict[Tuple[str, str], GeoDataFrame] = {}
+        self.zonal: ZonalStatsEngine = ZonalStatsEngine(ArtifactCache())
+        self.indices: SpatialIndexStore = SpatialIndexStore(ArtifactCache())
+        self.hexagonos: HexGridEngine = HexGridEngine()
+        self._capas_hex: Dict[Tuple, GeoDataFrame] = {}
+        self._indices_clusters: Dict[Tuple, PointClusterIndex] = {}
+        self._indices_bitmap: Dict[Tuple, IndiceBitmap] = {}
+        self._crossfilter: Dict[Tuple, CrossfilterEngine] = {}
+        self._selecciones: Dict[Tuple, EstadoSeleccion] = {}
+        # Matriz unidades x años por (dataset, granularidad, métrica, predicados)
+        self._series_anuales: Dict[Tuple, SerieAnual] = {}
+        self.estaciones: Optional[StationReadingStore] = None
+        self.interpolador_estaciones: StationInterpolator = StationInterpolator(ArtifactCache())
+        self.interpolacion_config: InterpolacionEstacionesConfig = InterpolacionEstacionesConfig()
+        self._promedios_estaciones: Dict[Tuple, pd.Series] = {}
+        # Catálogo de estaciones (se lee al conectar el almacén), capas de
+        # polígonos por granularidad y, por (granularidad, config), los pesos
+        # de interpolación con la capa base: se calculan una vez, no por mapa
+        self._catalogo_estaciones: GeoDataFrame = gpd.GeoDataFrame()
+        self._zonas: Optional[Dict[str, Tuple[GeoDataFrame, Optional[str]]]] = None
+        self._interpolaciones_estaciones: Dict[Tuple, Tuple[PesosVecinos, GeoDataFrame]] = {}
 
     def initialize_datasets(self) -> None:
         """
@@ -38,12 +127,159 @@ class DataService:
         """
         logger.info("Inicializando carga de datasets en DataService...")
         try:
-            self.datasets = self.loader.load_datasets()
-            logger.info(f"Datasets disponibles: {list(self.datasets.keys())}")
+            # Geometría para mostrar (EPSG:4326) y para medir (UTM 14N) con
+            # área, perímetro, centroide y caja precalculados, una sola vez
+            # (y una sola geometría por unidad en los datasets con varios años)
+            self.datasets.clear()
+            self.almacenes.clear()
+            for clave, gdf in self.loader.load_datasets().items():
+                self._guardar_dataset(clave, gdf)
+            self.metricas_derivadas.invalidar()
+            self.cortes.invalidar()
+            self._motores_accesibilidad.clear()
+            self._capas_accesibilidad.clear()
+            self._demograficos_manzana.clear()
+            self._capas_transferidas.clear()
+            self._capas_hex.clear()
+            self._capas_precalculadas.clear()
+            self._indices_clusters.clear()
+            self._indices_bitmap.clear()
+            self._crossfilter.clear()
+            self._selecciones.clear()
+            self._series_anuales.clear()
+            self._zonas = None
+            self._interpolaciones_estaciones.clear()
+            # Abrir (o construir una vez) los índices espaciales persistidos
+            self.indices.precargar({TABLAS_DATASET.get(clave, clave): self._geometrias_dataset(clave)
+                                    for clave in self.datasets_disponibles()})
+            logger.info(f"Datasets disponibles: {self.datasets_disponibles()}")
         except RuntimeError as ex:
             logger.error("No se pudieron inicializar los datasets.")
             raise
 
+    def registrar_dataset(self, dataset_key: str, gdf: GeoDataFrame) -> None:
+        """
+        Agrega (o reemplaza) un dataset en memoria e invalida lo que
+        se haya calculado a partir de él.
+
+        :param dataset_key: Clave del dataset (p. ej. "servicios").
+        :param gdf: Datos del dataset.
+        """
+        self._guardar_dataset(dataset_key, gdf)
+        self.metricas_derivadas.invalidar(dataset_key)
+        self.cortes.invalidar(dataset_key)
+        if dataset_key in ("servicios", self.accesibilidad_config.dataset_demanda):
+            self._capas_accesibilidad.clear()
+            self.cortes.invalidar("servicios")
+        if dataset_key == self.accesibilidad_config.dataset_demanda:
+            self._motores_accesibilidad.clear()
+        if dataset_key in ("demograficos", "manzanas", "edafologicos"):
+            self._demograficos_manzana.clear()
+            self.metricas_derivadas.invalidar("demograficos")
+            self.cortes.invalidar("demograficos")
+        for clave in [c for c in self._capas_hex if c[0] == dataset_key]:
+            del self._capas_hex[clave]
+        for clave in [c for c in self._capas_precalculadas if c[0] == dataset_key]:
+            del self._capas_precalculadas[clave]
+        for clave in [c for c in self._indices_clusters if c[0] == dataset_key]:
+            del self._indices_clusters[clave]
+        # Las capas redistribuidas (c[2]) pueden depender de este dataset
+        for clave in [c for c in self._indices_bitmap if c[0] == dataset_key or c[2] is not None]:
+            del self._indices_bitmap[clave]
+        for clave in [c for c in self._crossfilter
+                      if c[0] == dataset_key or self._cambia_granularidad(c[0], c[2])]:
+            del self._crossfilter[clave]
+            self._selecciones.pop(clave, None)
+        # Pueden venir de capas redistribuidas de cualquier dataset
+        self._series_anuales.clear()
+        capas = [capa for capa, _ in CAPAS_GRANULARIDAD.values()]
+        if dataset_key in ("manzanas", "demograficos", *capas):
+            self._zonas = None
+            self._interpolaciones_estaciones.clear()
+        if dataset_key in GRANULARIDAD_NATIVA or dataset_key in capas:
+            for clave in [c for c in self._capas_transferidas
+                          if dataset_key in (c[0], CAPAS_GRANULARIDAD[c[2]][0])]:
+                del self._capas_transferidas[clave]
+                self.metricas_derivadas.invalidar(clave[0])
+                self.cortes.invalidar(clave[0])
+        logger.info(f"Dataset '{dataset_key}' registrado: {len(gdf)} registros.")
+
+    def _guardar_dataset(self, dataset_key: str, gdf: GeoDataFrame) -> None:
+        """Guarda la capa preparada: tal cual, o separada si tiene varios años."""
+        capa = preparar_capa(gdf)
+        if es_multianual(capa):
+            self.almacenes[dataset_key] = UnitGeometryStore.desde_capa(
+                capa, (COLUMNA_METRICA,) + COLUMNAS_GEOMETRICAS
+            )
+            self.datasets.pop(dataset_key, None)
+        else:
+            self.datasets[dataset_key] = capa
+            self.almacenes.pop(dataset_key, None)
+
+    def datasets_disponibles(self) -> List[str]:
+        """Claves de los datasets cargados (de un año o de varios)."""
+        return list(self.datasets) + [c for c in self.almacenes if c not in self.datasets]
+
+    def tiene_dataset(self, dataset_key: str) -> bool:
+        return dataset_key in self.datasets or dataset_key in self.almacenes
+
+    def capa_dataset(self, dataset_key: str, anio: Optional[int] = None) -> Optional[GeoDataFrame]:
+        """
+        Capa de un dataset para `anio` (None = todos los registros). En los
+        datasets con varios años, aquí es donde los atributos del año se
+        unen con la geometría de su unidad.
+
+        :return: El GDF, o None si el dataset no existe.
+        """
+        if dataset_key in self.almacenes:
+            return self.almacenes[dataset_key].capa(anio)
+        gdf = self.datasets.get(dataset_key)
+        return None if gdf is None else GeoDataProcessor.filtrar_por_anio(gdf, anio)
+
+    def atributos_dataset(self, dataset_key: str) -> Optional[pd.DataFrame]:
+        """
+        Tabla de atributos de todos los registros (sin unir geometrías en
+        los datasets con varios años), p. ej. para listar columnas o valores.
+        """
+        if dataset_key in self.almacenes:
+            return self.almacenes[dataset_key].atributos
+        return self.datasets.get(dataset_key)
+
+    def geometrias_columnares(self,
+                              dataset_key: str,
+                              filters: DashboardFilters,
+                              gdf: GeoDataFrame) -> Optional[RaggedGeometryArray]:
+        """
+        Geometrías de las filas de `gdf` (salida de obtener_datos_filtrados
+        con `filters`) en formato columnar, tomadas del almacén del dataset,
+        para serializarlas sin pasar por shapely.
+
+        :return: El arreglo, o None si la capa no sale del almacén de
+                 polígonos (otra granularidad, accesibilidad, un solo año).
+        """
+        almacen = self.almacenes.get(dataset_key)
+        if almacen is None or not almacen.es_poligonal or gdf.empty or dataset_key == "servicios" \
+                or self._cambia_granularidad(dataset_key, filters.granularidad):
+            return None
+        return almacen.geometrias_columnares(gdf.index)
+
+    def _geometrias_dataset(self, dataset_key: str) -> Optional[GeoDataFrame]:
+        """Geometrías del dataset: una por unidad en los datasets con varios años."""
+        if dataset_key in self.almacenes:
+            return self.almacenes[dataset_key].geometrias
+        return self.datasets.get(dataset_key)
+
+    def indice_espacial(self, dataset_key: str) -> Optional[IndiceEspacial]:
+        """
+        Índice espacial persistido del dataset (el mismo que usa la app
+        Flask para la misma tabla), o None si el dataset no existe. En los
+        datasets con varios años indexa las geometrías únicas (una por unidad).
+        """
+        gdf = self._geometrias_dataset(dataset_key)
+        if gdf is None or gdf.empty:
+            return None
+        return self.indices.obtener(TABLAS_DATASET.get(dataset_key, dataset_key), gdf)
+
     def obtener_anios_disponibles(self, dataset_key: str) -> List[int]:
         """
         Retorna la lista de años disponibles en un dataset dado,
@@ -52,11 +288,79 @@ class DataService:
         :param dataset_key: "demograficos", "edafologicos", etc.
         :return: Lista de años encontrados (ordenada).
         """
+        if dataset_key == "servicios":
+            # La accesibilidad se mide sobre las unidades de demanda de cada año
+            dataset_key = self.accesibilidad_config.dataset_demanda
+        if dataset_key in self.almacenes:
+            return sorted(self.almacenes[dataset_key].anios)
         gdf = self.datasets.get(dataset_key)
         if gdf is None or gdf.empty or "anio" not in gdf.columns:
             return []
         return sorted(gdf["anio"].unique())
 
+    def obtener_metricas_disponibles(self,
+                                     dataset_key: str,
+                                     anio: Optional[int],
+                                     granularidad: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Opciones del dropdown de métricas: columnas numéricas nativas del
+        dataset más las métricas derivadas aplicables.
+
+        :param dataset_key: "demograficos", "edafologicos", etc.
+        :param anio: Año seleccionado (None = todos).
+        :param granularidad: Granularidad seleccionada (si difiere de la
+                             nativa, se usa la capa redistribuida).
+        :return: Lista de {"label", "value"}.
+        """
+        if dataset_key == "servicios" and not self._cambia_granularidad(dataset_key, granularidad):
+            return self._metricas_accesibilidad()
+
+        gdf = self._capa_granularidad(dataset_key, anio, granularidad)
+        if gdf is None:
+            gdf = self.capa_dataset(dataset_key, anio)
+        else:
+            gdf = GeoDataProcessor.filtrar_por_anio(gdf, anio)
+        if gdf is None or gdf.empty:
+            logger.warning(f"Dataset '{dataset_key}' vacío o inexistente.")
+            return []
+
+        # Filtrar columnas numéricas
+        numeric_cols = self.columnas_numericas(gdf)
+        opciones = [{"label": c.replace("_", " ").capitalize(), "value": c}
+                    for c in numeric_cols]
+
+        for metrica in self.metricas_derivadas.metricas_disponibles(dataset_key, gdf.columns):
+            etiqueta = metrica.etiqueta or metrica.nombre.replace("_", " ").capitalize()
+            opciones.append({"label": etiqueta, "value": metrica.nombre})
+        return opciones
+
+    def obtener_opciones_filtro(self, dataset_key: str) -> List[Dict[str, str]]:
+        """
+        Columnas categóricas (COLUMNAS_BITMAP) del dataset por las que se
+        puede filtrar, como opciones de dropdown.
+        """
+        gdf = self.atributos_dataset(dataset_key)
+        if gdf is None:
+            return []
+        return [{"label": c.replace("_", " ").capitalize(), "value": c}
+                for c in COLUMNAS_BITMAP if c in gdf.columns]
+
+    def obtener_valores_filtro(self, dataset_key: str, columna: Optional[str]) -> List[Dict[str, str]]:
+        """
+        Valores distintos de `columna` en el dataset completo, leídos de su
+        índice de bitmaps (que queda listo para evaluar el filtro).
+        """
+        gdf = self.atributos_dataset(dataset_key)
+        if gdf is None or not columna or columna not in gdf.columns:
+            return []
+        clave = (dataset_key, None, None)
+        indice = self._indices_bitmap.get(clave)
+        if indice is None or not indice.tabla.index.equals(gdf.index):
+            indice = IndiceBitmap(gdf, COLUMNAS_BITMAP)
+            self._indices_bitmap[clave] = indice
+        valores = sorted(indice.bitmaps(columna), key = str)
+        return [{"label": str(v), "value": v} for v in valores]
+
     def obtener_datos_filtrados(self, dataset_key: str, filters: DashboardFilters) -> GeoDataFrame:
         """
         Dado un dataset (p. ej. "demograficos") y un set de filtros,
@@ -66,24 +370,864 @@ class DataService:
         :param filters: Filtros de dominio (anio, granularidad, metrica)
         :return: El GDF filtrado
         """
-        gdf = self.datasets.get(dataset_key)
+        if dataset_key == "servicios" and not self._cambia_granularidad(dataset_key, filters.granularidad):
+            gdf = self.calcular_accesibilidad(filters.anio)
+            gdf = self._aplicar_predicados((dataset_key, filters.anio, "accesibilidad"), gdf, gdf, filters)
+            metricas = [filters.metrica] if filters.metrica else []
+            return GeoDataProcessor.seleccionar_metricas(
+                gdf, metricas,
+                tooltip_cols = [c for c in filters.tooltip_cols if c in gdf.columns]
+            )
+
+        # Capa en otra granularidad (manzanas, colonias...) ya calculada para el año
+        gdf = self._capa_granularidad(dataset_key, filters.anio, filters.granularidad)
+        redistribuida = gdf is not None
+        if redistribuida:
+            gdf = GeoDataProcessor.filtrar_por_anio(gdf, filters.anio)
+        else:
+            # 1. Capa del año (une atributos y geometrías si hay varios años)
+            gdf = self.capa_dataset(dataset_key, filters.anio)
 
         if gdf is None or gdf.empty:
             logger.warning(f"Dataset '{dataset_key}' vacío o inexistente.")
             return gpd.GeoDataFrame()
+        base = gdf
 
-        # 1. Filtrar por año
-        gdf = GeoDataProcessor.filtrar_por_anio(gdf, filters.anio)
+        # 1b. Adjuntar la métrica si es derivada (cacheada por dataset/año)
+        if self.metricas_derivadas.es_derivada(dataset_key, filters.metrica, gdf.columns):
+            derivadas = self.metricas_derivadas.calcular(
+                dataset_key, filters.anio, gdf,
+                granularidad = filters.granularidad if redistribuida else None
+            )
+            gdf = gdf.assign(**{filters.metrica: derivadas[filters.metrica]})
+
+        # 1c. Predicados por atributo (bitmaps sobre la capa del año, después
+        #     de las derivadas para no invalidar su caché)
+        clave = (dataset_key, filters.anio, filters.granularidad if redistribuida else None)
+        gdf = self._aplicar_predicados(clave, base, gdf, filters)
 
         # 2. (Opcional) Filtrar por granularidad si hay una columna que la maneje
-        # if "granularidad" in gdf.columns:
-        #     gdf = gdf[gdf["granularidad"] == filters.granularidad]
+        if "granularidad" in gdf.columns:
+            gdf = gdf[gdf["granularidad"] == filters.granularidad]
         print(f"granularidad: {filters.tooltip_cols}")
 
         # 3. Seleccionar columnas/métricas
         metricas = [filters.metrica] if filters.metrica else []
         gdf = GeoDataProcessor.seleccionar_metricas(gdf, 
                             metricas, 
-                            tooltip_cols = filters.tooltip_cols)
+                            tooltip_cols = [c for c in filters.tooltip_cols if c in gdf.columns])
 
         return gdf
+
+    def obtener_cortes(self,
+                       dataset_key: str,
+                       filters: DashboardFilters,
+                       metodo: str,
+                       num_clases: int = 5) -> Optional[List[float]]:
+        """
+        Bordes de clase de la métrica seleccionada, cacheados por
+        (dataset, anio, granularidad, metrica, predicados, metodo, num_clases)
+        para que todos los renderizadores compartan las mismas clases.
+
+        :return: Lista de bordes, o None si no hay datos para clasificar o
+                 si la métrica es constante (un solo borde, ninguna clase).
+        """
+        clave = self._clave_filtros(dataset_key, filters)
+
+        def valores() -> pd.Series:
+            # Solo se arma la capa filtrada si los cortes no están en caché
+            gdf = self.obtener_datos_filtrados(dataset_key, filters)
+            if gdf.empty or filters.metrica not in gdf.columns:
+                raise ValueError("no hay datos para clasificar")
+            return gdf[filters.metrica]
+
+        try:
+            cortes = self.cortes.obtener(clave, valores, metodo, num_clases)
+        except ValueError as ex:
+            logger.warning(f"No se pudieron calcular cortes para {clave}: {ex}")
+            return None
+        if len(cortes) < 2:
+            return None
+        return cortes.tolist()
+
+    def obtener_serie_anual(self, dataset_key: str, filters: DashboardFilters) -> Optional[SerieAnual]:
+        """
+        Métrica de `filters` para todos los años, alineada por unidad en una
+        matriz unidades x años (filters.anio se ignora). Se arma una vez por
+        (dataset, granularidad, métrica, predicados) con las mismas capas que
+        obtener_datos_filtrados.
+
+        :return: La serie, o None si no hay métrica o años.
+        """
+        if not filters.metrica:
+            return None
+        clave = self._clave_filtros(dataset_key, replace(filters, anio = None))
+        if clave in self._series_anuales:
+            return self._series_anuales[clave]
+
+        anios = self.obtener_anios_disponibles(dataset_key)
+        if not anios:
+            return None
+        capas = {anio: self.obtener_datos_filtrados(dataset_key, replace(filters, anio = anio))
+                 for anio in anios}
+        columna_id = filters.granularidad if self._cambia_granularidad(dataset_key, filters.granularidad) \
+            else COLUMNAS_ID_UNIDAD.get(dataset_key)
+        serie = serie_anual(capas, filters.metrica, columna_id = columna_id)
+        self._series_anuales[clave] = serie
+        return serie
+
+    def comparar_anios(self,
+                       dataset_key: str,
+                       filters: DashboardFilters,
+                       anio_base: int) -> GeoDataFrame:
+        """
+        Capa con la métrica de `filters` en `anio_base` y en filters.anio,
+        su diferencia y su crecimiento (ver analysis/temporal_comparison.py).
+
+        :return: La capa, o vacía si falta alguno de los años.
+        """
+        serie = self.obtener_serie_anual(dataset_key, filters)
+        if serie is None or serie.unidades.empty or filters.anio is None \
+                or not np.isin([anio_base, filters.anio], serie.anios).all():
+            return gpd.GeoDataFrame()
+        return comparar(serie, anio_base, filters.anio)
+
+    def calcular_hotspots(self,
+                          dataset_key: str,
+                          filters: DashboardFilters,
+                          config: Optional[HotspotsConfig] = None) -> Tuple[GeoDataFrame, Optional[MoranGlobal]]:
+        """
+        Calcula el I de Moran global y los clusters LISA (hot/cold spots) de
+        la métrica de `filters`. Los pesos se construyen una vez por
+        (dataset, granularidad, método) sobre todas las unidades del nivel
+        y se reutilizan para cualquier métrica o filtro: las unidades sin
+        valor (nulos o fuera del filtro) solo se enmascaran.
+
+        :param dataset_key: Clave para self.datasets
+        :param filters: Filtros de dominio (anio, granularidad, metrica)
+        :param config: Parámetros (por defecto, self.hotspots_config).
+        :return: (GDF con columnas lisa_*, resultado global) o (GDF vacío, None)
+        """
+        config = config or self.hotspots_config
+        gdf = self.obtener_datos_filtrados(dataset_key, filters)
+        if gdf.empty or filters.metrica not in gdf.columns:
+            return gpd.GeoDataFrame(), None
+
+        # Todas las unidades del nivel (sin predicados ni recorte de columnas)
+        unidades = self.obtener_datos_filtrados(dataset_key, replace(filters, metrica = None, predicados = []))
+        columna_id = filters.granularidad if self._cambia_granularidad(dataset_key, filters.granularidad) \
+            else COLUMNAS_ID_UNIDAD.get(dataset_key)
+        if columna_id not in gdf.columns or columna_id not in unidades.columns:
+            columna_id = None
+            unidades = unidades.loc[~unidades.index.duplicated()]
+        else:
+            unidades = unidades.drop_duplicates(subset = columna_id)
+            gdf = gdf.drop_duplicates(subset = columna_id)
+
+        metodo = config.metodo_manzana if filters.granularidad == "manzana" else config.metodo_pesos
+        pesos = self.pesos_espaciales.obtener(
+            unidades,
+            nivel = f"{dataset_key}_{filters.granularidad}",
+            metodo = metodo,
+            k = config.k,
+            tolerancia = config.tolerancia_m if metodo == "queen" else 0.0,
+            columna_id = columna_id
+        )
+        try:
+            capa = capa_hotspots(gdf, pesos, filters.metrica,
+                                 columna_id = columna_id,
+                                 permutaciones = config.permutaciones,
+                                 alfa = config.alfa)
+            pesos_validos, valores = sin_nulos(pesos, valores_alineados(gdf, pesos, filters.metrica, columna_id))
+        except ValueError as ex:
+            logger.warning(f"No se pudieron calcular hot spots de '{filters.metrica}': {ex}")
+            return gpd.GeoDataFrame(), None
+        return capa, moran_global(pesos_validos, valores, config.permutaciones)
+
+    def regionalizar(self,
+                     dataset_key: str = "demograficos",
+                     anio: Optional[int] = None,
+                     granularidad: Optional[str] = None,
+                     config: Optional[RegionalizacionConfig] = None) -> GeoDataFrame:
+        """
+        Agrupa las unidades contiguas de un dataset (AGEB, o manzanas con
+        granularidad "manzana") en zonas homogéneas y registra el resultado
+        como el dataset "regiones", que queda disponible como granularidad
+        "region". El grafo de contigüidad se toma de la caché de pesos y la
+        asignación se guarda en disco con la huella de su contenido, así que
+        con los mismos datos solo se disuelven las regiones.
+
+        :param anio: Año de los indicadores (None = el más reciente; nunca se
+                     mezclan años).
+        :param granularidad: Granularidad de las unidades (None = nativa).
+        :param config: Parámetros (por defecto, self.regionalizacion_config).
+        :return: Capa con una fila por región, o vacía si faltan datos.
+        """
+        config = config or self.regionalizacion_config
+        if anio is None:
+            anios = self.obtener_anios_disponibles(dataset_key)
+            anio = anios[-1] if anios else None
+        gdf = self._capa_granularidad(dataset_key, anio, granularidad)
+        redistribuida = gdf is not None
+        if not redistribuida:
+            gdf = self.capa_dataset(dataset_key, anio)
+        if gdf is None or gdf.empty:
+            logger.warning(f"Dataset '{dataset_key}' vacío o inexistente; no se regionaliza.")
+            return gpd.GeoDataFrame()
+
+        columna_id = granularidad if redistribuida else COLUMNAS_ID_UNIDAD.get(dataset_key)
+        if columna_id not in gdf.columns:
+            columna_id = None
+        else:
+            gdf = gdf.drop_duplicates(subset = columna_id)
+        variables = [v for v in config.variables if v in gdf.columns] \
+            or self.columnas_numericas(gdf, excluir = ("area_km2",))
+        columna_piso = config.columna_piso if config.columna_piso in gdf.columns else None
+
+        nivel = f"{dataset_key}_{granularidad or GRANULARIDAD_NATIVA.get(dataset_key, 'nativa')}"
+        pesos = self.pesos_espaciales.obtener(
+            gdf,
+            nivel = nivel,
+            metodo = config.metodo_pesos,
+            tolerancia = config.tolerancia_m,
+            columna_id = columna_id
+        )
+        resultado = self.regionalizador.obtener(gdf, pesos, variables,
+                                                metodo = config.metodo,
+                                                n_regiones = config.n_regiones,
+                                                columna_piso = columna_piso,
+                                                umbral = config.umbral,
+                                                columna_id = columna_id,
+                                                reinicios = config.reinicios,
+                                                procesos = config.procesos,
+                                                nombre = f"regiones_{nivel}")
+        capa = capa_regiones(gdf, pesos, resultado,
+                             columna_id = columna_id,
+                             sumar = [columna_piso] if columna_piso else [])
+        self.registrar_dataset("regiones", capa)
+        return capa
+
+    def _metricas_accesibilidad(self) -> List[Dict[str, str]]:
+        """Opciones de métricas de accesibilidad por tipo de servicio presente."""
+        servicios = self.atributos_dataset("servicios")
+        columna_tipo = self.accesibilidad_config.columna_tipo
+        if servicios is None or servicios.empty or columna_tipo not in servicios.columns:
+            return []
+        opciones = []
+        for tipo in sorted(servicios[columna_tipo].dropna().unique()):
+            etiqueta = TIPOS_SERVICIO.get(tipo, str(tipo).capitalize())
+            opciones.append({"label": f"Accesibilidad 2SFCA - {etiqueta}", "value": f"acceso_{tipo}"})
+            opciones.append({"label": f"Distancia al más cercano (m) - {etiqueta}",
+                             "value": f"distancia_{tipo}"})
+        return opciones
+
+    def calcular_accesibilidad(self,
+                               anio: Optional[int] = None,
+                               config: Optional[AccesibilidadConfig] = None) -> GeoDataFrame:
+        """
+        Capa de unidades de demanda con, por cada tipo de servicio,
+        `distancia_<tipo>` (m a la instalación más cercana), `cercanas_<tipo>`
+        (instalaciones dentro del radio) y `acceso_<tipo>` (puntaje 2SFCA en
+        capacidad por cada 1,000 habitantes).
+
+        El motor (KD-tree de orígenes y matrices de distancias) se reutiliza
+        por (dataset de demanda, año), así que cambiar el radio o la capa de
+        instalaciones solo rehace las consultas y dos productos dispersos.
+
+        :param anio: Año de la demanda (None o inexistente = el más reciente).
+        :param config: Parámetros (None = self.accesibilidad_config).
+        :return: GDF de demanda con las columnas de accesibilidad, o vacío.
+        """
+        config = config or self.accesibilidad_config
+        demanda = self.atributos_dataset(config.dataset_demanda)
+        servicios = self.atributos_dataset("servicios")
+        if demanda is None or demanda.empty or servicios is None or servicios.empty:
+            logger.warning("Faltan datos de demanda o de servicios para la accesibilidad.")
+            return gpd.GeoDataFrame()
+
+        anios = self.obtener_anios_disponibles(config.dataset_demanda)
+        if anios and anio not in anios:
+            anio = anios[-1]
+        clave = (anio, config)
+        capa = self._capas_accesibilidad.get(clave)
+        if capa is not None:
+            return capa
+
+        demanda = self.capa_dataset(config.dataset_demanda, anio).reset_index(drop = True)
+        motor = self._motores_accesibilidad.get((config.dataset_demanda, anio))
+        if motor is None or motor.n != len(demanda):
+            motor = AccessibilityEngine(demanda)
+            self._motores_accesibilidad[(config.dataset_demanda, anio)] = motor
+
+        poblacion = demanda[config.columna_demanda].to_numpy(dtype = "float64") \
+            if config.columna_demanda in demanda.columns else None
+        servicios = self.capa_dataset("servicios", anio)
+        capa = demanda.copy()
+        for tipo, instalaciones in servicios.groupby(config.columna_tipo):
+            tabla = motor.calcular(
+                instalaciones, poblacion if poblacion is not None else np.ones(motor.n),
+                radio = config.radio_m,
+                k = config.k,
+                columna_oferta = config.columna_oferta,
+                ponderacion = config.ponderacion
+            )
+            capa[f"distancia_{tipo}"] = tabla["dist_1"].to_numpy()
+            capa[f"cercanas_{tipo}"] = tabla["num_en_radio"].to_numpy()
+            capa[f"acceso_{tipo}"] = tabla["acceso_2sfca"].to_numpy() * 1000
+        logger.info(f"Accesibilidad calculada para {len(capa)} unidades "
+                    f"(radio {config.radio_m:g} m, año {anio}).")
+        self._capas_accesibilidad[clave] = capa
+        return capa
+
+    @staticmethod
+    def columnas_numericas(gdf: GeoDataFrame, excluir: Tuple[str, ...] = ()) -> List[str]:
+        """
+        Columnas numéricas que son variables del dataset: sin 'anio' ni los
+        atributos geométricos precalculados (área, centroide, caja...).
+        """
+        omitidas = ("geometry", "anio") + COLUMNAS_GEOMETRICAS + tuple(excluir)
+        return [c for c in gdf.columns if c not in omitidas and gdf[c].dtype.kind in ["i", "f"]]
+
+    @staticmethod
+    def _es_dasimetrico(dataset_key: str, granularidad: Optional[str]) -> bool:
+        return dataset_key == "demograficos" and granularidad == "manzana"
+
+    def _es_de_puntos(self, dataset_key: str) -> bool:
+        """Indica si el dataset está formado por puntos (localidades, servicios...)."""
+        if dataset_key in self.almacenes and self.almacenes[dataset_key].es_poligonal:
+            return False
+        gdf = self._geometrias_dataset(dataset_key)
+        if gdf is None or gdf.empty or "geometry" not in gdf:
+            return False
+        return bool(gdf.geometry.geom_type.isin(["Point", "MultiPoint"]).all())
+
+    def _aplicar_predicados(self,
+                            clave: Tuple,
+                            base: GeoDataFrame,
+                            gdf: GeoDataFrame,
+                            filters: DashboardFilters) -> GeoDataFrame:
+        """
+        Filas de `gdf` que cumplen `filters.predicados`. Los predicados sobre
+        columnas de `base` (mismas filas y orden que `gdf`) se evalúan con el
+        índice de bitmaps cacheado por `clave`; los que solo existen en `gdf`
+        (p. ej. una métrica derivada) se evalúan recorriendo la columna.
+        """
+        if not filters.predicados or gdf.empty:
+            return gdf
+        indexados = [p for p in filters.predicados if p.columna in base.columns]
+        resto = [p for p in filters.predicados if p.columna not in base.columns and p.columna in gdf.columns]
+        omitidos = len(filters.predicados) - len(indexados) - len(resto)
+        if omitidos:
+            logger.warning(f"{omitidos} predicado(s) sobre columnas inexistentes en {clave}; se omiten.")
+
+        mascaras = []
+        if indexados:
+            indice = self._indices_bitmap.get(clave)
+            if indice is None or not indice.tabla.index.equals(base.index):
+                indice = IndiceBitmap(base, COLUMNAS_BITMAP)
+                self._indices_bitmap[clave] = indice
+            mascaras.append(indice.evaluar(indexados, filters.combinacion))
+        if resto:
+            mascaras.append(IndiceBitmap(gdf).evaluar(resto, filters.combinacion))
+        if not mascaras:
+            return gdf
+        mascara = np.logical_or.reduce(mascaras) if filters.combinacion == "or" \
+            else np.logical_and.reduce(mascaras)
+        logger.debug(f"Predicados en {clave}: {int(mascara.sum())} de {len(gdf)} filas.")
+        return gdf[mascara]
+
+    def _cambia_granularidad(self, dataset_key: str, granularidad: Optional[str]) -> bool:
+        """Indica si `granularidad` requiere una capa distinta a la nativa del dataset."""
+        if (dataset_key, granularidad) in self._capas_precalculadas:
+            return True
+        if self._es_dasimetrico(dataset_key, granularidad):
+            return True
+        if granularidad in GRANULARIDADES_HEX:
+            return self._es_de_puntos(dataset_key)
+        nativa = GRANULARIDAD_NATIVA.get(dataset_key)
+        capa = CAPAS_GRANULARIDAD.get(granularidad)
+        return nativa is not None and capa is not None and granularidad != nativa \
+            and self.tiene_dataset(capa[0])
+
+    def _capa_granularidad(self,
+                           dataset_key: str,
+                           anio: Optional[int],
+                           granularidad: Optional[str]) -> Optional[GeoDataFrame]:
+        """Capa del dataset en otra granularidad, o None si se usa la nativa."""
+        if not self._cambia_granularidad(dataset_key, granularidad):
+            return None
+        if (dataset_key, granularidad) in self._capas_precalculadas:
+            return GeoDataProcessor.filtrar_por_anio(self._capas_precalculadas[(dataset_key, granularidad)], anio)
+        if self._es_dasimetrico(dataset_key, granularidad):
+            return self.obtener_demograficos_manzana(anio)
+        if granularidad in GRANULARIDADES_HEX:
+            return self.agregar_en_hexagonos(dataset_key, anio, granularidad)
+        return self.transferir_a_granularidad(dataset_key, anio, granularidad)
+
+    def transferir_a_granularidad(self,
+                                  dataset_key: str,
+                                  anio: Optional[int],
+                                  granularidad: str) -> GeoDataFrame:
+        """
+        Lleva un dataset de su granularidad nativa (p. ej. AGEB) a otra capa
+        de polígonos (p. ej. colonias) por interpolación areal: los conteos
+        (PREFIJOS_EXTENSIVOS) se reparten por área y el resto de columnas
+        numéricas se promedian ponderando por área. El crosswalk entre capas
+        se calcula una vez (y se guarda en disco); cada año/dataset cuesta un
+        par de productos dispersos y el resultado queda en memoria.
+
+        :param granularidad: Clave de CAPAS_GRANULARIDAD (p. ej. "colonia").
+        :return: GDF de la capa destino con una columna `granularidad` de id,
+                 o vacío si faltan datos.
+        """
+        clave = (dataset_key, anio, granularidad)
+        if clave in self._capas_transferidas:
+            return self._capas_transferidas[clave]
+
+        origen = self.capa_dataset(dataset_key, anio)
+        capa_destino, columna_id_destino = CAPAS_GRANULARIDAD[granularidad]
+        destino = self.capa_dataset(capa_destino)
+        if origen is None or origen.empty or destino is None or destino.empty:
+            logger.warning(f"Faltan datos para llevar '{dataset_key}' a '{granularidad}'.")
+            return gpd.GeoDataFrame()
+        if columna_id_destino not in destino.columns:
+            columna_id_destino = None
+
+        columna_id_origen = COLUMNAS_ID_UNIDAD.get(dataset_key)
+        if columna_id_origen in origen.columns:
+            origen = origen.drop_duplicates(subset = columna_id_origen)
+        else:
+            columna_id_origen = None
+
+        numericas = self.columnas_numericas(origen, excluir = ("area_km2",))
+        extensivas = [c for c in numericas if c.lower().startswith(PREFIJOS_EXTENSIVOS)]
+        intensivas = [c for c in numericas if c not in extensivas]
+
+        valores = self.interpolador.transferir(
+            origen, destino,
+            nivel_origen = f"{dataset_key}_{GRANULARIDAD_NATIVA[dataset_key]}",
+            nivel_destino = granularidad,
+            extensivas = extensivas,
+            intensivas = intensivas,
+            columna_id_origen = columna_id_origen,
+            columna_id_destino = columna_id_destino,
+            indice_destino = self.indice_espacial(capa_destino) if capa_destino in self.datasets else None
+        )
+        capa = gpd.GeoDataFrame(
+            {granularidad: valores.index.to_numpy()},
+            geometry = destino.geometry.to_numpy(), crs = destino.crs
+        )
+        for columna in valores.columns:
+            capa[columna] = valores[columna].to_numpy()
+        capa = copiar_geometria_dual(destino, capa)
+        areas = capa["area_m2"].to_numpy() if "area_m2" in capa.columns \
+            else gpd.GeoSeries(geometrias_metricas(destino)).area.to_numpy()
+        capa["area_km2"] = areas / 1e6
+        if anio is not None:
+            capa["anio"] = anio
+
+        self._capas_transferidas[clave] = capa
+        logger.info(f"'{dataset_key}' ({anio}) llevado a '{granularidad}': {len(capa)} unidades.")
+        return capa
+
+    def agregar_en_hexagonos(self,
+                             dataset_key: str,
+                             anio: Optional[int],
+                             granularidad: str) -> GeoDataFrame:
+        """
+        Agrega un dataset de puntos en la rejilla hexagonal: `conteo` de
+        puntos, suma de sus columnas numéricas y, si tiene columna de tipo,
+        `conteo_<tipo>`. Todas las resoluciones de GRANULARIDADES_HEX se
+        calculan de una vez (la fina a partir de los puntos, las gruesas
+        sumando celdas) y quedan en memoria por (dataset, año).
+
+        :param granularidad: Clave de GRANULARIDADES_HEX (p. ej. "hex_500").
+        :return: GDF de hexágonos con una columna `granularidad` de id, o vacío.
+        """
+        clave = (dataset_key, anio, granularidad)
+        if clave in self._capas_hex:
+            return self._capas_hex[clave]
+
+        puntos = self.capa_dataset(dataset_key, anio)
+        if puntos is None or puntos.empty:
+            logger.warning(f"Dataset '{dataset_key}' vacío o inexistente.")
+            return gpd.GeoDataFrame()
+        sumas = self.columnas_numericas(puntos)
+        columna_tipo = self.accesibilidad_config.columna_tipo
+        capas = self.hexagonos.agregar(
+            puntos,
+            [resolucion for resolucion, _ in GRANULARIDADES_HEX.values()],
+            sumas = sumas,
+            columna_categoria = columna_tipo if columna_tipo in puntos.columns else None
+        )
+        for valor, (resolucion, _) in GRANULARIDADES_HEX.items():
+            capa = capas.get(resolucion, gpd.GeoDataFrame()).rename(columns = {"celda": valor})
+            if anio is not None and not capa.empty:
+                capa["anio"] = anio
+            self._capas_hex[(dataset_key, anio, valor)] = capa
+        return self._capas_hex[clave]
+
+    def indice_clusters(self, dataset_key: str, anio: Optional[int] = None) -> Optional[PointClusterIndex]:
+        """
+        Índice de clusters por zoom de un dataset de puntos; se construye una
+        sola vez por (dataset, año) y queda en memoria.
+
+        :return: El índice, o None si el dataset no existe o no es de puntos.
+        """
+        clave = (dataset_key, anio)
+        if clave in self._indices_clusters:
+            return self._indices_clusters[clave]
+        if not self._es_de_puntos(dataset_key):
+            logger.warning(f"Dataset '{dataset_key}' inexistente o sin geometrías de punto.")
+            return None
+        puntos = self.capa_dataset(dataset_key, anio)
+        indice = indice_de_capa(puntos)
+        self._indices_clusters[clave] = indice
+        return indice
+
+    def obtener_clusters(self,
+                         dataset_key: str,
+                         bbox: Tuple[float, float, float, float],
+                         zoom: float,
+                         anio: Optional[int] = None) -> ResultadoClusters:
+        """
+        Clusters (o puntos sueltos, en zoom alto) de un dataset de puntos
+        visibles en la vista actual (para Plotly, con `a_dataframe()`).
+
+        :param bbox: (lon_min, lat_min, lon_max, lat_max) de la vista.
+        :param zoom: Zoom del mapa.
+        :return: Elementos de la vista (vacío si el dataset no es de puntos).
+        """
+        indice = self.indice_clusters(dataset_key, anio)
+        if indice is None:
+            vacio = np.empty(0)
+            return ResultadoClusters(vacio, vacio, vacio.astype("int64"),
+                                     vacio.astype("int64"), vacio.astype(bool))
+        return indice.clusters(bbox, zoom)
+
+    @staticmethod
+    def _clave_filtros(dataset_key: str, filters: DashboardFilters) -> Tuple:
+        """Clave de caché de la capa que se dibuja con `filters`."""
+        return (dataset_key, filters.anio, filters.granularidad, filters.metrica,
+                filters.firma_predicados())
+
+    def motor_crossfilter(self,
+                          dataset_key: str,
+                          filters: DashboardFilters) -> Optional[CrossfilterEngine]:
+        """
+        Motor de filtrado cruzado de la capa que se dibuja con `filters`
+        (mismas filas y orden que obtener_datos_filtrados), con todas sus
+        columnas numéricas. Se construye una vez por combinación de filtros.
+
+        :return: El motor, o None si la capa está vacía.
+        """
+        clave = self._clave_filtros(dataset_key, filters)
+        if clave in self._crossfilter:
+            return self._crossfilter[clave]
+
+        # Sin métrica no se recortan columnas; la derivada se adjunta aparte
+        gdf = self.obtener_datos_filtrados(dataset_key, replace(filters, metrica = None))
+        if gdf.empty:
+            return None
+        metricas = self.columnas_numericas(gdf)
+        if filters.metrica and filters.metrica not in gdf.columns:
+            mapa = self.obtener_datos_filtrados(dataset_key, filters)
+            if filters.metrica in mapa.columns:
+                gdf = gdf.assign(**{filters.metrica: mapa[filters.metrica]})
+                metricas.append(filters.metrica)
+        if filters.metrica in metricas:
+            metricas.insert(0, metricas.pop(metricas.index(filters.metrica)))
+
+        motor = CrossfilterEngine(gdf, metricas)
+        self._crossfilter[clave] = motor
+        self._selecciones.pop(clave, None)
+        return motor
+
+    def actualizar_seleccion(self,
+                             dataset_key: str,
+                             filters: DashboardFilters,
+                             posiciones: Optional[List[int]]) -> Optional[pd.DataFrame]:
+        """
+        Cambia la selección del mapa (posiciones de los polígonos; None =
+        todos) y devuelve el resumen por métrica. Los agregados se actualizan
+        con la diferencia respecto a la selección anterior de la misma capa.
+
+        :return: Tabla (conteo, total, media, percentiles) o None si no hay datos.
+        """
+        motor = self.motor_crossfilter(dataset_key, filters)
+        if motor is None:
+            return None
+        clave = self._clave_filtros(dataset_key, filters)
+        estado = motor.actualizar(self._selecciones.get(clave), posiciones)
+        self._selecciones[clave] = estado
+        return motor.resumen(estado, PERCENTILES_ZONALES)
+
+    def histograma_seleccion(self,
+                             dataset_key: str,
+                             filters: DashboardFilters) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (bordes, conteos) de `filters.metrica` en la selección actual del
+        mapa (toda la capa si aún no hay selección).
+        """
+        motor = self.motor_crossfilter(dataset_key, filters)
+        if motor is None or filters.metrica not in motor.metricas:
+            return None
+        clave = self._clave_filtros(dataset_key, filters)
+        estado = self._selecciones.get(clave)
+        if estado is None:
+            estado = motor.estado()
+            self._selecciones[clave] = estado
+        return motor.histograma(estado, filters.metrica)
+
+    def posiciones_en_rango(self,
+                            dataset_key: str,
+                            filters: DashboardFilters,
+                            minimo: Optional[float],
+                            maximo: Optional[float]) -> List[int]:
+        """Posiciones de los polígonos con `filters.metrica` en [minimo, maximo]."""
+        motor = self.motor_crossfilter(dataset_key, filters)
+        if motor is None or filters.metrica not in motor.metricas:
+            return []
+        return motor.filas_en_rango(filters.metrica, minimo, maximo).tolist()
+
+    def obtener_demograficos_manzana(self, anio: Optional[int]) -> GeoDataFrame:
+        """
+        Granularidad "manzana" de demograficos: los conteos de cada AGEB
+        (columnas con PREFIJOS_EXTENSIVOS) repartidos entre sus manzanas según
+        su área de uso residencial. La matriz de redistribución se construye
+        una sola vez (y se guarda en disco); cada año cuesta un producto
+        disperso y el resultado queda en memoria.
+
+        :param anio: Año (None = todos los registros de demograficos).
+        :return: GDF de manzanas, o vacío si faltan manzanas o demograficos.
+        """
+        if anio in self._demograficos_manzana:
+            return self._demograficos_manzana[anio]
+
+        demograficos = self.capa_dataset("demograficos", anio)
+        manzanas = self.capa_dataset("manzanas")
+        columna_ageb = COLUMNAS_ID_UNIDAD["demograficos"]
+        if demograficos is None or demograficos.empty or manzanas is None or manzanas.empty \
+                or columna_ageb not in demograficos.columns:
+            logger.warning("Faltan manzanas o demograficos para la redistribución dasimétrica.")
+            return gpd.GeoDataFrame()
+
+        agebs = demograficos.drop_duplicates(subset = columna_ageb)
+        agebs = agebs.assign(**{columna_ageb: agebs[columna_ageb].astype(str)})
+
+        # Uso residencial: capa de uso de suelo o, si no, uso predominante por manzana
+        uso_suelo = self.capa_dataset("edafologicos")
+        columna_uso = next((c for c in COLUMNAS_USO_SUELO
+                            if uso_suelo is not None and c in uso_suelo.columns), None)
+        if columna_uso is None:
+            uso_suelo = None
+            columna_uso = next((c for c in COLUMNAS_USO_SUELO if c in manzanas.columns), None)
+        columna_id_manzana = next((c for c in COLUMNAS_ID_MANZANA if c in manzanas.columns), None)
+
+        try:
+            matriz = self.dasimetrico.obtener(
+                manzanas, agebs, columna_ageb,
+                columna_id_manzana = columna_id_manzana,
+                uso_suelo = uso_suelo,
+                columna_uso = columna_uso,
+                prefijos_residenciales = PREFIJOS_USO_RESIDENCIAL,
+                indice_manzanas = self.indice_espacial("manzanas")
+            )
+        except ValueError as ex:
+            logger.warning(f"No se pudo construir la redistribución dasimétrica: {ex}")
+            return gpd.GeoDataFrame()
+
+        agebs = agebs.set_index(columna_ageb)
+        extensivas = [
+            c for c in agebs.columns
+            if c.lower().startswith(PREFIJOS_EXTENSIVOS) and agebs[c].dtype.kind in ["i", "f"]
+        ]
+        descriptivas = [c for c in ("alc", "amb_loc") if c in agebs.columns]
+        capa = capa_manzanas(manzanas, matriz, agebs[extensivas], agebs[descriptivas])
+        if anio is not None:
+            capa["anio"] = anio
+
+        self._demograficos_manzana[anio] = capa
+        logger.info(f"Demograficos por manzana ({anio}): {len(capa)} manzanas, "
+                    f"variables {extensivas}.")
+        return capa
+
+    def _capas_zonales(self) -> Dict[str, Tuple[GeoDataFrame, Optional[str]]]:
+        """
+        Capas de polígonos disponibles por granularidad: {granularidad: (gdf,
+        columna id)}. Se arman una vez y se descartan al registrar alguna.
+        """
+        if self._zonas is not None:
+            return self._zonas
+        capas: Dict[str, Tuple[GeoDataFrame, Optional[str]]] = {}
+        manzanas = self.capa_dataset("manzanas")
+        if manzanas is not None and not manzanas.empty:
+            capas["manzana"] = (manzanas, next((c for c in COLUMNAS_ID_MANZANA if c in manzanas.columns), None))
+        demograficos = self.capa_dataset("demograficos")
+        columna_ageb = COLUMNAS_ID_UNIDAD["demograficos"]
+        if demograficos is not None and not demograficos.empty and columna_ageb in demograficos.columns:
+            agebs = demograficos.sort_values("anio") if "anio" in demograficos.columns else demograficos
+            capas["ageb"] = (agebs.drop_duplicates(subset = columna_ageb, keep = "last"), columna_ageb)
+        for granularidad, (capa, columna_id) in CAPAS_GRANULARIDAD.items():
+            gdf = self.capa_dataset(capa)
+            if gdf is not None and not gdf.empty:
+                capas[granularidad] = (gdf, columna_id if columna_id in gdf.columns else None)
+        self._zonas = capas
+        return capas
+
+    def cargar_ambientales(self, rasters: List[RasterAmbiental]) -> GeoDataFrame:
+        """
+        Resume cada ráster por zona en todas las granularidades disponibles
+        (manzana, AGEB, colonia, sección) y registra el resultado como el
+        dataset "ambientales": una fila por (granularidad, zona, año) con
+        columnas <variable>_media, _minimo, _maximo y _pNN.
+
+        :param rasters: Rásters a resumir (ver RasterCatalog).
+        :return: El dataset registrado (vacío si no hay rásters o capas).
+        """
+        capas = self._capas_zonales()
+        if not rasters or not capas:
+            logger.warning("Sin rásters o sin capas de polígonos para /ambientales.")
+            return gpd.GeoDataFrame()
+
+        partes = []
+        for granularidad, (zonas, columna_id) in capas.items():
+            zonas = preparar_capa(zonas)
+            ids = np.asarray(zonas[columna_id] if columna_id else zonas.index).astype(str)
+            por_anio: Dict[Optional[int], List[pd.DataFrame]] = {}
+            for raster in rasters:
+                try:
+                    tabla = self.zonal.estadisticas(raster.ruta, zonas, granularidad, columna_id,
+                                                    banda = raster.banda,
+                                                    percentiles = PERCENTILES_ZONALES)
+                except Exception as ex:
+                    logger.error(f"No se pudo resumir el ráster {raster.ruta}: {ex}")
+                    continue
+                tabla = tabla.drop(columns = "pixeles").add_prefix(f"{raster.variable}_")
+                por_anio.setdefault(raster.anio, []).append(tabla)
+
+            for anio, tablas in por_anio.items():
+                valores = pd.concat(tablas, axis = 1)
+                capa = gpd.GeoDataFrame(
+                    {"zona": ids, "granularidad": granularidad},
+                    geometry = zonas.geometry.to_numpy(), crs = zonas.crs
+                )
+                for columna in valores.columns:
+                    capa[columna] = valores[columna].to_numpy()
+                if anio is not None:
+                    capa["anio"] = anio
+                partes.append(capa)
+
+        if not partes:
+            return gpd.GeoDataFrame()
+        ambientales = gpd.GeoDataFrame(pd.concat(partes, ignore_index = True), crs = "EPSG:4326")
+        self.registrar_dataset("ambientales", ambientales)
+        return ambientales
+
+    def obtener_cambios_uso_suelo(self) -> GeoDataFrame:
+        """
+        Capa de cambios de uso de suelo registrada (vacía si no hay). Se
+        genera fuera del tablero con scripts/land_use_changes.py.
+        """
+        cambios = self.capa_dataset("cambios_uso_suelo")
+        if cambios is None or COLUMNA_CAMBIO not in cambios.columns:
+            return gpd.GeoDataFrame()
+        return cambios
+
+    def cargar_electorales(self, almacen: ElectoralResultsStore) -> None:
+        """
+        Registra los resultados electorales por sección (dataset
+        "electorales", todos los años) y las capas ya transferidas por la
+        ingesta (colonia, AGEB...), que se usan tal cual para esas
+        granularidades en lugar de interpolar al vuelo.
+
+        :param almacen: Almacén por año (ver scripts/electoral_ingest.py).
+        """
+        secciones = almacen.leer(NIVEL_BASE)
+        if secciones.empty:
+            logger.warning(f"Sin resultados electorales en {almacen.directorio}.")
+            return
+        self.registrar_dataset("electorales", secciones)
+        for nivel in almacen.niveles():
+            if nivel != NIVEL_BASE:
+                self._capas_precalculadas[("electorales", nivel)] = preparar_capa(almacen.leer(nivel))
+        logger.info(f"Resultados electorales: años {almacen.anios()}, niveles {almacen.niveles()}.")
+
+    def conectar_estaciones(self, almacen: StationReadingStore) -> None:
+        """
+        Usa `almacen` como fuente de lecturas de estaciones de calidad del aire.
+
+        :param almacen: Almacén particionado por día (ver StationReadingStore).
+        """
+        self.estaciones = almacen
+        self._catalogo_estaciones = almacen.estaciones()
+        self._promedios_estaciones.clear()
+        self._interpolaciones_estaciones.clear()
+        logger.info(f"Almacén de estaciones: {almacen.directorio} "
+                    f"({len(almacen.particiones())} días con lecturas).")
+
+    def contaminantes_estaciones(self) -> List[str]:
+        """Contaminantes con lecturas recientes (vacío si no hay almacén)."""
+        return self.estaciones.contaminantes() if self.estaciones is not None else []
+
+    def meses_estaciones(self) -> List[str]:
+        """Meses (AAAA-MM) con lecturas (vacío si no hay almacén)."""
+        return self.estaciones.meses() if self.estaciones is not None else []
+
+    def promedios_estaciones(self, contaminante: str, inicio, fin) -> pd.Series:
+        """
+        Promedio de `contaminante` por estación en [inicio, fin). Solo se leen
+        las particiones del rango y el resultado queda en memoria, así que
+        volver a pintar la misma ventana no toca el disco.
+
+        :return: Serie indexada por id de estación (vacía si no hay almacén).
+        """
+        if self.estaciones is None:
+            return pd.Series(dtype = "float64")
+        clave = (contaminante.lower(), pd.Timestamp(inicio), pd.Timestamp(fin))
+        if clave not in self._promedios_estaciones:
+            self._promedios_estaciones[clave] = self.estaciones.promedios(inicio, fin, contaminante)
+        return self._promedios_estaciones[clave]
+
+    def interpolar_estaciones(self,
+                              contaminante: str,
+                              inicio,
+                              fin,
+                              granularidad: str = "manzana",
+                              config: Optional[InterpolacionEstacionesConfig] = None) -> GeoDataFrame:
+        """
+        Mapa de `contaminante` promediado en [inicio, fin) e interpolado de
+        las estaciones a los centroides de la capa `granularidad`. Los
+        vecinos y pesos de cada (capa, método) se calculan una sola vez (y se
+        guardan en disco) y quedan en memoria con la capa base; cada ventana
+        cuesta una lectura por rango y un promedio ponderado.
+
+        :param granularidad: "manzana", "ageb", "colonia" o "seccion".
+        :param config: Parámetros (None = self.interpolacion_config).
+        :return: GDF con columnas `zona` y `contaminante`, o vacío.
+        """
+        config = config or self.interpolacion_config
+        clave = (granularidad, config)
+        if clave not in self._interpolaciones_estaciones:
+            capas = self._capas_zonales()
+            if granularidad not in capas or self._catalogo_estaciones.empty:
+                logger.warning(f"Sin estaciones o sin capa '{granularidad}' para interpolar {contaminante}.")
+                return gpd.GeoDataFrame()
+
+            zonas, columna_id = capas[granularidad]
+            pesos = self.interpolador_estaciones.pesos(
+                self._catalogo_estaciones, zonas, granularidad,
+                columna_id_destino = columna_id,
+                k = config.k,
+                potencia = config.potencia,
+                metodo = config.metodo
+            )
+            base = gpd.GeoDataFrame(
+                {"zona": pesos.ids_destino, "granularidad": granularidad},
+                geometry = zonas.geometry.to_numpy(), crs = zonas.crs
+            )
+            self._interpolaciones_estaciones[clave] = (pesos, base)
+
+        pesos, base = self._interpolaciones_estaciones[clave]
+        valores = pesos.interpolar(self.promedios_estaciones(contaminante, inicio, fin))
+        return base.assign(**{contaminante.lower(): valores})
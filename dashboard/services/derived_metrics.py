@@ -0,0 +1,171 @@
+# services/derived_metrics.py
+
+"""
+Motor de métricas derivadas: expresiones sobre columnas (densidades, razones,
+tasas per cápita) compiladas una sola vez y evaluadas de forma vectorizada
+con NumPy. Los resultados se cachean por (dataset, anio).
+"""
+
+import ast
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from domain.domain_models import MetricaDerivada
+
+logger = logging.getLogger(__name__)
+
+# Funciones permitidas dentro de una expresión
+FUNCIONES_PERMITIDAS: Dict[str, Any] = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "log10": np.log10,
+    "log1p": np.log1p,
+    "exp": np.exp,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+}
+
+_NODOS_PERMITIDOS = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Load, ast.Constant, ast.Call,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd,
+)
+
+
+@dataclass
+class ExpresionCompilada:
+    """Expresión validada: bytecode listo para evaluar y columnas que utiliza."""
+    codigo: Any
+    columnas: Tuple[str, ...]
+
+
+def compilar_expresion(expresion: str) -> ExpresionCompilada:
+    """
+    Valida la expresión (solo aritmética, constantes numéricas, columnas y
+    funciones de FUNCIONES_PERMITIDAS) y la compila a bytecode.
+
+    :raises ValueError: Si la expresión usa construcciones no permitidas.
+    """
+    try:
+        arbol = ast.parse(expresion, mode="eval")
+    except SyntaxError as ex:
+        raise ValueError(f"Expresión inválida '{expresion}': {ex}") from ex
+
+    columnas: List[str] = []
+    for nodo in ast.walk(arbol):
+        if not isinstance(nodo, _NODOS_PERMITIDOS):
+            raise ValueError(f"Construcción no permitida en '{expresion}': {type(nodo).__name__}")
+        if isinstance(nodo, ast.Constant) and not isinstance(nodo.value, (int, float)):
+            raise ValueError(f"Solo se permiten constantes numéricas en '{expresion}'.")
+        if isinstance(nodo, ast.Call):
+            if not isinstance(nodo.func, ast.Name) or nodo.func.id not in FUNCIONES_PERMITIDAS \
+                    or nodo.keywords:
+                raise ValueError(f"Función no permitida en '{expresion}'.")
+        elif isinstance(nodo, ast.Name) and nodo.id not in FUNCIONES_PERMITIDAS \
+                and nodo.id not in columnas:
+            columnas.append(nodo.id)
+
+    codigo = compile(arbol, filename=f"<metrica: {expresion}>", mode="eval")
+    return ExpresionCompilada(codigo=codigo, columnas=tuple(columnas))
+
+
+class DerivedMetricsEngine:
+    """
+    SRP: evaluar y cachear métricas derivadas.
+    - Las expresiones se compilan al registrar la métrica.
+    - Cada evaluación opera sobre columnas completas (float64).
+    - La caché se indexa por (dataset, anio) y se invalida al recargar datos.
+    """
+
+    def __init__(self, metricas: Optional[Iterable[MetricaDerivada]] = None) -> None:
+        """
+        :param metricas: Métricas a registrar inicialmente.
+        :raises ValueError: Si alguna expresión es inválida.
+        """
+        self._metricas: Dict[str, MetricaDerivada] = {}
+        self._compiladas: Dict[str, ExpresionCompilada] = {}
+        self._cache: Dict[Tuple[str, Hashable], pd.DataFrame] = {}
+        for metrica in metricas or []:
+            self.registrar(metrica)
+
+    def registrar(self, metrica: MetricaDerivada) -> None:
+        """
+        Registra (o reemplaza) una métrica derivada e invalida la caché.
+
+        :raises ValueError: Si la expresión es inválida.
+        """
+        self._compiladas[metrica.nombre] = compilar_expresion(metrica.expresion)
+        self._metricas[metrica.nombre] = metrica
+        self.invalidar()
+
+    def invalidar(self, dataset_key: Optional[str] = None) -> None:
+        """
+        Descarta los resultados cacheados de un dataset (o de todos).
+        """
+        if dataset_key is None:
+            self._cache.clear()
+        else:
+            for clave in [c for c in self._cache if c[0] == dataset_key]:
+                del self._cache[clave]
+
+    def metricas_disponibles(self, dataset_key: str, columnas: Iterable[str]) -> List[MetricaDerivada]:
+        """
+        Métricas aplicables a un dataset con las columnas dadas. Una columna
+        nativa con el mismo nombre tiene prioridad sobre la derivada.
+        """
+        columnas = set(columnas)
+        return [
+            metrica for nombre, metrica in self._metricas.items()
+            if (metrica.datasets is None or dataset_key in metrica.datasets)
+            and nombre not in columnas
+            and set(self._compiladas[nombre].columnas) <= columnas
+        ]
+
+    def es_derivada(self, dataset_key: str, nombre: Optional[str], columnas: Iterable[str]) -> bool:
+        """Indica si `nombre` es una métrica derivada aplicable al dataset."""
+        return any(m.nombre == nombre for m in self.metricas_disponibles(dataset_key, columnas))
+
+    def calcular(self,
+                 dataset_key: str,
+                 anio: Optional[int],
+                 data: pd.DataFrame,
+                 granularidad: Optional[str] = None) -> pd.DataFrame:
+        """
+        Calcula todas las métricas derivadas aplicables a `data`, que debe ser
+        el dataset ya filtrado por `anio`. El resultado comparte índice con
+        `data` y se reutiliza mientras no se invalide la caché.
+
+        :param granularidad: Solo cuando `data` es una capa derivada con
+                             otras unidades (p. ej. "manzana"); separa su caché.
+
+        :return: DataFrame con una columna por métrica derivada.
+        """
+        clave = (dataset_key, anio) if granularidad is None else (dataset_key, anio, granularidad)
+        resultado = self._cache.get(clave)
+        if resultado is not None and resultado.index.equals(data.index):
+            return resultado
+
+        resultado = pd.DataFrame(index=data.index)
+        for metrica in self.metricas_disponibles(dataset_key, data.columns):
+            resultado[metrica.nombre] = self._evaluar(metrica.nombre, data)
+
+        self._cache[clave] = resultado
+        logger.info(f"Métricas derivadas calculadas para {clave}: {list(resultado.columns)}")
+        return resultado
+
+    def _evaluar(self, nombre: str, data: pd.DataFrame) -> np.ndarray:
+        compilada = self._compiladas[nombre]
+        entorno: Dict[str, Any] = dict(FUNCIONES_PERMITIDAS)
+        for columna in compilada.columnas:
+            entorno[columna] = pd.to_numeric(data[columna], errors="coerce").to_numpy(dtype="float64")
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valores = eval(compilada.codigo, {"__builtins__": {}}, entorno)
+
+        valores = np.broadcast_to(np.asarray(valores, dtype="float64"), (len(data),)).copy()
+        valores[~np.isfinite(valores)] = np.nan
+        return valores
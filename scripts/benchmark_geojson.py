@@ -0,0 +1,74 @@
+# scripts/benchmark_geojson.py
+
+"""
+Compara tamaño y tiempo de serialización del GeoJSON de manzanas:
+`__geo_interface__` (Plotly), `to_json()` (Leaflet) y GeoJSONSerializer
+con distintas precisiones.
+
+Uso:
+    python scripts/benchmark_geojson.py [--repeticiones 5]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import geopandas as gpd
+
+# Obtener la ruta absoluta del directorio del script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from dashboard.figures.geojson_serializer import GeoJSONSerializer  # noqa: E402
+
+MANZANAS_SHP = os.path.join(ROOT_DIR, 'clean_data', 'poligonos', 'manzana',
+                            'manzanas_coyoacan_clean.shp')
+
+
+def medir(funcion: Callable[[], bytes], repeticiones: int) -> Tuple[float, bytes]:
+    """Devuelve el mejor tiempo (s) de `repeticiones` corridas y el último resultado."""
+    mejor = float('inf')
+    resultado = b''
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    manzanas = gpd.read_file(MANZANAS_SHP).to_crs('EPSG:4326')
+    print(f"Manzanas: {len(manzanas)} polígonos, "
+          f"{int(manzanas.count_coordinates().sum())} vértices")
+
+    casos: List[Tuple[str, Callable[[], bytes]]] = [
+        ('__geo_interface__ + json.dumps',
+         lambda: json.dumps(manzanas.__geo_interface__).encode('utf-8')),
+        ('to_json()',
+         lambda: manzanas.to_json().encode('utf-8')),
+    ]
+    for precision in (6, 5, 4):
+        for omitir_cierre in (False, True):
+            serializer = GeoJSONSerializer(precision=precision, omitir_cierre=omitir_cierre)
+            etiqueta = f"GeoJSONSerializer(p={precision}, omitir_cierre={omitir_cierre})"
+            casos.append((etiqueta, lambda s=serializer: s.serializar(manzanas, ['id_manzana'])))
+
+    print(f"{'Método':<52}{'ms':>9}{'KiB':>10}{'KiB gzip':>10}")
+    for etiqueta, funcion in casos:
+        segundos, payload = medir(funcion, args.repeticiones)
+        comprimido = gzip.compress(payload, compresslevel=6)
+        print(f"{etiqueta:<52}{segundos * 1000:>9.1f}"
+              f"{len(payload) / 1024:>10.1f}{len(comprimido) / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# scripts/build_clean_data.py
+
+"""
+Construye clean_data/poligonos (municipio, AGEB, colonias, manzanas) y las
+capas derivadas (uso de suelo recortado y uso predominante por manzana) a
+partir de los archivos de data/, con el pipeline incremental de
+pipeline.py: solo se reejecuta lo que depende de un archivo o parámetro
+que cambió, y los recortes independientes corren en paralelo.
+
+Uso:
+    python scripts/build_clean_data.py                 # construye todo
+    python scripts/build_clean_data.py --plan          # muestra qué se ejecutaría
+    python scripts/build_clean_data.py manzanas_uso_suelo --procesos 1
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import geopandas as gpd
+import pandas as pd
+from geopandas import GeoDataFrame
+from shapely.geometry import MultiPolygon
+
+from pipeline import Paso, Pipeline
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from dashboard.analysis.dual_crs import preparar_capa  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+CLEAN_DIR = os.path.join(ROOT_DIR, 'clean_data', 'poligonos')
+CACHE_DIR = os.path.join(ROOT_DIR, 'clean_data', '.pipeline')
+
+CRS_SALIDA = "EPSG:4326"
+
+
+def _solo_poligonos(geom):
+    """Conserva solo las partes poligonales (el overlay puede dejar líneas o puntos)."""
+    if geom is None or geom.is_empty:
+        return None
+    if geom.geom_type in ('Polygon', 'MultiPolygon'):
+        return geom
+    if geom.geom_type == 'GeometryCollection':
+        partes = [p for p in geom.geoms if p.geom_type in ('Polygon', 'MultiPolygon')]
+        if not partes:
+            return None
+        return partes[0] if len(partes) == 1 else MultiPolygon(
+            [q for p in partes for q in (p.geoms if p.geom_type == 'MultiPolygon' else [p])]
+        )
+    return None
+
+
+def leer_municipio(limites: str, nombre: str) -> GeoDataFrame:
+    """Polígono del municipio `nombre` en CRS_SALIDA, con geometría corregida."""
+    gdf = gpd.read_file(limites)
+    gdf = gdf[gdf['NOMGEO'] == nombre].to_crs(CRS_SALIDA)
+    gdf['geometry'] = gdf.geometry.buffer(0)
+    return gdf[~gdf.geometry.is_empty & gdf.geometry.notna()].reset_index(drop=True)
+
+
+def recortar_a_municipio(capa: str,
+                         municipio: GeoDataFrame,
+                         columnas: Optional[Dict[str, str]] = None,
+                         encoding: Optional[str] = None) -> GeoDataFrame:
+    """
+    Lee `capa`, la reproyecta a CRS_SALIDA y la recorta al municipio.
+
+    :param columnas: {columna original: nombre limpio}; None conserva todas.
+    :param encoding: Codificación del .dbf (p. ej. latin1 en uso de suelo).
+    """
+    gdf = gpd.read_file(capa, encoding=encoding) if encoding else gpd.read_file(capa)
+    gdf = gdf.to_crs(CRS_SALIDA)
+    gdf['geometry'] = gdf.geometry.buffer(0)
+    if columnas is not None:
+        gdf = gdf[list(columnas) + ['geometry']].rename(columns=columnas)
+        for columna in columnas.values():
+            gdf[columna] = gdf[columna].astype(str)
+    recortada = gpd.clip(gdf, municipio)
+    recortada['geometry'] = recortada.geometry.apply(_solo_poligonos)
+    recortada = recortada[recortada.geometry.notna()]
+    return recortada[~recortada.geometry.is_empty].reset_index(drop=True)
+
+
+def uso_suelo_predominante(manzanas: GeoDataFrame,
+                           uso_suelo: GeoDataFrame,
+                           columna_id: str = 'id_manzana',
+                           columna_uso: str = 'us_dscr') -> GeoDataFrame:
+    """
+    Uso de suelo más frecuente en cada manzana ('Sin Datos' si no hay),
+    como capa dual: geometría métrica, área, centroide y caja precalculados.
+    """
+    union = gpd.sjoin(manzanas, uso_suelo[[columna_uso, 'geometry']], how='left', predicate='contains')
+    conteos = union.groupby([columna_id, columna_uso]).size().reset_index(name='counts')
+    predominante = conteos.loc[conteos.groupby(columna_id)['counts'].idxmax(), [columna_id, columna_uso]]
+    resultado = manzanas.merge(predominante, on=columna_id, how='left')
+    resultado[columna_uso] = resultado[columna_uso].fillna('Sin Datos')
+    return preparar_capa(resultado)
+
+
+def pasos_coyoacan(data_dir: str = DATA_DIR,
+                   clean_dir: str = CLEAN_DIR,
+                   municipio: str = 'Coyoacán') -> List[Paso]:
+    """DAG de las capas limpias de Coyoacán."""
+    return [
+        Paso('municipio', leer_municipio,
+             archivos={'limites': os.path.join(data_dir, 'limites', 'poligonos_alcaldias_cdmx.shp')},
+             parametros={'nombre': municipio},
+             salida=os.path.join(clean_dir, 'municipio', 'municipio_coyoacan_clean.shp')),
+        Paso('ageb', recortar_a_municipio,
+             archivos={'capa': os.path.join(data_dir, 'ageb_cdmx', 'poligono_ageb_urbanas_cdmx.shp')},
+             dependencias=('municipio',),
+             parametros={'columnas': {'CVE_AGEB': 'id_ageb'}},
+             salida=os.path.join(clean_dir, 'ageb', 'ageb_coyoacan_clean.shp')),
+        Paso('colonias', recortar_a_municipio,
+             archivos={'capa': os.path.join(data_dir, 'colonias', 'colonias_coyoacan.shp')},
+             dependencias=('municipio',),
+             salida=os.path.join(clean_dir, 'colonia', 'colonias_coyoacan_clean.shp')),
+        Paso('manzanas', recortar_a_municipio,
+             archivos={'capa': os.path.join(data_dir, 'manzanas', '090030001m.shp')},
+             dependencias=('municipio',),
+             parametros={'columnas': {'IDENTIFICA': 'id_manzana'}},
+             salida=os.path.join(clean_dir, 'manzana', 'manzanas_coyoacan_clean.shp')),
+        Paso('uso_suelo', recortar_a_municipio,
+             archivos={'capa': os.path.join(data_dir, 'uso_suelo', 'uso-de-suelo.shp')},
+             dependencias=('municipio',),
+             parametros={'encoding': 'latin1'}),
+        Paso('manzanas_uso_suelo', uso_suelo_predominante,
+             dependencias=('manzanas', 'uso_suelo')),
+    ]
+
+
+def construir_capas(objetivos: Optional[Iterable[str]] = None,
+                    procesos: Optional[int] = None,
+                    forzar: bool = False) -> Dict[str, GeoDataFrame]:
+    """
+    Construye (o reutiliza) las capas pedidas y las devuelve.
+    Pensado para que los scripts de mapas no repitan recorte y uniones.
+    """
+    pipeline = Pipeline(pasos_coyoacan(), CACHE_DIR, max_procesos=procesos)
+    objetivos = list(objetivos) if objetivos is not None else None
+    resultados = pipeline.construir(objetivos, forzar=forzar)
+    nombres = objetivos if objetivos is not None else list(resultados)
+    return {nombre: gpd.read_parquet(resultados[nombre].ruta) for nombre in nombres}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Construye clean_data de forma incremental.")
+    parser.add_argument('objetivos', nargs='*', help="Pasos a construir (por defecto, todos).")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos en paralelo.")
+    parser.add_argument('--forzar', action='store_true', help="Ignora la caché.")
+    parser.add_argument('--plan', action='store_true', help="Solo muestra qué se ejecutaría.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    pipeline = Pipeline(pasos_coyoacan(), CACHE_DIR, max_procesos=args.procesos)
+    objetivos = args.objetivos or None
+    if args.plan:
+        for nombre, ejecutar in pipeline.plan(objetivos).items():
+            print(f"{'EJECUTAR' if ejecutar else 'en caché'}\t{nombre}")
+        return
+    resultados = pipeline.construir(objetivos, forzar=args.forzar)
+    resumen = pd.DataFrame([vars(r) for r in resultados.values()])
+    print(resumen.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
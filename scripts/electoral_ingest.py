@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# scripts/electoral_ingest.py
+
+"""
+Ingesta por bloques de resultados electorales por casilla (cómputos del
+INE/IECM) para el tablero /electorales.
+
+El CSV se lee en bloques; cada bloque se filtra por entidad (y por las
+secciones de la capa de polígonos) y se agrega por sección, sumándose a un
+acumulado, así que la memoria queda acotada por `chunksize` más una fila
+por sección. El resultado se une a los polígonos de sección y se escribe
+en el ElectoralResultsStore por año, junto con las transferencias
+sección -> colonia y sección -> AGEB ya calculadas (interpolación areal),
+para que el tablero solo tenga que leerlas.
+
+Uso:
+    python scripts/electoral_ingest.py casillas_2018.csv 2018 secciones.shp data/electorales \
+        --colonias clean_data/poligonos/colonia/colonias_coyoacan_clean.shp \
+        --agebs clean_data/poligonos/ageb/ageb_coyoacan_clean.shp
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from dashboard.analysis.areal_interpolation import ArealInterpolator  # noqa: E402
+from dashboard.analysis.artifact_cache import ArtifactCache  # noqa: E402
+from dashboard.analysis.spatial_weights import geometrias_metricas  # noqa: E402
+from dashboard.data_access.electoral_store import NIVEL_BASE, ElectoralResultsStore  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Columnas de identificación de la casilla: se leen como texto y no se suman
+COLUMNAS_CASILLA = ["ID_ESTADO", "ESTADO", "ID_DISTRITO", "DISTRITO", "ID_MUNICIPIO", "MUNICIPIO",
+                    "SECCION", "ID_CASILLA", "TIPO_CASILLA", "EXT_CONTIGUA", "CASILLA",
+                    "NUM_ACTA_IMPRESO", "OBSERVACIONES", "MECANISMOS_TRASLADO", "FECHA_HORA"]
+
+# Valores de actas no capturadas o ilegibles
+VALORES_NULOS = ["-", "", "N/A", "Ilegible", "Sin dato", "Sin acta"]
+
+# Columnas derivadas (ver nombre_columna): se reparten por área como conteos
+COLUMNA_CASILLAS = "casillas"
+COLUMNA_LISTA = "lista_nominal"
+COLUMNA_TOTAL = "votos_total"
+
+
+@dataclass
+class ElectoralIngestConfig:
+    """
+    Parámetros de la ingesta por casilla.
+    - entidad: ID_ESTADO a conservar (CDMX = 9; None = sin filtrar).
+    - columna_seccion / columna_entidad: Nombres de las columnas en el CSV.
+    - columnas_votos: Columnas a sumar (None = todas las numéricas que no
+      identifican la casilla).
+    """
+    csv_path: str
+    anio: int
+    entidad: Optional[int] = 9
+    columna_seccion: str = "SECCION"
+    columna_entidad: str = "ID_ESTADO"
+    chunksize: int = 200_000
+    columnas_votos: Optional[List[str]] = None
+    encoding: str = "utf-8"
+
+
+def nombre_columna(columna: str) -> str:
+    """
+    Nombre limpio de una columna de votos: votos_<partido> en minúsculas y
+    sin acentos; la lista nominal y el total tienen nombre fijo.
+    """
+    limpio = unicodedata.normalize("NFKD", str(columna)).encode("ascii", "ignore").decode()
+    limpio = re.sub(r"[^0-9a-zA-Z]+", "_", limpio).strip("_").lower()
+    if limpio.startswith("lista_nominal"):
+        return COLUMNA_LISTA
+    if limpio.startswith("total_votos") or limpio == "votacion_total":
+        return COLUMNA_TOTAL
+    return f"votos_{limpio}"
+
+
+def normalizar_seccion(serie: pd.Series) -> pd.Series:
+    """Clave de sección como texto sin ceros a la izquierda ("0123" -> "123")."""
+    return pd.to_numeric(serie, errors="coerce").astype("Int64").astype("string")
+
+
+def leer_casillas_por_bloques(config: ElectoralIngestConfig,
+                              secciones: Optional[Set[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Itera sobre bloques de casillas de la entidad (y de `secciones`, si se
+    da) con una columna `seccion` normalizada y los votos como números.
+    """
+    encabezado = pd.read_csv(config.csv_path, nrows=0, encoding=config.encoding)
+    columnas = list(encabezado.columns)
+    votos = config.columnas_votos
+    lector = pd.read_csv(
+        config.csv_path,
+        dtype="str",
+        na_values=VALORES_NULOS,
+        keep_default_na=False,
+        encoding=config.encoding,
+        chunksize=config.chunksize,
+    )
+
+    leidas = conservadas = 0
+    for bloque in lector:
+        leidas += len(bloque)
+        if config.entidad is not None and config.columna_entidad in columnas:
+            entidad = pd.to_numeric(bloque[config.columna_entidad], errors="coerce")
+            bloque = bloque[entidad == config.entidad]
+        seccion = normalizar_seccion(bloque[config.columna_seccion])
+        mascara = seccion.notna()
+        if secciones is not None:
+            mascara &= seccion.isin(secciones)
+        bloque, seccion = bloque[mascara], seccion[mascara]
+        if bloque.empty:
+            continue
+
+        if votos is None:
+            # Numéricas: las que no identifican la casilla y se leen como número
+            candidatas = [c for c in columnas if c not in COLUMNAS_CASILLA and c != config.columna_seccion]
+            votos = [c for c in candidatas
+                     if pd.to_numeric(bloque[c], errors="coerce").notna().sum() >= bloque[c].notna().sum() > 0]
+            logger.info(f"Columnas de votos: {votos}")
+        numeros = bloque[votos].apply(pd.to_numeric, errors="coerce").astype("float64")
+        numeros.columns = [nombre_columna(c) for c in votos]
+        numeros.insert(0, "seccion", seccion.to_numpy())
+        conservadas += len(numeros)
+        yield numeros
+
+    logger.info(f"Casillas: {leidas} filas leídas, {conservadas} conservadas.")
+
+
+def agregar_por_seccion(bloques: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Group-by incremental: cada bloque se agrega por sección y se suma al
+    acumulado (las secciones nuevas se agregan, las repetidas se suman).
+
+    :return: Una fila por sección (índice) con los votos y `casillas`.
+    """
+    acumulado: Optional[pd.DataFrame] = None
+    for bloque in bloques:
+        grupos = bloque.groupby("seccion", sort=False)
+        parcial = grupos.sum(min_count=1)
+        parcial[COLUMNA_CASILLAS] = grupos.size()
+        acumulado = parcial if acumulado is None else acumulado.add(parcial, fill_value=0)
+    if acumulado is None:
+        return pd.DataFrame()
+    acumulado[COLUMNA_CASILLAS] = acumulado[COLUMNA_CASILLAS].astype("int64")
+    return acumulado.sort_index()
+
+
+def agregar_participacion(capa: pd.DataFrame) -> pd.DataFrame:
+    """Participación (%) = votos_total / lista_nominal, sobre sumas ya agregadas."""
+    if COLUMNA_TOTAL in capa.columns and COLUMNA_LISTA in capa.columns:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            capa["participacion"] = np.where(capa[COLUMNA_LISTA] > 0,
+                                             100 * capa[COLUMNA_TOTAL] / capa[COLUMNA_LISTA], np.nan)
+    return capa
+
+
+def unir_a_secciones(resultados: pd.DataFrame,
+                     secciones: GeoDataFrame,
+                     columna_seccion: str = "seccion") -> GeoDataFrame:
+    """Polígonos de sección con sus resultados (solo las secciones con resultados)."""
+    poligonos = gpd.GeoDataFrame({"seccion": normalizar_seccion(secciones[columna_seccion]).to_numpy()},
+                                 geometry=secciones.geometry.to_numpy(), crs=secciones.crs)
+    poligonos = poligonos.dropna(subset=["seccion"]).drop_duplicates(subset="seccion")
+    capa = poligonos.merge(resultados, left_on="seccion", right_index=True, how="inner")
+    faltantes = len(resultados) - len(capa)
+    if faltantes:
+        logger.warning(f"{faltantes} secciones con resultados no tienen polígono.")
+    return agregar_participacion(capa.reset_index(drop=True))
+
+
+def transferir(capa_secciones: GeoDataFrame,
+               destino: GeoDataFrame,
+               nivel: str,
+               columna_id: Optional[str],
+               interpolador: ArealInterpolator) -> GeoDataFrame:
+    """
+    Lleva los conteos de sección a otra capa de polígonos por área, con el
+    mismo formato que DataService.transferir_a_granularidad (columna `nivel`
+    con el id de destino) y el mismo nombre de crosswalk, que queda en caché.
+    """
+    conteos = [c for c in capa_secciones.columns
+               if c.startswith("votos_") or c in (COLUMNA_LISTA, COLUMNA_CASILLAS)]
+    valores = interpolador.transferir(
+        capa_secciones, destino,
+        nivel_origen=f"electorales_{NIVEL_BASE}",
+        nivel_destino=nivel,
+        extensivas=conteos,
+        columna_id_origen="seccion",
+        columna_id_destino=columna_id,
+    )
+    capa = gpd.GeoDataFrame({nivel: valores.index.to_numpy()},
+                            geometry=destino.geometry.to_numpy(), crs=destino.crs)
+    for columna in valores.columns:
+        capa[columna] = valores[columna].to_numpy()
+    capa["area_km2"] = gpd.GeoSeries(geometrias_metricas(destino)).area.to_numpy() / 1e6
+    return agregar_participacion(capa)
+
+
+def ingest(config: ElectoralIngestConfig,
+           secciones: GeoDataFrame,
+           almacen: ElectoralResultsStore,
+           destinos: Optional[Dict[str, Tuple[GeoDataFrame, Optional[str]]]] = None,
+           interpolador: Optional[ArealInterpolator] = None,
+           columna_seccion: str = "seccion") -> Dict[str, GeoDataFrame]:
+    """
+    Agrega el CSV de casillas a sección, lo escribe en `almacen` para
+    `config.anio` y precalcula las transferencias a cada destino.
+
+    :param secciones: Polígonos de sección (con columna `columna_seccion`).
+    :param destinos: {nivel: (polígonos, columna id o None)}, p. ej. colonia y ageb.
+    :return: {nivel: capa escrita}.
+    """
+    claves = set(normalizar_seccion(secciones[columna_seccion]).dropna())
+    resultados = agregar_por_seccion(leer_casillas_por_bloques(config, claves))
+    if resultados.empty:
+        logger.warning("No hay casillas para los filtros indicados; no se escribió nada.")
+        return {}
+
+    capas = {NIVEL_BASE: unir_a_secciones(resultados, secciones, columna_seccion)}
+    interpolador = interpolador or ArealInterpolator(ArtifactCache())
+    for nivel, (destino, columna_id) in (destinos or {}).items():
+        capas[nivel] = transferir(capas[NIVEL_BASE], destino, nivel, columna_id, interpolador)
+    for nivel, capa in capas.items():
+        almacen.escribir(capa, config.anio, nivel)
+    return capas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingesta por bloques de resultados por casilla.")
+    parser.add_argument("csv_path")
+    parser.add_argument("anio", type=int)
+    parser.add_argument("secciones", help="Polígonos de sección (shp, gpkg, geojson)")
+    parser.add_argument("salida", help="Directorio del almacén de resultados")
+    parser.add_argument("--columna-seccion", default="seccion",
+                        help="Columna con la clave de sección en los polígonos")
+    parser.add_argument("--colonias", help="Polígonos de colonias (transferencia precalculada)")
+    parser.add_argument("--columna-colonia", default="id_colonia")
+    parser.add_argument("--agebs", help="Polígonos de AGEB (transferencia precalculada)")
+    parser.add_argument("--columna-ageb", default="id_ageb")
+    parser.add_argument("--entidad", type=int, default=9, help="ID_ESTADO; use 0 para no filtrar")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    destinos = {}
+    for nivel, ruta, columna in (("colonia", args.colonias, args.columna_colonia),
+                                 ("ageb", args.agebs, args.columna_ageb)):
+        if ruta:
+            capa = gpd.read_file(ruta)
+            destinos[nivel] = (capa, columna if columna in capa.columns else None)
+    config = ElectoralIngestConfig(
+        csv_path=args.csv_path,
+        anio=args.anio,
+        entidad=args.entidad or None,
+        chunksize=args.chunksize,
+        encoding=args.encoding,
+    )
+    ingest(config, gpd.read_file(args.secciones), ElectoralResultsStore(args.salida),
+           destinos, columna_seccion=args.columna_seccion)
+
+
+if __name__ == "__main__":
+    main()
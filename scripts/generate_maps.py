@@ -12,6 +12,9 @@ from typing import Optional
 import re
 import os
 
+from build_clean_data import construir_capas
+from iter_ingest import IterIngestConfig, leer_iter_por_bloques, a_geodataframe
+
 # Obtener la ruta absoluta del directorio del script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -40,49 +43,18 @@ class GeoDataHandler:
     data_dir: str
 
     def load_demography_data(self) -> gpd.GeoDataFrame:
-        """Carga y procesa los datos de demografía."""
+        """Carga y procesa los datos de demografía de Coyoacán."""
         # Ruta al archivo CSV
-        csv_path = f"{self.data_dir}demografia/iter_09_cpv2020/conjunto_de_datos/conjunto_de_datos_iter_09CSV20.csv"
-        # Cargar datos
-        demography_data = pd.read_csv(csv_path)
-
-        # Convertir coordenadas DMS a decimal
-        demography_data['LONGITUD'] = demography_data['LONGITUD'].apply(dms_to_decimal)
-        demography_data['LATITUD'] = demography_data['LATITUD'].apply(dms_to_decimal)
-
-        # Filtrar datos válidos
-        valid_data = demography_data.dropna(subset=['LONGITUD', 'LATITUD'])
-        valid_data = valid_data[
-            (valid_data['LONGITUD'].apply(lambda x: isinstance(x, float))) &
-            (valid_data['LATITUD'].apply(lambda x: isinstance(x, float)))
-        ]
+        csv_path = os.path.join(self.data_dir, 'demografia', 'iter_09_cpv2020',
+                                'conjunto_de_datos', 'conjunto_de_datos_iter_09CSV20.csv')
+        # Leer por bloques, filtrando a Coyoacán y convirtiendo las coordenadas DMS
+        config = IterIngestConfig(csv_path=csv_path, entidad='09', municipio='003')
+        bloques = list(leer_iter_por_bloques(config))
+        if not bloques:
+            return a_geodataframe(pd.DataFrame(columns=['LONGITUD', 'LATITUD']))
 
         # Crear GeoDataFrame
-        gdf = gpd.GeoDataFrame(
-            valid_data,
-            geometry=gpd.points_from_xy(valid_data['LONGITUD'], valid_data['LATITUD']),
-            crs='EPSG:4326'
-        )
-        return gdf
-
-    def load_coyoacan_boundary(self) -> gpd.GeoDataFrame:
-        """Carga los límites de Coyoacán."""
-        shp_path = os.path.join(self.data_dir, 'limites', 'poligonos_alcaldias_cdmx.shp')
-        gdf = gpd.read_file(shp_path)
-        coyoacan_boundary = gdf[gdf['NOMGEO'] == 'Coyoacán']
-        return coyoacan_boundary
-
-    def load_land_use(self) -> gpd.GeoDataFrame:
-        """Carga los datos de uso de suelo."""
-        shp_path = os.path.join(self.data_dir, 'uso_suelo', 'uso-de-suelo.shp')
-        gdf = gpd.read_file(shp_path, encoding='latin1')
-        return gdf
-
-    def load_manzanas(self) -> gpd.GeoDataFrame:
-        """Carga los datos de manzanas."""
-        shp_path = os.path.join(self.data_dir, 'manzanas', '090030001m.shp')
-        gdf = gpd.read_file(shp_path)
-        return gdf
+        return a_geodataframe(pd.concat(bloques, ignore_index=True))
 
 
 # Función para crear un mapa interactivo con Folium
@@ -93,13 +65,9 @@ def create_interactive_map(
     legend_title: str
 ) -> None:
     """Crea un mapa interactivo utilizando Folium."""
-    # Reproyectar a CRS proyectado para cálculos geométricos
-    gdf_proj = gdf.to_crs(epsg=32614)
-    # Calcular el centro del mapa
-    centroide = gdf_proj.geometry.centroid.union_all().centroid
-    centroide_wgs84 = gpd.GeoSeries([centroide], crs='EPSG:32614').to_crs(epsg=4326)
-    centro_lat = centroide_wgs84.geometry.y.iloc[0]
-    centro_lon = centroide_wgs84.geometry.x.iloc[0]
+    # Centro del mapa: promedio de los centroides precalculados (capa dual)
+    centro_lat = gdf['centroide_lat'].mean()
+    centro_lon = gdf['centroide_lon'].mean()
 
     # Crear el mapa
     m = folium.Map(location=[centro_lat, centro_lon], zoom_start=13)
@@ -117,7 +85,7 @@ def create_interactive_map(
 
     # Añadir los polígonos al mapa
     folium.GeoJson(
-        gdf,
+        gdf[[column_name, 'geometry']],
         style_function=lambda feature: {
             'fillColor': color_dict.get(feature['properties'][column_name], 'gray'),
             'color': 'black',
@@ -167,45 +135,9 @@ def generate_legend_html(color_dict: dict, legend_title: str) -> str:
 
 # Función principal
 def main():
-    # Crear una instancia del manejador de datos
-    geo_handler = GeoDataHandler(data_dir=DATA_DIR)
-
-    # Cargar los datos
-    coyoacan_boundary = geo_handler.load_coyoacan_boundary()
-    uso_suelo = geo_handler.load_land_use()
-    manzanas = geo_handler.load_manzanas()
-
-    # Asegurar que los CRS coincidan
-    if coyoacan_boundary.crs != uso_suelo.crs:
-        coyoacan_boundary = coyoacan_boundary.to_crs(uso_suelo.crs)
-    if manzanas.crs != uso_suelo.crs:
-        manzanas = manzanas.to_crs(uso_suelo.crs)
-
-    # Recortar los datos al área de Coyoacán
-    uso_suelo_coyoacan = gpd.clip(uso_suelo, coyoacan_boundary)
-    manzanas_coyoacan = gpd.clip(manzanas, coyoacan_boundary)
-
-    # Realizar la unión espacial entre manzanas y uso de suelo
-    gdf_union = gpd.sjoin(
-        manzanas_coyoacan,
-        uso_suelo_coyoacan,
-        how='left',
-        predicate='contains'
-    )
-
-    # Determinar el uso de suelo predominante en cada manzana
-    uso_suelo_por_manzana = gdf_union.groupby(['IDENTIFICA', 'us_dscr']).size().reset_index(name='counts')
-    idx_max = uso_suelo_por_manzana.groupby('IDENTIFICA')['counts'].idxmax()
-    uso_suelo_predominante = uso_suelo_por_manzana.loc[idx_max]
-
-    # Unir el uso de suelo predominante al GeoDataFrame de manzanas
-    manzanas_coyoacan = manzanas_coyoacan.merge(
-        uso_suelo_predominante[['IDENTIFICA', 'us_dscr']],
-        on='IDENTIFICA',
-        how='left'
-    )
-    # Manejar manzanas sin datos
-    manzanas_coyoacan['us_dscr'] = manzanas_coyoacan['us_dscr'].fillna('Sin Datos')
+    # Recorte, reproyección y unión con uso de suelo: se reutilizan del
+    # pipeline incremental (solo se recalculan si cambió algún archivo)
+    manzanas_coyoacan = construir_capas(['manzanas_uso_suelo'])['manzanas_uso_suelo']
 
     # Crear el mapa de uso de suelo por manzana
     create_interactive_map(
@@ -59,3 +59,20 @@ class DataProcessor:
         except Exception as e:
             logger.error(f"Error al agregar métrica personalizada: {e}")
             return data
+
+    @staticmethod
+    def agregar_metrica_expresion(
+        data: gpd.GeoDataFrame, nueva_columna: str, expresion: str
+    ) -> gpd.GeoDataFrame:
+        """
+        Agrega una métrica calculada con una expresión sobre columnas completas,
+        p. ej. "pob_total / area_km2". Se evalúa de forma vectorizada con
+        DataFrame.eval (numexpr si está instalado) en lugar de una llamada por fila.
+        """
+        try:
+            data[nueva_columna] = data.eval(expresion)
+            logger.info(f"Nueva columna '{nueva_columna}' agregada con la expresión '{expresion}'.")
+            return data
+        except Exception as e:
+            logger.error(f"Error al agregar métrica con expresión: {e}")
+            return data
@@ -4,6 +4,12 @@ import geopandas as gpd
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
 import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from dashboard.analysis.spatial_index import SpatialIndexStore  # noqa: E402
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -48,6 +54,10 @@ def importar_shapefile(ruta_shapefile, nombre_tabla):
         # Escribir el GeoDataFrame en PostgreSQL
         gdf.to_postgis(name=nombre_tabla, con=engine, if_exists='replace', index=False)
 
+        # Construir y persistir el índice espacial de la tabla, que la app y
+        # el dashboard abren al arrancar en vez de construirlo en memoria
+        SpatialIndexStore().construir(nombre_tabla, gdf)
+
         print(f"Shapefile '{ruta_shapefile}' importado exitosamente a la tabla '{nombre_tabla}'.")
     except Exception as e:
         print(f"[ERROR] Error al importar el shapefile '{ruta_shapefile}': {e}")
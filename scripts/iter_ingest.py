@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# scripts/iter_ingest.py
+
+"""
+Ingesta por bloques del ITER (Principales resultados por localidad, INEGI).
+
+El CSV se lee en bloques con un mapa de tipos explícito, se filtra por
+entidad/municipio mientras se lee y las coordenadas DMS se convierten con
+extracción vectorizada de strings. El resultado se escribe bloque a bloque
+a Parquet o a una tabla PostGIS, por lo que la memoria queda acotada por
+`chunksize` aun con el archivo nacional.
+
+Uso:
+    python scripts/iter_ingest.py ITER_NALCSV20.csv salida.parquet --entidad 09 --municipio 003
+"""
+
+import argparse
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Columnas de identificación: se leen como texto para conservar ceros a la izquierda
+COLUMNAS_CLAVE = ["ENTIDAD", "MUN", "LOC"]
+COLUMNAS_TEXTO = ["NOM_ENT", "NOM_MUN", "NOM_LOC", "LONGITUD", "LATITUD"]
+
+# Valores que el INEGI usa para datos confidenciales o no disponibles
+VALORES_NULOS = ["*", "N/D", "n/d", ""]
+
+DMS_PATTERN = r"^\s*(\d+)\s*°\s*(\d+)\s*'\s*(\d+\.?\d*)\s*\"?\s*([NSEW])"
+
+
+@dataclass
+class IterIngestConfig:
+    """
+    Parámetros de la ingesta del ITER.
+    - entidad / municipio: claves INEGI a conservar (None = sin filtrar).
+      Coyoacán es entidad "09", municipio "003".
+    - usecols: indicadores a conservar además de claves y coordenadas
+      (None = todos).
+    """
+    csv_path: str
+    entidad: Optional[str] = "09"
+    municipio: Optional[str] = "003"
+    chunksize: int = 100_000
+    usecols: Optional[List[str]] = None
+    encoding: str = "utf-8"
+
+
+def construir_mapa_dtypes(columnas: List[str]) -> Dict[str, str]:
+    """
+    Tipos explícitos por columna: claves y nombres como texto, el resto de
+    indicadores como float32 (los '*' y 'N/D' se leen como NaN).
+    """
+    return {
+        col: ("str" if col in COLUMNAS_CLAVE or col in COLUMNAS_TEXTO else "float32")
+        for col in columnas
+    }
+
+
+def dms_series_to_decimal(serie: pd.Series) -> pd.Series:
+    """
+    Convierte una serie de coordenadas DMS (p. ej. 99°09'44.893" W) a grados
+    decimales de forma vectorizada. Los valores inválidos quedan como NaN.
+    """
+    partes = serie.astype("string").str.extract(DMS_PATTERN)
+    grados = partes[0].astype("float64")
+    minutos = partes[1].astype("float64")
+    segundos = partes[2].astype("float64")
+    signo = np.where(partes[3].isin(["S", "W"]), -1.0, 1.0)
+    decimal = (grados + minutos / 60 + segundos / 3600) * signo
+    return decimal.astype("float64")
+
+
+def leer_iter_por_bloques(config: IterIngestConfig) -> Iterator[pd.DataFrame]:
+    """
+    Itera sobre bloques del ITER ya filtrados por entidad/municipio y con
+    LONGITUD/LATITUD en grados decimales. Se descartan filas sin coordenadas
+    válidas (totales municipales y agregados de localidades pequeñas).
+    """
+    encabezado = pd.read_csv(config.csv_path, nrows=0, encoding=config.encoding)
+    columnas = list(encabezado.columns)
+    if config.usecols is not None:
+        requeridas = COLUMNAS_CLAVE + COLUMNAS_TEXTO
+        columnas = [c for c in columnas if c in requeridas or c in config.usecols]
+
+    lector = pd.read_csv(
+        config.csv_path,
+        usecols=columnas,
+        dtype=construir_mapa_dtypes(columnas),
+        na_values=VALORES_NULOS,
+        keep_default_na=False,
+        encoding=config.encoding,
+        chunksize=config.chunksize,
+    )
+
+    leidas = conservadas = 0
+    for bloque in lector:
+        leidas += len(bloque)
+        mascara = pd.Series(True, index=bloque.index)
+        if config.entidad is not None:
+            mascara &= bloque["ENTIDAD"].str.zfill(2) == config.entidad.zfill(2)
+        if config.municipio is not None:
+            mascara &= bloque["MUN"].str.zfill(3) == config.municipio.zfill(3)
+        bloque = bloque[mascara]
+        if bloque.empty:
+            continue
+
+        bloque = bloque.assign(
+            LONGITUD=dms_series_to_decimal(bloque["LONGITUD"]),
+            LATITUD=dms_series_to_decimal(bloque["LATITUD"]),
+        ).dropna(subset=["LONGITUD", "LATITUD"])
+
+        conservadas += len(bloque)
+        if not bloque.empty:
+            yield bloque
+
+    logger.info(f"ITER: {leidas} filas leídas, {conservadas} conservadas.")
+
+
+def a_geodataframe(data: pd.DataFrame) -> gpd.GeoDataFrame:
+    """Construye un GeoDataFrame de puntos (EPSG:4326) a partir de LONGITUD/LATITUD."""
+    return gpd.GeoDataFrame(
+        data,
+        geometry=gpd.points_from_xy(data["LONGITUD"], data["LATITUD"]),
+        crs="EPSG:4326",
+    )
+
+
+def ingest_a_parquet(config: IterIngestConfig, output_path: str) -> int:
+    """
+    Escribe el ITER filtrado a un archivo Parquet, un row group por bloque.
+    La geometría se reconstruye al leer con `a_geodataframe`.
+
+    :return: Número de filas escritas.
+    """
+    escritor: Optional[pq.ParquetWriter] = None
+    total = 0
+    try:
+        for bloque in leer_iter_por_bloques(config):
+            if escritor is None:
+                tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                escritor = pq.ParquetWriter(output_path, tabla.schema, compression="zstd")
+            else:
+                tabla = pa.Table.from_pandas(bloque, schema=escritor.schema, preserve_index=False)
+            escritor.write_table(tabla)
+            total += len(bloque)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    if total == 0:
+        logger.warning("No se encontraron filas para los filtros indicados; no se escribió Parquet.")
+    else:
+        logger.info(f"ITER escrito en '{output_path}': {total} filas.")
+    return total
+
+
+def ingest_a_postgis(config: IterIngestConfig, engine, tabla: str) -> int:
+    """
+    Escribe el ITER filtrado a una tabla PostGIS, reemplazándola con el
+    primer bloque y anexando los siguientes.
+
+    :return: Número de filas escritas.
+    """
+    total = 0
+    for bloque in leer_iter_por_bloques(config):
+        a_geodataframe(bloque).to_postgis(
+            name=tabla,
+            con=engine,
+            if_exists="replace" if total == 0 else "append",
+            index=False,
+        )
+        total += len(bloque)
+    logger.info(f"ITER escrito en la tabla '{tabla}': {total} filas.")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingesta por bloques del ITER del INEGI.")
+    parser.add_argument("csv_path")
+    parser.add_argument("output_path", help="Archivo .parquet de salida")
+    parser.add_argument("--entidad", default="09")
+    parser.add_argument("--municipio", default="003",
+                        help="Clave de municipio; use '' para toda la entidad")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = IterIngestConfig(
+        csv_path=args.csv_path,
+        entidad=args.entidad or None,
+        municipio=args.municipio or None,
+        chunksize=args.chunksize,
+        encoding=args.encoding,
+    )
+    ingest_a_parquet(config, args.output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# scripts/land_use_changes.py
+
+"""
+Compara dos versiones de la capa de uso de suelo y escribe la capa de
+cambios (agregadas, eliminadas, reclasificadas, con cambio de forma,
+divididas y fusionadas) que muestra la página /cambios-uso-suelo.
+
+Uso:
+    python scripts/land_use_changes.py uso_suelo_2020.shp uso_suelo_2024.shp \
+        data/cambios_uso_suelo.parquet --columna-id identifica
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import geopandas as gpd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from dashboard.analysis.change_detection import COLUMNA_CAMBIO, detectar_cambios  # noqa: E402
+from dashboard.domain.domain_models import COLUMNAS_USO_SUELO  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cambios entre dos versiones de uso de suelo.")
+    parser.add_argument("anterior", help="Versión anterior (shp, gpkg, geojson, parquet)")
+    parser.add_argument("nueva", help="Versión nueva")
+    parser.add_argument("salida", help="Capa de cambios (.parquet o cualquier formato de GDAL)")
+    parser.add_argument("--columna-clase", help="Columna de uso de suelo (por defecto la primera de "
+                                                f"{', '.join(COLUMNAS_USO_SUELO)})")
+    parser.add_argument("--columna-id", help="Id de las parcelas (por defecto el índice)")
+    parser.add_argument("--rejilla", type=float, default=0.01, help="Tolerancia del hash en metros")
+    parser.add_argument("--cobertura", type=float, default=0.8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    capas = []
+    for ruta in (args.anterior, args.nueva):
+        capas.append(gpd.read_parquet(ruta) if ruta.endswith(".parquet") else gpd.read_file(ruta))
+    anterior, nueva = capas
+    columna_clase = args.columna_clase or next(
+        (c for c in COLUMNAS_USO_SUELO if c in anterior.columns and c in nueva.columns), None)
+    if columna_clase is None:
+        parser.error("no se encontró la columna de uso de suelo; use --columna-clase")
+
+    cambios = detectar_cambios(anterior, nueva, columna_clase, columna_id=args.columna_id,
+                               rejilla=args.rejilla, cobertura=args.cobertura)
+    if args.salida.endswith(".parquet"):
+        cambios.to_parquet(args.salida, index=False)
+    else:
+        cambios.to_file(args.salida)
+    logger.info(f"{len(cambios)} cambios escritos en {args.salida}: "
+                f"{cambios[COLUMNA_CAMBIO].value_counts().to_dict()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,15 @@ from dash import dcc, html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
 
-# Cargar archivos shapefile de manzanas y uso de suelo
-manzanas_gdf = gpd.read_file("data/manzanas/090030001m.shp")
-uso_suelo_gdf = gpd.read_file("data/uso_suelo/uso-de-suelo.shp")
+from build_clean_data import construir_capas
 
-# Realizar la unión espacial para asignar uso de suelo a cada manzana
-gdf_union = gpd.sjoin(manzanas_gdf, uso_suelo_gdf, how="left", predicate="intersects")
-uso_suelo_por_manzana = gdf_union.groupby(['IDENTIFICA', 'us_dscr']).size().reset_index(name='counts')
-idx_max = uso_suelo_por_manzana.groupby('IDENTIFICA')['counts'].idxmax()
-uso_suelo_predominante = uso_suelo_por_manzana.loc[idx_max]
-manzanas_gdf = manzanas_gdf.merge(uso_suelo_predominante[['IDENTIFICA', 'us_dscr']], on="IDENTIFICA", how="left")
-manzanas_gdf['us_dscr'] = manzanas_gdf['us_dscr'].fillna('Sin Datos')
+# Manzanas con su uso de suelo predominante, del pipeline incremental
+# (recorte y unión espacial solo se recalculan si cambió algún archivo)
+manzanas_gdf = construir_capas(['manzanas_uso_suelo'])['manzanas_uso_suelo']
 
 # Calcular el centro del mapa para enfocar Coyoacán
-centro_lat = manzanas_gdf.geometry.centroid.y.mean()
-centro_lon = manzanas_gdf.geometry.centroid.x.mean()
+centro_lat = manzanas_gdf['centroide_lat'].mean()
+centro_lon = manzanas_gdf['centroide_lon'].mean()
 
 # Crear una paleta de colores para cada tipo de uso de suelo
 tipos_uso_suelo = manzanas_gdf['us_dscr'].unique()
@@ -42,7 +36,7 @@ def style_function(feature):
 
 # Añadir las manzanas con su uso de suelo al mapa
 folium.GeoJson(
-    manzanas_gdf,
+    manzanas_gdf[['us_dscr', 'geometry']],
     style_function=style_function,
     tooltip=folium.GeoJsonTooltip(fields=['us_dscr'], aliases=['Uso de Suelo:'])
 ).add_to(m)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# scripts/pipeline.py
+
+"""
+Motor de construcción incremental para las capas limpias (clean_data) y
+los artefactos derivados: un DAG de pasos declarados con `Paso`.
+
+La huella de cada paso es un sha256 del código del módulo que define su
+función (la función y los auxiliares que llama), sus parámetros, el
+contenido de sus archivos de entrada (con los archivos hermanos de un
+shapefile) y las huellas de los pasos de los que depende. El resultado de
+cada paso se guarda como GeoParquet en el directorio de caché con su
+huella en el nombre, así que:
+
+- un paso cuya huella ya está en caché no se vuelve a ejecutar;
+- cambiar un shapefile solo cambia la huella de los pasos que lo leen y
+  de los que dependen de ellos;
+- los pasos independientes se ejecutan en paralelo (un proceso por paso).
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import geopandas as gpd
+from geopandas import GeoDataFrame
+
+logger = logging.getLogger(__name__)
+
+# Archivos que acompañan a un .shp y también forman parte de su contenido
+EXTENSIONES_SHAPEFILE = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+_TAMANO_BLOQUE = 1 << 20
+
+
+def huella_archivo(ruta: str) -> str:
+    """
+    sha256 del contenido de `ruta`; para un .shp incluye sus archivos
+    hermanos (.shx, .dbf, .prj, .cpg) que existan.
+
+    :raises FileNotFoundError: Si el archivo no existe.
+    """
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"Archivo de entrada no encontrado: {ruta}")
+    base, extension = os.path.splitext(ruta)
+    rutas = [ruta]
+    if extension.lower() == ".shp":
+        rutas = [f"{base}{ext}" for ext in EXTENSIONES_SHAPEFILE if os.path.exists(f"{base}{ext}")]
+    sha = hashlib.sha256()
+    for actual in rutas:
+        sha.update(os.path.basename(actual).encode())
+        with open(actual, "rb") as archivo:
+            for bloque in iter(lambda: archivo.read(_TAMANO_BLOQUE), b""):
+                sha.update(bloque)
+    return sha.hexdigest()
+
+
+def huella_funcion(funcion: Callable) -> str:
+    """
+    Huella del código de una función y de todo su módulo: así editar un
+    auxiliar (p. ej. _solo_poligonos en build_clean_data.py) también
+    reconstruye los pasos que lo usan. Cualquier cambio en el módulo
+    invalida sus pasos; es preferible a servir capas viejas.
+    """
+    nombre = f"{funcion.__module__}.{funcion.__qualname__}"
+    modulo = inspect.getmodule(funcion)
+    try:
+        fuente = inspect.getsource(modulo if modulo is not None else funcion)
+    except (OSError, TypeError):
+        try:
+            fuente = inspect.getsource(funcion)
+        except (OSError, TypeError):
+            fuente = ""
+    return hashlib.sha256(f"{nombre}\n{fuente}".encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class Paso:
+    """
+    Un paso del DAG. `funcion` recibe como argumentos con nombre:
+    - el GeoDataFrame de cada paso en `dependencias` (con el nombre del paso),
+    - la ruta de cada archivo en `archivos`,
+    - los `parametros`,
+    y devuelve un GeoDataFrame.
+
+    - salida: Ruta opcional donde además se publica el resultado (p. ej.
+      un shapefile de clean_data); se reescribe solo si el paso se ejecutó
+      o si falta.
+    """
+    nombre: str
+    funcion: Callable[..., GeoDataFrame]
+    archivos: Dict[str, str] = field(default_factory=dict)
+    dependencias: Tuple[str, ...] = ()
+    parametros: Dict[str, Any] = field(default_factory=dict)
+    salida: Optional[str] = None
+
+
+@dataclass
+class ResultadoPaso:
+    """Estado de un paso tras construir: dónde quedó y si se ejecutó."""
+    nombre: str
+    huella: str
+    ruta: str
+    ejecutado: bool
+
+
+def _escribir_parquet(gdf: GeoDataFrame, ruta: str) -> None:
+    """Escribe a un temporal y lo mueve, para no dejar artefactos a medias."""
+    carpeta = os.path.dirname(ruta)
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        gdf.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def publicar(gdf: GeoDataFrame, ruta: str) -> None:
+    """
+    Escribe `gdf` en `ruta` con el formato que indique su extensión. Solo
+    GeoParquet admite varias columnas de geometría; en los demás formatos
+    se escribe únicamente la geometría activa.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    if ruta.endswith(".parquet"):
+        _escribir_parquet(gdf, ruta)
+        return
+    extra = [c for c in gdf.columns if c != gdf.geometry.name and isinstance(gdf[c], gpd.GeoSeries)]
+    gdf = gdf.drop(columns=extra)
+    if ruta.endswith((".geojson", ".json")):
+        gdf.to_file(ruta, driver="GeoJSON")
+    else:
+        gdf.to_file(ruta)
+
+
+def _ejecutar_paso(paso: Paso, entradas: Dict[str, str], ruta: str) -> str:
+    """Ejecuta un paso (en un proceso del pool) y guarda su resultado en `ruta`."""
+    argumentos = {nombre: gpd.read_parquet(ruta_dep) for nombre, ruta_dep in entradas.items()}
+    argumentos.update(paso.archivos)
+    argumentos.update(paso.parametros)
+    resultado = paso.funcion(**argumentos)
+    if not isinstance(resultado, GeoDataFrame):
+        raise TypeError(f"El paso '{paso.nombre}' debe devolver un GeoDataFrame.")
+    _escribir_parquet(resultado, ruta)
+    if paso.salida:
+        publicar(resultado, paso.salida)
+    return ruta
+
+
+class Pipeline:
+    """
+    SRP: ordenar, fingerprintear y ejecutar los pasos de un DAG, reutilizando
+    los resultados cuya huella no cambió.
+    """
+
+    def __init__(self, pasos: Iterable[Paso], directorio_cache: str, max_procesos: Optional[int] = None) -> None:
+        """
+        :param pasos: Pasos del DAG (nombres únicos).
+        :param directorio_cache: Carpeta de los resultados intermedios.
+        :param max_procesos: Procesos en paralelo (None = los del sistema;
+                             1 = todo en el proceso actual).
+        :raises ValueError: Si hay nombres repetidos, dependencias
+                            inexistentes o ciclos.
+        """
+        self.pasos: Dict[str, Paso] = {}
+        for paso in pasos:
+            if paso.nombre in self.pasos:
+                raise ValueError(f"Paso repetido: '{paso.nombre}'")
+            self.pasos[paso.nombre] = paso
+        self.directorio_cache: str = directorio_cache
+        self.max_procesos: Optional[int] = max_procesos
+        self.orden: List[str] = self._ordenar()
+
+    def _ordenar(self) -> List[str]:
+        """Orden topológico (Kahn), estable respecto al orden de declaración."""
+        for paso in self.pasos.values():
+            faltantes = [d for d in paso.dependencias if d not in self.pasos]
+            if faltantes:
+                raise ValueError(f"El paso '{paso.nombre}' depende de pasos inexistentes: {faltantes}")
+        pendientes = {nombre: set(paso.dependencias) for nombre, paso in self.pasos.items()}
+        orden = []
+        while pendientes:
+            listos = [n for n, deps in pendientes.items() if not deps]
+            if not listos:
+                raise ValueError(f"Ciclo entre los pasos: {sorted(pendientes)}")
+            for nombre in listos:
+                orden.append(nombre)
+                del pendientes[nombre]
+            for deps in pendientes.values():
+                deps.difference_update(listos)
+        return orden
+
+    def huellas(self) -> Dict[str, str]:
+        """Huella de cada paso; solo se leen los archivos de entrada, no se ejecuta nada."""
+        huellas: Dict[str, str] = {}
+        por_archivo: Dict[str, str] = {}
+        for nombre in self.orden:
+            paso = self.pasos[nombre]
+            archivos = {}
+            for clave, ruta in sorted(paso.archivos.items()):
+                if ruta not in por_archivo:
+                    por_archivo[ruta] = huella_archivo(ruta)
+                archivos[clave] = por_archivo[ruta]
+            contenido = json.dumps({
+                "nombre": nombre,
+                "codigo": huella_funcion(paso.funcion),
+                "parametros": paso.parametros,
+                "archivos": archivos,
+                "dependencias": {d: huellas[d] for d in sorted(paso.dependencias)},
+            }, sort_keys=True, default=str)
+            huellas[nombre] = hashlib.sha256(contenido.encode()).hexdigest()[:16]
+        return huellas
+
+    def ruta_resultado(self, nombre: str, huella: str) -> str:
+        return os.path.join(self.directorio_cache, f"{nombre}-{huella}.parquet")
+
+    def _necesarios(self, objetivos: Optional[Iterable[str]]) -> List[str]:
+        """Pasos (en orden) que hacen falta para construir `objetivos`."""
+        if objetivos is None:
+            return list(self.orden)
+        necesarios = set()
+        pila = list(objetivos)
+        while pila:
+            nombre = pila.pop()
+            if nombre not in self.pasos:
+                raise ValueError(f"Paso inexistente: '{nombre}'")
+            if nombre not in necesarios:
+                necesarios.add(nombre)
+                pila.extend(self.pasos[nombre].dependencias)
+        return [n for n in self.orden if n in necesarios]
+
+    def plan(self, objetivos: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """{paso: True si se ejecutaría} sin ejecutar nada."""
+        huellas = self.huellas()
+        return {n: not os.path.exists(self.ruta_resultado(n, huellas[n])) for n in self._necesarios(objetivos)}
+
+    def construir(self,
+                  objetivos: Optional[Iterable[str]] = None,
+                  forzar: bool = False) -> Dict[str, ResultadoPaso]:
+        """
+        Construye los pasos necesarios para `objetivos` (None = todos).
+        Cada paso se lanza en cuanto terminan sus dependencias.
+
+        :param forzar: Ejecuta todos los pasos aunque estén en caché.
+        :return: {paso: ResultadoPaso}.
+        """
+        huellas = self.huellas()
+        nombres = self._necesarios(objetivos)
+        resultados: Dict[str, ResultadoPaso] = {}
+        por_ejecutar = []
+        for nombre in nombres:
+            ruta = self.ruta_resultado(nombre, huellas[nombre])
+            if not forzar and os.path.exists(ruta):
+                resultados[nombre] = ResultadoPaso(nombre, huellas[nombre], ruta, False)
+                salida = self.pasos[nombre].salida
+                if salida and not os.path.exists(salida):
+                    publicar(gpd.read_parquet(ruta), salida)
+            else:
+                por_ejecutar.append(nombre)
+        logger.info(f"{len(nombres)} pasos: {len(por_ejecutar)} por ejecutar, "
+                    f"{len(nombres) - len(por_ejecutar)} en caché.")
+
+        if self.max_procesos == 1:
+            for nombre in por_ejecutar:
+                self._lanzar(nombre, huellas, resultados, None)
+        else:
+            self._ejecutar_en_paralelo(por_ejecutar, huellas, resultados)
+        self._limpiar(huellas, nombres)
+        return resultados
+
+    def _lanzar(self, nombre, huellas, resultados, pool) -> Optional[Future]:
+        paso = self.pasos[nombre]
+        entradas = {d: resultados[d].ruta for d in paso.dependencias}
+        ruta = self.ruta_resultado(nombre, huellas[nombre])
+        logger.info(f"Ejecutando paso '{nombre}' ({huellas[nombre]}).")
+        if pool is None:
+            _ejecutar_paso(paso, entradas, ruta)
+            resultados[nombre] = ResultadoPaso(nombre, huellas[nombre], ruta, True)
+            return None
+        return pool.submit(_ejecutar_paso, paso, entradas, ruta)
+
+    def _ejecutar_en_paralelo(self, por_ejecutar: List[str], huellas: Dict[str, str],
+                              resultados: Dict[str, ResultadoPaso]) -> None:
+        pendientes = list(por_ejecutar)
+        en_curso: Dict[Future, str] = {}
+        with ProcessPoolExecutor(max_workers=self.max_procesos) as pool:
+            while pendientes or en_curso:
+                listos = [n for n in pendientes if all(d in resultados for d in self.pasos[n].dependencias)]
+                for nombre in listos:
+                    pendientes.remove(nombre)
+                    en_curso[self._lanzar(nombre, huellas, resultados, pool)] = nombre
+                if not en_curso:
+                    raise RuntimeError(f"Pasos sin poder ejecutarse: {pendientes}")
+                terminados, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    nombre = en_curso.pop(futuro)
+                    ruta = futuro.result()
+                    resultados[nombre] = ResultadoPaso(nombre, huellas[nombre], ruta, True)
+
+    def _limpiar(self, huellas: Dict[str, str], nombres: List[str]) -> None:
+        """Borra resultados antiguos (otra huella) de los pasos construidos."""
+        if not os.path.isdir(self.directorio_cache):
+            return
+        vigentes = {os.path.basename(self.ruta_resultado(n, huellas[n])) for n in nombres}
+        for archivo in os.listdir(self.directorio_cache):
+            nombre, _, resto = archivo.rpartition("-")
+            if nombre in nombres and resto.endswith(".parquet") and archivo not in vigentes:
+                os.remove(os.path.join(self.directorio_cache, archivo))
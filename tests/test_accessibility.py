@@ -0,0 +1,42 @@
+# tests/test_accessibility.py
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Point
+
+from dashboard.analysis.accessibility import AccessibilityEngine, dos_pasos_fca, pesos_decaimiento
+
+
+def _puntos(coords):
+    return gpd.GeoDataFrame(geometry=[Point(x, y) for x, y in coords], crs="EPSG:32614")
+
+
+def test_mas_cercanas_en_metros():
+    origenes = _puntos([(0, 0), (1000, 0), (5000, 0)])
+    motor = AccessibilityEngine(origenes)
+    distancias, indices = motor.mas_cercanas(_puntos([(0, 0), (1200, 0)]), k=2)
+    assert np.allclose(distancias[:, 0], [0, 200, 3800])
+    assert indices[2, 0] == 1
+
+
+def test_dos_pasos_binario_conserva_oferta():
+    origenes = _puntos([(0, 0), (100, 0), (5000, 0)])
+    instalaciones = _puntos([(50, 0)])
+    instalaciones['camas'] = [30]
+    motor = AccessibilityEngine(origenes)
+    acceso = motor.dos_pasos(instalaciones, np.array([100, 200, 50]), radio=500,
+                             columna_oferta='camas', ponderacion='binaria')
+    # 30 camas para 300 habitantes dentro del radio; el tercer origen queda fuera
+    assert np.allclose(acceso, [0.1, 0.1, 0.0])
+    assert np.isclose((acceso * [100, 200, 50]).sum(), 30)
+
+
+def test_distancia_cero_y_radio_menor_reutiliza_matriz():
+    motor = AccessibilityEngine(_puntos([(0, 0), (300, 0)]))
+    instalaciones = _puntos([(0, 0)])
+    grande = motor.distancias(instalaciones, 1000)
+    chica = motor.distancias(instalaciones, 100)
+    assert grande.nnz == 2 and chica.nnz == 1
+    pesos = pesos_decaimiento(chica, 100, 'gaussiana')
+    assert np.isclose(pesos[0, 0], 1.0)
+    assert np.allclose(dos_pasos_fca(pesos, [10, 10], [5]), [0.5, 0.0])
@@ -0,0 +1,44 @@
+# tests/test_areal_interpolation.py
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from dashboard.analysis.areal_interpolation import ArealInterpolator
+from dashboard.analysis.artifact_cache import ArtifactCache
+
+
+def _capas():
+    # Origen: dos franjas verticales; destino: dos franjas horizontales
+    agebs = gpd.GeoDataFrame({'ageb': ['A', 'B'], 'pob_total': [100.0, 300.0], 'escolaridad': [8.0, 12.0]},
+                             geometry=[box(0, 0, 100, 200), box(100, 0, 200, 200)], crs="EPSG:32614")
+    colonias = gpd.GeoDataFrame({'id_colonia': ['N', 'S']},
+                                geometry=[box(0, 100, 200, 200), box(0, 0, 200, 100)], crs="EPSG:32614")
+    return agebs, colonias
+
+
+def test_transferencia_extensiva_e_intensiva():
+    agebs, colonias = _capas()
+    resultado = ArealInterpolator().transferir(
+        agebs, colonias, 'ageb', 'colonia', extensivas=['pob_total'], intensivas=['escolaridad'],
+        columna_id_origen='ageb', columna_id_destino='id_colonia'
+    )
+    assert np.allclose(resultado.loc[['N', 'S'], 'pob_total'], [200, 200])
+    assert np.allclose(resultado['escolaridad'], 10.0)
+    assert np.isclose(resultado['pob_total'].sum(), agebs['pob_total'].sum())
+
+
+def test_inverso_por_transposicion_y_cache_en_disco(tmp_path):
+    agebs, colonias = _capas()
+    cache = ArtifactCache(str(tmp_path))
+    interpolador = ArealInterpolator(cache)
+    directo = interpolador.obtener(agebs, colonias, 'ageb', 'colonia', 'ageb', 'id_colonia')
+    inverso = interpolador.obtener(colonias, agebs, 'colonia', 'ageb', 'id_colonia', 'ageb')
+    assert (inverso.areas != directo.areas.T).nnz == 0
+    assert list(inverso.ids_destino) == ['A', 'B']
+
+    recargado = ArealInterpolator(cache).obtener(agebs, colonias, 'ageb', 'colonia', 'ageb', 'id_colonia')
+    assert np.allclose(recargado.areas.toarray(), 10_000)
+    votos = recargado.transferir_extensivas(pd.DataFrame({'votos': [10.0, 30.0]}, index=['A', 'B']))
+    assert votos['votos'].tolist() == [20.0, 20.0]
@@ -0,0 +1,84 @@
+# tests/test_autocorrelation.py
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from dashboard.analysis.artifact_cache import ArtifactCache
+from dashboard.analysis.autocorrelation import capa_hotspots, moran_global, moran_local
+from dashboard.analysis.spatial_weights import SpatialWeightsBuilder
+
+
+def _rejilla(n=5):
+    celdas = [box(x, y, x + 1, y + 1) for y in range(n) for x in range(n)]
+    return gpd.GeoDataFrame({'id': [f"c{i}" for i in range(n * n)]}, geometry=celdas)
+
+
+def test_cardinalidad_queen_y_rook():
+    rejilla = _rejilla()
+    queen = SpatialWeightsBuilder.construir(rejilla, 'queen')
+    rook = SpatialWeightsBuilder.construir(rejilla, 'rook')
+    assert queen.cardinalidad[12] == 8 and queen.cardinalidad[0] == 3
+    assert rook.cardinalidad[12] == 4 and rook.cardinalidad[0] == 2
+    assert np.allclose(queen.matriz.sum(axis=1), 1.0)
+
+
+def test_pesos_se_reutilizan_desde_disco(tmp_path):
+    rejilla = _rejilla()
+    cache = ArtifactCache(str(tmp_path))
+    pesos = SpatialWeightsBuilder(cache).obtener(rejilla, 'prueba', columna_id='id')
+    recargados = SpatialWeightsBuilder(cache).obtener(rejilla, 'prueba', columna_id='id')
+    assert (pesos.matriz != recargados.matriz).nnz == 0
+    assert list(recargados.ids) == list(rejilla['id'])
+
+
+def test_moran_agrupado_y_tablero():
+    rejilla = _rejilla()
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'rook')
+    x, y = rejilla.centroid.x.to_numpy(), rejilla.centroid.y.to_numpy()
+
+    agrupado = moran_global(pesos, x + y, permutaciones=199, semilla=0)
+    assert agrupado.I > 0.5 and agrupado.p_sim < 0.05
+
+    tablero = moran_global(pesos, (np.floor(x) + np.floor(y)) % 2, permutaciones=199, semilla=0)
+    assert tablero.I < -0.9
+
+
+def test_lisa_detecta_hot_spot():
+    rejilla = _rejilla(7)
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'queen')
+    valores = np.zeros(49)
+    valores[[16, 17, 18, 23, 24, 25, 30, 31, 32]] = 10.0
+    lisa = moran_local(pesos, valores, permutaciones=499, semilla=1)
+    assert lisa['lisa_cluster'].iloc[24] == 'Alto-Alto'
+    assert lisa['lisa_cluster'].iloc[0] in ('Bajo-Bajo', 'No significativo')
+
+
+def test_nulos_se_enmascaran_sin_reconstruir_pesos():
+    rejilla = _rejilla(7)
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'queen', ids=rejilla['id'].to_numpy())
+    valores = np.zeros(49)
+    valores[[16, 17, 18, 23, 24, 25, 30, 31, 32]] = 10.0
+    valores[[0, 6]] = np.nan
+
+    subconjunto = pesos.subconjunto(~np.isnan(valores))
+    assert subconjunto.n == 47 and np.allclose(subconjunto.matriz.sum(axis=1), 1.0)
+    assert pesos.n == 49
+
+    capa = capa_hotspots(rejilla.assign(x=valores), pesos, 'x', columna_id='id', permutaciones=199, semilla=1)
+    assert capa['lisa_cluster'].isna().sum() == 2 and pd.isna(capa['lisa_cluster'].iloc[0])
+    assert capa['lisa_cluster'].iloc[24] == 'Alto-Alto'
+
+
+def test_metrica_constante_no_se_reporta_como_cluster():
+    rejilla = _rejilla().assign(valor=3.0)
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'queen', ids=rejilla['id'].to_numpy())
+    for calcular in (moran_global, moran_local):
+        with pytest.raises(ValueError):
+            calcular(pesos, rejilla['valor'].to_numpy(), permutaciones=99)
+    # Constante entre las unidades con valor, aunque haya nulos
+    rejilla.loc[:4, 'valor'] = np.nan
+    with pytest.raises(ValueError):
+        capa_hotspots(rejilla, pesos, 'valor', columna_id='id', permutaciones=99)
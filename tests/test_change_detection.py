@@ -0,0 +1,44 @@
+# tests/test_change_detection.py
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, box
+
+from dashboard.analysis.change_detection import detectar_cambios, emparejar_por_hash, hash_geometrias
+
+
+def test_hash_ignora_orden_de_vertices_y_empareja_repetidos():
+    cuadro = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+    rotado = Polygon([(10, 10), (0, 10), (0, 0), (10, 0)])
+    invertido = Polygon([(0, 0), (0, 10), (10, 10), (10, 0)])
+    casi = Polygon([(0, 0), (10.001, 0), (10, 10), (0, 10)])
+    hashes = hash_geometrias(np.array([cuadro, rotado, invertido, casi, box(20, 0, 30, 10)]))
+    assert len(set(hashes[:4])) == 1 and hashes[4] != hashes[0]
+
+    ia, ib = emparejar_por_hash(np.array([7, 7, 3], dtype="uint64"), np.array([3, 7, 9, 7], dtype="uint64"))
+    assert sorted(zip(ia, ib)) == [(0, 1), (1, 3), (2, 0)]
+
+
+def test_detectar_cambios_clasifica_cada_tipo():
+    anterior = gpd.GeoDataFrame({
+        'id': ['igual', 'reclas', 'forma', 'dividida', 'f1', 'f2', 'quitada'],
+        'us_dscr': ['H', 'H', 'C', 'E', 'H', 'H', 'AV'],
+    }, geometry=[box(0, 0, 10, 10), box(20, 0, 30, 10), box(40, 0, 50, 10), box(60, 0, 80, 10),
+                 box(0, 20, 10, 30), box(10, 20, 20, 30), box(40, 20, 50, 30)], crs="EPSG:32614")
+    nueva = gpd.GeoDataFrame({
+        'id': ['n_igual', 'n_reclas', 'n_forma', 'd1', 'd2', 'fusion', 'agregada'],
+        'us_dscr': ['H', 'C', 'C', 'E', 'E', 'H', 'EV'],
+    }, geometry=[shapely.normalize(box(0, 0, 10, 10)), box(20, 0, 30, 10), box(40, 0, 50, 12),
+                 box(60, 0, 70, 10), box(70, 0, 80, 10), box(0, 20, 20, 30), box(60, 20, 70, 30)],
+        crs="EPSG:32614")
+
+    cambios = detectar_cambios(anterior, nueva, 'us_dscr', columna_id='id').set_index('id_nuevo')
+    tipos = cambios['tipo_cambio'].to_dict()
+    eliminadas = tipos.pop(None)
+    assert tipos == {'n_reclas': 'reclasificado', 'n_forma': 'forma', 'd1': 'division',
+                     'd2': 'division', 'fusion': 'fusion', 'agregada': 'agregado'}
+    assert eliminadas == 'eliminado' and cambios.loc[None, 'id_anterior'] == 'quitada'
+    assert cambios.loc['n_reclas', ['clase_anterior', 'clase_nueva']].tolist() == ['H', 'C']
+    assert cambios.loc['d1', 'id_anterior'] == 'dividida'
+    assert cambios.crs == nueva.crs
@@ -0,0 +1,70 @@
+# tests/test_classification.py
+
+import numpy as np
+import pytest
+
+from dashboard.figures.classification import (
+    BreaksCache,
+    asignar_clases,
+    calcular_cortes,
+    cortes_jenks,
+)
+
+
+def test_jenks_separa_grupos_naturales():
+    valores = [1, 2, 2, 3, 10, 11, 12, 50, 52, 51]
+    assert list(cortes_jenks(valores, 3)) == [1, 3, 12, 52]
+
+
+def test_jenks_muestreado_conserva_extremos():
+    valores = np.random.default_rng(0).lognormal(3, 1, 50_000)
+    cortes = cortes_jenks(valores, 5, muestra=200)
+    assert cortes[0] == valores.min() and cortes[-1] == valores.max()
+    assert len(cortes) == 6 and np.all(np.diff(cortes) > 0)
+
+
+def test_cuantiles_e_intervalos():
+    valores = np.arange(1, 101, dtype=float)
+    assert list(calcular_cortes(valores, 'intervalos_iguales', 3)) == [1, 34, 67, 100]
+    clases = asignar_clases(valores, calcular_cortes(valores, 'cuantiles', 4))
+    assert np.bincount(clases).tolist() == [25, 25, 25, 25]
+
+
+def test_asignar_clases_nulos_y_bordes():
+    assert asignar_clases([0, 5, 6, np.nan], [0, 5, 10]).tolist() == [0, 0, 1, -1]
+
+
+def test_metodo_invalido():
+    with pytest.raises(ValueError):
+        calcular_cortes([1, 2, 3], 'desconocido', 3)
+
+
+def test_cache_reutiliza_e_invalida():
+    cache = BreaksCache()
+    clave = ('demograficos', 2020, 'ageb', 'pob')
+    primeros = cache.obtener(clave, [1, 2, 3, 4], 'cuantiles', 2)
+    assert cache.obtener(clave, [100, 200], 'cuantiles', 2) is primeros
+    cache.invalidar('demograficos')
+    assert cache.obtener(clave, [100, 200], 'cuantiles', 2) is not primeros
+
+
+def test_cache_no_evalua_valores_en_un_acierto():
+    cache = BreaksCache()
+    clave = ('demograficos', 2020, 'ageb', 'pob', ())
+    llamadas = []
+
+    def valores():
+        llamadas.append(1)
+        return [1, 2, 3, 4]
+
+    primeros = cache.obtener(clave, valores, 'cuantiles', 2)
+    assert cache.obtener(clave, valores, 'cuantiles', 2) is primeros
+    assert len(llamadas) == 1
+
+
+def test_serie_constante_da_un_solo_borde():
+    for metodo in ('cuantiles', 'intervalos_iguales'):
+        cortes = calcular_cortes(np.array([5.0, 5.0, 5.0]), metodo, 5)
+        assert list(cortes) == [5.0]
+    # Sin clases que pintar, todos los valores caen en la clase 0
+    assert asignar_clases([5.0, 5.0], [5.0]).tolist() == [0, 0]
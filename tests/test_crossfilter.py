@@ -0,0 +1,50 @@
+# tests/test_crossfilter.py
+
+import numpy as np
+import pandas as pd
+
+from dashboard.analysis.crossfilter import CrossfilterEngine
+
+
+def _tabla(n=2000, semilla=0):
+    rng = np.random.default_rng(semilla)
+    tabla = pd.DataFrame({'pob': rng.gamma(2.0, 300.0, n), 'viv': rng.integers(0, 400, n).astype(float)})
+    tabla.loc[::50, 'viv'] = np.nan
+    return tabla
+
+
+def test_actualizacion_incremental_igual_a_recalculo():
+    tabla = _tabla()
+    motor = CrossfilterEngine(tabla, ['pob', 'viv'], num_cubetas=32)
+    rng = np.random.default_rng(1)
+    estado = motor.estado()
+    seleccion = np.arange(300)
+    for _ in range(6):
+        # Selecciones que se traslapan: entran y salen pocos elementos
+        seleccion = np.unique(np.concatenate([seleccion[20:], rng.integers(0, len(tabla), 25)]))
+        estado = motor.actualizar(estado, seleccion)
+        directo = motor.estado(seleccion)
+        np.testing.assert_allclose(estado.sumas, directo.sumas)
+        np.testing.assert_array_equal(estado.conteos, directo.conteos)
+        np.testing.assert_array_equal(estado.histogramas, directo.histogramas)
+
+    esperado = tabla.iloc[seleccion][['pob', 'viv']]
+    resumen = motor.resumen(estado)
+    np.testing.assert_allclose(resumen['total'], esperado.sum())
+    np.testing.assert_array_equal(resumen['conteo'], esperado.count())
+
+
+def test_cuantiles_del_bosquejo_y_rango():
+    tabla = _tabla()
+    motor = CrossfilterEngine(tabla, ['pob', 'viv'], num_cubetas=64)
+    estado = motor.estado()
+    valores = np.sort(tabla['pob'].to_numpy())
+    for q in (0.1, 0.5, 0.9):
+        aproximado = motor.cuantil(estado, 'pob', q)
+        # Error de rango acotado por una cubeta (~n / 64 elementos)
+        rango = np.searchsorted(valores, aproximado) / len(valores)
+        assert abs(rango - q) <= 1 / 64 + 1e-9
+
+    posiciones = motor.filas_en_rango('viv', 100, 200)
+    esperado = np.flatnonzero(tabla['viv'].between(100, 200).to_numpy())
+    np.testing.assert_array_equal(posiciones, esperado)
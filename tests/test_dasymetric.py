@@ -0,0 +1,61 @@
+# tests/test_dasymetric.py
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from dashboard.analysis.artifact_cache import ArtifactCache
+from dashboard.analysis.dasymetric import DasymetricEngine, capa_manzanas
+
+
+def _capas():
+    # Dos AGEB de 200 x 100 m, cada una con dos manzanas de 100 x 100 m
+    agebs = gpd.GeoDataFrame({'ageb': ['A', 'B']},
+                             geometry=[box(0, 0, 200, 100), box(0, 100, 200, 200)], crs="EPSG:32614")
+    manzanas = gpd.GeoDataFrame({'id_manzana': ['m1', 'm2', 'm3', 'm4']}, geometry=[
+        box(0, 0, 100, 100), box(100, 0, 200, 100), box(0, 100, 100, 200), box(100, 100, 200, 200)
+    ], crs="EPSG:32614")
+    # Uso de suelo: m1 totalmente habitacional, m2 solo un cuarto; AGEB B sin vivienda
+    uso = gpd.GeoDataFrame({'us_dscr': ['Habitacional', 'Habitacional Mixto', 'Equipamiento']}, geometry=[
+        box(0, 0, 100, 100), box(100, 0, 150, 50), box(0, 100, 200, 200)
+    ], crs="EPSG:32614")
+    return agebs, manzanas, uso
+
+
+def test_redistribucion_por_area_residencial_conserva_totales():
+    agebs, manzanas, uso = _capas()
+    matriz = DasymetricEngine().obtener(manzanas, agebs, 'ageb', 'id_manzana', uso, 'us_dscr')
+    valores = pd.DataFrame({'pob_total': [1000.0, 400.0]}, index=['A', 'B'])
+    resultado = matriz.redistribuir(valores)['pob_total']
+    assert np.allclose(resultado.loc[['m1', 'm2']], [800, 200])
+    # Sin área residencial en B: se reparte por área
+    assert np.allclose(resultado.loc[['m3', 'm4']], [200, 200])
+    assert np.isclose(resultado.sum(), 1400)
+
+
+def test_uso_predominante_y_cache_en_disco(tmp_path):
+    agebs, manzanas, _ = _capas()
+    manzanas['us_dscr'] = ['Habitacional', 'Sin Datos', 'Habitacional', 'Habitacional']
+    cache = ArtifactCache(str(tmp_path))
+    primera = DasymetricEngine(cache).obtener(manzanas, agebs, 'ageb', 'id_manzana', columna_uso='us_dscr')
+    segunda = DasymetricEngine(cache).obtener(manzanas, agebs, 'ageb', 'id_manzana', columna_uso='us_dscr')
+    assert (primera.matriz != segunda.matriz).nnz == 0
+    capa = capa_manzanas(manzanas, segunda, pd.DataFrame({'pob_total': [10.0, 6.0]}, index=['A', 'B']))
+    assert capa['pob_total'].tolist() == [10.0, 0.0, 3.0, 3.0]
+    assert capa['ageb'].tolist() == ['A', 'A', 'B', 'B']
+    assert np.allclose(capa['area_km2'], 0.01)
+
+
+def test_agebs_sin_manzanas_conservan_el_total():
+    agebs, manzanas, uso = _capas()
+    # C no traslapa ninguna manzana: su población va a la más cercana (m2)
+    agebs = gpd.GeoDataFrame({'ageb': ['A', 'B', 'C']}, geometry=[*agebs.geometry, box(250, 0, 300, 50)],
+                             crs="EPSG:32614")
+    matriz = DasymetricEngine().obtener(manzanas, agebs, 'ageb', 'id_manzana', uso, 'us_dscr')
+    assert np.allclose(np.asarray(matriz.matriz.sum(axis=0)).ravel(), 1.0)
+    valores = pd.DataFrame({'pob_total': [1000.0, 400.0, 50.0]}, index=['A', 'B', 'C'])
+    resultado = matriz.redistribuir(valores)['pob_total']
+    assert np.isclose(resultado.sum(), valores['pob_total'].sum())
+    assert np.allclose(resultado.loc[['m1', 'm2']], [800, 250])
+    assert matriz.ageb_principal().tolist() == ['A', 'A', 'B', 'B']
@@ -0,0 +1,64 @@
+# tests/test_derived_metrics.py
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los servicios del tablero importan sus paquetes hermanos sin prefijo
+# (como al correr dashboard/app.py); se agrega al final para no tapar app/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dashboard'))
+
+from domain.domain_models import MetricaDerivada  # noqa: E402
+from services.derived_metrics import DerivedMetricsEngine, compilar_expresion  # noqa: E402
+
+
+def _motor():
+    return DerivedMetricsEngine([
+        MetricaDerivada('densidad_pob', 'pob_total / area_km2', datasets=['demograficos']),
+        MetricaDerivada('indice_masculinidad', 'pob_hombres / pob_mujeres * 100'),
+    ])
+
+
+def test_compilar_rechaza_llamadas_y_atributos():
+    for expresion in ('__import__("os")', 'a.__class__', 'open("x")', 'sqrt(x, y=1)', '"a" + b', 'a +'):
+        with pytest.raises(ValueError):
+            compilar_expresion(expresion)
+    compilada = compilar_expresion('log1p(pob_total) / area_km2 + pob_total')
+    assert compilada.columnas == ('pob_total', 'area_km2')
+
+
+def test_razon_vectorizada_con_ceros_y_nulos():
+    datos = pd.DataFrame({'pob_hombres': [50, 10, 0, np.nan], 'pob_mujeres': [100, 0, 0, 5]})
+    resultado = _motor().calcular('demograficos', 2020, datos)
+    assert list(resultado.columns) == ['indice_masculinidad']
+    np.testing.assert_array_equal(resultado['indice_masculinidad'], [50.0, np.nan, np.nan, np.nan])
+
+
+def test_cache_por_dataset_y_anio_e_invalidacion():
+    motor = _motor()
+    datos = pd.DataFrame({'pob_total': [100.0, 300.0], 'area_km2': [2.0, 3.0]})
+    primera = motor.calcular('demograficos', 2020, datos)
+    assert motor.calcular('demograficos', 2020, datos) is primera
+    assert motor.calcular('demograficos', 2010, datos) is not primera
+    assert motor.calcular('demograficos', 2020, datos, granularidad='manzana') is not primera
+
+    # Al recargar el dataset se descarta su caché, no la de los demás
+    otro = motor.calcular('edafologicos', 2020, datos)
+    motor.invalidar('demograficos')
+    recargados = datos.assign(pob_total=[10.0, 30.0])
+    np.testing.assert_array_equal(motor.calcular('demograficos', 2020, recargados)['densidad_pob'], [5.0, 10.0])
+    assert motor.calcular('edafologicos', 2020, datos) is otro
+
+
+def test_solo_se_ofrecen_metricas_con_sus_columnas():
+    motor = _motor()
+    columnas = ['pob_total', 'area_km2', 'pob_hombres']
+    assert [m.nombre for m in motor.metricas_disponibles('demograficos', columnas)] == ['densidad_pob']
+    assert motor.metricas_disponibles('electorales', columnas) == []
+    assert motor.es_derivada('demograficos', 'densidad_pob', columnas)
+    assert not motor.es_derivada('demograficos', 'indice_masculinidad', columnas)
+    # Una columna nativa con el mismo nombre tiene prioridad
+    assert not motor.es_derivada('demograficos', 'densidad_pob', columnas + ['densidad_pob'])
@@ -0,0 +1,42 @@
+# tests/test_dual_crs.py
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from dashboard.analysis.artifact_cache import ArtifactCache
+from dashboard.analysis.dual_crs import COLUMNA_METRICA, preparar_capa
+from dashboard.analysis.spatial_index import SpatialIndexStore, recortar
+from dashboard.analysis.spatial_weights import geometrias_metricas
+
+
+def _capa_utm():
+    return gpd.GeoDataFrame(
+        {'id': ['a', 'b']},
+        geometry=[box(480_000, 2_130_000, 481_000, 2_131_000), box(482_000, 2_130_000, 482_500, 2_130_500)],
+        crs='EPSG:32614'
+    )
+
+
+def test_capa_dual_precalcula_medidas():
+    capa = preparar_capa(_capa_utm())
+    assert capa.crs.equals('EPSG:4326')
+    assert capa[COLUMNA_METRICA].crs.equals('EPSG:32614')
+    assert np.allclose(capa['area_m2'], [1e6, 2.5e5])
+    assert np.allclose(capa['perimetro_m'], [4000, 2000])
+    assert (capa['bbox_lon_min'] < capa['centroide_lon']).all()
+    assert (capa['centroide_lat'] < capa['bbox_lat_max']).all()
+    # Las consultas métricas usan la columna precalculada, sin reproyectar
+    assert geometrias_metricas(capa)[0] is capa[COLUMNA_METRICA].values[0]
+    assert preparar_capa(capa) is capa
+
+
+def test_recorte_actualiza_solo_las_geometrias_que_cambian(tmp_path):
+    capa = preparar_capa(_capa_utm())
+    mascara = preparar_capa(gpd.GeoDataFrame(
+        geometry=[box(479_000, 2_129_000, 482_250, 2_132_000)], crs='EPSG:32614'
+    ))
+    indice = SpatialIndexStore(ArtifactCache(str(tmp_path))).obtener('prueba', capa)
+    recortada = recortar(capa, mascara, indice)
+    assert recortada[COLUMNA_METRICA].values[0] is capa[COLUMNA_METRICA].values[0]
+    assert np.isclose(recortada['area_m2'].iloc[1], 250 * 500, rtol=1e-3)
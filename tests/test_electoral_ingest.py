@@ -0,0 +1,70 @@
+# tests/test_electoral_ingest.py
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from dashboard.analysis.areal_interpolation import ArealInterpolator
+from dashboard.data_access.electoral_store import ElectoralResultsStore
+from scripts.electoral_ingest import (
+    ElectoralIngestConfig,
+    agregar_por_seccion,
+    ingest,
+    leer_casillas_por_bloques,
+)
+
+CSV_CASILLAS = (
+    'ID_ESTADO,SECCION,ID_CASILLA,TIPO_CASILLA,PAN,MORENA,TOTAL_VOTOS_CALCULADOS,LISTA_NOMINAL_CASILLA\n'
+    '9,0101,1,B,10,20,30,60\n'
+    '9,0101,1,C,5,-,5,40\n'
+    '9,0102,1,B,7,8,15,50\n'
+    '15,0101,1,B,100,100,200,300\n'
+    '9,0102,2,C,3,2,5,50\n'
+    '9,0999,1,B,1,1,2,10\n'
+)
+
+
+@pytest.fixture
+def casillas_csv(tmp_path):
+    ruta = tmp_path / 'casillas.csv'
+    ruta.write_text(CSV_CASILLAS, encoding='utf-8')
+    return str(ruta)
+
+
+def _secciones():
+    return gpd.GeoDataFrame({'seccion': ['101', '102']},
+                            geometry=[box(-99.17, 19.33, -99.16, 19.34), box(-99.16, 19.33, -99.15, 19.34)],
+                            crs='EPSG:4326')
+
+
+def test_agregacion_incremental_por_bloques(casillas_csv):
+    config = ElectoralIngestConfig(casillas_csv, 2018, chunksize=2)
+    resultados = agregar_por_seccion(leer_casillas_por_bloques(config, {'101', '102'}))
+    assert list(resultados.index) == ['101', '102']
+    assert resultados.loc['101', 'votos_pan'] == 15 and resultados.loc['101', 'votos_morena'] == 20
+    assert resultados.loc['102', 'votos_total'] == 20 and resultados.loc['102', 'lista_nominal'] == 100
+    assert list(resultados['casillas']) == [2, 2]
+
+    en_un_bloque = agregar_por_seccion(leer_casillas_por_bloques(
+        ElectoralIngestConfig(casillas_csv, 2018, chunksize=100), {'101', '102'}))
+    pd.testing.assert_frame_equal(resultados, en_un_bloque)
+
+
+def test_ingest_escribe_secciones_y_transferencias(casillas_csv, tmp_path):
+    almacen = ElectoralResultsStore(str(tmp_path / 'electorales'))
+    colonias = gpd.GeoDataFrame({'id_colonia': ['C1']}, geometry=[box(-99.18, 19.32, -99.14, 19.35)],
+                                crs='EPSG:4326')
+    ingest(ElectoralIngestConfig(casillas_csv, 2018, chunksize=2), _secciones(), almacen,
+           {'colonia': (colonias, 'id_colonia')}, ArealInterpolator())
+
+    assert almacen.existe() and almacen.anios() == [2018]
+    assert almacen.niveles() == ['seccion', 'colonia']
+    secciones = almacen.leer('seccion')
+    assert list(secciones['anio']) == [2018, 2018]
+    assert secciones.set_index('seccion').loc['101', 'participacion'] == pytest.approx(35)
+
+    colonia = almacen.leer('colonia')
+    assert colonia['colonia'].tolist() == ['C1']
+    assert colonia['votos_total'].iloc[0] == pytest.approx(55)
+    assert colonia['participacion'].iloc[0] == pytest.approx(55 / 2)
@@ -0,0 +1,47 @@
+# tests/test_filter_planner.py
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data_access.filter_planner import BITMAP, RANGO_ORDENADO, IndiceBitmap, compilar_sql
+from dashboard.domain.domain_models import PredicadoFiltro
+
+
+def _tabla(n=500, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'us dscr': rng.choice(['Habitacional', 'Comercial', 'Equipamiento', 'Sin Datos'], n),
+        'colonia': rng.choice([f'Col {i}' for i in range(20)], n),
+        'pob': rng.integers(0, 1000, n).astype('float64'),
+    })
+
+
+def test_bitmaps_equivalen_a_mascara_booleana():
+    tabla = _tabla()
+    tabla.loc[::37, 'pob'] = np.nan
+    indice = IndiceBitmap(tabla, ['us dscr', 'colonia'])
+    predicados = [
+        PredicadoFiltro.en('us dscr', ['Habitacional', 'Comercial', 'Inexistente']),
+        PredicadoFiltro.igual('colonia', 'Col 3'),
+        PredicadoFiltro.rango('pob', 100, 600),
+    ]
+    plan = indice.planificar(predicados)
+    assert plan.estrategias == [BITMAP, BITMAP, RANGO_ORDENADO]
+
+    uso = tabla['us dscr'].isin(['Habitacional', 'Comercial'])
+    colonia = tabla['colonia'] == 'Col 3'
+    rango = tabla['pob'].between(100, 600)
+    np.testing.assert_array_equal(indice.evaluar(predicados, 'and'), (uso & colonia & rango).to_numpy())
+    np.testing.assert_array_equal(indice.evaluar(predicados, 'or'), (uso | colonia | rango).to_numpy())
+    assert len(indice.filtrar([PredicadoFiltro.igual('colonia', 'No existe')])) == 0
+
+
+def test_compilar_sql_con_parametros_ligados():
+    where, parametros = compilar_sql([
+        PredicadoFiltro.en('us dscr', ['Habitacional', "O'Higgins"]),
+        PredicadoFiltro.rango('pob', maximo=np.int64(50)),
+    ])
+    assert where == '"us dscr" IN (:f0, :f1) AND ("pob" <= :f2)'
+    assert parametros == {'f0': 'Habitacional', 'f1': "O'Higgins", 'f2': 50}
+    assert type(parametros['f2']) is int
+    assert compilar_sql([]) == ('', {})
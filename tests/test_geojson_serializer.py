@@ -0,0 +1,63 @@
+# tests/test_geojson_serializer.py
+
+import json
+
+import geopandas as gpd
+from shapely.geometry import MultiPolygon, Point, Polygon
+
+from dashboard.figures.geojson_serializer import GeoJSONSerializer
+
+
+def _gdf():
+    cuadro = Polygon(
+        [(-99.1612345, 19.3412345), (-99.1512345, 19.3412345),
+         (-99.1512345, 19.3312345), (-99.1612345, 19.3312345)],
+        holes=[[(-99.158, 19.338), (-99.155, 19.338), (-99.155, 19.335)]]
+    )
+    multi = MultiPolygon([
+        Polygon([(-99.20, 19.30), (-99.19, 19.30), (-99.19, 19.29)]),
+        Polygon([(-99.18, 19.30), (-99.17, 19.30), (-99.17, 19.29)]),
+    ])
+    return gpd.GeoDataFrame(
+        {'ageb': ['0001', '0002'], 'pob': [120, 340], 'extra': ['a', 'b']},
+        geometry=[cuadro, multi], crs="EPSG:4326"
+    )
+
+
+def test_redondea_y_omite_cierre():
+    data = json.loads(GeoJSONSerializer(precision=4).serializar(_gdf()))
+    exterior, hueco = data['features'][0]['geometry']['coordinates']
+    assert exterior[0] == [-99.1612, 19.3412]
+    assert len(exterior) == 4 and len(hueco) == 3
+    assert data['features'][1]['geometry']['type'] == 'MultiPolygon'
+
+
+def test_conserva_cierre_para_mapbox():
+    data = GeoJSONSerializer(precision=4, omitir_cierre=False).serializar_dict(_gdf())
+    exterior = data['features'][0]['geometry']['coordinates'][0]
+    assert exterior[0] == exterior[-1] and len(exterior) == 5
+
+
+def test_elimina_vertices_colapsados():
+    casi_igual = Polygon([(0.0, 0.0), (1.0, 0.0), (1.000001, 0.0), (1.0, 1.0)])
+    gdf = gpd.GeoDataFrame(geometry=[casi_igual], crs="EPSG:4326")
+    data = GeoJSONSerializer(precision=3).serializar_dict(gdf)
+    assert data['features'][0]['geometry']['coordinates'][0] == [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]
+
+
+def test_solo_propiedades_solicitadas_e_ids():
+    data = GeoJSONSerializer().serializar_dict(_gdf(), ['pob', 'no_existe'])
+    assert [f['properties'] for f in data['features']] == [{'pob': 120}, {'pob': 340}]
+    assert [f['id'] for f in data['features']] == ['0', '1']
+
+
+def test_puntos():
+    gdf = gpd.GeoDataFrame(geometry=[Point(-99.123456, 19.654321)], crs="EPSG:4326")
+    data = GeoJSONSerializer(precision=2).serializar_dict(gdf)
+    assert data['features'][0]['geometry'] == {'type': 'Point', 'coordinates': [-99.12, 19.65]}
+
+
+def test_propiedades_con_separadores_unicode():
+    gdf = _gdf().assign(extra=['línea\u2028uno\u2029dos\x85', 'otra\nlínea'])
+    data = GeoJSONSerializer().serializar_dict(gdf, ['extra'])
+    assert [f['properties']['extra'] for f in data['features']] == ['línea\u2028uno\u2029dos\x85', 'otra\nlínea']
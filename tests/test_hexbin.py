@@ -0,0 +1,41 @@
+# tests/test_hexbin.py
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from dashboard.analysis.hexbin import HexGridEngine, celdas_de_puntos, padres, poligonos, tamano_celda
+
+
+def test_cada_punto_cae_en_su_hexagono():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(480_000, 485_000, 2000)
+    y = rng.uniform(2_130_000, 2_135_000, 2000)
+    celdas = celdas_de_puntos(x, y, 4)
+    assert shapely.intersects_xy(poligonos(celdas), x, y).all()
+    area = shapely.area(poligonos(celdas[:1]))[0]
+    assert np.isclose(area, 1.5 * np.sqrt(3) * tamano_celda(4) ** 2)
+    # El padre contiene el centro de la hija
+    hijas = np.unique(celdas)
+    assert (padres(hijas, 4) == hijas).all()
+
+
+def test_agregacion_multinivel_conserva_totales():
+    rng = np.random.default_rng(1)
+    puntos = gpd.GeoDataFrame(
+        {'tipo': rng.choice(['salud', 'educacion'], 500), 'camas': rng.integers(0, 10, 500)},
+        geometry=gpd.points_from_xy(rng.uniform(-99.19, -99.11, 500), rng.uniform(19.29, 19.36, 500)),
+        crs='EPSG:4326'
+    )
+    motor = HexGridEngine()
+    capas = motor.agregar(puntos, [3, 5], sumas=['camas'], columna_categoria='tipo')
+    for capa in capas.values():
+        assert capa.crs == 'EPSG:4326'
+        assert capa['conteo'].sum() == 500
+        assert capa['camas'].sum() == puntos['camas'].sum()
+        assert (capa['conteo_salud'] + capa['conteo_educacion'] == capa['conteo']).all()
+    assert len(capas[3]) < len(capas[5])
+    # Las geometrías de cada resolución se construyen una sola vez
+    antes = motor.geometrias(np.array(capas[5]['celda'], dtype='int64'), 5)
+    despues = motor.geometrias(np.array(capas[5]['celda'], dtype='int64'), 5)
+    assert all(a is b for a, b in zip(antes, despues))
@@ -0,0 +1,51 @@
+# tests/test_iter_ingest.py
+
+import pandas as pd
+import pytest
+
+from scripts.iter_ingest import (
+    IterIngestConfig,
+    dms_series_to_decimal,
+    ingest_a_parquet,
+    leer_iter_por_bloques,
+)
+
+CSV_ITER = (
+    'ENTIDAD,NOM_ENT,MUN,NOM_MUN,LOC,NOM_LOC,LONGITUD,LATITUD,ALTITUD,POBTOT,POBFEM\n'
+    '09,Ciudad de México,003,Coyoacán,0000,Total del Municipio,,,,614447,326090\n'
+    '09,Ciudad de México,003,Coyoacán,0001,Coyoacán,"99°09\'44.893"" W","19°21\'01.626"" N",2240,614447,*\n'
+    '09,Ciudad de México,002,Azcapotzalco,0001,Azcapotzalco,"99°11\'04.000"" W","19°29\'13.000"" N",2240,432205,N/D\n'
+    '15,México,003,Aculco,0001,Aculco,"99°49\'37.000"" W","20°05\'56.000"" N",2440,5000,2600\n'
+)
+
+
+@pytest.fixture
+def iter_csv(tmp_path):
+    ruta = tmp_path / 'iter.csv'
+    ruta.write_text(CSV_ITER, encoding='utf-8')
+    return str(ruta)
+
+
+def test_dms_vectorizado():
+    serie = pd.Series(['99°09\'44.893" W', '19°21\'01.626" N', 'sin dato', None])
+    decimal = dms_series_to_decimal(serie)
+    assert decimal[0] == pytest.approx(-99.162470, abs=1e-6)
+    assert decimal[1] == pytest.approx(19.350452, abs=1e-6)
+    assert decimal[2:].isna().all()
+
+
+def test_filtra_municipio_por_bloques(iter_csv):
+    config = IterIngestConfig(csv_path=iter_csv, chunksize=2)
+    datos = pd.concat(leer_iter_por_bloques(config))
+    assert list(datos['NOM_LOC']) == ['Coyoacán']
+    assert datos['ENTIDAD'].iloc[0] == '09'
+    assert datos['POBTOT'].dtype == 'float32'
+    assert pd.isna(datos['POBFEM'].iloc[0])
+
+
+def test_ingest_a_parquet(iter_csv, tmp_path):
+    salida = str(tmp_path / 'iter.parquet')
+    config = IterIngestConfig(csv_path=iter_csv, municipio=None, chunksize=1)
+    assert ingest_a_parquet(config, salida) == 2
+    datos = pd.read_parquet(salida)
+    assert sorted(datos['NOM_MUN']) == ['Azcapotzalco', 'Coyoacán']
@@ -0,0 +1,34 @@
+# tests/test_name_search.py
+
+import numpy as np
+
+from app.name_search import NameSearchIndex, normalizar
+
+
+def _indice():
+    indice = NameSearchIndex(limite=5)
+    indice.agregar('calle',
+                   ['Av. Río Churubusco', 'Av. Río Churubusco', 'Miguel Ángel de Quevedo', None,
+                    'Calle Churubusco Norte'],
+                   np.array([[0, 0, 1, 1], [1, 1, 2, 3], [5, 5, 6, 6], [0, 0, 0, 0], [7, 7, 8, 8]]))
+    indice.agregar('colonia', ['Del Carmen', 'Santa Catarina'], np.zeros((2, 4)))
+    return indice.construir()
+
+
+def test_prefijo_de_nombre_y_de_palabra():
+    indice = _indice()
+    assert normalizar('  Av. RÍO  churubusco ') == 'av rio churubusco'
+    etiquetas = [indice.etiquetas[k] for k in indice.buscar('CHUR')]
+    assert etiquetas == ['Av. Río Churubusco', 'Calle Churubusco Norte']
+    assert indice.etiquetas[indice.buscar('del')[0]] == 'Del Carmen'
+    # Los registros con el mismo nombre se agrupan y su caja es la unión
+    rio = indice.buscar('av rio')[0]
+    assert indice.caja(rio) == (0, 0, 2, 3) and indice.filas[rio].tolist() == [0, 1]
+
+
+def test_busqueda_difusa_completa_el_resultado():
+    indice = _indice()
+    assert [indice.etiquetas[k] for k in indice.buscar('quevdo')] == ['Miguel Ángel de Quevedo']
+    opciones = indice.opciones(indice.buscar('sta catarna'))
+    assert opciones == [{'label': 'Santa Catarina (colonia)', 'value': 4}]
+    assert indice.buscar('zzzz') == [] and indice.buscar('') == []
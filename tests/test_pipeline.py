@@ -0,0 +1,93 @@
+# tests/test_pipeline.py
+
+import importlib.util
+import sys
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import Point
+
+from scripts.pipeline import Paso, Pipeline
+
+
+def leer(capa: str) -> gpd.GeoDataFrame:
+    return gpd.read_file(capa)
+
+
+def unir(a: gpd.GeoDataFrame, b: gpd.GeoDataFrame, factor: int) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {'valor': list(a['valor'] * factor) + list(b['valor'] * factor)},
+        geometry=list(a.geometry) + list(b.geometry), crs=a.crs
+    )
+
+
+def _capa(ruta, valor):
+    gpd.GeoDataFrame({'valor': [valor]}, geometry=[Point(valor, valor)], crs='EPSG:4326')\
+        .to_file(ruta, driver='GeoJSON')
+    return str(ruta)
+
+
+def _pasos(tmp_path, factor=2):
+    return [
+        Paso('a', leer, archivos={'capa': str(tmp_path / 'a.geojson')}),
+        Paso('b', leer, archivos={'capa': str(tmp_path / 'b.geojson')}),
+        Paso('union', unir, dependencias=('a', 'b'), parametros={'factor': factor},
+             salida=str(tmp_path / 'salida' / 'union.geojson')),
+    ]
+
+
+def test_solo_se_reconstruye_lo_que_depende_del_cambio(tmp_path):
+    _capa(tmp_path / 'a.geojson', 1)
+    _capa(tmp_path / 'b.geojson', 2)
+    cache = str(tmp_path / 'cache')
+
+    primero = Pipeline(_pasos(tmp_path), cache, max_procesos=1).construir()
+    assert all(r.ejecutado for r in primero.values())
+    assert list(gpd.read_file(tmp_path / 'salida' / 'union.geojson')['valor']) == [2, 4]
+
+    segundo = Pipeline(_pasos(tmp_path), cache, max_procesos=1).construir()
+    assert not any(r.ejecutado for r in segundo.values())
+
+    _capa(tmp_path / 'b.geojson', 5)
+    tercero = Pipeline(_pasos(tmp_path), cache, max_procesos=1).construir()
+    assert {n: r.ejecutado for n, r in tercero.items()} == {'a': False, 'b': True, 'union': True}
+
+    # Cambiar un parámetro solo invalida su paso
+    pipeline = Pipeline(_pasos(tmp_path, factor=3), cache, max_procesos=2)
+    assert pipeline.plan() == {'a': False, 'b': False, 'union': True}
+    resultado = pipeline.construir()
+    assert list(gpd.read_parquet(resultado['union'].ruta)['valor']) == [3, 15]
+
+
+def test_dependencias_invalidas_y_ciclos(tmp_path):
+    with pytest.raises(ValueError):
+        Pipeline([Paso('x', leer, dependencias=('y',))], str(tmp_path))
+    with pytest.raises(ValueError):
+        Pipeline([Paso('x', unir, dependencias=('y',)), Paso('y', unir, dependencias=('x',))], str(tmp_path))
+
+
+def test_cambiar_un_auxiliar_reconstruye_el_paso(tmp_path, monkeypatch):
+    def cargar(nombre, factor):
+        ruta = tmp_path / f'{nombre}.py'
+        ruta.write_text(
+            'import geopandas as gpd\n\n\n'
+            f'def _escalar(valores):\n    return valores * {factor}\n\n\n'
+            'def leer_escalado(capa):\n'
+            '    gdf = gpd.read_file(capa)\n'
+            '    return gdf.assign(valor=_escalar(gdf["valor"]))\n'
+        )
+        spec = importlib.util.spec_from_file_location(nombre, ruta)
+        modulo = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, nombre, modulo)
+        spec.loader.exec_module(modulo)
+        return modulo
+
+    capa = _capa(tmp_path / 'a.geojson', 1)
+    cache = str(tmp_path / 'cache')
+    paso = Paso('a', cargar('pasos_v1', 2).leer_escalado, archivos={'capa': capa})
+    Pipeline([paso], cache, max_procesos=1).construir()
+    assert Pipeline([paso], cache, max_procesos=1).plan() == {'a': False}
+
+    # Misma función, auxiliar distinto
+    paso = Paso('a', cargar('pasos_v1', 30).leer_escalado, archivos={'capa': capa})
+    assert Pipeline([paso], cache, max_procesos=1).plan() == {'a': True}
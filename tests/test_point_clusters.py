@@ -0,0 +1,37 @@
+# tests/test_point_clusters.py
+
+import numpy as np
+
+from dashboard.analysis.point_clusters import PointClusterIndex
+
+BBOX_TOTAL = (-180, -85, 180, 85)
+
+
+def _puntos(n=3000, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(-99.19, -99.11, n), rng.uniform(19.29, 19.36, n)
+
+
+def test_conteos_se_conservan_en_cada_zoom():
+    lon, lat = _puntos()
+    indice = PointClusterIndex(lon, lat, max_zoom=14)
+    for zoom in range(0, 16):
+        assert indice.clusters(BBOX_TOTAL, zoom).conteo.sum() == len(lon)
+    assert indice.clusters(BBOX_TOTAL, 3).es_cluster.any()
+    # Después de max_zoom se ven todos los puntos sueltos
+    sueltos = indice.clusters(BBOX_TOTAL, 15)
+    assert len(sueltos) == len(lon) and not sueltos.es_cluster.any()
+
+
+def test_bbox_filtra_y_hojas_coinciden_con_conteo():
+    lon, lat = _puntos(semilla=1)
+    indice = PointClusterIndex(lon, lat, max_zoom=14)
+    vista = (-99.15, 19.30, -99.13, 19.32)
+    resultado = indice.clusters(vista, 16)
+    dentro = (lon >= vista[0]) & (lon <= vista[2]) & (lat >= vista[1]) & (lat <= vista[3])
+    assert sorted(resultado.ids) == sorted(np.flatnonzero(dentro))
+
+    medio = indice.clusters(BBOX_TOTAL, 10)
+    for cluster, conteo in zip(medio.ids[medio.es_cluster], medio.conteo[medio.es_cluster]):
+        assert len(indice.hojas(cluster)) == conteo
+        assert indice.zoom_expansion(cluster) > 10
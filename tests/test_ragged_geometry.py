@@ -0,0 +1,38 @@
+# tests/test_ragged_geometry.py
+
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, box
+
+from dashboard.data_access.ragged_geometry import RaggedGeometryArray
+
+
+def _geometrias():
+    return np.array([
+        box(0, 0, 2, 2).difference(box(0.5, 0.5, 1, 1)),
+        MultiPolygon([box(3, 3, 4, 4), box(5, 5, 7, 6)]),
+        None,
+        box(10, 10, 11, 13),
+    ], dtype=object)
+
+
+def test_medidas_vectorizadas_igual_a_shapely():
+    geometrias = _geometrias()
+    ragged = RaggedGeometryArray.desde_shapely(geometrias)
+    validas = ~shapely.is_missing(geometrias)
+    np.testing.assert_allclose(ragged.areas()[validas], shapely.area(geometrias[validas]))
+    np.testing.assert_allclose(ragged.perimetros()[validas], shapely.length(geometrias[validas]))
+    np.testing.assert_allclose(ragged.cajas(), shapely.bounds(geometrias))
+    assert ragged.vacias.tolist() == [False, False, True, False]
+
+
+def test_subconjunto_float32_y_regreso_a_shapely():
+    # Coordenadas de tamaño UTM, donde float32 sin origen local perdería precisión
+    desplazadas = shapely.transform(_geometrias()[[0, 1, 3]], lambda c: c + [480000, 2130000])
+    ragged = RaggedGeometryArray.desde_shapely(desplazadas, float32=True)
+    assert ragged.coords.dtype == np.float32
+    subconjunto = ragged.tomar(np.array([2, 0, 0]))
+    regreso = subconjunto.a_shapely()
+    assert [g.geom_type for g in regreso] == ['Polygon', 'Polygon', 'Polygon']
+    assert shapely.equals_exact(regreso, desplazadas[[2, 0, 0]], tolerance=1e-3).all()
+    np.testing.assert_allclose(subconjunto.areas(), shapely.area(desplazadas[[2, 0, 0]]), rtol=1e-6)
@@ -0,0 +1,76 @@
+# tests/test_regionalization.py
+
+import geopandas as gpd
+import numpy as np
+from scipy.sparse import csgraph
+from shapely.geometry import box
+
+from dashboard.analysis import regionalization as regionalizacion
+from dashboard.analysis.artifact_cache import ArtifactCache
+from dashboard.analysis.regionalization import (RegionalizationEngine, capa_regiones, grafo_contiguidad,
+                                                regionalizar)
+from dashboard.analysis.spatial_weights import SpatialWeightsBuilder
+
+
+def _rejilla(n=10):
+    rng = np.random.default_rng(0)
+    celdas = [box(x, y, x + 1, y + 1) for y in range(n) for x in range(n)]
+    x = np.array([c.bounds[0] for c in celdas])
+    return gpd.GeoDataFrame({
+        'id': [f"c{i}" for i in range(n * n)],
+        'indicador': np.where(x < n / 2, 0.0, 10.0) + rng.normal(scale=0.1, size=n * n),
+        'pob_total': rng.integers(50, 150, n * n),
+    }, geometry=celdas)
+
+
+def _contiguas(pesos, etiquetas):
+    grafo = grafo_contiguidad(pesos)
+    for region in np.unique(etiquetas):
+        miembros = np.flatnonzero(etiquetas == region)
+        if csgraph.connected_components(grafo[miembros][:, miembros], directed=False)[0] != 1:
+            return False
+    return True
+
+
+def test_skater_separa_zonas_homogeneas():
+    rejilla = _rejilla()
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'rook', ids=rejilla['id'].to_numpy())
+    resultado = regionalizar(rejilla, pesos, ['indicador'], 'skater', n_regiones=2, columna_id='id')
+    assert resultado.n_regiones == 2 and _contiguas(pesos, resultado.etiquetas)
+    izquierda = rejilla.geometry.bounds['minx'].to_numpy() < 5
+    assert len(np.unique(resultado.etiquetas[izquierda])) == 1
+    assert resultado.etiquetas[izquierda][0] != resultado.etiquetas[~izquierda][0]
+
+
+def test_maxp_respeta_umbral_y_reinicios_en_paralelo():
+    rejilla = _rejilla()
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'queen')
+    argumentos = dict(metodo='maxp', columna_piso='pob_total', umbral=800, reinicios=4)
+    paralelo = regionalizar(rejilla, pesos, ['indicador'], procesos=2, **argumentos)
+    secuencial = regionalizar(rejilla, pesos, ['indicador'], procesos=1, **argumentos)
+    assert np.array_equal(paralelo.etiquetas, secuencial.etiquetas)
+    assert paralelo.n_regiones > 1 and _contiguas(pesos, paralelo.etiquetas)
+
+    capa = capa_regiones(rejilla, pesos, paralelo, sumar=['pob_total'])
+    assert (capa['pob_total'] >= 800).all()
+    assert capa['n_unidades'].sum() == len(rejilla)
+    assert capa['pob_total'].sum() == rejilla['pob_total'].sum()
+
+
+def test_asignacion_en_cache_por_contenido(tmp_path, monkeypatch):
+    rejilla = _rejilla()
+    pesos = SpatialWeightsBuilder.construir(rejilla, 'rook', ids=rejilla['id'].to_numpy())
+    cache = ArtifactCache(str(tmp_path))
+    primera = RegionalizationEngine(cache).obtener(rejilla, pesos, ['indicador'], n_regiones=2, columna_id='id')
+
+    llamadas = []
+    original = regionalizacion.regionalizar
+    monkeypatch.setattr(regionalizacion, 'regionalizar', lambda *a, **k: llamadas.append(1) or original(*a, **k))
+    # Mismo contenido: otra instancia la carga del disco sin recalcular
+    segunda = RegionalizationEngine(cache).obtener(rejilla, pesos, ['indicador'], n_regiones=2, columna_id='id')
+    assert np.array_equal(primera.etiquetas, segunda.etiquetas) and not llamadas
+    # Otros valores u otros parámetros: se recalcula
+    rejilla.loc[0, 'indicador'] += 1.0
+    RegionalizationEngine(cache).obtener(rejilla, pesos, ['indicador'], n_regiones=2, columna_id='id')
+    RegionalizationEngine(cache).obtener(rejilla, pesos, ['indicador'], n_regiones=3, columna_id='id')
+    assert len(llamadas) == 2
@@ -0,0 +1,43 @@
+# tests/test_spatial_index.py
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from dashboard.analysis.artifact_cache import ArtifactCache
+from dashboard.analysis.spatial_index import SpatialIndexStore, recortar, unir_espacial
+
+
+def _rejilla(n=4, crs='EPSG:32614'):
+    celdas = [box(x * 100, y * 100, (x + 1) * 100, (y + 1) * 100) for x in range(n) for y in range(n)]
+    return gpd.GeoDataFrame({'id': [f'c{i}' for i in range(n * n)]}, geometry=celdas, crs=crs)
+
+
+def test_indice_persistido_se_reutiliza_entre_procesos(tmp_path):
+    celdas = _rejilla()
+    SpatialIndexStore(ArtifactCache(str(tmp_path))).obtener('celdas', celdas)
+    # Otro proceso (otro almacén) abre el índice de disco sin reconstruirlo
+    otro = SpatialIndexStore(ArtifactCache(str(tmp_path)))
+    otro.construir = None
+    indice = otro.obtener('celdas', celdas)
+    assert indice.n == 16
+    # Si la capa cambia, la huella no coincide y se reconstruye
+    nuevo = SpatialIndexStore(ArtifactCache(str(tmp_path))).obtener('celdas', celdas.iloc[:4])
+    assert nuevo.n == 4
+
+
+def test_union_y_recorte_como_geopandas(tmp_path):
+    celdas = _rejilla()
+    puntos = gpd.GeoDataFrame({'id': ['p1', 'p2']},
+                              geometry=[box(150, 150, 160, 160), box(1000, 1000, 1010, 1010)],
+                              crs='EPSG:32614')
+    indice = SpatialIndexStore(ArtifactCache(str(tmp_path))).obtener('celdas', celdas)
+    unida = unir_espacial(puntos, celdas, indice, how='left')
+    esperada = gpd.sjoin(puntos, celdas, how='left', predicate='intersects')
+    assert list(unida.columns) == list(esperada.columns)
+    assert unida['id_right'].tolist() == esperada['id_right'].tolist()
+
+    mascara = gpd.GeoDataFrame(geometry=[box(50, 50, 250, 250)], crs='EPSG:32614')
+    recorte = recortar(celdas, mascara, indice)
+    assert np.isclose(recorte.area.sum(), gpd.clip(celdas, mascara).area.sum())
+    assert len(recorte) == 9
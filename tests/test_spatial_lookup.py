@@ -0,0 +1,44 @@
+# tests/test_spatial_lookup.py
+
+import geopandas as gpd
+from shapely.geometry import box
+
+from app.spatial_lookup import ZoneLookupService
+
+
+def _servicio():
+    colonias = gpd.GeoDataFrame({
+        'id_colonia': ['03-001', '03-002'],
+        'nombre_col': ['Colonia Norte', 'Colonia Sur'],
+        'geometry': [box(-99.17, 19.33, -99.15, 19.35), box(-99.17, 19.31, -99.15, 19.33)]
+    }, crs="EPSG:4326")
+    manzanas = gpd.GeoDataFrame({
+        'nombre': ['Manzana 1', 'Manzana 2'],
+        'geometry': [box(-99.165, 19.335, -99.160, 19.340), box(-99.165, 19.315, -99.160, 19.320)]
+    }, crs="EPSG:4326")
+    servicio = ZoneLookupService()
+    servicio.agregar_capa('colonia', colonias, 'id_colonia', 'nombre_col')
+    servicio.agregar_capa('manzanas', manzanas, columna_nombre='nombre', padres=['colonia'])
+    return servicio
+
+
+def test_busqueda_por_punto_y_padres():
+    servicio = _servicio()
+    zona = servicio.buscar_punto('manzanas', 19.317, -99.162)
+    assert zona['nombre'] == 'Manzana 2'
+    assert zona['colonia'] == 'Colonia Sur'
+    assert servicio.buscar_punto('manzanas', 19.325, -99.162) is None
+
+
+def test_area_en_metros_cuadrados():
+    zona = _servicio().buscar_id('manzanas', 0)
+    # 0.005° x 0.005° a ~19.3°N ≈ 525 m x 553 m
+    assert 280_000 < zona['area_m2'] < 300_000
+    assert abs(zona['centroide_lat'] - 19.3375) < 1e-4
+
+
+def test_resolver_clic_por_location():
+    servicio = _servicio()
+    zona = servicio.resolver_clic('manzanas', {'points': [{'location': '1', 'hovertext': 'Manzana 2'}]})
+    assert zona['nombre'] == 'Manzana 2'
+    assert servicio.resolver_clic('manzanas', None) is None
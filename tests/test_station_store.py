@@ -0,0 +1,44 @@
+# tests/test_station_store.py
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point, box
+
+from dashboard.analysis.station_interpolation import StationInterpolator
+from dashboard.data_access.station_store import StationReadingStore
+
+
+def _lecturas(dias, estaciones=('A', 'B')):
+    fechas = pd.date_range(dias[0], dias[1], freq='h', inclusive='left')
+    filas = [(e, f, 'pm25', 10.0 if e == 'A' else 30.0) for e in estaciones for f in fechas]
+    return pd.DataFrame(filas, columns=['estacion', 'fecha', 'contaminante', 'valor'])
+
+
+def test_anexado_y_lectura_por_rango(tmp_path):
+    almacen = StationReadingStore(str(tmp_path))
+    assert almacen.agregar(_lecturas(('2023-01-30', '2023-02-02'))) == 3
+    almacen.agregar(_lecturas(('2023-02-01', '2023-02-02'), estaciones=('C',)))
+    assert almacen.particiones('2023-02-01', '2023-02-28') == ['2023-02-01']
+    assert almacen.meses() == ['2023-01', '2023-02']
+
+    febrero = almacen.leer('2023-02-01', '2023-03-01')
+    assert len(febrero) == 24 * 3
+    assert set(febrero['estacion']) == {'A', 'B', 'C'}
+    assert almacen.leer('2023-01-31 12:00', '2023-01-31 13:00')['fecha'].nunique() == 1
+    assert almacen.promedios('2023-01-01', '2023-02-01', 'PM25').to_dict() == {'A': 10.0, 'B': 30.0}
+
+
+def test_idw_renormaliza_sin_recalcular_pesos(tmp_path):
+    estaciones = gpd.GeoDataFrame({'estacion': ['A', 'B']},
+                                  geometry=[Point(0, 0), Point(1000, 0)], crs='EPSG:32614')
+    zonas = gpd.GeoDataFrame({'id': ['z1', 'z2']},
+                             geometry=[box(-10, -10, 10, 10), box(240, -10, 260, 10)], crs='EPSG:32614')
+    interpolador = StationInterpolator()
+    pesos = interpolador.pesos(estaciones, zonas, 'zona', columna_id_destino='id', k=2)
+    valores = pesos.interpolar(pd.Series({'A': 10.0, 'B': 30.0}))
+    # z1 coincide con A; z2 a 250 m de A y 750 m de B: pesos 9/10 y 1/10
+    assert np.allclose(valores, [10.0, 12.0])
+    # Si falta B, todo el peso pasa a A con los mismos vecinos
+    assert np.allclose(pesos.interpolar(pd.Series({'A': 10.0})), [10.0, 10.0])
+    assert interpolador.pesos(estaciones, zonas, 'zona', columna_id_destino='id', k=2) is pesos
@@ -0,0 +1,39 @@
+# tests/test_temporal_comparison.py
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from dashboard.analysis.temporal_comparison import comparar, deltas, serie_anual
+
+
+def _capa(ids, valores):
+    return gpd.GeoDataFrame({
+        'ageb': ids,
+        'pob_total': valores,
+    }, geometry=[box(int(i[1:]), 0, int(i[1:]) + 1, 1) for i in ids], crs="EPSG:4326")
+
+
+def test_serie_alinea_unidades_por_id_y_por_geometria():
+    capas = {2020: _capa(['a2', 'a0', 'a1'], [30.0, 10.0, 20.0]),
+             2010: _capa(['a0', 'a1'], [5.0, 20.0])}
+    for columna_id in ('ageb', None):
+        serie = serie_anual(capas, 'pob_total', columna_id=columna_id)
+        assert serie.anios.tolist() == [2010, 2020]
+        assert len(serie.unidades) == 3
+        fila = {i: k for k, i in enumerate(serie.unidades.geometry.bounds['minx'].astype(int))}
+        np.testing.assert_array_equal(serie.valores[[fila[0], fila[1], fila[2]]],
+                                      [[5.0, 10.0], [20.0, 20.0], [np.nan, 30.0]])
+
+
+def test_deltas_y_crecimiento():
+    delta, crecimiento = deltas(np.array([[10.0, 15.0, 15.0], [0.0, 4.0, 2.0]]))
+    np.testing.assert_array_equal(delta, [[5.0, 0.0], [4.0, -2.0]])
+    np.testing.assert_array_equal(crecimiento, [[50.0, 0.0], [np.nan, -50.0]])
+
+    serie = serie_anual({2010: _capa(['a0', 'a1'], [100.0, 0.0]),
+                         2020: _capa(['a0', 'a1'], [121.0, 3.0])}, 'pob_total', columna_id='ageb')
+    capa = comparar(serie, 2010, 2020).set_index('ageb')
+    assert capa.loc['a0', 'delta'] == 21.0 and capa.loc['a0', 'crecimiento_pct'] == 21.0
+    np.testing.assert_allclose(capa.loc['a0', 'crecimiento_anual_pct'], (1.21 ** 0.1 - 1) * 100)
+    assert np.isnan(capa.loc['a1', 'crecimiento_pct']) and np.isnan(capa.loc['a1', 'crecimiento_anual_pct'])
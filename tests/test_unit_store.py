@@ -0,0 +1,57 @@
+# tests/test_unit_store.py
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from dashboard.analysis.dual_crs import COLUMNA_METRICA, COLUMNAS_GEOMETRICAS, preparar_capa
+from dashboard.data_access.unit_store import UnitGeometryStore, es_multianual
+from dashboard.figures.geojson_serializer import GeoJSONSerializer
+
+
+def _capa_multianual(unidades=5, anios=(2010, 2015, 2020)):
+    filas = []
+    for anio in anios:
+        for i in range(unidades):
+            filas.append({'ageb': f'{i:03d}', 'anio': anio, 'pob': float(i * anio),
+                          'geometry': box(-99.17 + i * 0.01, 19.33, -99.16 + i * 0.01, 19.34)})
+    # Orden intercalado (no agrupado por año) y con índice propio
+    gdf = gpd.GeoDataFrame(filas, crs='EPSG:4326').sample(frac=1, random_state=0)
+    return preparar_capa(gdf)
+
+
+def test_capa_por_anio_igual_a_filtrar_original():
+    original = _capa_multianual()
+    assert es_multianual(original)
+    almacen = UnitGeometryStore.desde_capa(original, (COLUMNA_METRICA,) + COLUMNAS_GEOMETRICAS)
+    assert len(almacen.geometrias) == 5
+    assert sorted(almacen.anios) == [2010, 2015, 2020]
+    assert COLUMNA_METRICA not in almacen.atributos.columns
+
+    for anio in (2015, None):
+        esperado = original if anio is None else original[original['anio'] == anio]
+        capa = almacen.capa(anio)
+        assert list(capa.columns) == list(original.columns)
+        assert capa.index.equals(esperado.index)
+        pd.testing.assert_frame_equal(pd.DataFrame(capa.drop(columns=['geometry', COLUMNA_METRICA])),
+                                      pd.DataFrame(esperado.drop(columns=['geometry', COLUMNA_METRICA])))
+        assert capa.geometry.geom_equals(esperado.geometry).all()
+    assert almacen.capa(1990).empty
+
+
+def test_poligonos_columnares_y_serializacion():
+    original = _capa_multianual()
+    almacen = UnitGeometryStore.desde_capa(original, (COLUMNA_METRICA,) + COLUMNAS_GEOMETRICAS, float32=True)
+    assert almacen.es_poligonal
+    # Ninguna columna de objetos de shapely en memoria
+    assert not any(isinstance(c, gpd.GeoSeries) for _, c in almacen.unidades.items())
+
+    capa = almacen.capa(2020)
+    assert capa[COLUMNA_METRICA].crs == 'EPSG:32614'
+    np.testing.assert_allclose(capa[COLUMNA_METRICA].area, capa['area_m2'], rtol=1e-6)
+
+    columnares = almacen.geometrias_columnares(capa.index)
+    np.testing.assert_allclose(columnares.cajas(), capa.geometry.bounds.to_numpy(), atol=1e-6)
+    serializador = GeoJSONSerializer(precision=5)
+    assert serializador.serializar(capa, geometrias=columnares) == serializador.serializar(capa)
@@ -0,0 +1,58 @@
+# tests/test_zonal_stats.py
+
+import geopandas as gpd
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from dashboard.analysis.artifact_cache import ArtifactCache
+from dashboard.analysis.zonal_stats import AcumuladorZonal, EspecificacionRejilla, ZonalStatsEngine
+
+
+def _raster(ruta, valores, nodata=-9999.0):
+    # Píxeles de 10 m con origen en (0, 100)
+    with rasterio.open(ruta, 'w', driver='GTiff', height=valores.shape[0], width=valores.shape[1],
+                       count=1, dtype='float32', crs='EPSG:32614',
+                       transform=from_origin(0, 100, 10, 10), nodata=nodata) as dst:
+        dst.write(valores.astype('float32'), 1)
+
+
+def test_acumulador_coincide_con_numpy():
+    rng = np.random.default_rng(0)
+    etiquetas = rng.integers(0, 4, size=(50, 50))
+    valores = rng.normal(size=(50, 50))
+    acumulador = AcumuladorZonal(4, percentiles=(10, 50, 90))
+    acumulador.agregar(etiquetas[:20], valores[:20])
+    acumulador.agregar(etiquetas[20:], valores[20:])
+    tabla = acumulador.resultado()
+    for zona in (1, 2, 3):
+        datos = valores[etiquetas == zona]
+        fila = tabla.iloc[zona - 1]
+        assert np.isclose(fila['media'], datos.mean()) and fila['maximo'] == datos.max()
+        assert np.allclose([fila['p10'], fila['p50'], fila['p90']],
+                           np.percentile(datos.astype('float32'), [10, 50, 90]), atol=1e-6)
+    assert tabla.iloc[3]['pixeles'] == 0 and np.isnan(tabla.iloc[3]['media'])
+
+
+def test_estadisticas_por_ventanas_con_nodata(tmp_path):
+    valores = np.arange(100, dtype=float).reshape(10, 10)
+    valores[0, 0] = -9999.0
+    ruta = str(tmp_path / 'ndvi_2020.tif')
+    _raster(ruta, valores)
+    zonas = gpd.GeoDataFrame({'zona': ['oeste', 'este']},
+                             geometry=[box(0, 0, 50, 100), box(50, 0, 100, 100)], crs='EPSG:32614')
+
+    motor = ZonalStatsEngine(ArtifactCache(str(tmp_path / 'cache')), filas_por_bloque=3)
+    tabla = motor.estadisticas(ruta, zonas, 'prueba', 'zona')
+    oeste = valores[:, :5][valores[:, :5] != -9999.0]
+    assert tabla.loc['oeste', 'pixeles'] == 49
+    assert np.isclose(tabla.loc['oeste', 'media'], oeste.mean())
+    assert tabla.loc['este', 'minimo'] == 5 and tabla.loc['este', 'maximo'] == 99
+
+    # La rejilla de etiquetas se reutiliza desde disco (memoria mapeada)
+    otra = ZonalStatsEngine(ArtifactCache(str(tmp_path / 'cache')))
+    assert otra.estadisticas(ruta, zonas, 'prueba', 'zona').equals(tabla)
+    with rasterio.open(ruta) as src:
+        rejilla, _ = otra.etiquetas(zonas, 'prueba', EspecificacionRejilla.desde_raster(src), 'zona')
+    assert isinstance(rejilla, np.memmap)